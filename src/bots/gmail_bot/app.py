@@ -3,9 +3,12 @@ from __future__ import annotations
 import os
 from pathlib import Path
 
-from telegram.ext import Application, ApplicationBuilder
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder, TypeHandler
 
 from apps.gmail.telegram_commands import register_handlers
+from src.telegram import updates
+from src.telegram.http_client import ptb_urls
 
 def run_bot(env_path: Path) -> None:
     """
@@ -29,7 +32,13 @@ def run_bot(env_path: Path) -> None:
 
     print("Gmail Bot listening... (env:", env_path, ")")
 
-    app: Application = ApplicationBuilder().token(token).build()
+    # Same Bot API server as telegram_utils (TELEGRAM_API_BASE_URL)
+    base_url, base_file_url = ptb_urls()
+    app: Application = ApplicationBuilder().token(token).base_url(base_url).base_file_url(base_file_url).build()
+
+    # The panel reads this bot's chats from the store instead of getUpdates
+    if updates.bot_polls():
+        app.add_handler(TypeHandler(Update, updates.recorder(token)), group=-1)
 
     # Register Gmail commands
     register_handlers(app)
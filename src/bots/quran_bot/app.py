@@ -10,11 +10,21 @@ from telegram.ext import (
     CommandHandler,
     MessageHandler,
     ContextTypes,
+    TypeHandler,
     filters,
 )
 
+from src.telegram import updates
+from src.telegram.http_client import ptb_urls
 from src.telegram.panel.environment import load_environment
-from src.telegram.db import upsert_user_from_chat, add_message
+from src.telegram.db import (
+    add_message,
+    disable_write_behind,
+    enable_write_behind,
+    upsert_user_from_chat,
+)
+from src.telegram.retention import RetentionWorker
+from src.telegram.rollups import DEFAULT_INTERVAL_SEC, RollupWorker
 
 # =====================
 # General Configuration
@@ -245,7 +255,13 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 # =====================
 
 def build_application(token: str) -> Application:
-    app = Application.builder().token(token).build()
+    # Same Bot API server as telegram_utils (TELEGRAM_API_BASE_URL)
+    base_url, base_file_url = ptb_urls()
+    app = Application.builder().token(token).base_url(base_url).base_file_url(base_file_url).build()
+
+    # The panel reads this bot's chats from the store instead of getUpdates
+    if updates.bot_polls():
+        app.add_handler(TypeHandler(Update, updates.recorder(token)), group=-1)
 
     app.add_handler(CommandHandler("start", cmd_start))
     app.add_handler(CommandHandler("setsurah", cmd_setsurah))
@@ -265,6 +281,8 @@ def run_bot(env_path: Path) -> None:
 
     - Loads .env file.
     - Reads BOT_PROFILE and TELEGRAM_BOT_TOKEN.
+    - Enables write-behind DB logging when DB_WRITE_BEHIND is set.
+    - Starts the retention worker when DB_RETENTION_INTERVAL_SEC is set.
     - Starts the bot with polling.
 
     Args:
@@ -280,6 +298,36 @@ def run_bot(env_path: Path) -> None:
         print(f"Missing TELEGRAM_BOT_TOKEN in .env: {env_path}")
         return
 
+    # Optional group-commit logging (DB_WRITE_BEHIND=1 in .env)
+    write_behind = os.getenv("DB_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+    if write_behind:
+        enable_write_behind(
+            max_batch=int(os.getenv("DB_WRITE_BEHIND_BATCH", "500")),
+            flush_interval_ms=int(os.getenv("DB_WRITE_BEHIND_INTERVAL_MS", "50")),
+        )
+
+    # Optional background archiving/compaction (DB_RETENTION_INTERVAL_SEC in .env)
+    retention: RetentionWorker | None = None
+    retention_interval = os.getenv("DB_RETENTION_INTERVAL_SEC")
+    if retention_interval:
+        retention = RetentionWorker(interval=float(retention_interval))
+        retention.start()
+
+    # Activity rollups folded in the background (DB_ROLLUP_INTERVAL_SEC, 0 = off)
+    rollup_worker: RollupWorker | None = None
+    rollup_interval = float(os.getenv("DB_ROLLUP_INTERVAL_SEC", DEFAULT_INTERVAL_SEC))
+    if rollup_interval > 0:
+        rollup_worker = RollupWorker(interval=rollup_interval)
+        rollup_worker.start()
+
     print(f"Quran Bot starting... env={env_path}, profile={BOT_PROFILE}")
     app = build_application(token)
-    app.run_polling()
\ No newline at end of file
+    try:
+        app.run_polling()
+    finally:
+        if rollup_worker is not None:
+            rollup_worker.stop()
+        if retention is not None:
+            retention.stop()
+        if write_behind:
+            disable_write_behind()
\ No newline at end of file
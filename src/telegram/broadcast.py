@@ -0,0 +1,338 @@
+"""
+Concurrent broadcast engine, paced to Telegram's global and per-chat limits.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import lanes, telegram_utils
+
+# =========================
+#  Limits
+# =========================
+
+GLOBAL_RATE = 30.0            # messages per second for the whole bot
+PRIVATE_CHAT_INTERVAL = 1.0   # seconds between two messages to one private chat
+GROUP_CHAT_INTERVAL = 3.0     # 20 messages per minute to one group / channel
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_RETRIES = 3       # network errors and 5xx responses
+MAX_FLOOD_WAITS = 5           # 429 answers tolerated per recipient
+
+BroadcastResult = Dict[str, Any]
+SendFunc = Callable[[int | str], Dict[str, Any]]
+PartSendFunc = Callable[[int | str, int, Optional[int]], Dict[str, Any]]   # (chat_id, part, reply_to)
+ProgressFunc = Callable[[int, int, BroadcastResult], None]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: Optional[threading.Event] = None) -> bool:
+        """
+        Block until a token is available.
+
+        Returns:
+            bool: False if `stop` was set while waiting.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    wait = (1 - self._tokens) / self.rate
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hand out no tokens for `seconds` (used after a 429 answer).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0
+            self._updated = self._paused_until
+
+
+class ChatPacer:
+    """
+    Reserves send slots per chat so one chat never exceeds its own limit.
+    """
+
+    def __init__(
+        self,
+        private_interval: float = PRIVATE_CHAT_INTERVAL,
+        group_interval: float = GROUP_CHAT_INTERVAL,
+    ) -> None:
+        self.private_interval = private_interval
+        self.group_interval = group_interval
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def interval(self, chat_id: int | str) -> float:
+        # Groups, supergroups and channels have negative ids (or @usernames)
+        text = str(chat_id)
+        if text.startswith("-") or text.startswith("@"):
+            return self.group_interval
+        return self.private_interval
+
+    def reserve(self, chat_id: int | str) -> float:
+        """
+        Return the earliest monotonic time this chat may receive a message
+        and book that slot.
+        """
+        key = str(chat_id)
+        with self._lock:
+            at = max(time.monotonic(), self._next.get(key, 0.0))
+            self._next[key] = at + self.interval(chat_id)
+            return at
+
+    def delay(self, chat_id: int | str, seconds: float) -> float:
+        """
+        Push the chat's next slot at least `seconds` into the future.
+        """
+        key = str(chat_id)
+        with self._lock:
+            at = max(time.monotonic() + seconds, self._next.get(key, 0.0))
+            self._next[key] = at + self.interval(chat_id)
+            return at
+
+
+# =========================
+#  Engine
+# =========================
+
+def _send_text_parts(
+    text: str,
+    parse_mode: Optional[str],
+    disable_web_page_preview: Optional[bool],
+) -> Tuple[int, PartSendFunc]:
+    """
+    Split `text` once (see `text_split`) and return the number of parts and
+    a sender of one part; each part after the first replies to the previous one.
+    """
+    parts = telegram_utils._text_payloads("", text, parse_mode, disable_web_page_preview)
+
+    def send(chat_id: int | str, part: int, reply_to: Optional[int]) -> Dict[str, Any]:
+        payload = {**parts[part], "chat_id": chat_id}
+        if reply_to:
+            payload["reply_to_message_id"] = reply_to
+        return telegram_utils._request("sendMessage", payload, retry=False)
+
+    return len(parts), send
+
+
+def _retry_after(response: Dict[str, Any]) -> Optional[float]:
+    if response.get("error_code") != 429:
+        return None
+    params = response.get("parameters") or {}
+    return float(params.get("retry_after") or 1)
+
+
+def iter_broadcast(
+    chat_ids: List[int | str],
+    text: Optional[str] = None,
+    parse_mode: Optional[str] = None,
+    disable_web_page_preview: Optional[bool] = None,
+    send: Optional[SendFunc] = None,
+    workers: int = DEFAULT_WORKERS,
+    rate: float = GLOBAL_RATE,
+    private_interval: float = PRIVATE_CHAT_INTERVAL,
+    group_interval: float = GROUP_CHAT_INTERVAL,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    lane: str = lanes.BULK,
+) -> Iterator[BroadcastResult]:
+    """
+    Send to every chat and yield one result per recipient as soon as it is final.
+
+    Args:
+        chat_ids (List[int | str]): Recipients (duplicates are paced per chat).
+        text (Optional[str]): Message text (sendMessage). Texts over 4096
+            characters go out as chained parts; each part counts against the
+            global rate and the chat's pacing, and the result's response is
+            the last part's, with every id under "message_ids".
+        parse_mode (Optional[str]): "Markdown" / "HTML".
+        disable_web_page_preview (Optional[bool]): Passed to sendMessage.
+        send (Optional[SendFunc]): Custom sender `chat_id -> API response`
+            (e.g. a sendPhoto call) used instead of `text`; it must return the
+            raw response like `telegram_utils._request(..., retry=False)`.
+        workers (int): Concurrent API calls.
+        rate (float): Global messages per second.
+        private_interval (float): Seconds between messages to one private chat.
+        group_interval (float): Seconds between messages to one group/channel.
+        max_retries (int): Retries after network errors / 5xx responses.
+        lane (str): Priority lane of the sends (`lanes`); bulk by default so
+            interactive replies keep flowing during the broadcast.
+
+    Yields:
+        BroadcastResult: {"index", "chat_id", "ok", "response", "error_code",
+        "error", "attempts"}; `index` is the position in `chat_ids`.
+
+    Closing the generator early stops the remaining sends.
+    """
+    if send is not None:
+        custom = send
+        part_count, send_part = 1, lambda chat_id, part, reply_to: custom(chat_id)
+    elif text is not None:
+        part_count, send_part = _send_text_parts(text, parse_mode, disable_web_page_preview)
+    else:
+        raise ValueError("Either text or send must be given.")
+
+    bucket = TokenBucket(rate)
+    pacer = ChatPacer(private_interval, group_interval)
+    stop = threading.Event()
+    cond = threading.Condition()
+    seq = itertools.count()
+
+    # (ready_at, seq, index, chat_id, part, part_attempts, flood_waits)
+    heap: List[Tuple[float, int, int, int | str, int, int, int]] = []
+    for index, chat_id in enumerate(chat_ids):
+        heap.append((pacer.reserve(chat_id), next(seq), index, chat_id, 0, 0, 0))
+    heapq.heapify(heap)
+
+    done: List[BroadcastResult] = []
+    pending = [len(chat_ids)]
+    attempts = [0] * len(chat_ids)                      # API calls per recipient
+    message_ids: List[List[int]] = [[] for _ in chat_ids]
+
+    def finish(index: int, chat_id: int | str, response: Dict[str, Any]) -> None:
+        ok = bool(response.get("ok"))
+        if ok and len(message_ids[index]) > 1:
+            response = {**response, "message_ids": message_ids[index]}
+        result = {
+            "index": index,
+            "chat_id": chat_id,
+            "ok": ok,
+            "response": response if ok else None,
+            "error_code": None if ok else response.get("error_code"),
+            "error": None if ok else response.get("description"),
+            "attempts": attempts[index],
+        }
+        with cond:
+            done.append(result)
+            pending[0] -= 1
+            cond.notify_all()
+
+    def worker() -> None:
+        with lanes.lane(lane):
+            work()
+
+    def work() -> None:
+        while not stop.is_set():
+            with cond:
+                if pending[0] <= 0:
+                    return
+                if not heap:
+                    cond.wait(0.1)
+                    continue
+                wait = heap[0][0] - time.monotonic()
+                if wait > 0:
+                    cond.wait(min(wait, 0.1))
+                    continue
+                _, _, index, chat_id, part, part_attempts, flood_waits = heapq.heappop(heap)
+
+            if not bucket.acquire(stop):
+                return
+            attempts[index] += 1
+            part_attempts += 1
+            reply_to = message_ids[index][-1] if message_ids[index] else None
+            try:
+                response = send_part(chat_id, part, reply_to)
+            except Exception as e:  # a custom sender may raise
+                response = {"ok": False, "error_code": None, "description": str(e)}
+
+            retry_after = _retry_after(response)
+            error_code = response.get("error_code")
+            if response.get("ok") and part + 1 < part_count:
+                # Next part of a long text: paced like any other message to this chat
+                message_ids[index].append(response["result"]["message_id"])
+                item = (pacer.reserve(chat_id), next(seq), index, chat_id, part + 1, 0, flood_waits)
+            elif retry_after is not None and flood_waits < MAX_FLOOD_WAITS:
+                bucket.pause(retry_after)
+                at = pacer.delay(chat_id, retry_after)
+                item = (at, next(seq), index, chat_id, part, part_attempts, flood_waits + 1)
+            elif not response.get("ok") and (error_code is None or error_code >= 500) and part_attempts <= max_retries:
+                at = time.monotonic() + min(30.0, 0.5 * 2 ** (part_attempts - 1))
+                item = (at, next(seq), index, chat_id, part, part_attempts, flood_waits)
+            else:
+                if response.get("ok") and part_count > 1:
+                    message_ids[index].append(response["result"]["message_id"])
+                finish(index, chat_id, response)
+                continue
+
+            with cond:
+                heapq.heappush(heap, item)
+                cond.notify_all()
+
+    threads = [
+        threading.Thread(target=worker, name=f"broadcast-{i}", daemon=True)
+        for i in range(max(1, min(workers, len(chat_ids))))
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        yielded = 0
+        while yielded < len(chat_ids):
+            with cond:
+                while len(done) <= yielded:
+                    cond.wait()
+                batch = done[yielded:]
+            for result in batch:
+                yielded += 1
+                yield result
+    finally:
+        stop.set()
+        with cond:
+            cond.notify_all()
+        for t in threads:
+            t.join()
+
+
+def run_broadcast(
+    chat_ids: List[int | str],
+    text: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+    **options: Any,
+) -> List[BroadcastResult]:
+    """
+    Broadcast and wait for every recipient (see `iter_broadcast` for options).
+
+    Args:
+        chat_ids (List[int | str]): Recipients.
+        text (Optional[str]): Message text.
+        on_progress (Optional[ProgressFunc]): Called as
+            `on_progress(done, total, result)` after every recipient.
+
+    Returns:
+        List[BroadcastResult]: One result per recipient, in `chat_ids` order.
+    """
+    results: List[Optional[BroadcastResult]] = [None] * len(chat_ids)
+    for n, result in enumerate(iter_broadcast(chat_ids, text, **options), start=1):
+        results[result["index"]] = result
+        if on_progress is not None:
+            on_progress(n, len(chat_ids), result)
+    return results  # type: ignore[return-value]
@@ -0,0 +1,572 @@
+"""
+Cached chat metadata (getChat, getChatMemberCount, getUserProfilePhotos):
+an in-process LRU over the `chat_metadata` table, refreshed in the background.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import db, lanes, telegram_utils
+from .media_cache import token_key
+
+# =========================
+#  Settings
+# =========================
+
+DEFAULT_CACHE_SIZE = 5_000       # entries in the in-process LRU
+DEFAULT_MAX_ROWS = 100_000       # rows kept in the chat_metadata table
+REFRESH_BATCH = 50               # entries fetched (and stored in one transaction) per batch
+REFRESH_CONCURRENCY = 4          # API calls in flight per batch
+
+Value = Dict[str, Any]
+
+
+class Kind(NamedTuple):
+    method: str
+    params: Callable[[int], Dict[str, Any]]
+    value: Callable[[Any], Value]
+    applies: Callable[[int], bool]
+    ttl: int
+
+
+def _photos_value(result: Dict[str, Any]) -> Value:
+    photos = result.get("photos") or []
+    sizes = photos[0] if photos else []
+    smallest = sizes[0] if sizes else {}
+    return {
+        "total_count": result.get("total_count", 0),
+        "file_id": smallest.get("file_id"),
+        "file_unique_id": smallest.get("file_unique_id"),
+    }
+
+
+# Cached kinds: method, request parameters, value stored, which chats it
+# applies to (member counts exist for groups/channels, profile photos for
+# users) and how long an answer stays fresh.
+KINDS: Dict[str, Kind] = {
+    "chat": Kind(
+        "getChat",
+        lambda chat_id: {"chat_id": chat_id},
+        lambda result: result,
+        lambda chat_id: True,
+        3600,
+    ),
+    "member_count": Kind(
+        "getChatMemberCount",
+        lambda chat_id: {"chat_id": chat_id},
+        lambda result: {"count": result},
+        lambda chat_id: chat_id < 0,
+        900,
+    ),
+    "photos": Kind(
+        "getUserProfilePhotos",
+        lambda chat_id: {"user_id": chat_id, "limit": 1},
+        _photos_value,
+        lambda chat_id: chat_id > 0,
+        86400,
+    ),
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def ttl(kind: str) -> int:
+    """
+    Seconds an answer of `kind` stays fresh (TELEGRAM_CHAT_INFO_TTL_SEC
+    overrides every kind).
+    """
+    return _env_int("TELEGRAM_CHAT_INFO_TTL_SEC", KINDS[kind].ttl)
+
+
+# =========================
+#  Memory Tier
+# =========================
+
+_Key = Tuple[str, str, int]   # (token_key, kind, chat_id)
+
+
+class Entry(NamedTuple):
+    value: Optional[Value]
+    error: Optional[str]
+    fetched_ts: int
+
+    def fresh(self, kind: str, now: float) -> bool:
+        return now - self.fetched_ts < ttl(kind)
+
+
+class _LRU:
+    """
+    Bounded LRU of cache entries, for one database file.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max(1, max_size)
+        self.path = str(db.DB_PATH)
+        self._entries: "OrderedDict[_Key, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: _Key) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: _Key, entry: Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: _Key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_lru: Optional[_LRU] = None
+_lru_lock = threading.Lock()
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stale": 0, "fetches": 0, "fetch_errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _memory() -> _LRU:
+    """
+    Return the LRU for the current DB_PATH (a new database starts empty).
+    """
+    global _lru
+    lru = _lru
+    if lru is None or lru.path != str(db.DB_PATH):
+        with _lru_lock:
+            if _lru is None or _lru.path != str(db.DB_PATH):
+                _lru = _LRU(_env_int("TELEGRAM_CHAT_INFO_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+            lru = _lru
+    return lru
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+# =========================
+#  Persistent Tier
+# =========================
+
+_schema_ready: set[str] = set()
+
+
+def _ensure_schema() -> bool:
+    """
+    Run the migrations once per database file; False if the DB is unusable.
+    """
+    path = str(db.DB_PATH)
+    if path in _schema_ready:
+        return True
+    try:
+        db.init_db()
+    except sqlite3.Error as e:
+        print(f"[CHAT INFO ERROR] {e}")
+        return False
+    _schema_ready.add(path)
+    return True
+
+
+def _load(tkey: str, kind: str, chat_ids: List[int]) -> Dict[int, Entry]:
+    """
+    Stored entries of `kind` for `chat_ids`, in one query per 500 ids.
+    """
+    found: Dict[int, Entry] = {}
+    if not chat_ids or not _ensure_schema():
+        return found
+    with db._pool().connection() as conn:
+        for start in range(0, len(chat_ids), 500):
+            chunk = chat_ids[start:start + 500]
+            rows = conn.execute(
+                f"""
+                SELECT chat_id, value, error, fetched_ts FROM chat_metadata
+                WHERE token_key = ? AND kind = ? AND chat_id IN ({",".join("?" * len(chunk))})
+                """,
+                (tkey, kind, *chunk),
+            ).fetchall()
+            for row in rows:
+                value = json.loads(row["value"]) if row["value"] is not None else None
+                found[row["chat_id"]] = Entry(value, row["error"], row["fetched_ts"])
+    return found
+
+
+def _save(tkey: str, results: List[Tuple[str, int, Entry]]) -> None:
+    """
+    Store a batch of fetched entries in one transaction, then drop the
+    oldest rows above TELEGRAM_CHAT_INFO_MAX.
+    """
+    if not results or not _ensure_schema():
+        return
+    with db._transaction() as conn:
+        conn.executemany(
+            """
+            INSERT INTO chat_metadata (token_key, kind, chat_id, value, error, fetched_ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(token_key, kind, chat_id) DO UPDATE SET
+                value = excluded.value,
+                error = excluded.error,
+                fetched_ts = excluded.fetched_ts
+            """,
+            [
+                (
+                    tkey, kind, chat_id,
+                    json.dumps(entry.value, ensure_ascii=False) if entry.value is not None else None,
+                    entry.error, entry.fetched_ts,
+                )
+                for kind, chat_id, entry in results
+            ],
+        )
+        conn.execute(
+            """
+            DELETE FROM chat_metadata
+            WHERE (token_key, kind, chat_id) IN (
+                SELECT token_key, kind, chat_id FROM chat_metadata
+                ORDER BY fetched_ts DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (max(1, _env_int("TELEGRAM_CHAT_INFO_MAX", DEFAULT_MAX_ROWS)),),
+        )
+
+
+# =========================
+#  Fetching
+# =========================
+
+def _fetch(kind: str, chat_id: int) -> Optional[Entry]:
+    """
+    Call the Bot API for one entry. Returns None on a transient failure
+    (nothing is cached then).
+    """
+    spec = KINDS[kind]
+    data = telegram_utils._request(spec.method, spec.params(chat_id), timeout=15)
+    now = int(time.time())
+    _count("fetches")
+    if data.get("ok"):
+        return Entry(spec.value(data.get("result")), None, now)
+    _count("fetch_errors")
+    if data.get("error_code") in (400, 403):
+        return Entry(None, data.get("description") or "error", now)
+    print(f"[CHAT INFO ERROR] {spec.method} for {chat_id}: {data.get('description')}")
+    return None
+
+
+def _store(token: str, results: List[Tuple[str, int, Entry]]) -> None:
+    tkey = token_key(token)
+    memory = _memory()
+    for kind, chat_id, entry in results:
+        memory.put((tkey, kind, chat_id), entry)
+    try:
+        _save(tkey, results)
+    except sqlite3.Error as e:
+        print(f"[CHAT INFO ERROR] {e}")
+
+
+def _lookup(token: str, kind: str, chat_ids: List[int]) -> Dict[int, Entry]:
+    """
+    Cached entries for `chat_ids` (fresh or stale), memory first, then the
+    table for the rest (which are promoted to memory).
+    """
+    tkey = token_key(token)
+    memory = _memory()
+    found: Dict[int, Entry] = {}
+    missing: List[int] = []
+    for chat_id in chat_ids:
+        entry = memory.get((tkey, kind, chat_id))
+        if entry is None:
+            missing.append(chat_id)
+        else:
+            found[chat_id] = entry
+    _count("memory_hits", len(found))
+
+    if missing:
+        try:
+            stored = _load(tkey, kind, missing)
+        except sqlite3.Error as e:
+            print(f"[CHAT INFO ERROR] {e}")
+            stored = {}
+        for chat_id, entry in stored.items():
+            memory.put((tkey, kind, chat_id), entry)
+        found.update(stored)
+        _count("db_hits", len(stored))
+        _count("misses", len(missing) - len(stored))
+    return found
+
+
+def _token() -> str:
+    return os.getenv("TELEGRAM_BOT_TOKEN", "")
+
+
+# =========================
+#  Background Refresh
+# =========================
+
+class _Refresher:
+    """
+    Fetches queued (kind, chat_id) entries in batches on a daemon thread,
+    which exits when the queue is empty and is restarted by `schedule()`.
+    """
+
+    def __init__(self) -> None:
+        self._pending: "OrderedDict[Tuple[str, str, int], None]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._inflight: set[Tuple[str, str, int]] = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, token: str, keys: Iterable[Tuple[str, int]]) -> int:
+        added = 0
+        with self._cond:
+            for kind, chat_id in keys:
+                key = (token, kind, chat_id)
+                if key not in self._pending and key not in self._inflight:
+                    self._pending[key] = None
+                    added += 1
+            if self._pending and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="chat-info-refresh", daemon=True)
+                self._thread.start()
+        return added
+
+    def _next_batch(self) -> List[Tuple[str, str, int]]:
+        with self._cond:
+            batch: List[Tuple[str, str, int]] = []
+            token = next(iter(self._pending))[0] if self._pending else None
+            for key in list(self._pending):
+                if len(batch) >= REFRESH_BATCH:
+                    break
+                if key[0] == token:
+                    batch.append(key)
+                    del self._pending[key]
+            self._inflight.update(batch)
+            if not batch:
+                self._thread = None
+                self._cond.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        with ThreadPoolExecutor(REFRESH_CONCURRENCY, thread_name_prefix="chat-info") as pool:
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    return
+                token = batch[0][0]
+                try:
+                    results = list(pool.map(lambda key: self._fetch_one(token, key[1], key[2]), batch))
+                    _store(token, [r for r in results if r is not None])
+                except Exception as e:  # keep the refresher alive
+                    print(f"[CHAT INFO ERROR] refresh failed: {e}")
+                finally:
+                    with self._cond:
+                        self._inflight.clear()
+                        self._cond.notify_all()
+
+    @staticmethod
+    def _fetch_one(token: str, kind: str, chat_id: int) -> Optional[Tuple[str, int, Entry]]:
+        if _token() != token:
+            return None   # the bot token changed since this was queued
+        with lanes.lane(lanes.BULK):
+            entry = _fetch(kind, chat_id)
+        return None if entry is None else (kind, chat_id, entry)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending) + len(self._inflight)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._inflight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+_refresher = _Refresher()
+
+
+# =========================
+#  Public API
+# =========================
+
+def get(chat_id: int, kind: str = "chat") -> Optional[Value]:
+    """
+    Metadata of one chat, fetched now when missing or stale.
+
+    Args:
+        chat_id (int): Numeric chat id.
+        kind (str): "chat" (getChat), "member_count" or "photos".
+
+    Returns:
+        Optional[Dict[str, Any]]: The cached answer; None when it does not
+        apply to this chat, Telegram refused it, or it is unavailable (a
+        stale answer is returned if the refresh fails transiently).
+    """
+    spec = KINDS[kind]
+    if not spec.applies(chat_id):
+        return None
+    token = _token()
+    entry = _lookup(token, kind, [chat_id]).get(chat_id)
+    if entry is None or not entry.fresh(kind, time.time()):
+        fetched = _fetch(kind, chat_id)
+        if fetched is not None:
+            _store(token, [(kind, chat_id, fetched)])
+            entry = fetched
+    return entry.value if entry is not None else None
+
+
+def _cached(
+    token: str,
+    chat_ids: List[int],
+    kinds: Iterable[str],
+) -> Tuple[Dict[int, Dict[str, Optional[Value]]], List[Tuple[str, int]]]:
+    """
+    Cached values of `chat_ids` per kind, and the (kind, chat_id) entries
+    that are missing or stale.
+    """
+    now = time.time()
+    result: Dict[int, Dict[str, Optional[Value]]] = {chat_id: {} for chat_id in chat_ids}
+    outdated: List[Tuple[str, int]] = []
+
+    for kind in kinds:
+        spec = KINDS[kind]
+        wanted = [chat_id for chat_id in chat_ids if spec.applies(chat_id)]
+        found = _lookup(token, kind, wanted)
+        for chat_id in chat_ids:
+            entry = found.get(chat_id)
+            result[chat_id][kind] = entry.value if entry is not None else None
+        for chat_id in wanted:
+            entry = found.get(chat_id)
+            if entry is None or not entry.fresh(kind, now):
+                if entry is not None:
+                    _count("stale")
+                outdated.append((kind, chat_id))
+    return result, outdated
+
+
+def get_many(
+    chat_ids: Iterable[int],
+    kinds: Iterable[str] = ("chat",),
+    refresh: bool = True,
+) -> Dict[int, Dict[str, Optional[Value]]]:
+    """
+    Cached metadata of many chats without calling the API on this thread.
+
+    Args:
+        chat_ids (Iterable[int]): Numeric chat ids.
+        kinds (Iterable[str]): Kinds to return (see KINDS).
+        refresh (bool): Queue missing and stale entries for the background
+            refresher.
+
+    Returns:
+        Dict[int, Dict[str, Optional[Dict[str, Any]]]]: chat_id -> kind ->
+        cached value (stale values included), or None when not known yet.
+    """
+    token = _token()
+    result, outdated = _cached(token, list(dict.fromkeys(int(c) for c in chat_ids)), kinds)
+    if refresh and outdated and token:
+        _refresher.schedule(token, outdated)
+    return result
+
+
+def prefetch(chat_ids: Iterable[int], kinds: Iterable[str] = ("chat",)) -> int:
+    """
+    Queue missing or stale entries for a background refresh.
+
+    Returns:
+        int: Number of entries queued.
+    """
+    token = _token()
+    _, outdated = _cached(token, list(dict.fromkeys(int(c) for c in chat_ids)), kinds)
+    if not token:
+        return 0
+    return _refresher.schedule(token, outdated)
+
+
+def invalidate(chat_id: int, kind: Optional[str] = None) -> None:
+    """
+    Forget the cached answers of one chat (every kind by default).
+    """
+    tkey = token_key(_token())
+    kinds = [kind] if kind else list(KINDS)
+    memory = _memory()
+    for k in kinds:
+        memory.pop((tkey, k, chat_id))
+    if not _ensure_schema():
+        return
+    with db._transaction() as conn:
+        conn.executemany(
+            "DELETE FROM chat_metadata WHERE token_key = ? AND kind = ? AND chat_id = ?",
+            [(tkey, k, chat_id) for k in kinds],
+        )
+
+
+def wait_idle(timeout: Optional[float] = None) -> bool:
+    """
+    Wait until the background refresher has nothing left to fetch.
+
+    Returns:
+        bool: False if `timeout` elapsed first.
+    """
+    return _refresher.wait_idle(timeout)
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Returns:
+        Dict[str, Any]: Hit / miss / fetch counters, the LRU size and the
+        number of entries waiting for a refresh.
+    """
+    with _stats_lock:
+        result: Dict[str, Any] = dict(_stats)
+    memory = _memory()
+    result["size"] = len(memory)
+    result["evictions"] = memory.evictions
+    result["pending"] = _refresher.pending()
+    return result
+
+
+def reset() -> None:
+    """
+    Clear the in-process tier and the counters (the table is kept).
+    """
+    global _lru
+    with _lru_lock:
+        _lru = None
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def display_name(chat: Optional[Value]) -> Optional[str]:
+    """
+    Title of a group/channel or full name of a user from a getChat answer.
+    """
+    if not chat:
+        return None
+    if chat.get("title"):
+        return chat["title"]
+    name = f"{chat.get('first_name') or ''} {chat.get('last_name') or ''}".strip()
+    return name or chat.get("username")
@@ -1,23 +1,177 @@
 from __future__ import annotations
 
+import atexit
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .migrations import migrate
+from .sqlite_pool import SQLitePool, close_pool, get_pool
 
 # Path to the project root: src/telegram/db.py → ../.. = project root
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "telegram_data.db"
 
+logger = logging.getLogger(__name__)
+
 
 # =========================
 #  Database Connection
 # =========================
 
-def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def _pool() -> SQLitePool:
+    """
+    Return the shared connection pool for the current DB_PATH.
+    """
+    return get_pool(DB_PATH)
+
+
+@contextmanager
+def _get_conn() -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection (read-only use, no commit).
+
+    After `enable_read_only_reads()` this is a `mode=ro` / `query_only`
+    connection (to DB_PATH or to its replica), and the whole block reads
+    one consistent WAL snapshot.
+    """
+    if _read_only is None:
+        with _pool().connection() as conn:
+            yield conn
+        return
+
+    with _read_pool().connection() as conn:
+        began = not conn.in_transaction
+        if began:
+            conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            if began and conn.in_transaction:
+                conn.rollback()
+
+
+@contextmanager
+def _transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection and commit when the block succeeds.
+    """
+    with _pool().transaction() as conn:
+        yield conn
+
+
+# =========================
+#  Read-Only Path
+# =========================
+
+_read_only: Optional[Dict[str, Any]] = None
+_read_only_lock = threading.Lock()
+
+
+def _read_pool() -> SQLitePool:
+    ro = _read_only
+    if ro["replica"] is not None:
+        return get_pool(ro["replica"], immutable=True)
+    return get_pool(DB_PATH, readonly=True)
+
+
+def refresh_replica(replica_path: Path | str) -> None:
+    """
+    Copy a consistent snapshot of DB_PATH to `replica_path`.
+
+    The copy is made with the online backup API from a read-only connection
+    (no write lock is taken), written next to the target and swapped in with
+    an atomic rename. Connections to the old replica finish their queries;
+    new ones open the fresh file.
+    """
+    replica_path = Path(replica_path)
+    replica_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = replica_path.with_name(replica_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    src = sqlite3.connect(Path(DB_PATH).resolve().as_uri() + "?mode=ro", uri=True)
+    dst = sqlite3.connect(str(tmp_path))
+    try:
+        src.backup(dst)
+        # Rollback-journal file: opens read-only without -wal / -shm files.
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+
+    os.replace(tmp_path, replica_path)
+    close_pool(replica_path)
+
+
+class _ReplicaRefresher:
+    """
+    Daemon thread that refreshes the panel replica every `interval` seconds.
+    """
+
+    def __init__(self, replica_path: Path, interval: float) -> None:
+        self.replica_path = replica_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-replica", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                refresh_replica(self.replica_path)
+            except (sqlite3.Error, OSError) as e:
+                logger.error("replica refresh failed: %s", e)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def enable_read_only_reads(
+    replica_path: Optional[Path | str] = None,
+    refresh_sec: float = 30.0,
+) -> None:
+    """
+    Serve every read helper (`get_users_page`, `search_messages`, ...) from
+    read-only connections, so readers such as the panel never take a write
+    lock or slow down the bot's writers. Writes keep using the normal pool.
+
+    Args:
+        replica_path (Optional[Path | str]): Read a copy of the database
+            instead of the live file; it is refreshed every `refresh_sec`
+            seconds by a background thread.
+        refresh_sec (float): Replica refresh interval.
+    """
+    global _read_only
+    with _read_only_lock:
+        if _read_only is not None:
+            return
+        replica = Path(replica_path) if replica_path else None
+        refresher = None
+        if replica is not None:
+            refresh_replica(replica)
+            refresher = _ReplicaRefresher(replica, refresh_sec)
+        _read_only = {"replica": replica, "refresher": refresher}
+
+
+def disable_read_only_reads() -> None:
+    """
+    Go back to reading through the read/write pool.
+    """
+    global _read_only
+    with _read_only_lock:
+        ro = _read_only
+        _read_only = None
+    if ro is not None and ro["refresher"] is not None:
+        ro["refresher"].stop()
 
 
 # =========================
@@ -26,69 +180,201 @@ def _get_conn() -> sqlite3.Connection:
 
 def init_db() -> None:
     """
-    Create tables `users` and `messages` if they do not exist.
-    Adds `bot_profile` column if missing.
+    Create or upgrade the `users` and `messages` tables.
+
+    Runs the versioned migrations from `migrations.py` (tracked with
+    PRAGMA user_version), so existing databases are upgraded in place.
     """
-    conn = _get_conn()
-    cur = conn.cursor()
+    with _pool().connection() as conn:
+        migrate(conn)
 
-    # Create users table
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            chat_id INTEGER UNIQUE NOT NULL,
-            type TEXT,
-            username TEXT,
-            first_name TEXT,
-            last_name TEXT,
-            title TEXT,
-            added_at TEXT,
-            last_seen_at TEXT
-        )
-        """
-    )
 
-    # Try to add bot_profile column
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN bot_profile TEXT")
-    except sqlite3.OperationalError:
-        pass
+# =========================
+#  Date Helpers
+# =========================
+
+def _now() -> tuple[str, int]:
+    """
+    Current UTC time as (ISO-8601 text, epoch seconds) for the paired columns.
+    """
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    return now.replace(tzinfo=None).isoformat(), int(now.timestamp())
+
+
+# =========================
+#  Recently-Seen User Cache
+# =========================
+
+DEFAULT_USER_CACHE_SIZE = 10_000
+DEFAULT_USER_CACHE_TTL_SEC = 3600
+DEFAULT_USER_TOUCH_INTERVAL_SEC = 60
+
+# (bot_profile, chat_id) -> (type, username, first_name, last_name, title)
+_UserKey = Tuple[str, int]
+_UserFields = Tuple[Optional[str], ...]
+
+
+class _UserCache:
+    """
+    Bounded LRU of the user rows this process has written recently.
+
+    Each entry remembers the stored profile fields, the `last_seen_ts`
+    written for it and when it was cached. Entries older than `ttl` count as
+    misses, so rows changed by another process are rewritten eventually.
+    """
 
-    # Create messages table
-    cur.execute(
+    def __init__(self, max_size: int, ttl: float, touch_interval: int) -> None:
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.path = str(DB_PATH)
+        self._entries: "OrderedDict[_UserKey, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "full_writes": 0,
+            "touches": 0,
+            "skipped": 0,
+        }
+
+    def decide(self, key: _UserKey, fields: _UserFields, now_ts: int) -> str:
         """
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            chat_id INTEGER NOT NULL,
-            direction TEXT CHECK(direction IN ('in', 'out')) NOT NULL,
-            text TEXT,
-            created_at TEXT
-        )
+        Return "skip", "touch" (only last_seen changes) or "write", and
+        record the write the caller is about to make.
         """
-    )
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl:
+                del self._entries[key]
+                entry = None
+                self._stats["expired"] += 1
+
+            if entry is None or entry[0] != fields:
+                self._stats["misses"] += 1
+                self._stats["full_writes"] += 1
+                self._entries[key] = [fields, now_ts, time.monotonic()]
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+                return "write"
+
+            self._stats["hits"] += 1
+            self._entries.move_to_end(key)
+            if now_ts - entry[1] < self.touch_interval:
+                self._stats["skipped"] += 1
+                return "skip"
+            entry[1] = now_ts
+            self._stats["touches"] += 1
+            return "touch"
+
+    def forget(self, key: _UserKey) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
 
+_user_cache: Optional[_UserCache] = None
+_user_cache_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
     try:
-        cur.execute("ALTER TABLE messages ADD COLUMN bot_profile TEXT")
-    except sqlite3.OperationalError:
-        pass
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
 
-    conn.commit()
-    conn.close()
 
+def configure_user_cache(
+    max_size: Optional[int] = None,
+    ttl_sec: Optional[float] = None,
+    touch_interval_sec: Optional[int] = None,
+) -> None:
+    """
+    (Re)create the recently-seen user cache.
+
+    Defaults come from DB_USER_CACHE_SIZE, DB_USER_CACHE_TTL_SEC and
+    DB_USER_TOUCH_INTERVAL_SEC. A max_size of 0 disables the cache, so
+    every `upsert_user` writes the full row again.
 
-# =========================
-#  Date Helpers
-# =========================
+    Args:
+        max_size (Optional[int]): Maximum number of cached chats.
+        ttl_sec (Optional[float]): Seconds before an entry must be re-written in full.
+        touch_interval_sec (Optional[int]): Minimum seconds between two
+            `last_seen_at` updates of the same chat.
+    """
+    global _user_cache
+    if max_size is None:
+        max_size = _env_int("DB_USER_CACHE_SIZE", DEFAULT_USER_CACHE_SIZE)
+    if ttl_sec is None:
+        ttl_sec = _env_int("DB_USER_CACHE_TTL_SEC", DEFAULT_USER_CACHE_TTL_SEC)
+    if touch_interval_sec is None:
+        touch_interval_sec = _env_int("DB_USER_TOUCH_INTERVAL_SEC", DEFAULT_USER_TOUCH_INTERVAL_SEC)
+
+    with _user_cache_lock:
+        _user_cache = _UserCache(max_size, ttl_sec, touch_interval_sec) if max_size > 0 else None
+
+
+def _get_user_cache() -> Optional[_UserCache]:
+    """
+    Return the cache for the current DB_PATH (a new database starts empty).
+    """
+    cache = _user_cache
+    if cache is not None and cache.path != str(DB_PATH):
+        configure_user_cache(cache.max_size, cache.ttl, cache.touch_interval)
+        cache = _user_cache
+    return cache
 
-def _now_str() -> str:
-    return datetime.utcnow().isoformat(timespec="seconds")
+
+def user_cache_stats() -> Optional[Dict[str, Any]]:
+    """
+    Return hit / miss / skipped-write counters, or None when the cache is off.
+    """
+    cache = _user_cache
+    return cache.stats() if cache is not None else None
 
 
 # =========================
 #  Users Table Operations
 # =========================
 
+_UPSERT_USER_SQL = """
+    INSERT INTO users (
+        bot_profile, chat_id, type, username, first_name, last_name, title,
+        added_at, last_seen_at, added_ts, last_seen_ts
+    )
+    VALUES (
+        :bot_profile, :chat_id, :type, :username, :first_name, :last_name, :title,
+        :added_at, :last_seen_at, :added_ts, :last_seen_ts
+    )
+    ON CONFLICT(bot_profile, chat_id) DO UPDATE SET
+        type=excluded.type,
+        username=excluded.username,
+        first_name=excluded.first_name,
+        last_name=excluded.last_name,
+        title=excluded.title,
+        last_seen_at=excluded.last_seen_at,
+        last_seen_ts=excluded.last_seen_ts
+"""
+
+# Same insert, but an existing row only gets its last-seen columns updated
+# (the username / first_name indexes are left untouched).
+_TOUCH_USER_SQL = _UPSERT_USER_SQL.split("ON CONFLICT")[0] + """ON CONFLICT(bot_profile, chat_id) DO UPDATE SET
+        last_seen_at=excluded.last_seen_at,
+        last_seen_ts=excluded.last_seen_ts
+"""
+
+
 def upsert_user(
     chat_id: int,
     chat_type: Optional[str] = None,
@@ -99,48 +385,50 @@ def upsert_user(
     bot_profile: Optional[str] = None,
 ) -> None:
     """
-    Insert or update a user based on `chat_id`.
-    Also records the `bot_profile` to distinguish which bot interacted.
+    Insert or update a user based on (`bot_profile`, `chat_id`).
+    The same chat talking to two bots is stored once per bot profile.
+
+    Chats seen recently are looked up in the in-process user cache first:
+    nothing is written when the profile fields are unchanged and
+    `last_seen_at` was updated less than DB_USER_TOUCH_INTERVAL_SEC ago,
+    and only `last_seen_at` is updated when the fields are unchanged.
     """
-    conn = _get_conn()
-    cur = conn.cursor()
+    now, now_ts = _now()
+    params = {
+        "bot_profile": bot_profile or "",
+        "chat_id": chat_id,
+        "type": chat_type,
+        "username": username,
+        "first_name": first_name,
+        "last_name": last_name,
+        "title": title,
+        "added_at": now,
+        "last_seen_at": now,
+        "added_ts": now_ts,
+        "last_seen_ts": now_ts,
+    }
 
-    now = _now_str()
+    kind, sql = _WB_USER, _UPSERT_USER_SQL
+    cache = _get_user_cache()
+    if cache is not None:
+        key = (params["bot_profile"], chat_id)
+        action = cache.decide(key, (chat_type, username, first_name, last_name, title), now_ts)
+        if action == "skip":
+            return
+        if action == "touch":
+            kind, sql = _WB_USER_TOUCH, _TOUCH_USER_SQL
 
-    cur.execute(
-        """
-        INSERT INTO users (
-            chat_id, type, username, first_name, last_name, title,
-            added_at, last_seen_at, bot_profile
-        )
-        VALUES (
-            :chat_id, :type, :username, :first_name, :last_name, :title,
-            :added_at, :last_seen_at, :bot_profile
-        )
-        ON CONFLICT(chat_id) DO UPDATE SET
-            type=excluded.type,
-            username=excluded.username,
-            first_name=excluded.first_name,
-            last_name=excluded.last_name,
-            title=excluded.title,
-            last_seen_at=excluded.last_seen_at,
-            bot_profile=excluded.bot_profile
-        """,
-        {
-            "chat_id": chat_id,
-            "type": chat_type,
-            "username": username,
-            "first_name": first_name,
-            "last_name": last_name,
-            "title": title,
-            "added_at": now,
-            "last_seen_at": now,
-            "bot_profile": bot_profile,
-        },
-    )
+    if _write_behind is not None:
+        _write_behind.put(kind, params)
+        return
 
-    conn.commit()
-    conn.close()
+    try:
+        with _transaction() as conn:
+            conn.execute(sql, params)
+    except sqlite3.Error:
+        if cache is not None:
+            cache.forget(key)
+        raise
 
 
 def upsert_user_from_chat(chat: Any, bot_profile: Optional[str] = None) -> None:
@@ -165,26 +453,23 @@ def get_all_users() -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: List of user records.
     """
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT
-            chat_id,
-            type,
-            username,
-            first_name,
-            last_name,
-            title,
-            added_at,
-            last_seen_at,
-            bot_profile
-        FROM users
-        ORDER BY last_seen_at DESC
-        """
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with _get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT
+                chat_id,
+                type,
+                username,
+                first_name,
+                last_name,
+                title,
+                added_at,
+                last_seen_at,
+                bot_profile
+            FROM users
+            ORDER BY last_seen_ts DESC, id DESC
+            """
+        ).fetchall()
 
     return [dict(row) for row in rows]
 
@@ -193,6 +478,12 @@ def get_all_users() -> List[Dict[str, Any]]:
 #  Messages Table Operations
 # =========================
 
+_INSERT_MESSAGE_SQL = """
+    INSERT INTO messages (chat_id, direction, text, created_at, created_ts, bot_profile)
+    VALUES (:chat_id, :direction, :text, :created_at, :created_ts, :bot_profile)
+"""
+
+
 def add_message(
     chat_id: int,
     direction: str,
@@ -208,52 +499,553 @@ def add_message(
         text (Optional[str]): Message content.
         bot_profile (Optional[str]): Associated bot profile.
     """
-    conn = _get_conn()
-    cur = conn.cursor()
+    created_at, created_ts = _now()
+    params = {
+        "chat_id": chat_id,
+        "direction": direction,
+        "text": text,
+        "created_at": created_at,
+        "created_ts": created_ts,
+        "bot_profile": bot_profile or "",
+    }
 
-    cur.execute(
-        """
-        INSERT INTO messages (chat_id, direction, text, created_at, bot_profile)
-        VALUES (:chat_id, :direction, :text, :created_at, :bot_profile)
-        """,
-        {
-            "chat_id": chat_id,
-            "direction": direction,
-            "text": text,
-            "created_at": _now_str(),
-            "bot_profile": bot_profile,
-        },
-    )
+    if _write_behind is not None:
+        _write_behind.put(_WB_MESSAGE, params)
+        return
 
-    conn.commit()
-    conn.close()
+    with _transaction() as conn:
+        conn.execute(_INSERT_MESSAGE_SQL, params)
 
 
-def get_messages_for_chat(chat_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+def get_messages_for_chat(
+    chat_id: int,
+    limit: int = 50,
+    bot_profile: Optional[str] = None,
+    include_archive: bool = False,
+) -> List[Dict[str, Any]]:
     """
     Retrieve the last `limit` messages for a given chat ID.
 
     Args:
         chat_id (int): Telegram chat ID.
         limit (int): Number of recent messages to retrieve.
+        bot_profile (Optional[str]): Only return messages of this bot profile.
+        include_archive (bool): Also read archived (retention-moved) messages.
 
     Returns:
         List[Dict[str, Any]]: List of message records.
     """
-    conn = _get_conn()
-    cur = conn.cursor()
+    rows, _ = get_messages_page(
+        chat_id, bot_profile=bot_profile, limit=limit, include_archive=include_archive
+    )
+    return rows
 
-    cur.execute(
-        """
-        SELECT direction, text, created_at, bot_profile
-        FROM messages
-        WHERE chat_id = :chat_id
-        ORDER BY id DESC
+
+# =========================
+#  Paginated Queries
+# =========================
+
+# Keyset cursor for users: (last_seen_ts, id) of the last row on a page
+UserCursor = Tuple[int, int]
+
+_USER_COLUMNS = """
+    id, chat_id, type, username, first_name, last_name, title,
+    added_at, last_seen_at, last_seen_ts, bot_profile
+"""
+
+
+def _user_query(
+    bot_profile: str,
+    search: Optional[str],
+    cursor: Optional[UserCursor],
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the WHERE clause shared by `get_users_page` and `iter_users`.
+    """
+    where = ["bot_profile = :bot_profile"]
+    params: Dict[str, Any] = {"bot_profile": bot_profile}
+
+    search = (search or "").strip().lstrip("@")
+    if search:
+        # Prefix ranges keep the (bot_profile, username/first_name) indexes usable
+        params["lo"] = search
+        params["hi"] = search + "\U0010ffff"
+        terms = [
+            "(username >= :lo COLLATE NOCASE AND username < :hi COLLATE NOCASE)",
+            "(first_name >= :lo COLLATE NOCASE AND first_name < :hi COLLATE NOCASE)",
+        ]
+        if search.lstrip("-").isdigit():
+            params["search_chat_id"] = int(search)
+            terms.append("chat_id = :search_chat_id")
+        where.append("(" + " OR ".join(terms) + ")")
+
+    if cursor is not None:
+        where.append("(last_seen_ts, id) < (:cursor_ts, :cursor_id)")
+        params["cursor_ts"], params["cursor_id"] = cursor
+
+    sql = f"""
+        SELECT {_USER_COLUMNS}
+        FROM users
+        WHERE {" AND ".join(where)}
+        ORDER BY last_seen_ts DESC, id DESC
         LIMIT :limit
-        """,
-        {"chat_id": chat_id, "limit": limit},
-    )
+    """
+    return sql, params
+
+
+def get_users_page(
+    bot_profile: str,
+    search: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[UserCursor] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[UserCursor]]:
+    """
+    Fetch one page of users for a bot profile, most recently seen first.
+
+    The profile filter, prefix search and ordering all run in SQL and the
+    page is located with a keyset cursor, so the cost does not grow with
+    the number of users or the page number.
+
+    Args:
+        bot_profile (str): Profile to list (e.g. "quran").
+        search (Optional[str]): Prefix of username / first name, or a chat_id.
+        limit (int): Page size.
+        cursor (Optional[UserCursor]): Cursor returned by the previous page.
+
+    Returns:
+        Tuple: (list of user records, cursor for the next page or None)
+    """
+    sql, params = _user_query(bot_profile, search, cursor)
+    params["limit"] = limit + 1
+
+    with _get_conn() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    users = [dict(row) for row in rows[:limit]]
+    next_cursor: Optional[UserCursor] = None
+    if len(rows) > limit:
+        last = users[-1]
+        next_cursor = (last["last_seen_ts"], last["id"])
+    return users, next_cursor
+
+
+def iter_users(
+    bot_profile: str,
+    search: Optional[str] = None,
+    page_size: int = 500,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily iterate over every user of a profile, one keyset page at a time.
+    """
+    cursor: Optional[UserCursor] = None
+    while True:
+        users, cursor = get_users_page(bot_profile, search, page_size, cursor)
+        yield from users
+        if cursor is None:
+            return
+
+
+def _archive_tables(conn: sqlite3.Connection) -> List[str]:
+    """
+    Names of the monthly archive tables, newest month first.
+    """
+    rows = conn.execute("SELECT table_name FROM message_archives ORDER BY month DESC")
+    return [row[0] for row in rows]
+
+
+def get_messages_page(
+    chat_id: int,
+    bot_profile: Optional[str] = None,
+    limit: int = 50,
+    before_id: Optional[int] = None,
+    include_archive: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Fetch one page of a chat's messages, newest first.
+
+    Args:
+        chat_id (int): Telegram chat ID.
+        bot_profile (Optional[str]): Only messages of this profile (all if None).
+        limit (int): Page size.
+        before_id (Optional[int]): Cursor returned by the previous page.
+        include_archive (bool): Also read rows moved to the monthly archive
+            tables by the retention job.
+
+    Returns:
+        Tuple: (list of message records, cursor for older messages or None)
+    """
+    where = ["chat_id = :chat_id"]
+    params: Dict[str, Any] = {"chat_id": chat_id, "limit": limit + 1}
+    if bot_profile is not None:
+        where.append("bot_profile = :bot_profile")
+        params["bot_profile"] = bot_profile
+    if before_id is not None:
+        where.append("id < :before_id")
+        params["before_id"] = before_id
+
+    def select(table: str) -> str:
+        return f"""
+            SELECT * FROM (
+                SELECT id, direction, text, created_at, bot_profile
+                FROM {table}
+                WHERE {" AND ".join(where)}
+                ORDER BY id DESC
+                LIMIT :limit
+            )
+        """
+
+    with _get_conn() as conn:
+        tables = ["messages"]
+        if include_archive:
+            tables += _archive_tables(conn)
+        rows = conn.execute(
+            " UNION ALL ".join(select(t) for t in tables) + " ORDER BY id DESC LIMIT :limit",
+            params,
+        ).fetchall()
+
+    messages = [dict(row) for row in rows[:limit]]
+    next_before = messages[-1]["id"] if len(rows) > limit else None
+    return messages, next_before
+
+
+def iter_messages(
+    chat_id: int,
+    bot_profile: Optional[str] = None,
+    page_size: int = 500,
+    include_archive: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily iterate over a chat's messages, newest first.
+    """
+    before_id: Optional[int] = None
+    while True:
+        messages, before_id = get_messages_page(
+            chat_id, bot_profile, page_size, before_id, include_archive
+        )
+        yield from messages
+        if before_id is None:
+            return
+
+
+# =========================
+#  Full-Text Search
+# =========================
+
+# Keyset cursor for ranked search: (rank, id) of the last hit on a page
+SearchCursor = Tuple[float, int]
+
+
+def _fts_quote(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _fts_match(bot_profile: str, query: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 expression restricted to one profile.
+    Every word is quoted, so user input can never inject FTS5 syntax.
+    """
+    terms = [_fts_quote(word) for word in query.split() if word.strip('"')]
+    if not terms:
+        return None
+    return f"{{bot_profile}}: {_fts_quote(bot_profile)} AND {{text}}: ({' '.join(terms)})"
+
+
+def search_messages(
+    bot_profile: str,
+    query: str,
+    limit: int = 20,
+    cursor: Optional[SearchCursor] = None,
+    order: str = "rank",
+    highlight: Tuple[str, str] = ("**", "**"),
+    rank_window: Optional[int] = 5_000,
+) -> Tuple[List[Dict[str, Any]], Optional[SearchCursor]]:
+    """
+    Full-text search over one profile's logged messages.
+
+    Args:
+        bot_profile (str): Profile to search in.
+        query (str): Words to look for (all must match).
+        limit (int): Page size.
+        cursor (Optional[SearchCursor]): Cursor returned by the previous page.
+        order (str): "rank" (bm25 relevance) or "recent" (newest first; cheapest
+            for very common words because no ranking sort is needed).
+        highlight (Tuple[str, str]): Markers placed around matches in `snippet`.
+        rank_window (Optional[int]): With order="rank", only the newest
+            `rank_window` matches are scored. This keeps very common words
+            from scoring millions of rows; None ranks every match.
+
+    Returns:
+        Tuple: (list of hits with id, chat_id, direction, created_at, snippet
+        and rank; cursor for the next page or None)
+    """
+    match = _fts_match(bot_profile, query)
+    if match is None:
+        return [], None
+
+    params: Dict[str, Any] = {
+        "match": match,
+        "limit": limit + 1,
+        "open": highlight[0],
+        "close": highlight[1],
+    }
+    where = ["messages_fts MATCH :match"]
+    # bm25 needs document frequencies for every phrase, so only pay for it when ranking
+    rank_column = "messages_fts.rank"
+
+    if order == "recent":
+        order_by = "messages_fts.rowid DESC"
+        rank_column = "NULL"
+        if cursor is not None:
+            where.append("messages_fts.rowid < :cursor_id")
+            params["cursor_id"] = cursor[1]
+    else:
+        order_by = "messages_fts.rank, messages_fts.rowid"
+        if rank_window:
+            where.append(
+                """
+                messages_fts.rowid >= COALESCE((
+                    SELECT rowid FROM messages_fts
+                    WHERE messages_fts MATCH :match
+                    ORDER BY rowid DESC
+                    LIMIT 1 OFFSET :window
+                ), 0)
+                """
+            )
+            params["window"] = rank_window - 1
+        if cursor is not None:
+            where.append("(messages_fts.rank, messages_fts.rowid) > (:cursor_rank, :cursor_id)")
+            params["cursor_rank"], params["cursor_id"] = cursor
+
+    with _get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT
+                m.id,
+                m.chat_id,
+                m.direction,
+                m.created_at,
+                snippet(messages_fts, 0, :open, :close, '…', 16) AS snippet,
+                {rank_column} AS rank
+            FROM messages_fts
+            JOIN messages AS m ON m.id = messages_fts.rowid
+            WHERE {" AND ".join(where)}
+            ORDER BY {order_by}
+            LIMIT :limit
+            """,
+            params,
+        ).fetchall()
+
+    hits = [dict(row) for row in rows[:limit]]
+    next_cursor: Optional[SearchCursor] = None
+    if len(rows) > limit:
+        last = hits[-1]
+        next_cursor = (last["rank"], last["id"])
+    return hits, next_cursor
+
+
+# =========================
+#  Write-Behind Queue
+# =========================
+
+_WB_USER = "user"
+_WB_USER_TOUCH = "user_touch"
+_WB_MESSAGE = "message"
+
+
+class _WriteBehindQueue:
+    """
+    Bounded queue + background writer for `upsert_user` and `add_message`.
+
+    Rows are grouped and written with `executemany` in a single transaction
+    every `max_batch` rows or `flush_interval_ms`, whichever comes first.
+    Producers block when the queue is full (backpressure).
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 500,
+        flush_interval_ms: int = 50,
+        max_queue: int = 10_000,
+    ) -> None:
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = max(1, flush_interval_ms) / 1000
+        self._queue: "queue.Queue[Optional[tuple[str, Dict[str, Any]]]]" = queue.Queue(
+            maxsize=max(1, max_queue)
+        )
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "enqueued": 0,
+            "blocked_puts": 0,
+            "flushes": 0,
+            "flushed_rows": 0,
+            "failed_rows": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+        self._thread = threading.Thread(
+            target=self._run, name="db-write-behind", daemon=True
+        )
+        self._thread.start()
+
+    # ---------- producer side ----------
+
+    def put(self, kind: str, params: Dict[str, Any]) -> None:
+        item = (kind, params)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["blocked_puts"] += 1
+            self._queue.put(item)
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+
+    def flush(self) -> None:
+        """
+        Block until every row enqueued so far has been written.
+        """
+        self._queue.join()
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---------- writer side ----------
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            stop = first is None
+
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                stop = item is None
+
+            rows = [item for item in batch if item is not None]
+            if rows:
+                self._write(rows)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, rows: List[tuple[str, Dict[str, Any]]]) -> None:
+        # User writes keep their order (a touch must not overwrite a newer
+        # full upsert of the same chat); consecutive runs share one executemany.
+        user_runs: List[tuple[str, List[Dict[str, Any]]]] = []
+        for kind, params in rows:
+            if kind == _WB_MESSAGE:
+                continue
+            if user_runs and user_runs[-1][0] == kind:
+                user_runs[-1][1].append(params)
+            else:
+                user_runs.append((kind, [params]))
+        messages = [params for kind, params in rows if kind == _WB_MESSAGE]
+
+        start = time.perf_counter()
+        try:
+            with _transaction() as conn:
+                for kind, params_list in user_runs:
+                    sql = _TOUCH_USER_SQL if kind == _WB_USER_TOUCH else _UPSERT_USER_SQL
+                    conn.executemany(sql, params_list)
+                if messages:
+                    conn.executemany(_INSERT_MESSAGE_SQL, messages)
+        except sqlite3.Error as e:
+            logger.error("write-behind flush failed, dropped %d rows: %s", len(rows), e)
+            # Those users were never stored: the next upsert must write them again
+            cache = _user_cache
+            if cache is not None:
+                for kind, params in rows:
+                    if kind != _WB_MESSAGE:
+                        cache.forget((params["bot_profile"], params["chat_id"]))
+            with self._stats_lock:
+                self._stats["failed_rows"] += len(rows)
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self._stats["flushes"] += 1
+            self._stats["flushed_rows"] += len(rows)
+            self._stats["last_flush_ms"] = elapsed_ms
+            self._stats["total_flush_ms"] += elapsed_ms
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        flushes = stats.pop("total_flush_ms")
+        stats["avg_flush_ms"] = flushes / stats["flushes"] if stats["flushes"] else 0.0
+        stats["queue_depth"] = self._queue.qsize()
+        stats["max_queue"] = self._queue.maxsize
+        return stats
+
+
+_write_behind: Optional[_WriteBehindQueue] = None
+_write_behind_lock = threading.Lock()
+
+
+def enable_write_behind(
+    max_batch: int = 500,
+    flush_interval_ms: int = 50,
+    max_queue: int = 10_000,
+) -> None:
+    """
+    Switch `upsert_user` and `add_message` to group-commit mode.
+
+    Writes return immediately and are flushed by a background thread
+    every `max_batch` rows or `flush_interval_ms` milliseconds.
+    Pending rows are flushed automatically at interpreter exit.
+
+    Args:
+        max_batch (int): Maximum rows written per transaction.
+        flush_interval_ms (int): Maximum time a row waits before being written.
+        max_queue (int): Queue capacity; producers block once it is full.
+    """
+    global _write_behind
+    with _write_behind_lock:
+        if _write_behind is not None:
+            return
+        _write_behind = _WriteBehindQueue(max_batch, flush_interval_ms, max_queue)
+
+
+def disable_write_behind() -> None:
+    """
+    Flush pending rows, stop the writer thread and go back to direct writes.
+    """
+    global _write_behind
+    with _write_behind_lock:
+        wb = _write_behind
+        _write_behind = None
+    if wb is not None:
+        wb.stop()
+
+
+def flush_writes() -> None:
+    """
+    Wait until every queued write has been committed (no-op in direct mode).
+    """
+    wb = _write_behind
+    if wb is not None:
+        wb.flush()
+
+
+def write_behind_stats() -> Optional[Dict[str, Any]]:
+    """
+    Return queue depth and flush latency counters, or None in direct mode.
+    """
+    wb = _write_behind
+    return wb.stats() if wb is not None else None
+
 
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
\ No newline at end of file
+atexit.register(disable_write_behind)
+configure_user_cache()
@@ -0,0 +1,420 @@
+"""
+Streaming, resumable export of users and message history
+(`python -m src.telegram.export --help`).
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import db
+
+try:  # optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+DEFAULT_CHUNK_SIZE = 1000
+
+MESSAGE_COLUMNS = ["id", "chat_id", "direction", "text", "created_at", "created_ts", "bot_profile"]
+USER_COLUMNS = [
+    "id", "chat_id", "type", "username", "first_name", "last_name", "title",
+    "added_at", "last_seen_at", "bot_profile",
+]
+
+FORMATS = ("ndjson", "csv")
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+# Export position: (source index, keyset values of the last row written)
+Checkpoint = Dict[str, Any]
+
+
+# =========================
+#  Row Readers
+# =========================
+
+def _message_sources(include_archive: bool) -> List[str]:
+    """
+    Tables to read, oldest first: archive months (ascending), then live rows.
+    """
+    if not include_archive:
+        return ["messages"]
+    with db._get_conn() as conn:
+        archives = list(reversed(db._archive_tables(conn)))
+    return archives + ["messages"]
+
+
+def iter_messages_for_export(
+    bot_profile: str,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    direction: Optional[str] = None,
+    include_archive: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    checkpoint: Optional[Checkpoint] = None,
+) -> Iterator[Tuple[Dict[str, Any], Checkpoint]]:
+    """
+    Yield (message row, checkpoint after this row) for one profile.
+
+    Live rows are walked on the (bot_profile, created_ts) index with a
+    (created_ts, id) keyset, rows without created_ts first; archive tables
+    are walked by id. Every chunk is
+    a separate short query, so no read transaction stays open for the whole
+    export and WAL checkpoints keep running.
+    """
+    sources = _message_sources(include_archive)
+    start_source = 0
+    cursor: List[Any] = []
+    if checkpoint:
+        if checkpoint.get("source") in sources:
+            start_source = sources.index(checkpoint["source"])
+            cursor = list(checkpoint.get("cursor") or [])
+
+    for index in range(start_source, len(sources)):
+        table = sources[index]
+        live = table == "messages"
+        if index != start_source:
+            cursor = []
+
+        while True:
+            where = ["bot_profile = :bot_profile"]
+            params: Dict[str, Any] = {"bot_profile": bot_profile, "limit": chunk_size}
+            if since_ts is not None:
+                where.append("created_ts >= :since")
+                params["since"] = since_ts
+            if until_ts is not None:
+                where.append("created_ts < :until")
+                params["until"] = until_ts
+            if direction:
+                where.append("direction = :direction")
+                params["direction"] = direction
+
+            if live:
+                if cursor and cursor[0] is None:
+                    # NULL created_ts sorts first: finish those rows by id, then the rest
+                    where.append("((created_ts IS NULL AND id > :cursor_id) OR created_ts IS NOT NULL)")
+                    params["cursor_id"] = cursor[1]
+                elif cursor:
+                    where.append("(created_ts, id) > (:cursor_ts, :cursor_id)")
+                    params["cursor_ts"], params["cursor_id"] = cursor
+                source_sql = "messages INDEXED BY idx_messages_profile_created"
+                order_by = "created_ts, id"
+            else:
+                if cursor:
+                    where.append("id > :cursor_id")
+                    params["cursor_id"] = cursor[0]
+                source_sql = f"{table} NOT INDEXED"
+                order_by = "id"
+
+            with db._get_conn() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT {", ".join(MESSAGE_COLUMNS)}
+                    FROM {source_sql}
+                    WHERE {" AND ".join(where)}
+                    ORDER BY {order_by}
+                    LIMIT :limit
+                    """,
+                    params,
+                ).fetchall()
+
+            for row in rows:
+                record = dict(row)
+                cursor = [record["created_ts"], record["id"]] if live else [record["id"]]
+                yield record, {"source": table, "cursor": cursor}
+
+            if len(rows) < chunk_size:
+                break
+
+
+def iter_users_for_export(
+    bot_profile: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    checkpoint: Optional[Checkpoint] = None,
+) -> Iterator[Tuple[Dict[str, Any], Checkpoint]]:
+    """
+    Yield (user row, checkpoint after this row) for one profile, by id.
+    """
+    last_id = 0
+    if checkpoint and checkpoint.get("cursor"):
+        last_id = checkpoint["cursor"][0]
+
+    while True:
+        with db._get_conn() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT {", ".join(USER_COLUMNS)}
+                FROM users NOT INDEXED
+                WHERE id > :last_id AND bot_profile = :bot_profile
+                ORDER BY id
+                LIMIT :limit
+                """,
+                {"last_id": last_id, "bot_profile": bot_profile, "limit": chunk_size},
+            ).fetchall()
+
+        for row in rows:
+            record = dict(row)
+            last_id = record["id"]
+            yield record, {"source": "users", "cursor": [last_id]}
+
+        if len(rows) < chunk_size:
+            return
+
+
+# =========================
+#  Encoders
+# =========================
+
+def _encoder(fmt: str, columns: List[str]) -> Tuple[Optional[str], Callable[[Dict[str, Any]], str]]:
+    """
+    Return (header line or None, function encoding one row as a line).
+    """
+    if fmt == "ndjson":
+        return None, lambda row: json.dumps(row, ensure_ascii=False) + "\n"
+    if fmt != "csv":
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def encode(values: List[Any]) -> str:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow(values)
+        return buf.getvalue()
+
+    return encode(columns), lambda row: encode([row.get(c) for c in columns])
+
+
+def _stream_compressor(compression: str) -> Any:
+    """
+    Return an object with compress(bytes) / flush() for one continuous stream.
+    """
+    if compression == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip container
+    if compression == "zstd":
+        _require_zstd()
+        return zstandard.ZstdCompressor().compressobj()
+    if compression != "none":
+        raise ValueError(f"Unknown compression: {compression}")
+    return None
+
+
+def _compress_chunk(data: bytes, compression: str) -> bytes:
+    """
+    Compress one chunk as a complete gzip member / zstd frame, so a file can be
+    truncated back to any chunk boundary and appended to again.
+    """
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if compression == "zstd":
+        _require_zstd()
+        return zstandard.ZstdCompressor().compress(data)
+    if compression != "none":
+        raise ValueError(f"Unknown compression: {compression}")
+    return data
+
+
+def _require_zstd() -> None:
+    if zstandard is None:
+        raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard).")
+
+
+# =========================
+#  Export API
+# =========================
+
+def _checkpoint_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".checkpoint")
+
+
+def _rows_and_columns(
+    kind: str,
+    bot_profile: str,
+    filters: Dict[str, Any],
+    chunk_size: int,
+    checkpoint: Optional[Checkpoint],
+) -> Tuple[Iterator[Tuple[Dict[str, Any], Checkpoint]], List[str]]:
+    if kind == "users":
+        return iter_users_for_export(bot_profile, chunk_size, checkpoint), USER_COLUMNS
+    if kind == "messages":
+        return (
+            iter_messages_for_export(
+                bot_profile,
+                since_ts=filters.get("since_ts"),
+                until_ts=filters.get("until_ts"),
+                direction=filters.get("direction"),
+                include_archive=filters.get("include_archive", False),
+                chunk_size=chunk_size,
+                checkpoint=checkpoint,
+            ),
+            MESSAGE_COLUMNS,
+        )
+    raise ValueError(f"Unknown export kind: {kind}")
+
+
+def stream_export(
+    kind: str,
+    bot_profile: str,
+    fmt: str = "ndjson",
+    compression: str = "none",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **filters: Any,
+) -> Iterator[bytes]:
+    """
+    Generate the export as a stream of (optionally compressed) byte chunks.
+
+    Args:
+        kind (str): "messages" or "users".
+        bot_profile (str): Profile to export.
+        fmt (str): "ndjson" or "csv".
+        compression (str): "none", "gzip" or "zstd".
+        chunk_size (int): Rows read per query.
+        **filters: since_ts, until_ts, direction, include_archive (messages only).
+
+    Yields:
+        bytes: Output chunks, roughly one per `chunk_size` rows.
+    """
+    rows, columns = _rows_and_columns(kind, bot_profile, filters, chunk_size, None)
+    header, encode = _encoder(fmt, columns)
+    comp = _stream_compressor(compression)
+
+    def emit(lines: List[str]) -> bytes:
+        data = "".join(lines).encode("utf-8")
+        return comp.compress(data) if comp is not None else data
+
+    lines: List[str] = [header] if header else []
+    pending = 0
+    for record, _ in rows:
+        lines.append(encode(record))
+        pending += 1
+        if pending >= chunk_size:
+            out = emit(lines)
+            lines, pending = [], 0
+            if out:
+                yield out
+
+    tail = emit(lines)
+    if comp is not None:
+        tail += comp.flush()
+    if tail:
+        yield tail
+
+
+def export_to_file(
+    kind: str,
+    bot_profile: str,
+    out_path: Path | str,
+    fmt: str = "ndjson",
+    compression: str = "none",
+    resume: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **filters: Any,
+) -> Dict[str, Any]:
+    """
+    Export to a file, writing a checkpoint after every chunk.
+
+    Every chunk is written as a self-contained gzip member / zstd frame, and
+    the checkpoint records the byte offset after it. With `resume=True` the
+    file is truncated back to that offset and the export continues after the
+    last row written; standard decompressors read the members as one stream.
+    The checkpoint file is removed once the export completes.
+
+    Returns:
+        Dict[str, Any]: total rows, output path and whether it resumed.
+    """
+    out_path = Path(out_path)
+    ckpt_path = _checkpoint_path(out_path)
+
+    checkpoint: Optional[Checkpoint] = None
+    if resume and ckpt_path.exists() and out_path.exists():
+        checkpoint = json.loads(ckpt_path.read_text(encoding="utf-8"))
+        with open(out_path, "r+b") as f:
+            f.truncate(checkpoint["bytes"])
+
+    rows, columns = _rows_and_columns(kind, bot_profile, filters, chunk_size, checkpoint)
+    header, encode = _encoder(fmt, columns)
+    total = checkpoint["rows"] if checkpoint else 0
+
+    with open(out_path, "ab" if checkpoint else "wb") as f:
+        lines: List[str] = [header] if header and checkpoint is None else []
+        position: Checkpoint = {}
+
+        def flush_chunk() -> None:
+            f.write(_compress_chunk("".join(lines).encode("utf-8"), compression))
+            f.flush()
+            ckpt_path.write_text(
+                json.dumps({**position, "bytes": f.tell(), "rows": total}),
+                encoding="utf-8",
+            )
+
+        pending = 0
+        for record, position in rows:
+            lines.append(encode(record))
+            total += 1
+            pending += 1
+            if pending >= chunk_size:
+                flush_chunk()
+                lines, pending = [], 0
+
+        if lines:
+            flush_chunk()
+
+    ckpt_path.unlink(missing_ok=True)
+    return {"rows": total, "path": str(out_path), "resumed": checkpoint is not None}
+
+
+# =========================
+#  CLI
+# =========================
+
+def _parse_date(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export users or messages of a bot profile.")
+    parser.add_argument("kind", choices=["messages", "users"])
+    parser.add_argument("--profile", required=True, help="BOT_PROFILE to export")
+    parser.add_argument("--out", required=True, help="Output file path")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default="none")
+    parser.add_argument("--since", help="ISO date/time (UTC), inclusive")
+    parser.add_argument("--until", help="ISO date/time (UTC), exclusive")
+    parser.add_argument("--direction", choices=["in", "out"])
+    parser.add_argument("--include-archive", action="store_true")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    db.init_db()
+    stats = export_to_file(
+        args.kind,
+        args.profile,
+        args.out,
+        fmt=args.format,
+        compression=args.compress,
+        resume=args.resume,
+        chunk_size=args.chunk_size,
+        since_ts=_parse_date(args.since),
+        until_ts=_parse_date(args.until),
+        direction=args.direction,
+        include_archive=args.include_archive,
+    )
+    print(f"Exported {stats['rows']} rows to {stats['path']}" + (" (resumed)" if stats["resumed"] else ""))
+
+
+if __name__ == "__main__":
+    main()
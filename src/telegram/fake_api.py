@@ -0,0 +1,801 @@
+"""
+In-memory stand-in for the Telegram Bot API, for offline tests and load runs.
+Run it with `python -m src.telegram.fake_api --help`.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# =========================
+#  Settings
+# =========================
+
+MAX_MESSAGE_LENGTH = 4096
+MAX_CAPTION_LENGTH = 1024
+MAX_POLL_TIMEOUT = 50.0      # seconds a getUpdates long poll may hold
+RECORDED_REQUESTS = 1000     # latest (method, params) kept in `requests`
+MAX_MESSAGES = 100_000       # messages kept for replies, edits and `messages()`
+MAX_FILES = 10_000           # files kept for file_id reuse and getFile
+
+# Size caps of api.telegram.org and of a --local telegram-bot-api server
+CLOUD_UPLOAD_LIMIT = 50 * 2**20
+CLOUD_DOWNLOAD_LIMIT = 20 * 2**20
+LOCAL_UPLOAD_LIMIT = 2000 * 2**20
+
+_TOKEN = re.compile(r"^\d+:[\w-]+$")
+_PATH = re.compile(r"^/(file/)?bot([^/]+)/(.+)$")
+
+_MEDIA_METHODS = {
+    "sendPhoto": "photo",
+    "sendDocument": "document",
+    "sendVoice": "voice",
+    "sendVideo": "video",
+    "sendAudio": "audio",
+    "sendAnimation": "animation",
+    "sendSticker": "sticker",
+    "sendVideoNote": "video_note",
+}
+
+# Methods answered with `true` and otherwise ignored
+_NO_OP_METHODS = (
+    "deleteWebhook", "setWebhook", "setMyCommands", "deleteMyCommands",
+    "sendChatAction", "answerCallbackQuery", "close", "logOut",
+)
+
+Params = Dict[str, Any]
+Files = Dict[str, Tuple[str, bytes]]
+Reply = Tuple[int, Dict[str, Any]]
+
+
+class ApiError(Exception):
+    """
+    A Bot API error answer: {"ok": false, "error_code": ..., "description": ...}.
+    """
+
+    def __init__(self, code: int, description: str, retry_after: Optional[int] = None) -> None:
+        super().__init__(description)
+        self.code = code
+        self.description = description
+        self.retry_after = retry_after
+
+    def reply(self) -> Reply:
+        body: Dict[str, Any] = {"ok": False, "error_code": self.code, "description": self.description}
+        if self.retry_after is not None:
+            body["parameters"] = {"retry_after": self.retry_after}
+        return self.code, body
+
+
+def _utf16_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+# =========================
+#  Server
+# =========================
+
+class FakeBotAPI:
+    """
+    In-memory Bot API server. Every fault setting can be changed while it
+    runs (tests flip them between calls).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_code: int = 502,
+        flood_rate: float = 0.0,
+        retry_after: int = 1,
+        rate_limit: Optional[float] = None,
+        seed: Optional[int] = None,
+        local: bool = False,
+        upload_limit: Optional[int] = None,
+        download_limit: Optional[int] = None,
+        record_requests: int = RECORDED_REQUESTS,
+        max_messages: int = MAX_MESSAGES,
+        max_files: int = MAX_FILES,
+    ) -> None:
+        """
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port (0 picks a free one; see `url`).
+            latency (float): Seconds added to every answer.
+            jitter (float): Extra random delay of up to this many seconds.
+            error_rate (float): Share of calls answered with `error_code`.
+            error_code (int): Status of injected errors (502 by default).
+            flood_rate (float): Share of calls answered 429 with `retry_after`.
+            retry_after (int): Seconds announced by injected 429 answers.
+            rate_limit (Optional[float]): Calls per second allowed per token
+                (burst of one second); calls above it get a 429 like the
+                real flood control. None: unlimited.
+            seed (Optional[int]): Seed of the fault injection, for repeatable runs.
+            local (bool): Behave like a self-hosted server started with
+                --local: file:// paths are accepted as media and getFile
+                answers with absolute local paths.
+            upload_limit (Optional[int]): Largest request body in bytes
+                (50 MB, or 2000 MB in local mode); larger ones get a 413.
+            download_limit (Optional[int]): Largest file getFile serves
+                (20 MB; unlimited in local mode).
+            record_requests (int): How many of the latest requests `requests`
+                keeps (0: none), so long load runs stay bounded.
+            max_messages (int): Messages kept; the oldest are forgotten.
+            max_files (int): Files kept; the oldest are forgotten (their
+                file_ids are then rejected, like expired ones).
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.local = local
+        self.upload_limit = upload_limit or (LOCAL_UPLOAD_LIMIT if local else CLOUD_UPLOAD_LIMIT)
+        self.download_limit = download_limit or (None if local else CLOUD_DOWNLOAD_LIMIT)
+
+        self.calls: Counter = Counter()
+        self.faults: Counter = Counter()
+        # (method, params) of the latest requests, in arrival order
+        self.requests: Deque[Tuple[str, Params]] = deque(maxlen=record_requests)
+        self.max_messages = max_messages
+        self.max_files = max_files
+        self.unknown_chats: set = set()   # chat ids answered with "chat not found"
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._updates_cond = threading.Condition(self._lock)
+        self._buckets: Dict[str, Tuple[float, float]] = {}   # token -> (tokens, updated)
+        self._message_ids: Dict[Any, int] = {}
+        self._messages: Dict[Tuple[Any, int], Dict[str, Any]] = {}
+        self._pinned: Dict[Any, List[int]] = {}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._next_file = 1
+        self._file_paths: Dict[str, str] = {}
+        self._storage: Optional[tempfile.TemporaryDirectory] = None
+        self._updates: List[Dict[str, Any]] = []
+        self._next_update_id = 1
+        self._next_group_id = 10000
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._handlers: Dict[str, Callable[[str, Params, Files], Any]] = {
+            "getMe": self._get_me,
+            "getUpdates": self._get_updates,
+            "getChat": self._get_chat,
+            "getChatMemberCount": self._get_chat_member_count,
+            "getUserProfilePhotos": self._get_user_profile_photos,
+            "getFile": self._get_file,
+            "getWebhookInfo": lambda token, params, files: {"url": "", "pending_update_count": 0},
+            "sendMessage": self._send_message,
+            "sendMediaGroup": self._send_media_group,
+            "editMessageText": self._edit_message,
+            "editMessageCaption": self._edit_message,
+            "deleteMessage": self._delete_message,
+            "pinChatMessage": self._pin_message,
+            "unpinChatMessage": self._unpin_message,
+            "unpinAllChatMessages": self._unpin_all,
+        }
+
+    # ---------- lifecycle ----------
+
+    @property
+    def url(self) -> str:
+        """
+        Base URL for TELEGRAM_API_BASE_URL.
+        """
+        if self._server is None:
+            raise RuntimeError("FakeBotAPI is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeBotAPI":
+        server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        server.daemon_threads = True
+        server.api = self  # type: ignore[attr-defined]
+        self._server = server
+        threading.Thread(target=server.serve_forever, name="fake-bot-api", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            with self._updates_cond:
+                self._updates_cond.notify_all()
+            server.shutdown()
+            server.server_close()
+        if self._storage is not None:
+            self._storage.cleanup()
+            self._storage = None
+
+    def __enter__(self) -> "FakeBotAPI":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # ---------- test helpers ----------
+
+    def push_update(self, text: str, chat_id: int = 1, **message: Any) -> Dict[str, Any]:
+        """
+        Queue an incoming text message for getUpdates (a private chat by
+        default) and wake up a waiting long poll.
+
+        Returns:
+            Dict[str, Any]: The update.
+        """
+        with self._updates_cond:
+            msg = {
+                "message_id": self._new_message_id(chat_id),
+                "date": int(time.time()),
+                "chat": self._chat(chat_id),
+                "from": {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"},
+                "text": text,
+                **message,
+            }
+            self._store_message(chat_id, msg)
+            return self._queue_update("message", msg)
+
+    def push_event(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue an update of any other type (`callback_query`, `chat_member`,
+        ...) with `payload` as its body.
+
+        Returns:
+            Dict[str, Any]: The update.
+        """
+        with self._updates_cond:
+            return self._queue_update(kind, payload)
+
+    def _queue_update(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        update = {"update_id": self._next_update_id, kind: payload}
+        self._next_update_id += 1
+        self._updates.append(update)
+        self._updates_cond.notify_all()
+        return update
+
+    def messages(self, chat_id: Any) -> List[Dict[str, Any]]:
+        """
+        Messages currently in a chat, oldest first.
+        """
+        with self._lock:
+            return [m for (cid, _), m in sorted(self._messages.items(), key=lambda kv: kv[0][1]) if cid == chat_id]
+
+    def pinned(self, chat_id: Any) -> List[int]:
+        with self._lock:
+            return list(self._pinned.get(chat_id, []))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Calls per method and injected faults per kind.
+        """
+        with self._lock:
+            return {"calls": dict(self.calls), "faults": dict(self.faults)}
+
+    # ---------- request handling ----------
+
+    def handle(self, path: str, params: Params, files: Files, body_size: int = 0) -> Tuple[int, Any]:
+        """
+        Answer one request (`body_size`: bytes of the request body).
+
+        Returns:
+            Tuple[int, Any]: HTTP status and the JSON body (bytes for file
+            downloads).
+        """
+        match = _PATH.match(urlsplit(path).path)
+        if not match or not _TOKEN.match(match.group(2)):
+            return 404 if not match else 401, {
+                "ok": False,
+                "error_code": 404 if not match else 401,
+                "description": "Not Found" if not match else "Unauthorized",
+            }
+        is_file, token, method = bool(match.group(1)), match.group(2), match.group(3)
+
+        self._delay()
+        if is_file:
+            with self._lock:
+                file_id = self._file_paths.get(method)
+                entry = self._files[file_id] if file_id else None
+            if entry is None:
+                return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+            return 200, self._content(entry)
+        if body_size > self.upload_limit:
+            return ApiError(413, "Request Entity Too Large").reply()
+
+        with self._lock:
+            self.calls[method] += 1
+            if self.requests.maxlen:
+                self.requests.append((method, dict(params)))
+        try:
+            self._inject_faults(token)
+            handler = self._handlers.get(method)
+            if handler is None and method in _MEDIA_METHODS:
+                return 200, {"ok": True, "result": self._send_media(method, token, params, files)}
+            if handler is None and method in _NO_OP_METHODS:
+                return 200, {"ok": True, "result": True}
+            if handler is None:
+                raise ApiError(404, "Not Found")
+            return 200, {"ok": True, "result": handler(token, params, files)}
+        except ApiError as e:
+            return e.reply()
+
+    def _delay(self) -> None:
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _inject_faults(self, token: str) -> None:
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(token, (self.rate_limit, now))
+                tokens = min(self.rate_limit, tokens + (now - updated) * self.rate_limit)
+                if tokens < 1:
+                    self._buckets[token] = (tokens, now)
+                    self.faults["rate_limit"] += 1
+                    wait = max(1, int((1 - tokens) / self.rate_limit + 0.999))
+                    raise ApiError(429, f"Too Many Requests: retry after {wait}", retry_after=wait)
+                self._buckets[token] = (tokens - 1, now)
+            if self.flood_rate and self._random.random() < self.flood_rate:
+                self.faults["flood"] += 1
+                raise ApiError(429, f"Too Many Requests: retry after {self.retry_after}", retry_after=self.retry_after)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.faults["error"] += 1
+                raise ApiError(self.error_code, "Bad Gateway" if self.error_code == 502 else "Internal Server Error")
+
+    # ---------- state helpers (called with the lock held) ----------
+
+    @staticmethod
+    def _chat_id(params: Params) -> Any:
+        value = params.get("chat_id")
+        if value in (None, ""):
+            raise ApiError(400, "Bad Request: chat_id is empty")
+        text = str(value)
+        return int(text) if text.lstrip("-").isdigit() else text
+
+    @staticmethod
+    def _chat(chat_id: Any) -> Dict[str, Any]:
+        if isinstance(chat_id, int) and chat_id > 0:
+            return {"id": chat_id, "type": "private", "first_name": f"User{chat_id}"}
+        if isinstance(chat_id, str):
+            number = int(hashlib.sha256(chat_id.encode("utf-8")).hexdigest()[:8], 16)
+            return {"id": -1000000000000 - number, "type": "channel", "title": chat_id, "username": chat_id.lstrip("@")}
+        return {"id": chat_id, "type": "supergroup", "title": f"Group {chat_id}"}
+
+    def _new_message_id(self, chat_id: Any) -> int:
+        next_id = self._message_ids.get(chat_id, 0) + 1
+        self._message_ids[chat_id] = next_id
+        return next_id
+
+    def _new_message(self, chat_id: Any, params: Params, **content: Any) -> Dict[str, Any]:
+        reply_to = params.get("reply_to_message_id")
+        if reply_to not in (None, ""):
+            reply_to = int(reply_to)
+            if (chat_id, reply_to) not in self._messages:
+                raise ApiError(400, "Bad Request: message to be replied not found")
+        msg: Dict[str, Any] = {
+            "message_id": self._new_message_id(chat_id),
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+            "from": {"id": 1, "is_bot": True, "first_name": "Fake Bot", "username": "fake_bot"},
+            **content,
+        }
+        if reply_to not in (None, ""):
+            msg["reply_to_message"] = {"message_id": reply_to, "chat": msg["chat"]}
+        self._store_message(chat_id, msg)
+        return msg
+
+    def _store_message(self, chat_id: Any, msg: Dict[str, Any]) -> None:
+        self._messages[(chat_id, msg["message_id"])] = msg
+        while len(self._messages) > self.max_messages:
+            del self._messages[next(iter(self._messages))]
+
+    def _add_file(self, kind: str, tag: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a new file under a fresh file_id, forgetting the oldest ones
+        beyond `max_files`.
+        """
+        file_id = f"FAKE-{kind}-{tag}-{self._next_file}"
+        self._next_file += 1
+        self._files[file_id] = {"file_id": file_id, **entry}
+        while len(self._files) > self.max_files:
+            old = self._files.pop(next(iter(self._files)))
+            if self._file_paths.get(old.get("file_path", "")) == old["file_id"]:
+                del self._file_paths[old["file_path"]]
+        return self._files[file_id]
+
+    def _file(self, kind: str, value: Any, files: Files) -> Dict[str, Any]:
+        """
+        File object for an uploaded file, a known file_id, a URL or (in local
+        mode) a file:// path.
+        """
+        if isinstance(value, str) and value.startswith("attach://"):
+            value = files.get(value[len("attach://"):])
+            if value is None:
+                raise ApiError(400, "Bad Request: wrong file identifier/HTTP URL specified")
+        if isinstance(value, tuple):
+            filename, data = value
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            return self._add_file(kind, digest, {
+                "file_unique_id": digest,
+                "file_size": len(data),
+                "file_name": filename,
+                "data": data,
+            })
+        if isinstance(value, str) and value in self._files:
+            return self._files[value]
+        if isinstance(value, str) and value.startswith("file://") and self.local:
+            path = value[len("file://"):]
+            if not os.path.isfile(path):
+                raise ApiError(400, "Bad Request: file not found")
+            stat = os.stat(path)
+            unique = hashlib.sha256(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+            return self._add_file(kind, unique, {
+                "file_unique_id": unique,
+                "file_size": stat.st_size,
+                "file_name": os.path.basename(path),
+                "local_path": path,
+            })
+        if isinstance(value, str) and value.startswith(("http://", "https://")):
+            entry = self._add_file(kind, "url", {"file_size": 0, "data": b""})
+            entry["file_unique_id"] = entry["file_id"]
+            return entry
+        raise ApiError(400, "Bad Request: wrong file identifier/HTTP URL specified")
+
+    @staticmethod
+    def _media_field(kind: str, entry: Dict[str, Any]) -> Any:
+        public = {k: v for k, v in entry.items() if k not in ("data", "local_path", "file_path")}
+        if kind == "photo":
+            thumb = {"file_id": f"{entry['file_id']}-thumb", "file_unique_id": f"{entry['file_unique_id']}t",
+                     "file_size": min(entry["file_size"], 1000), "width": 90, "height": 90}
+            full = {k: public[k] for k in ("file_id", "file_unique_id", "file_size")}
+            return [thumb, {**full, "width": 1280, "height": 960}]
+        if kind not in ("document", "audio", "video", "animation"):
+            public.pop("file_name", None)
+        return public
+
+    @staticmethod
+    def _check_caption(params: Params) -> Dict[str, Any]:
+        caption = params.get("caption")
+        if not caption:
+            return {}
+        if _utf16_len(caption) > MAX_CAPTION_LENGTH:
+            raise ApiError(400, "Bad Request: message caption is too long")
+        return {"caption": caption}
+
+    # ---------- methods ----------
+
+    def _get_me(self, token: str, params: Params, files: Files) -> Dict[str, Any]:
+        return {
+            "id": int(token.split(":", 1)[0]),
+            "is_bot": True,
+            "first_name": "Fake Bot",
+            "username": "fake_bot",
+            "can_join_groups": True,
+            "can_read_all_group_messages": False,
+            "supports_inline_queries": False,
+        }
+
+    def _known_chat_id(self, params: Params, field: str = "chat_id") -> Any:
+        chat_id = self._chat_id({"chat_id": params.get(field)})
+        if chat_id in self.unknown_chats:
+            raise ApiError(400, "Bad Request: chat not found")
+        return chat_id
+
+    def _get_chat(self, token: str, params: Params, files: Files) -> Dict[str, Any]:
+        return self._chat(self._known_chat_id(params))
+
+    def _get_chat_member_count(self, token: str, params: Params, files: Files) -> int:
+        chat_id = self._known_chat_id(params)
+        if isinstance(chat_id, int) and chat_id > 0:
+            return 2   # the user and the bot
+        digest = hashlib.sha256(str(chat_id).encode("utf-8")).hexdigest()
+        return 10 + int(digest[:8], 16) % 990
+
+    def _get_user_profile_photos(self, token: str, params: Params, files: Files) -> Dict[str, Any]:
+        user_id = self._known_chat_id(params, "user_id")
+        sizes = [
+            {
+                "file_id": f"photo-{user_id}-{side}",
+                "file_unique_id": f"uphoto{user_id}{side}",
+                "width": side,
+                "height": side,
+            }
+            for side in (160, 640)
+        ]
+        limit = int(params.get("limit") or 100)
+        return {"total_count": 1, "photos": [sizes][:limit]}
+
+    def _get_updates(self, token: str, params: Params, files: Files) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        limit = max(1, min(100, int(params.get("limit") or 100)))
+        timeout = min(MAX_POLL_TIMEOUT, float(params.get("timeout") or 0))
+        allowed = set(json.loads(params.get("allowed_updates") or "[]")) or None
+        deadline = time.monotonic() + timeout
+        with self._updates_cond:
+            if offset:
+                # Like Telegram: a call with an offset confirms every earlier update.
+                self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            while True:
+                # Types left out of allowed_updates are skipped (and dropped
+                # once a later offset confirms them).
+                pending = [
+                    u for u in self._updates
+                    if u["update_id"] >= offset and (allowed is None or not allowed.isdisjoint(u))
+                ]
+                remaining = deadline - time.monotonic()
+                if pending or remaining <= 0 or self._server is None:
+                    return pending[:limit]
+                self._updates_cond.wait(remaining)
+
+    def _get_file(self, token: str, params: Params, files: Files) -> Dict[str, Any]:
+        file_id = params.get("file_id")
+        with self._lock:
+            entry = self._files.get(file_id or "")
+            if entry is None:
+                raise ApiError(400, "Bad Request: invalid file_id")
+            if self.download_limit is not None and entry["file_size"] > self.download_limit:
+                raise ApiError(400, "Bad Request: file is too big")
+            if self.local:
+                path = entry.get("local_path") or self._store_locally(entry)
+            else:
+                path = f"files/{entry['file_unique_id']}"
+            self._file_paths[path] = entry["file_id"]
+            entry["file_path"] = path
+        return {"file_id": entry["file_id"], "file_unique_id": entry["file_unique_id"], "file_size": entry["file_size"], "file_path": path}
+
+    def _store_locally(self, entry: Dict[str, Any]) -> str:
+        """
+        Absolute path of an uploaded file in the server's working directory.
+        """
+        if self._storage is None:
+            self._storage = tempfile.TemporaryDirectory(prefix="fake-bot-api-")
+        path = os.path.join(self._storage.name, f"{entry['file_unique_id']}-{entry.get('file_name') or 'file'}")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(entry["data"])
+        entry["local_path"] = path
+        return path
+
+    @staticmethod
+    def _content(entry: Dict[str, Any]) -> bytes:
+        if entry.get("data") is not None:
+            return entry["data"]
+        with open(entry["local_path"], "rb") as f:
+            return f.read()
+
+    def _send_message(self, token: str, params: Params, files: Files) -> Dict[str, Any]:
+        chat_id = self._chat_id(params)
+        text = params.get("text") or ""
+        if not text.strip():
+            raise ApiError(400, "Bad Request: message text is empty")
+        if _utf16_len(text) > MAX_MESSAGE_LENGTH:
+            raise ApiError(400, "Bad Request: message is too long")
+        with self._lock:
+            return self._new_message(chat_id, params, text=text)
+
+    def _send_media(self, method: str, token: str, params: Params, files: Files) -> Dict[str, Any]:
+        kind = _MEDIA_METHODS[method]
+        chat_id = self._chat_id(params)
+        value = files.get(kind) or params.get(kind)
+        if not value:
+            raise ApiError(400, f"Bad Request: there is no {kind} in the request")
+        caption = self._check_caption(params)
+        with self._lock:
+            entry = self._file(kind, value, files)
+            return self._new_message(chat_id, params, **{kind: self._media_field(kind, entry)}, **caption)
+
+    def _send_media_group(self, token: str, params: Params, files: Files) -> List[Dict[str, Any]]:
+        chat_id = self._chat_id(params)
+        try:
+            media = json.loads(params.get("media") or "[]")
+        except ValueError:
+            raise ApiError(400, "Bad Request: can't parse media JSON object")
+        if not 2 <= len(media) <= 10:
+            raise ApiError(400, "Bad Request: wrong number of media specified")
+        with self._lock:
+            self._next_group_id += 1
+            group_id = str(self._next_group_id)
+            messages = []
+            for item in media:
+                kind = item.get("type", "photo")
+                entry = self._file(kind, item.get("media"), files)
+                content = {kind: self._media_field(kind, entry), "media_group_id": group_id}
+                content.update(self._check_caption(item))
+                messages.append(self._new_message(chat_id, params, **content))
+                params = {k: v for k, v in params.items() if k != "reply_to_message_id"}
+            return messages
+
+    def _edit_message(self, token: str, params: Params, files: Files) -> Dict[str, Any]:
+        chat_id = self._chat_id(params)
+        message_id = int(params.get("message_id") or 0)
+        with self._lock:
+            msg = self._messages.get((chat_id, message_id))
+            if msg is None:
+                raise ApiError(400, "Bad Request: message to edit not found")
+            if "text" in params:
+                text = params["text"] or ""
+                if not text.strip():
+                    raise ApiError(400, "Bad Request: message text is empty")
+                if _utf16_len(text) > MAX_MESSAGE_LENGTH:
+                    raise ApiError(400, "Bad Request: message is too long")
+                if msg.get("text") == text:
+                    raise ApiError(400, "Bad Request: message is not modified")
+                msg["text"] = text
+            else:
+                msg.update(self._check_caption(params))
+            msg["edit_date"] = int(time.time())
+            return msg
+
+    def _delete_message(self, token: str, params: Params, files: Files) -> bool:
+        chat_id = self._chat_id(params)
+        message_id = int(params.get("message_id") or 0)
+        with self._lock:
+            if self._messages.pop((chat_id, message_id), None) is None:
+                raise ApiError(400, "Bad Request: message to delete not found")
+            pinned = self._pinned.get(chat_id, [])
+            if message_id in pinned:
+                pinned.remove(message_id)
+        return True
+
+    def _pin_message(self, token: str, params: Params, files: Files) -> bool:
+        chat_id = self._chat_id(params)
+        message_id = int(params.get("message_id") or 0)
+        with self._lock:
+            if (chat_id, message_id) not in self._messages:
+                raise ApiError(400, "Bad Request: message to pin not found")
+            pinned = self._pinned.setdefault(chat_id, [])
+            if message_id not in pinned:
+                pinned.append(message_id)
+        return True
+
+    def _unpin_message(self, token: str, params: Params, files: Files) -> bool:
+        chat_id = self._chat_id(params)
+        with self._lock:
+            pinned = self._pinned.get(chat_id, [])
+            if not pinned:
+                return True
+            message_id = int(params.get("message_id") or pinned[-1])
+            if message_id in pinned:
+                pinned.remove(message_id)
+        return True
+
+    def _unpin_all(self, token: str, params: Params, files: Files) -> bool:
+        chat_id = self._chat_id(params)
+        with self._lock:
+            self._pinned.pop(chat_id, None)
+        return True
+
+
+# =========================
+#  HTTP layer
+# =========================
+
+def _parse_body(content_type: str, raw: bytes) -> Tuple[Params, Files]:
+    """
+    Form fields and uploaded files of a request body (urlencoded, JSON or
+    multipart).
+    """
+    params: Params = {}
+    files: Files = {}
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        params = {k: v[0] for k, v in parse_qs(raw.decode("utf-8"), keep_blank_values=True).items()}
+    elif content_type.startswith("application/json"):
+        data = json.loads(raw or b"{}")
+        params = {k: v if isinstance(v, str) else json.dumps(v) if isinstance(v, (dict, list)) else str(v) for k, v in data.items()}
+    elif content_type.startswith("multipart/form-data"):
+        message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + raw)
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            filename = part.get_filename()
+            if filename is None:
+                params[name] = payload.decode("utf-8")
+            else:
+                files[name] = (filename, payload)
+    return params, files
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like api.telegram.org
+    disable_nagle_algorithm = True
+
+    def _answer(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            raw = self.rfile.read(length)
+        elif self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            raw = self._read_chunked()
+        else:
+            raw = b""
+        try:
+            params, files = _parse_body(self.headers.get("Content-Type", ""), raw)
+        except ValueError:
+            params, files = {}, {}
+        query = urlsplit(self.path).query
+        for key, values in parse_qs(query, keep_blank_values=True).items():
+            params.setdefault(key, values[0])
+
+        status, reply = self.server.api.handle(self.path, params, files, len(raw))  # type: ignore[attr-defined]
+        if isinstance(reply, bytes):
+            body, ctype = reply, "application/octet-stream"
+        else:
+            body, ctype = json.dumps(reply).encode("utf-8"), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                self.rfile.readline()
+                return b"".join(chunks)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    do_GET = _answer
+    do_POST = _answer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in Telegram Bot API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081, help="0 picks a free port")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every answer")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered 502")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="share of calls answered 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after of injected 429 answers")
+    parser.add_argument("--rate-limit", type=float, default=None, help="calls/s per token before 429 answers")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--local", action="store_true", help="accept file:// paths like telegram-bot-api --local")
+    args = parser.parse_args(argv)
+
+    api = FakeBotAPI(
+        host=args.host,
+        port=args.port,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        flood_rate=args.flood_rate,
+        retry_after=args.retry_after,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+        local=args.local,
+        record_requests=0,
+    ).start()
+    print(f"Fake Bot API listening on {api.url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
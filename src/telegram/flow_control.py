@@ -0,0 +1,190 @@
+"""
+Cross-process flow control: one rate bucket and 429 block per bot token,
+shared through a small SQLite file.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+from .sqlite_pool import SQLitePool, get_pool
+
+# =========================
+#  Settings
+# =========================
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_RATE_DB = BASE_DIR / "telegram_ratelimit.db"
+DEFAULT_RATE = 30.0            # calls per second per bot token
+DEFAULT_MAX_RETRIES = 3        # transient errors (connect failures, 502/503/504)
+DEFAULT_MAX_RETRY_AFTER = 60   # longest 429 wait accepted before giving up (seconds)
+BACKOFF_BASE = 0.5             # first retry delay, doubled per attempt, with jitter
+MAX_WAIT_SLICE = 1.0           # re-read the shared state at least this often while waiting
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def enabled() -> bool:
+    return os.getenv("TELEGRAM_FLOW_CONTROL", "1").lower() in ("1", "true", "yes")
+
+
+def rate() -> float:
+    return max(0.1, _env_float("TELEGRAM_RATE_LIMIT", DEFAULT_RATE))
+
+
+def max_retries() -> int:
+    return int(_env_float("TELEGRAM_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+
+
+def max_retry_after() -> float:
+    return _env_float("TELEGRAM_MAX_RETRY_AFTER", DEFAULT_MAX_RETRY_AFTER)
+
+
+def backoff(attempt: int) -> float:
+    """
+    Exponential backoff with +/-50% jitter for retry number `attempt` (1-based),
+    so processes that failed together do not retry together.
+    """
+    return BACKOFF_BASE * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+# =========================
+#  Shared State
+# =========================
+
+_ready: Set[str] = set()
+
+
+def _pool() -> SQLitePool:
+    path = str(os.getenv("TELEGRAM_RATE_DB") or DEFAULT_RATE_DB)
+    # Losing the last few updates after a crash is harmless here.
+    pool = get_pool(path, synchronous="OFF", size=2)
+    if path not in _ready:
+        with pool.transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    blocked_until REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+        _ready.add(path)
+    return pool
+
+
+def _key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def _take(token: str, per_second: float, capacity: float) -> float:
+    """
+    Try to take one token. Returns 0 on success, else seconds to wait.
+    """
+    key = _key(token)
+    with _pool().transaction() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        row = conn.execute(
+            "SELECT tokens, updated, blocked_until FROM rate_buckets WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            tokens, blocked_until = capacity, 0.0
+        else:
+            elapsed = max(0.0, now - row["updated"])
+            tokens = min(capacity, row["tokens"] + elapsed * per_second)
+            blocked_until = row["blocked_until"]
+
+        if blocked_until > now:
+            wait = blocked_until - now
+        elif tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / per_second
+
+        conn.execute(
+            """
+            INSERT INTO rate_buckets (key, tokens, updated, blocked_until)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                tokens = excluded.tokens,
+                updated = excluded.updated
+            """,
+            (key, tokens, now, blocked_until),
+        )
+    return wait
+
+
+def try_acquire(token: str, per_second: Optional[float] = None, capacity: Optional[float] = None) -> float:
+    """
+    Take one call from the token's shared bucket without waiting.
+
+    Returns:
+        float: 0 if the call may go ahead, else seconds to wait before
+        trying again (for callers that wait on their own, e.g. asyncio).
+    """
+    per_second = per_second or rate()
+    return _take(token, per_second, capacity or max(1.0, per_second))
+
+
+def acquire(token: str, per_second: Optional[float] = None, capacity: Optional[float] = None) -> float:
+    """
+    Block until the token's shared bucket allows one more call.
+
+    Returns:
+        float: Seconds spent waiting.
+    """
+    waited = 0.0
+    while True:
+        wait = try_acquire(token, per_second, capacity)
+        if wait <= 0:
+            return waited
+        wait = min(wait, MAX_WAIT_SLICE)
+        time.sleep(wait)
+        waited += wait
+
+
+def block(token: str, seconds: float) -> None:
+    """
+    Stop every process from calling the API with `token` for `seconds`.
+    """
+    key = _key(token)
+    with _pool().transaction() as conn:
+        now = time.time()
+        conn.execute(
+            """
+            INSERT INTO rate_buckets (key, tokens, updated, blocked_until)
+            VALUES (?, 0, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                tokens = 0,
+                updated = excluded.updated,
+                blocked_until = MAX(blocked_until, excluded.blocked_until)
+            """,
+            (key, now, now + seconds),
+        )
+
+
+def state(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Current shared bucket of `token` (tokens, updated, blocked_until), if any.
+    """
+    with _pool().connection() as conn:
+        row = conn.execute(
+            "SELECT tokens, updated, blocked_until FROM rate_buckets WHERE key = ?",
+            (_key(token),),
+        ).fetchone()
+    return dict(row) if row else None
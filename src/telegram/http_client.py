@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# =========================
+#  Settings
+# =========================
+
+# Overridden by TELEGRAM_API_BASE_URL (e.g. a local `fake_api` server)
+API_BASE_URL = "https://api.telegram.org"
+
+# Upload/download caps of api.telegram.org and of a self-hosted
+# telegram-bot-api server started with --local (TELEGRAM_LOCAL_MODE=1)
+CLOUD_UPLOAD_LIMIT_MB = 50
+LOCAL_UPLOAD_LIMIT_MB = 2000
+CLOUD_DOWNLOAD_LIMIT_MB = 20
+
+DEFAULT_POOL_SIZE = 10          # keep-alive connections per bot token
+DEFAULT_CONNECT_TIMEOUT = 5.0   # seconds
+DEFAULT_READ_TIMEOUT = 30.0     # seconds, used when the caller passes none
+DEFAULT_CONNECT_RETRIES = 2     # only failed connects are retried (POST is not idempotent)
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def api_base_url() -> str:
+    """
+    Root URL of the Bot API server: TELEGRAM_API_BASE_URL or API_BASE_URL.
+    """
+    return (os.getenv("TELEGRAM_API_BASE_URL") or API_BASE_URL).rstrip("/")
+
+
+def local_mode() -> bool:
+    """
+    True when TELEGRAM_API_BASE_URL is a self-hosted Bot API server running
+    with --local on this machine (or sharing its file system): files are
+    passed as file:// paths and getFile answers with local paths.
+    """
+    return os.getenv("TELEGRAM_LOCAL_MODE", "0").lower() in ("1", "true", "yes")
+
+
+def upload_limit() -> int:
+    """
+    Largest request body the server accepts, in bytes (TELEGRAM_MAX_UPLOAD_MB
+    or the default of the current mode).
+    """
+    default = LOCAL_UPLOAD_LIMIT_MB if local_mode() else CLOUD_UPLOAD_LIMIT_MB
+    return int(_env_number("TELEGRAM_MAX_UPLOAD_MB", default) * 1024 * 1024)
+
+
+def download_limit() -> Optional[int]:
+    """
+    Largest file the bot may download, in bytes (TELEGRAM_MAX_DOWNLOAD_MB or
+    20 MB); None in local mode, which has no cap.
+    """
+    if local_mode():
+        return None
+    return int(_env_number("TELEGRAM_MAX_DOWNLOAD_MB", CLOUD_DOWNLOAD_LIMIT_MB) * 1024 * 1024)
+
+
+def pool_size() -> int:
+    return int(_env_number("TELEGRAM_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE))
+
+
+def request_timeout(read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    """
+    (connect, read) timeout tuple for `requests`.
+
+    Args:
+        read_timeout (Optional[float]): Read timeout of this call; defaults to
+            TELEGRAM_HTTP_READ_TIMEOUT.
+    """
+    connect = _env_number("TELEGRAM_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)
+    if read_timeout is None:
+        read_timeout = _env_number("TELEGRAM_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)
+    return connect, read_timeout
+
+
+# =========================
+#  Sessions
+# =========================
+
+_sessions: Dict[str, requests.Session] = {}
+_base_urls: Dict[Tuple[str, str], str] = {}
+_lock = threading.Lock()
+
+
+def _new_session() -> requests.Session:
+    size = max(1, pool_size())
+    retries = Retry(
+        total=DEFAULT_CONNECT_RETRIES,
+        connect=DEFAULT_CONNECT_RETRIES,
+        read=0,
+        status=0,
+        other=0,
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retries)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(token: str) -> requests.Session:
+    """
+    Return the shared keep-alive session for one bot token.
+
+    The session (and its connection pool) lives for the whole process, so
+    every thread — scheduler timers, panel reruns, bot handlers — reuses the
+    same TCP/TLS connections instead of opening one per call.
+    """
+    session = _sessions.get(token)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(token)
+        if session is None:
+            session = _new_session()
+            _sessions[token] = session
+        return session
+
+
+def method_url(token: str, method: str) -> str:
+    """
+    Bot API URL of `method` for `token` (the per-token prefix is cached).
+    """
+    key = (api_base_url(), token)
+    base = _base_urls.get(key)
+    if base is None:
+        base = f"{key[0]}/bot{token}/"
+        _base_urls[key] = base
+    return base + method
+
+
+def file_url(token: str, file_path: str) -> str:
+    """
+    Download URL of a file returned by getFile.
+    """
+    return f"{api_base_url()}/file/bot{token}/{file_path}"
+
+
+def ptb_urls() -> Tuple[str, str]:
+    """
+    (base_url, base_file_url) for python-telegram-bot's ApplicationBuilder,
+    so the bots talk to the same server as `telegram_utils`.
+    """
+    root = api_base_url()
+    return f"{root}/bot", f"{root}/file/bot"
+
+
+def close_sessions() -> None:
+    """
+    Close every pooled session (their connections are dropped).
+    """
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        _base_urls.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_sessions)
@@ -0,0 +1,355 @@
+"""
+Priority lanes (interactive, transactional, bulk) for this process's Bot API calls.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from . import flow_control
+
+# =========================
+#  Settings
+# =========================
+
+INTERACTIVE = "interactive"
+TRANSACTIONAL = "transactional"
+BULK = "bulk"
+LANES = (INTERACTIVE, TRANSACTIONAL, BULK)   # also the tie-break priority
+
+WEIGHTS = {INTERACTIVE: 8.0, TRANSACTIONAL: 3.0, BULK: 1.0}
+DEFAULT_RESERVE = 0.2      # share of the rate only interactive calls may use
+LATENCY_SAMPLES = 2048     # recent queue waits kept per lane for percentiles
+MAX_WAIT_SLICE = 0.5
+
+# A direct call is assumed to have someone waiting on it.
+_current_lane: contextvars.ContextVar[str] = contextvars.ContextVar("telegram_lane", default=INTERACTIVE)
+
+
+def reserve() -> float:
+    try:
+        value = float(os.getenv("TELEGRAM_INTERACTIVE_RESERVE", DEFAULT_RESERVE))
+    except ValueError:
+        value = DEFAULT_RESERVE
+    return min(0.9, max(0.0, value))
+
+
+def current_lane() -> str:
+    return _current_lane.get()
+
+
+@contextmanager
+def lane(name: str) -> Iterator[None]:
+    """
+    Tag every Bot API call made inside the block (in this thread or task)
+    with lane `name`.
+    """
+    if name not in WEIGHTS:
+        raise ValueError(f"Unknown lane: {name}")
+    reset = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(reset)
+
+
+# =========================
+#  Scheduler
+# =========================
+
+class LaneScheduler:
+    """
+    Orders the calls of one bot token: one waiter at a time takes the next
+    slot of the shared rate bucket, chosen by stride scheduling.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        reserve_share: float = DEFAULT_RESERVE,
+        weights: Optional[Dict[str, float]] = None,
+        take: Optional[Callable[[], Any]] = None,
+        try_take: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """
+        Args:
+            rate (float): Calls per second of the token.
+            reserve_share (float): Share of `rate` kept for interactive calls.
+            weights (Optional[Dict[str, float]]): Lane weights (WEIGHTS).
+            take (Optional[Callable[[], Any]]): Blocks until the shared
+                bucket hands out a slot (`acquire()` passes
+                `flow_control.acquire`; None only orders the calls).
+            try_take (Optional[Callable[[], float]]): Non-blocking form of
+                `take` used by `acquire_async`: 0 when a slot was taken,
+                else seconds to wait before trying again.
+        """
+        self.weights = dict(weights or WEIGHTS)
+        self.take = take
+        self.try_take = try_take
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._queues: Dict[str, Deque[Tuple[int, float]]] = {name: deque() for name in self.weights}
+        self._pass: Dict[str, float] = {name: 0.0 for name in self.weights}
+        self._vtime = 0.0
+        self._busy = False
+        # ticket -> (loop, event) of a coroutine waiting in `acquire_async`
+        self._async_waiters: Dict[Tuple[int, float], Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+
+        # Cap shared by the non-interactive lanes
+        self._cap_rate = max(0.1, rate * (1.0 - reserve_share))
+        self._cap_size = max(1.0, self._cap_rate)
+        self._cap_tokens = self._cap_size
+        self._cap_updated = time.monotonic()
+
+        self._granted: Dict[str, int] = {name: 0 for name in self.weights}
+        self._waits: Dict[str, Deque[float]] = {name: deque(maxlen=LATENCY_SAMPLES) for name in self.weights}
+
+    def _refill(self, now: float) -> None:
+        self._cap_tokens = min(self._cap_size, self._cap_tokens + (now - self._cap_updated) * self._cap_rate)
+        self._cap_updated = now
+
+    def _pick(self) -> Tuple[Optional[str], float]:
+        """
+        Lane whose head waiter goes next, or (None, seconds until the
+        non-interactive cap allows one).
+        """
+        now = time.monotonic()
+        self._refill(now)
+        best: Optional[str] = None
+        for name in self.weights:
+            if not self._queues[name]:
+                continue
+            if name != INTERACTIVE and self._cap_tokens < 1:
+                continue
+            if best is None or self._pass[name] < self._pass[best]:
+                best = name
+        if best is not None:
+            return best, 0.0
+        return None, (1 - self._cap_tokens) / self._cap_rate
+
+    # The helpers below run with `_cond` held.
+
+    def _lane_of(self, lane_name: Optional[str]) -> str:
+        name = lane_name or current_lane()
+        return name if name in self._queues else INTERACTIVE
+
+    def _notify(self) -> None:
+        # The choice only changes when a waiter arrives, a slot is released
+        # or the non-interactive cap refills; only lane heads can be chosen.
+        self._cond.notify_all()
+        for queue in self._queues.values():
+            waiter = self._async_waiters.get(queue[0]) if queue else None
+            if waiter is not None:
+                loop, event = waiter
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:   # loop closed
+                    pass
+
+    def _enqueue(self, name: str) -> Tuple[int, float]:
+        ticket = (next(self._seq), time.monotonic())
+        queue = self._queues[name]
+        if not queue:
+            # An idle lane does not bank credit while it had nothing to send.
+            self._pass[name] = max(self._pass[name], self._vtime)
+        queue.append(ticket)
+        return ticket
+
+    def _grant(self, name: str, ticket: Tuple[int, float]) -> Optional[float]:
+        """
+        Give the slot to `ticket` if it is its turn (None), else return how
+        long to wait before looking again.
+        """
+        wait = MAX_WAIT_SLICE
+        if not self._busy:
+            chosen, refill = self._pick()
+            queue = self._queues[name]
+            if chosen == name and queue[0] is ticket:
+                queue.popleft()
+                self._busy = True
+                self._vtime = self._pass[name]
+                self._pass[name] += 1.0 / self.weights[name]
+                if name != INTERACTIVE:
+                    self._cap_tokens -= 1
+                return None
+            if chosen is None:
+                wait = min(wait, refill)
+        return wait
+
+    def _release(self, name: str, ticket: Tuple[int, float]) -> float:
+        waited = time.monotonic() - ticket[1]
+        self._busy = False
+        self._granted[name] += 1
+        self._waits[name].append(waited)
+        self._notify()
+        return waited
+
+    def acquire(self, lane_name: Optional[str] = None) -> float:
+        """
+        Wait for this call's turn, then for the shared rate bucket.
+
+        Returns:
+            float: Seconds spent waiting in total.
+        """
+        name = self._lane_of(lane_name)
+        with self._cond:
+            ticket = self._enqueue(name)
+            self._notify()
+            while True:
+                wait = self._grant(name, ticket)
+                if wait is None:
+                    break
+                self._cond.wait(wait)
+            self._notify()
+
+        try:
+            if self.take is not None:
+                self.take()
+        finally:
+            with self._cond:
+                waited = self._release(name, ticket)
+        return waited
+
+    async def acquire_async(self, lane_name: Optional[str] = None) -> float:
+        """
+        `acquire` for coroutines: waits on the event loop instead of
+        blocking a thread (only the bucket's short SQLite update runs in a
+        worker thread).
+        """
+        name = self._lane_of(lane_name)
+        event = asyncio.Event()
+        granted = False
+        with self._cond:
+            ticket = self._enqueue(name)
+            self._async_waiters[ticket] = (asyncio.get_running_loop(), event)
+            self._notify()
+        try:
+            while True:
+                with self._cond:
+                    event.clear()
+                    wait = self._grant(name, ticket)
+                    if wait is None:
+                        granted = True
+                        self._notify()
+                        break
+                try:
+                    await asyncio.wait_for(event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.pop(ticket, None)
+                if not granted:   # cancelled while queued
+                    self._queues[name].remove(ticket)
+                    self._notify()
+
+        try:
+            if self.try_take is not None:
+                while True:
+                    wait = await asyncio.to_thread(self.try_take)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(min(wait, MAX_WAIT_SLICE))
+            elif self.take is not None:
+                await asyncio.to_thread(self.take)
+        finally:
+            with self._cond:
+                waited = self._release(name, ticket)
+        return waited
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per lane: current queue depth, calls granted and queue-wait
+        percentiles (seconds) over the recent samples.
+        """
+        with self._cond:
+            result: Dict[str, Dict[str, Any]] = {}
+            for name in self.weights:
+                waits = sorted(self._waits[name])
+                result[name] = {
+                    "depth": len(self._queues[name]),
+                    "granted": self._granted[name],
+                    "wait_p50": _percentile(waits, 0.50),
+                    "wait_p99": _percentile(waits, 0.99),
+                    "wait_max": waits[-1] if waits else 0.0,
+                }
+            return result
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+_schedulers: Dict[str, LaneScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def _scheduler(token: str) -> LaneScheduler:
+    scheduler = _schedulers.get(token)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(token)
+            if scheduler is None:
+                scheduler = LaneScheduler(
+                    flow_control.rate(),
+                    reserve(),
+                    take=lambda: flow_control.acquire(token),
+                    try_take=lambda: flow_control.try_acquire(token),
+                )
+                _schedulers[token] = scheduler
+    return scheduler
+
+
+def acquire(token: str, lane_name: Optional[str] = None) -> float:
+    """
+    Take the next Bot API slot for `token` in the caller's lane (replaces a
+    direct `flow_control.acquire`).
+
+    Returns:
+        float: Seconds spent waiting.
+    """
+    return _scheduler(token).acquire(lane_name)
+
+
+async def acquire_async(token: str, lane_name: Optional[str] = None) -> float:
+    """
+    `acquire` for coroutines (the lane of the calling task by default).
+    """
+    return await _scheduler(token).acquire_async(lane_name)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Lane metrics summed over every token used by this process.
+    """
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    merged: Dict[str, Dict[str, Any]] = {
+        name: {"depth": 0, "granted": 0, "wait_p50": 0.0, "wait_p99": 0.0, "wait_max": 0.0}
+        for name in LANES
+    }
+    for scheduler in schedulers:
+        for name, values in scheduler.stats().items():
+            m = merged[name]
+            m["depth"] += values["depth"]
+            m["granted"] += values["granted"]
+            for key in ("wait_p50", "wait_p99", "wait_max"):
+                m[key] = max(m[key], values[key])
+    return merged
+
+
+def reset() -> None:
+    """
+    Forget every scheduler (settings are re-read on next use).
+    """
+    with _schedulers_lock:
+        _schedulers.clear()
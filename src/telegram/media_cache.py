@@ -0,0 +1,276 @@
+"""
+Content-addressed cache of Telegram `file_id`s for uploaded files.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from . import db, http_client
+from .multipart import MediaSource, iter_source, local_file_uri
+
+# =========================
+#  Settings
+# =========================
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_AGE_DAYS = 180
+HASH_CHUNK = 1024 * 1024
+
+# Parts of the Bot API's 400 descriptions that mean "this file_id is no good"
+_STALE_ERRORS = (
+    "file identifier",
+    "file reference",
+    "file_id",
+    "wrong type",
+    "can't use file",
+)
+
+# Result keys under which each method returns the uploaded file
+_RESULT_KEYS = {
+    "photo": ("photo",),
+    "document": ("document", "animation", "video", "audio"),
+    "voice": ("voice", "audio", "document"),
+    "video": ("video", "animation", "document"),
+    "audio": ("audio", "voice", "document"),
+    "animation": ("animation", "document"),
+}
+
+
+def enabled() -> bool:
+    return os.getenv("TELEGRAM_MEDIA_CACHE", "1").lower() in ("1", "true", "yes")
+
+
+def applies_to(source: MediaSource) -> bool:
+    """
+    Whether sends of `source` go through the cache: not when it is disabled,
+    nor for local paths in local mode, which are passed to the server as
+    file:// paths (hashing them would cost more than it saves).
+    """
+    if not enabled():
+        return False
+    return not (http_client.local_mode() and local_file_uri(source) is not None)
+
+
+def max_entries() -> int:
+    try:
+        return int(os.getenv("TELEGRAM_MEDIA_CACHE_MAX", DEFAULT_MAX_ENTRIES))
+    except ValueError:
+        return DEFAULT_MAX_ENTRIES
+
+
+# =========================
+#  Content Hashing
+# =========================
+
+# (path, size, mtime_ns) -> sha256; sending one file to many chats hashes it once
+_hashes: Dict[Tuple[str, int, int], str] = {}
+_hashes_lock = threading.Lock()
+
+
+def file_sha256(path: str) -> str:
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _hashes_lock:
+        digest = _hashes.get(key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _hashes_lock:
+        if len(_hashes) >= 1024:
+            _hashes.clear()
+        _hashes[key] = digest
+    return digest
+
+
+def content_sha256(source: MediaSource) -> Optional[str]:
+    """
+    SHA-256 of any upload source: a path (memoized), a bytes buffer, or a
+    seekable file object (read in chunks, then rewound). None for streams
+    that cannot be rewound, which are simply not cached.
+    """
+    if isinstance(source, (str, Path)):
+        return file_sha256(str(source))
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    try:
+        if not source.seekable():
+            return None
+        start = source.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+    h = hashlib.sha256()
+    for chunk in iter_source(source, HASH_CHUNK):
+        h.update(chunk)
+    source.seek(start)
+    return h.hexdigest()
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+# =========================
+#  Cache Store
+# =========================
+
+_schema_ready: set[str] = set()
+
+
+def _ensure_schema() -> bool:
+    """
+    Run the migrations once per database file; False if the DB is unusable.
+    """
+    path = str(db.DB_PATH)
+    if path in _schema_ready:
+        return True
+    try:
+        db.init_db()
+    except sqlite3.Error as e:
+        print(f"[MEDIA CACHE ERROR] {e}")
+        return False
+    _schema_ready.add(path)
+    return True
+
+
+def lookup(token: str, kind: str, sha256: str) -> Optional[str]:
+    """
+    Return the cached file_id for this content, or None.
+
+    Reads the live database, not the read-only replica, so a file stored a
+    moment ago is reused right away.
+    """
+    if not _ensure_schema():
+        return None
+    with db._pool().connection() as conn:
+        row = conn.execute(
+            """
+            SELECT file_id, created_ts FROM media_file_ids
+            WHERE token_key = ? AND kind = ? AND sha256 = ?
+            """,
+            (token_key(token), kind, sha256),
+        ).fetchone()
+    if row is None:
+        return None
+    if row["created_ts"] < int(time.time()) - DEFAULT_MAX_AGE_DAYS * 86400:
+        invalidate(token, kind, sha256)
+        return None
+    return row["file_id"]
+
+
+def touch(token: str, kind: str, sha256: str) -> None:
+    with db._transaction() as conn:
+        conn.execute(
+            """
+            UPDATE media_file_ids SET last_used_ts = ?, uses = uses + 1
+            WHERE token_key = ? AND kind = ? AND sha256 = ?
+            """,
+            (int(time.time()), token_key(token), kind, sha256),
+        )
+
+
+def store(token: str, kind: str, sha256: str, file: Dict[str, Any]) -> None:
+    """
+    Remember the file object returned by an upload, then evict the least
+    recently used entries above TELEGRAM_MEDIA_CACHE_MAX.
+    """
+    if not _ensure_schema():
+        return
+    now = int(time.time())
+    with db._transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO media_file_ids (
+                token_key, kind, sha256, file_id, file_unique_id, size,
+                created_ts, last_used_ts, uses
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            ON CONFLICT(token_key, kind, sha256) DO UPDATE SET
+                file_id = excluded.file_id,
+                file_unique_id = excluded.file_unique_id,
+                size = excluded.size,
+                created_ts = excluded.created_ts,
+                last_used_ts = excluded.last_used_ts
+            """,
+            (
+                token_key(token), kind, sha256, file["file_id"],
+                file.get("file_unique_id"), file.get("file_size"), now, now,
+            ),
+        )
+        conn.execute(
+            """
+            DELETE FROM media_file_ids
+            WHERE (token_key, kind, sha256) IN (
+                SELECT token_key, kind, sha256 FROM media_file_ids
+                ORDER BY last_used_ts DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (max(1, max_entries()),),
+        )
+
+
+def invalidate(token: str, kind: str, sha256: str) -> None:
+    with db._transaction() as conn:
+        conn.execute(
+            "DELETE FROM media_file_ids WHERE token_key = ? AND kind = ? AND sha256 = ?",
+            (token_key(token), kind, sha256),
+        )
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Returns:
+        Dict[str, Any]: entries, total uses and bytes of uploads avoided.
+    """
+    if not _ensure_schema():
+        return {"entries": 0, "uses": 0, "bytes_saved": 0}
+    with db._get_conn() as conn:
+        row = conn.execute(
+            """
+            SELECT COUNT(*) AS entries,
+                   COALESCE(SUM(uses), 0) AS uses,
+                   COALESCE(SUM((uses - 1) * COALESCE(size, 0)), 0) AS bytes_saved
+            FROM media_file_ids
+            """
+        ).fetchone()
+    return dict(row)
+
+
+# =========================
+#  Response Helpers
+# =========================
+
+def is_stale_file_error(response: Dict[str, Any]) -> bool:
+    """
+    True when Telegram rejected the request because of the file_id itself.
+    """
+    if response.get("ok") or response.get("error_code") != 400:
+        return False
+    description = (response.get("description") or "").lower()
+    return any(part in description for part in _STALE_ERRORS)
+
+
+def extract_file(kind: str, response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    The uploaded file object in a send* response (largest size for photos).
+    """
+    message = response.get("result") or {}
+    for key in _RESULT_KEYS.get(kind, (kind,)):
+        value = message.get(key)
+        if isinstance(value, list) and value:
+            value = max(value, key=lambda p: (p.get("file_size") or 0, p.get("width") or 0))
+        if isinstance(value, dict) and value.get("file_id"):
+            return value
+    return None
@@ -0,0 +1,314 @@
+"""
+Per-method Bot API call metrics for this process, in Prometheus format.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# =========================
+#  Settings
+# =========================
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+NETWORK_ERROR = "network"   # status label of attempts that got no HTTP answer
+
+
+def metrics_port() -> Optional[int]:
+    try:
+        port = int(os.getenv("TELEGRAM_METRICS_PORT", "0"))
+    except ValueError:
+        return None
+    return port or None
+
+
+# =========================
+#  Registry
+# =========================
+
+class _MethodStats:
+    __slots__ = ("buckets", "latency_sum", "count", "statuses", "errors", "retries", "bytes_sent", "bytes_received")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)   # last one is +Inf
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statuses: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+_lock = threading.Lock()
+_methods: Dict[str, _MethodStats] = {}
+
+
+def _stats(method: str) -> _MethodStats:
+    stats = _methods.get(method)
+    if stats is None:
+        stats = _methods[method] = _MethodStats()
+    return stats
+
+
+def observe(
+    method: str,
+    seconds: float,
+    status: int | str,
+    error_code: Optional[int] = None,
+    bytes_sent: int = 0,
+    bytes_received: int = 0,
+) -> None:
+    """
+    Record one HTTP attempt of a Bot API call.
+
+    Args:
+        method (str): Bot API method, e.g. "sendMessage".
+        seconds (float): Time from sending the request to the decoded answer.
+        status (int | str): HTTP status, or NETWORK_ERROR.
+        error_code (Optional[int]): `error_code` of a failed Bot API answer.
+        bytes_sent (int): Request body size.
+        bytes_received (int): Response body size.
+    """
+    index = len(LATENCY_BUCKETS)
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            index = i
+            break
+    with _lock:
+        stats = _stats(method)
+        stats.buckets[index] += 1
+        stats.latency_sum += seconds
+        stats.count += 1
+        key = str(status)
+        stats.statuses[key] = stats.statuses.get(key, 0) + 1
+        if error_code is not None:
+            code = str(error_code)
+            stats.errors[code] = stats.errors.get(code, 0) + 1
+        stats.bytes_sent += bytes_sent
+        stats.bytes_received += bytes_received
+
+
+def record_retry(method: str, reason: str) -> None:
+    """
+    Count a retried attempt ("429", "5xx" or NETWORK_ERROR).
+    """
+    with _lock:
+        stats = _stats(method)
+        stats.retries[reason] = stats.retries.get(reason, 0) + 1
+
+
+def body_size(body: Any) -> int:
+    """
+    Size of a request body as sent by `requests`/`httpx` (0 if unknown,
+    e.g. a chunked upload).
+    """
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    size = getattr(body, "len", None)
+    return size if isinstance(size, int) else 0
+
+
+def reset() -> None:
+    with _lock:
+        _methods.clear()
+
+
+def _quantile(buckets: List[int], count: int, q: float) -> float:
+    """
+    Quantile estimated from the histogram (upper bound of its bucket).
+    """
+    if not count:
+        return 0.0
+    rank = q * count
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= rank:
+            return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float("inf")
+    return float("inf")
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    Per method: calls, latency p50/p99/mean (seconds), calls by HTTP status
+    and by error code, retries by reason and bytes sent / received.
+    """
+    with _lock:
+        result: Dict[str, Dict[str, Any]] = {}
+        for method, s in sorted(_methods.items()):
+            result[method] = {
+                "calls": s.count,
+                "p50": _quantile(s.buckets, s.count, 0.50),
+                "p99": _quantile(s.buckets, s.count, 0.99),
+                "mean": s.latency_sum / s.count if s.count else 0.0,
+                "statuses": dict(s.statuses),
+                "errors": dict(s.errors),
+                "retries": dict(s.retries),
+                "bytes_sent": s.bytes_sent,
+                "bytes_received": s.bytes_received,
+            }
+        return result
+
+
+# =========================
+#  Prometheus exposition
+# =========================
+
+def _label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def _gauges() -> List[Tuple[str, str, Dict[str, str], float]]:
+    """
+    (name, help, labels, value) of the lane, outbox and media cache gauges.
+    Sources that fail (no database yet) are left out.
+    """
+    from . import lanes, media_cache, outbox
+
+    gauges: List[Tuple[str, str, Dict[str, str], float]] = []
+    for name, values in lanes.stats().items():
+        gauges.append(("telegram_lane_queue_depth", "Calls waiting in a priority lane.", {"lane": name}, values["depth"]))
+        gauges.append(("telegram_lane_granted_total", "Calls granted a slot per lane.", {"lane": name}, values["granted"]))
+        gauges.append(("telegram_lane_wait_p99_seconds", "Recent p99 queue wait per lane.", {"lane": name}, values["wait_p99"]))
+
+    sources: List[Tuple[str, Callable[[], Dict[str, Any]]]] = [("outbox", outbox.stats), ("media_cache", media_cache.stats)]
+    for prefix, func in sources:
+        try:
+            values = func()
+        except Exception:
+            continue
+        if prefix == "outbox":
+            for status, n in values.items():
+                gauges.append(("telegram_outbox_jobs", "Outbox jobs by status.", {"status": status}, n))
+        else:
+            for key, n in values.items():
+                gauges.append((f"telegram_media_cache_{key}", f"Media file_id cache: {key}.", {}, n))
+    return gauges
+
+
+def render_prometheus() -> str:
+    """
+    Every metric in the Prometheus text exposition format (0.0.4).
+    """
+    data = snapshot()
+    with _lock:
+        histograms = {m: (list(s.buckets), s.latency_sum, s.count) for m, s in _methods.items()}
+
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("telegram_api_request_duration_seconds", "histogram", "Bot API call latency per attempt.")
+    for method, (buckets, total, count) in sorted(histograms.items()):
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+            seen += n
+            lines.append(f'telegram_api_request_duration_seconds_bucket{{method="{_label(method)}",le="{_bound(bound)}"}} {seen}')
+        lines.append(f'telegram_api_request_duration_seconds_sum{{method="{_label(method)}"}} {total}')
+        lines.append(f'telegram_api_request_duration_seconds_count{{method="{_label(method)}"}} {count}')
+
+    counters = (
+        ("telegram_api_requests_total", "Bot API attempts by HTTP status.", "statuses", "status"),
+        ("telegram_api_errors_total", "Failed Bot API answers by error code.", "errors", "error_code"),
+        ("telegram_api_retries_total", "Retried Bot API attempts by reason.", "retries", "reason"),
+    )
+    for name, help_text, key, label in counters:
+        family(name, "counter", help_text)
+        for method, values in data.items():
+            for value, n in sorted(values[key].items()):
+                lines.append(f'{name}{{method="{_label(method)}",{label}="{_label(value)}"}} {n}')
+
+    for name, key, help_text in (
+        ("telegram_api_request_bytes_total", "bytes_sent", "Request body bytes sent."),
+        ("telegram_api_response_bytes_total", "bytes_received", "Response body bytes received."),
+    ):
+        family(name, "counter", help_text)
+        for method, values in data.items():
+            lines.append(f'{name}{{method="{_label(method)}"}} {values[key]}')
+
+    declared = set()
+    for name, help_text, labels, value in _gauges():
+        if name not in declared:
+            family(name, "gauge", help_text)
+            declared.add(name)
+        rendered = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+        lines.append(f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+# =========================
+#  HTTP endpoint
+# =========================
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 (http.server API)
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_server(port: Optional[int] = None, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics in a daemon thread (once per process).
+
+    Args:
+        port (Optional[int]): Port to listen on; defaults to
+            TELEGRAM_METRICS_PORT (unset or 0: no server).
+        host (str): Interface to bind.
+
+    Returns:
+        Optional[ThreadingHTTPServer]: The running server, or None when
+        disabled or the port cannot be bound.
+    """
+    global _server
+    port = metrics_port() if port is None else port
+    if port is None:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            print(f"Metrics server could not bind {host}:{port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="telegram-metrics", daemon=True).start()
+        _server = server
+        return server
+
+
+def stop_server() -> None:
+    global _server
+    with _server_lock:
+        server, _server = _server, None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,643 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Callable, List, Optional, Set
+
+# =========================
+#  Migration Helpers
+# =========================
+
+Migration = Callable[[sqlite3.Connection], None]
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> Set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _defer(conn: sqlite3.Connection, name: str, upto: int = 0) -> None:
+    """
+    Queue a slow step (see `TASKS`) to run after the current migration
+    commits, so it does not hold the migration's write lock.
+    """
+    conn.execute(
+        "INSERT OR REPLACE INTO migration_tasks (name, cursor, upto) VALUES (?, 0, ?)",
+        (name, upto),
+    )
+
+
+def _epoch(column: str) -> str:
+    """
+    SQL expression converting an ISO-8601 text column to integer epoch seconds.
+    """
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+# =========================
+#  Migrations (in order)
+# =========================
+
+def _m001_base_tables(conn: sqlite3.Connection) -> None:
+    """
+    The original schema, including the `bot_profile` columns that used to be
+    added with try/except ALTER TABLE.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER UNIQUE NOT NULL,
+            type TEXT,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            title TEXT,
+            added_at TEXT,
+            last_seen_at TEXT
+        )
+        """
+    )
+    if "bot_profile" not in _columns(conn, "users"):
+        conn.execute("ALTER TABLE users ADD COLUMN bot_profile TEXT")
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            direction TEXT CHECK(direction IN ('in', 'out')) NOT NULL,
+            text TEXT,
+            created_at TEXT
+        )
+        """
+    )
+    if "bot_profile" not in _columns(conn, "messages"):
+        conn.execute("ALTER TABLE messages ADD COLUMN bot_profile TEXT")
+
+
+def _m002_profile_keys_and_epochs(conn: sqlite3.Connection) -> None:
+    """
+    - users: one row per (bot_profile, chat_id) instead of per chat_id.
+    - users/messages: integer epoch columns next to the ISO text columns.
+    - NULL bot_profile values become '' so they take part in the unique key.
+
+    The users table is rebuilt in the step; messages only get the new
+    column here and are backfilled by a deferred task.
+    """
+    conn.execute(
+        """
+        CREATE TABLE users_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_profile TEXT NOT NULL DEFAULT '',
+            chat_id INTEGER NOT NULL,
+            type TEXT,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            title TEXT,
+            added_at TEXT,
+            last_seen_at TEXT,
+            added_ts INTEGER,
+            last_seen_ts INTEGER,
+            UNIQUE (bot_profile, chat_id)
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO users_v2 (
+            id, bot_profile, chat_id, type, username, first_name, last_name,
+            title, added_at, last_seen_at, added_ts, last_seen_ts
+        )
+        SELECT
+            id, COALESCE(bot_profile, ''), chat_id, type, username, first_name,
+            last_name, title, added_at, last_seen_at,
+            {_epoch("added_at")}, {_epoch("last_seen_at")}
+        FROM users
+        """
+    )
+    conn.execute("DROP TABLE users")
+    conn.execute("ALTER TABLE users_v2 RENAME TO users")
+
+    # Existing messages are filled in batches after the step commits
+    # (`_task_messages_epochs`).
+    conn.execute("ALTER TABLE messages ADD COLUMN created_ts INTEGER")
+    upto = conn.execute("SELECT COALESCE(MAX(id), 0) FROM messages").fetchone()[0]
+    _defer(conn, "messages_epochs", upto)
+
+
+def _m003_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Indexes for the panel's access patterns:
+    - users of one profile ordered by last activity (keyset on last_seen_ts, id);
+    - the latest messages of one chat within one profile;
+    - time-range scans over one profile's messages.
+    """
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_profile_seen
+        ON users (bot_profile, last_seen_ts)
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_profile_chat
+        ON messages (bot_profile, chat_id, id)
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_chat
+        ON messages (chat_id, id)
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_profile_created
+        ON messages (bot_profile, created_ts)
+        """
+    )
+    _defer(conn, "analyze")
+
+
+def _m004_user_search_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Case-insensitive prefix search on username / first name within a profile.
+    """
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_profile_username
+        ON users (bot_profile, username COLLATE NOCASE)
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_profile_first_name
+        ON users (bot_profile, first_name COLLATE NOCASE)
+        """
+    )
+
+
+def _m005_messages_fts(conn: sqlite3.Connection) -> None:
+    """
+    FTS5 index over messages.text (external content, no duplicated text).
+
+    `bot_profile` is an indexed FTS column so a search can be restricted to
+    one profile inside the MATCH expression. New rows are indexed by an
+    insert trigger; existing rows are indexed in batches after the step
+    commits (`_task_messages_fts`), which then adds the update / delete
+    triggers.
+    """
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            text,
+            bot_profile,
+            content='messages',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts (rowid, text, bot_profile)
+            VALUES (new.id, new.text, new.bot_profile);
+        END
+        """
+    )
+    upto = conn.execute("SELECT COALESCE(MAX(id), 0) FROM messages").fetchone()[0]
+    _defer(conn, "messages_fts", upto)
+
+
+def _messages_fts_sync_triggers(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, text, bot_profile)
+            VALUES ('delete', old.id, old.text, old.bot_profile);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE ON messages BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, text, bot_profile)
+            VALUES ('delete', old.id, old.text, old.bot_profile);
+            INSERT INTO messages_fts (rowid, text, bot_profile)
+            VALUES (new.id, new.text, new.bot_profile);
+        END
+        """
+    )
+
+
+def _m006_retention(conn: sqlite3.Connection) -> None:
+    """
+    Per-profile retention policies and the catalogue of monthly archive tables
+    (`messages_archive_YYYYMM`) that old messages are moved into.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS retention_policies (
+            bot_profile TEXT PRIMARY KEY,
+            keep_days INTEGER NOT NULL CHECK (keep_days > 0),
+            updated_at TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS message_archives (
+            table_name TEXT PRIMARY KEY,
+            month TEXT NOT NULL UNIQUE,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            min_id INTEGER,
+            max_id INTEGER
+        )
+        """
+    )
+
+
+def _m007_rollups(conn: sqlite3.Connection) -> None:
+    """
+    Activity rollups per (bot_profile, bucket_size, bucket_start):
+    - message counts per direction;
+    - the distinct chats seen in each bucket and their count (active users);
+    - the last `messages.id` folded in by the catch-up job.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS message_rollups (
+            bot_profile TEXT NOT NULL,
+            bucket_size INTEGER NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            direction TEXT NOT NULL,
+            messages INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bot_profile, bucket_size, bucket_start, direction)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollup_active_chats (
+            bot_profile TEXT NOT NULL,
+            bucket_size INTEGER NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            PRIMARY KEY (bot_profile, bucket_size, bucket_start, chat_id)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS active_user_rollups (
+            bot_profile TEXT NOT NULL,
+            bucket_size INTEGER NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            active_users INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bot_profile, bucket_size, bucket_start)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            name TEXT PRIMARY KEY,
+            last_message_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )
+        """
+    )
+
+
+def _m008_media_file_ids(conn: sqlite3.Connection) -> None:
+    """
+    Telegram `file_id`s of uploaded media, keyed by bot token hash, media
+    kind and the SHA-256 of the file content.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_file_ids (
+            token_key TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            file_unique_id TEXT,
+            size INTEGER,
+            created_ts INTEGER NOT NULL,
+            last_used_ts INTEGER NOT NULL,
+            uses INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (token_key, kind, sha256)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_media_file_ids_last_used
+        ON media_file_ids (last_used_ts)
+        """
+    )
+
+
+def _m009_outbox(conn: sqlite3.Connection) -> None:
+    """
+    Durable outbox of outgoing Bot API calls, claimed by sender workers
+    with leases, plus the dead-letter table for jobs that kept failing.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            method TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            files TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            available_at REAL NOT NULL,
+            lease_until REAL,
+            worker TEXT,
+            created_at REAL NOT NULL,
+            sent_at REAL,
+            message_id INTEGER,
+            last_error TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_outbox_ready
+        ON outbox (status, available_at)
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox_dead (
+            id INTEGER PRIMARY KEY,
+            method TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            files TEXT,
+            attempts INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            failed_at REAL NOT NULL,
+            error_code INTEGER,
+            last_error TEXT
+        )
+        """
+    )
+
+
+def _m010_update_ingest(conn: sqlite3.Connection) -> None:
+    """
+    State of the incremental getUpdates ingester: the last confirmed
+    `update_id` per bot token hash, and every chat seen in an update with
+    the latest update that mentioned it.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS update_offsets (
+            token_key TEXT PRIMARY KEY,
+            last_update_id INTEGER NOT NULL,
+            updated_ts INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS known_chats (
+            token_key TEXT NOT NULL,
+            chat_id INTEGER NOT NULL,
+            type TEXT,
+            title TEXT,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            first_seen_ts INTEGER NOT NULL,
+            last_seen_ts INTEGER NOT NULL,
+            last_update_id INTEGER NOT NULL,
+            last_update TEXT,
+            PRIMARY KEY (token_key, chat_id)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_known_chats_recent
+        ON known_chats (token_key, last_update_id DESC)
+        """
+    )
+
+
+def _m011_chat_metadata(conn: sqlite3.Connection) -> None:
+    """
+    Persistent tier of the chat metadata cache (`chat_info.py`): the last
+    getChat / getChatMemberCount / getUserProfilePhotos answer per bot
+    token hash, kind and chat.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_metadata (
+            token_key TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            chat_id INTEGER NOT NULL,
+            value TEXT,
+            error TEXT,
+            fetched_ts INTEGER NOT NULL,
+            PRIMARY KEY (token_key, kind, chat_id)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_chat_metadata_fetched
+        ON chat_metadata (fetched_ts)
+        """
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    _m001_base_tables,
+    _m002_profile_keys_and_epochs,
+    _m003_indexes,
+    _m004_user_search_indexes,
+    _m005_messages_fts,
+    _m006_retention,
+    _m007_rollups,
+    _m008_media_file_ids,
+    _m009_outbox,
+    _m010_update_ingest,
+    _m011_chat_metadata,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+# =========================
+#  Runner
+# =========================
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+# =========================
+#  Deferred Tasks
+# =========================
+
+DEFAULT_TASK_BATCH = 5000     # rows per write transaction of a deferred task
+ANALYSIS_LIMIT = 1000         # rows sampled per index by the deferred ANALYZE
+
+
+def _task_analyze(conn: sqlite3.Connection, batch_size: int) -> None:
+    # Sampled statistics: bounded time however large the tables are.
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+    conn.execute("DELETE FROM migration_tasks WHERE name = 'analyze'")
+    conn.commit()
+
+
+def _task_by_id_range(
+    conn: sqlite3.Connection,
+    name: str,
+    batch_size: int,
+    step: Callable[[sqlite3.Connection, int, int], None],
+    finish: Optional[Migration] = None,
+) -> None:
+    """
+    Run `step(conn, lo, hi)` over the messages with `cursor < id <= upto`
+    of task `name`, `batch_size` rows per transaction. Progress is kept in
+    the task row, so an interrupted run continues where it stopped; the
+    transaction that finds nothing left runs `finish` and drops the task.
+    """
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT cursor, upto FROM migration_tasks WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:   # finished by another process
+                conn.rollback()
+                return
+            cursor, upto = row
+            hi = conn.execute(
+                """
+                SELECT MAX(id) FROM (
+                    SELECT id FROM messages WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+                )
+                """,
+                (cursor, upto, batch_size),
+            ).fetchone()[0]
+            if hi is None:
+                if finish is not None:
+                    finish(conn)
+                conn.execute("DELETE FROM migration_tasks WHERE name = ?", (name,))
+            else:
+                step(conn, cursor, hi)
+                conn.execute("UPDATE migration_tasks SET cursor = ? WHERE name = ?", (hi, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if hi is None:
+            return
+
+
+def _task_messages_epochs(conn: sqlite3.Connection, batch_size: int) -> None:
+    """
+    Fill `created_ts` and the '' bot_profile of the messages that existed
+    when migration 002 added the column.
+    """
+    def step(conn: sqlite3.Connection, lo: int, hi: int) -> None:
+        conn.execute(
+            f"""
+            UPDATE messages
+            SET created_ts = COALESCE(created_ts, {_epoch("created_at")}),
+                bot_profile = COALESCE(bot_profile, '')
+            WHERE id > ? AND id <= ?
+            """,
+            (lo, hi),
+        )
+
+    _task_by_id_range(conn, "messages_epochs", batch_size, step)
+
+
+def _task_messages_fts(conn: sqlite3.Connection, batch_size: int) -> None:
+    """
+    Index the messages that existed when the FTS table was created, then
+    add the update / delete triggers.
+    """
+    def step(conn: sqlite3.Connection, lo: int, hi: int) -> None:
+        conn.execute(
+            """
+            INSERT INTO messages_fts (rowid, text, bot_profile)
+            SELECT id, text, bot_profile FROM messages WHERE id > ? AND id <= ?
+            """,
+            (lo, hi),
+        )
+
+    _task_by_id_range(conn, "messages_fts", batch_size, step, _messages_fts_sync_triggers)
+
+
+TASKS = {
+    "analyze": _task_analyze,
+    "messages_epochs": _task_messages_epochs,
+    "messages_fts": _task_messages_fts,
+}
+
+
+def run_pending_tasks(conn: sqlite3.Connection, batch_size: int = DEFAULT_TASK_BATCH) -> None:
+    """
+    Run the deferred steps queued by migrations, outside their transaction.
+    """
+    names = [row[0] for row in conn.execute("SELECT name FROM migration_tasks ORDER BY rowid")]
+    for name in names:
+        TASKS[name](conn, batch_size)
+
+
+def migrate(conn: sqlite3.Connection, task_batch_size: int = DEFAULT_TASK_BATCH) -> int:
+    """
+    Apply every pending migration, one transaction per step.
+
+    The schema version lives in `PRAGMA user_version`. Each step takes the
+    write lock with BEGIN IMMEDIATE and re-checks the version, so several
+    processes can start at once and only one of them performs a step.
+    Readers keep working (WAL) while a step runs. Slow work (ANALYZE, the
+    created_ts backfill, the initial FTS indexing) is queued in `migration_tasks` and runs after the
+    step commits, in short transactions of its own.
+
+    Args:
+        conn (sqlite3.Connection): An open connection outside any transaction.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS migration_tasks (
+            name TEXT PRIMARY KEY,
+            cursor INTEGER NOT NULL DEFAULT 0,
+            upto INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    run_pending_tasks(conn, task_batch_size)   # left over by an interrupted start
+
+    while get_schema_version(conn) < SCHEMA_VERSION:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_schema_version(conn)
+            if version >= SCHEMA_VERSION:
+                conn.rollback()
+                break
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        run_pending_tasks(conn, task_batch_size)
+
+    return get_schema_version(conn)
@@ -0,0 +1,217 @@
+"""
+Streaming multipart/form-data bodies for Bot API uploads.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import mimetypes
+import os
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+CHUNK_SIZE = 64 * 1024
+
+# A local path, raw bytes or a readable binary file object
+MediaSource = Union[str, Path, bytes, bytearray, memoryview, BinaryIO]
+# `source` or `(filename, source)` or `(filename, source, content_type)`
+FileField = Union[MediaSource, Tuple[Any, ...]]
+ProgressFunc = Callable[[int, Optional[int]], None]
+
+
+def is_file_like(source: Any) -> bool:
+    return hasattr(source, "read")
+
+
+def source_name(source: MediaSource) -> str:
+    """
+    File name sent to Telegram for `source` (the path's or file object's
+    base name, else "file").
+    """
+    if isinstance(source, (str, Path)):
+        return Path(source).name
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and name:
+        return os.path.basename(name)
+    return "file"
+
+
+def source_size(source: MediaSource) -> Optional[int]:
+    """
+    Bytes left to read from `source`, or None if that is unknown
+    (a non-seekable stream).
+    """
+    if isinstance(source, (str, Path)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    try:
+        pos = source.tell()
+        end = source.seek(0, os.SEEK_END)
+        source.seek(pos)
+        return end - pos
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def local_file_uri(spec: FileField) -> Optional[str]:
+    """
+    file:// URI of a file field read from a path on disk (what a self-hosted
+    Bot API server in --local mode accepts instead of an upload), else None.
+    """
+    source = spec[1] if isinstance(spec, tuple) else spec
+    if isinstance(source, (str, Path)) and os.path.isfile(source):
+        return "file://" + os.path.abspath(source)
+    return None
+
+
+def iter_source(source: MediaSource, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the content of `source` in chunks of at most `chunk_size` bytes.
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast("B")
+        for start in range(0, view.nbytes, chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    else:
+        yield from iter(lambda: source.read(chunk_size), b"")
+
+
+def _form_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", " ").replace("\n", " ")
+
+
+class MultipartStream:
+    """
+    Lazily encoded multipart/form-data body.
+
+    Iterating the object yields the body in chunks; it can be iterated again
+    (a retry rewinds file objects to where they were when the stream was
+    built). `len` is the exact body size, or None when a source is a
+    non-seekable stream, in which case the body is sent chunked.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[Dict[str, Any]] = None,
+        files: Optional[Dict[str, FileField]] = None,
+        on_progress: Optional[ProgressFunc] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        """
+        Args:
+            fields (Optional[Dict[str, Any]]): Plain form fields; None values
+                are skipped, dicts/lists are sent as JSON.
+            files (Optional[Dict[str, FileField]]): File fields.
+            on_progress (Optional[ProgressFunc]): Called as
+                `on_progress(bytes_sent, total_bytes)` after every chunk.
+            chunk_size (int): Bytes read from a source at a time.
+        """
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.on_progress = on_progress
+        self.chunk_size = chunk_size
+
+        # Each part: (header bytes, source or None for a plain field, value bytes)
+        self._parts: List[Tuple[bytes, Optional[MediaSource], bytes]] = []
+        self._starts: Dict[int, int] = {}
+        total: Optional[int] = 0
+
+        for name, value in (fields or {}).items():
+            if value is None:
+                continue
+            header = (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+            ).encode("utf-8")
+            data = _form_value(value).encode("utf-8")
+            self._parts.append((header, None, data))
+            total += len(header) + len(data) + 2
+
+        for name, spec in (files or {}).items():
+            filename, source, ctype = self._unpack(spec)
+            header = (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"; filename="{_quote(filename)}"\r\n'
+                f"Content-Type: {ctype}\r\n\r\n"
+            ).encode("utf-8")
+            if is_file_like(source) and hasattr(source, "tell"):
+                try:
+                    self._starts[id(source)] = source.tell()
+                except (OSError, ValueError):
+                    pass
+            size = source_size(source)
+            self._parts.append((header, source, b""))
+            if total is not None:
+                total = None if size is None else total + len(header) + size + 2
+
+        self._closing = f"--{self.boundary}--\r\n".encode("utf-8")
+        self.len: Optional[int] = None if total is None else total + len(self._closing)
+
+    @staticmethod
+    def _unpack(spec: FileField) -> Tuple[str, MediaSource, str]:
+        if isinstance(spec, tuple):
+            filename = spec[0] or source_name(spec[1])
+            source = spec[1]
+            ctype = spec[2] if len(spec) > 2 and spec[2] else None
+        else:
+            filename, source, ctype = source_name(spec), spec, None
+        if ctype is None:
+            ctype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return filename, source, ctype
+
+    def _rewind(self) -> None:
+        for _, source, _ in self._parts:
+            start = self._starts.get(id(source))
+            if start is not None:
+                source.seek(start)
+
+    def _chunks(self) -> Iterator[bytes]:
+        self._rewind()
+        for header, source, data in self._parts:
+            yield header
+            if source is None:
+                yield data
+            else:
+                yield from iter_source(source, self.chunk_size)
+            yield b"\r\n"
+        yield self._closing
+
+    def __iter__(self) -> Iterator[bytes]:
+        sent = 0
+        for chunk in self._chunks():
+            if not chunk:
+                continue
+            sent += len(chunk)
+            yield chunk
+            if self.on_progress is not None:
+                self.on_progress(sent, self.len)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        # Disk reads happen in a worker thread so the event loop never blocks.
+        chunks = iter(self)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def read_all(self) -> bytes:
+        """
+        The whole body in memory (for tests and small payloads).
+        """
+        return b"".join(self)
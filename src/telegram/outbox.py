@@ -0,0 +1,616 @@
+"""
+Durable outbox for outgoing Bot API calls, sent by leased background workers.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import db, flow_control, lanes, telegram_utils
+
+# =========================
+#  Settings
+# =========================
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_LEASE_SEC = 60.0         # a send must finish within this, or another worker retries it
+DEFAULT_POLL_INTERVAL = 1.0      # idle workers look for due jobs at least this often
+DEFAULT_KEEP_SENT_SEC = 86400    # sent jobs are purged after a day
+MAX_BACKOFF = 300.0
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def worker_count() -> int:
+    return int(_env_float("OUTBOX_WORKERS", DEFAULT_WORKERS))
+
+
+def max_attempts() -> int:
+    return max(1, int(_env_float("OUTBOX_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)))
+
+
+# Wakes idle workers of this process as soon as something is enqueued
+_wakeup = threading.Event()
+_schema_ready: set[str] = set()
+
+
+def _ensure_schema() -> None:
+    path = str(db.DB_PATH)
+    if path not in _schema_ready:
+        db.init_db()
+        _schema_ready.add(path)
+
+
+# =========================
+#  Producer API
+# =========================
+
+def enqueue(
+    method: str,
+    payload: Dict[str, Any],
+    files: Optional[Dict[str, str]] = None,
+    run_at: Optional[float] = None,
+    attempts: Optional[int] = None,
+) -> int:
+    """
+    Queue one Bot API call.
+
+    Args:
+        method (str): Bot API method, e.g. "sendMessage".
+        payload (Dict[str, Any]): JSON-serializable parameters.
+        files (Optional[Dict[str, str]]): Upload fields mapped to local
+            paths; the files must exist until the job is final.
+        run_at (Optional[float]): Unix time before which the job is not sent
+            (scheduled messages); defaults to now.
+        attempts (Optional[int]): Attempts before dead-lettering
+            (default OUTBOX_MAX_ATTEMPTS).
+
+    Returns:
+        int: The job id.
+    """
+    _ensure_schema()
+    now = time.time()
+    with db._transaction() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO outbox (method, payload, files, max_attempts, available_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                method,
+                json.dumps(payload, ensure_ascii=False),
+                json.dumps(files) if files else None,
+                attempts or max_attempts(),
+                run_at if run_at is not None else now,
+                now,
+            ),
+        )
+        job_id = int(cur.lastrowid)
+    _wakeup.set()
+    return job_id
+
+
+def enqueue_text(
+    chat_id: int | str,
+    text: str,
+    parse_mode: Optional[str] = None,
+    run_at: Optional[float] = None,
+) -> int:
+    """
+    Queue a sendMessage call (see `enqueue`). Texts over Telegram's 4096
+    character limit are split here (see `text_split`) into one job whose
+    parts are sent in order, each replying to the previous one.
+    """
+    parts = telegram_utils._text_payloads(chat_id, text, parse_mode, None)
+    if len(parts) == 1:
+        return enqueue("sendMessage", parts[0], run_at=run_at)
+    return enqueue("sendMessage", {"chat_id": chat_id, "parts": parts}, run_at=run_at)
+
+
+def enqueue_media_group(
+    chat_id: int | str,
+    items: List[Dict[str, Any]],
+    run_at: Optional[float] = None,
+) -> int:
+    """
+    Queue an album (see `telegram_utils.send_media_group`) as one job.
+
+    Args:
+        chat_id (int | str): Target chat.
+        items (List[Dict[str, Any]]): `telegram_utils.input_media(...)`
+            dicts whose media is a local path (e.g. from `spool`).
+        run_at (Optional[float]): See `enqueue`.
+
+    Returns:
+        int: The job id.
+    """
+    files: Dict[str, str] = {}
+    described: List[Dict[str, Any]] = []
+    for i, item in enumerate(items):
+        field = f"file{i}"
+        files[field] = str(item["media"])
+        described.append({
+            "type": item["type"],
+            "caption": item.get("caption"),
+            "parse_mode": item.get("parse_mode"),
+            "filename": item.get("filename") or Path(item["media"]).name,
+            "file": field,
+        })
+    return enqueue("sendMediaGroup", {"chat_id": chat_id, "items": described}, files=files, run_at=run_at)
+
+
+def get_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Current state of a job: status is "queued", "leased", "sent" or "dead".
+    """
+    _ensure_schema()
+    # Straight from the writable pool: the panel's read-only snapshot may lag.
+    with db._pool().connection() as conn:
+        row = conn.execute(
+            """
+            SELECT id, method, status, attempts, available_at, sent_at, message_id, last_error
+            FROM outbox WHERE id = ?
+            """,
+            (job_id,),
+        ).fetchone()
+        if row is not None:
+            return dict(row)
+        row = conn.execute(
+            """
+            SELECT id, method, 'dead' AS status, attempts, failed_at, error_code, last_error
+            FROM outbox_dead WHERE id = ?
+            """,
+            (job_id,),
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def wait(job_id: int, timeout: float = 5.0, interval: float = 0.05) -> Optional[Dict[str, Any]]:
+    """
+    Poll a job until it is sent or dead, or `timeout` passes.
+
+    Returns:
+        Optional[Dict[str, Any]]: The last state seen (see `get_job`).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job["status"] in ("sent", "dead") or time.monotonic() >= deadline:
+            return job
+        time.sleep(interval)
+
+
+def stats() -> Dict[str, int]:
+    """
+    Number of jobs per status, plus dead-lettered jobs.
+    """
+    _ensure_schema()
+    with db._pool().connection() as conn:
+        counts = {row["status"]: row["n"] for row in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM outbox GROUP BY status"
+        )}
+        dead = conn.execute("SELECT COUNT(*) FROM outbox_dead").fetchone()[0]
+    return {
+        "queued": counts.get("queued", 0),
+        "leased": counts.get("leased", 0),
+        "sent": counts.get("sent", 0),
+        "dead": dead,
+    }
+
+
+def requeue_dead(job_id: int) -> bool:
+    """
+    Move a dead-lettered job back into the outbox with fresh attempts.
+    """
+    _ensure_schema()
+    with db._transaction() as conn:
+        row = conn.execute("SELECT * FROM outbox_dead WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return False
+        now = time.time()
+        conn.execute(
+            """
+            INSERT INTO outbox (id, method, payload, files, max_attempts, available_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (row["id"], row["method"], row["payload"], row["files"], max_attempts(), now, row["created_at"]),
+        )
+        conn.execute("DELETE FROM outbox_dead WHERE id = ?", (job_id,))
+    _wakeup.set()
+    return True
+
+
+def spool_dir() -> Path:
+    """
+    Directory for uploads that must outlive the caller (e.g. files uploaded
+    through the panel); spooled files are deleted once their job is sent.
+    """
+    path = Path(os.getenv("OUTBOX_SPOOL_DIR") or Path(db.DB_PATH).parent / "outbox_spool")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def spool(data: bytes | Any, filename: str) -> str:
+    """
+    Save `data` (bytes or a binary file object) in the spool directory.
+
+    Returns:
+        str: The path to pass in `enqueue(..., files=...)`.
+    """
+    # One directory per upload keeps the original file name for Telegram.
+    path = spool_dir() / uuid.uuid4().hex / (Path(filename).name or "file")
+    path.parent.mkdir()
+    with open(path, "wb") as f:
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            f.write(data)
+        else:
+            for chunk in iter(lambda: data.read(1024 * 1024), b""):
+                f.write(chunk)
+    return str(path)
+
+
+def _remove_spooled(files: Optional[str]) -> None:
+    if not files:
+        return
+    root = spool_dir().resolve()
+    for path in json.loads(files).values():
+        p = Path(path).resolve()
+        if p.parent.parent == root:
+            p.unlink(missing_ok=True)
+            try:
+                p.parent.rmdir()
+            except OSError:
+                pass
+
+
+# =========================
+#  Claiming & Completion
+# =========================
+
+def claim(worker: str, limit: int = 1, lease_sec: float = DEFAULT_LEASE_SEC) -> List[Dict[str, Any]]:
+    """
+    Lease up to `limit` due jobs (queued ones, or leased ones whose lease
+    expired) to `worker`. One UPDATE statement, so two workers never get
+    the same job.
+    """
+    now = time.time()
+    with db._transaction() as conn:
+        rows = conn.execute(
+            """
+            UPDATE outbox
+            SET status = 'leased', lease_until = ?, worker = ?, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM outbox
+                WHERE (status = 'queued' AND available_at <= ?)
+                   OR (status = 'leased' AND lease_until < ?)
+                ORDER BY available_at, id
+                LIMIT ?
+            )
+            RETURNING id, method, payload, files, attempts, max_attempts, created_at
+            """,
+            (now + lease_sec, worker, now, now, limit),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _complete(job: Dict[str, Any], worker: str, response: Dict[str, Any]) -> str:
+    """
+    Record the outcome of one attempt.
+
+    Returns:
+        str: "sent", "retry" or "dead".
+    """
+    now = time.time()
+    error_code = response.get("error_code")
+    description = response.get("description")
+
+    with db._transaction() as conn:
+        if response.get("ok"):
+            result = response.get("result")
+            if isinstance(result, list) and result:
+                result = result[0]   # an album: its first message
+            message_id = result.get("message_id") if isinstance(result, dict) else None
+            conn.execute(
+                """
+                UPDATE outbox
+                SET status = 'sent', sent_at = ?, message_id = ?, lease_until = NULL, last_error = NULL
+                WHERE id = ? AND worker = ?
+                """,
+                (now, message_id, job["id"], worker),
+            )
+            outcome = "sent"
+        else:
+            transient = error_code is None or error_code == 429 or error_code >= 500
+            if transient and job["attempts"] < job["max_attempts"]:
+                if error_code == 429:
+                    delay = float((response.get("parameters") or {}).get("retry_after") or 1)
+                else:
+                    delay = min(MAX_BACKOFF, flow_control.backoff(job["attempts"]))
+                conn.execute(
+                    """
+                    UPDATE outbox
+                    SET status = 'queued', available_at = ?, lease_until = NULL, last_error = ?
+                    WHERE id = ? AND worker = ?
+                    """,
+                    (now + delay, description, job["id"], worker),
+                )
+                outcome = "retry"
+            else:
+                cur = conn.execute(
+                    "DELETE FROM outbox WHERE id = ? AND worker = ?",
+                    (job["id"], worker),
+                )
+                if cur.rowcount:
+                    conn.execute(
+                        """
+                        INSERT OR REPLACE INTO outbox_dead (
+                            id, method, payload, files, attempts, created_at,
+                            failed_at, error_code, last_error
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            job["id"], job["method"], job["payload"], job["files"],
+                            job["attempts"], job["created_at"], now, error_code, description,
+                        ),
+                    )
+                outcome = "dead"
+    if outcome == "sent":
+        _remove_spooled(job["files"])
+    return outcome
+
+
+def _save_progress(job: Dict[str, Any], worker: str, payload: Dict[str, Any]) -> None:
+    """
+    Replace the payload of a multi-part job with what is left to send, so a
+    retry (or a requeued dead letter) does not repeat the parts already sent.
+    """
+    job["payload"] = json.dumps(payload, ensure_ascii=False)
+    with db._transaction() as conn:
+        conn.execute(
+            "UPDATE outbox SET payload = ? WHERE id = ? AND worker = ?",
+            (job["payload"], job["id"], worker),
+        )
+
+
+def _message_parts(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The sendMessage payloads of a job: its stored parts, or its text split
+    at Telegram's length limit (other fields are kept on every part).
+    """
+    if "parts" in payload:
+        return payload["parts"]
+    extra = {k: v for k, v in payload.items() if k not in ("text", "parse_mode", "disable_web_page_preview")}
+    parts = telegram_utils._text_payloads(
+        payload["chat_id"], payload["text"], payload.get("parse_mode"), payload.get("disable_web_page_preview")
+    )
+    return [{**extra, **part} for part in parts]
+
+
+def _deliver_parts(job: Dict[str, Any], worker: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Send the parts of a long text in order, each replying to the previous one.
+    """
+    parts = _message_parts(payload)
+    reply_to = payload.get("reply_to_message_id") if "parts" in payload else None
+    response: Dict[str, Any] = {}
+    for i, part in enumerate(parts):
+        if reply_to:
+            part = {**part, "reply_to_message_id": reply_to}
+        response = telegram_utils._request("sendMessage", part, retry=False)
+        if not response.get("ok"):
+            return response
+        reply_to = response["result"]["message_id"]
+        if i + 1 < len(parts):
+            _save_progress(job, worker, {"chat_id": part["chat_id"], "parts": parts[i + 1:], "reply_to_message_id": reply_to})
+    return response
+
+
+def _deliver_albums(job: Dict[str, Any], worker: str, payload: Dict[str, Any], files: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Send an album job as valid albums (10 items at most, compatible types)
+    through media_cache, dropping each album from the job once it is sent.
+    """
+    token = telegram_utils._get_token()
+    if not token:
+        return telegram_utils._no_token()
+    for item in payload["items"]:
+        if not os.path.isfile(files[item["file"]]):
+            raise FileNotFoundError(files[item["file"]])
+
+    items = [{**item, "media": files[item["file"]]} for item in payload["items"]]
+    albums = telegram_utils._split_albums(items)
+    response: Dict[str, Any] = {}
+    for n, album in enumerate(albums):
+        if len(album) == 1:
+            response = telegram_utils._single_request(payload["chat_id"], album[0], {}, retry=False)
+        else:
+            response = telegram_utils._album_request(token, payload["chat_id"], album, {}, retry=False)
+        if not response.get("ok"):
+            return response
+        left = [item for rest in albums[n + 1:] for item in rest]
+        if left:
+            _save_progress(job, worker, {
+                "chat_id": payload["chat_id"],
+                "items": [{k: v for k, v in item.items() if k != "media"} for item in left],
+            })
+    return response
+
+
+def _deliver(job: Dict[str, Any], worker: str) -> Dict[str, Any]:
+    payload = json.loads(job["payload"])
+    files = json.loads(job["files"]) if job["files"] else None
+    if job["method"] == "sendMessage" and ("parts" in payload or "text" in payload):
+        return _deliver_parts(job, worker, payload)
+    if job["method"] == "sendMediaGroup" and "items" in payload:
+        try:
+            return _deliver_albums(job, worker, payload, files or {})
+        except OSError as e:
+            return {"ok": False, "error_code": 400, "description": f"File error: {e}"}
+    if not files:
+        return telegram_utils._request(job["method"], payload, retry=False)
+    try:
+        if len(files) == 1:
+            # Single uploads go through media_cache, like telegram_utils.send_*;
+            # a file deleted since the job was queued is a 400 answer.
+            [(field, path)] = files.items()
+            return telegram_utils._upload_media(
+                job["method"], field, path, payload, Path(path).name, retry=False
+            )
+        uploads = {field: (Path(path).name, Path(path)) for field, path in files.items()}
+        return telegram_utils._request(job["method"], payload, files=uploads, retry=False)
+    except OSError as e:
+        # The file is gone: retrying cannot help.
+        return {"ok": False, "error_code": 400, "description": f"File error: {e}"}
+
+
+def process_one(worker: str, lease_sec: float = DEFAULT_LEASE_SEC) -> Optional[str]:
+    """
+    Claim and send a single job.
+
+    Returns:
+        Optional[str]: "sent", "retry" or "dead", or None if nothing was due.
+    """
+    jobs = claim(worker, 1, lease_sec)
+    if not jobs:
+        return None
+    job = jobs[0]
+    try:
+        with lanes.lane(lanes.TRANSACTIONAL):
+            response = _deliver(job, worker)
+    except Exception as e:  # never let one job kill the worker
+        response = {"ok": False, "error_code": None, "description": f"Send error: {e}"}
+    outcome = _complete(job, worker, response)
+    if outcome != "sent":
+        print(f"[OUTBOX] job {job['id']} {job['method']}: {outcome} ({response.get('description')})")
+    return outcome
+
+
+def purge_sent(older_than_sec: float = DEFAULT_KEEP_SENT_SEC) -> int:
+    """
+    Delete sent jobs older than `older_than_sec`; returns the number removed.
+    """
+    with db._transaction() as conn:
+        cur = conn.execute(
+            "DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?",
+            (time.time() - older_than_sec,),
+        )
+        return cur.rowcount
+
+
+# =========================
+#  Worker Pool
+# =========================
+
+class OutboxWorkers:
+    """
+    Sender threads draining the outbox. `stop()` lets in-flight sends finish
+    (and, with `drain=True`, everything already due) before returning.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        lease_sec: float = DEFAULT_LEASE_SEC,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.lease_sec = lease_sec
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._drain = False
+        self._threads: List[threading.Thread] = []
+        self._last_purge = 0.0
+
+    def start(self) -> "OutboxWorkers":
+        _ensure_schema()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, args=(f"{self.name}/{i}",), name=f"outbox-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def _run(self, worker: str) -> None:
+        while True:
+            if self._stop.is_set() and not self._drain:
+                return
+            try:
+                outcome = process_one(worker, self.lease_sec)
+            except Exception as e:
+                print(f"[OUTBOX ERROR] {e}")
+                outcome = None
+
+            if outcome is not None:
+                continue
+            if self._stop.is_set():
+                return  # draining and nothing left that is due
+            self._maybe_purge()
+            _wakeup.wait(self.poll_interval)
+            _wakeup.clear()
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge >= 3600:
+            self._last_purge = now
+            purge_sent(_env_float("OUTBOX_KEEP_SENT_SEC", DEFAULT_KEEP_SENT_SEC))
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = 30.0) -> None:
+        self._drain = drain
+        self._stop.set()
+        _wakeup.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for t in self._threads:
+            t.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._threads = [t for t in self._threads if t.is_alive()]
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads) and not self._stop.is_set()
+
+
+_workers: Optional[OutboxWorkers] = None
+_workers_lock = threading.Lock()
+
+
+def start_workers(workers: Optional[int] = None) -> Optional[OutboxWorkers]:
+    """
+    Start this process's sender pool (idempotent). OUTBOX_WORKERS=0 disables
+    it, leaving delivery to other processes.
+    """
+    global _workers
+    count = worker_count() if workers is None else workers
+    if count <= 0:
+        return None
+    with _workers_lock:
+        if _workers is None or not _workers.running:
+            _workers = OutboxWorkers(count).start()
+        return _workers
+
+
+def stop_workers(drain: bool = True, timeout: Optional[float] = 30.0) -> None:
+    global _workers
+    with _workers_lock:
+        workers, _workers = _workers, None
+    if workers is not None:
+        workers.stop(drain=drain, timeout=timeout)
+
+
+def workers_running() -> bool:
+    return _workers is not None and _workers.running
+
+
+atexit.register(stop_workers, True, 10.0)
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-import threading
 from datetime import datetime
 
-from ..telegram_utils import send_markdown, send_text  # type: ignore
+from .. import outbox  # type: ignore
 
 def schedule_message(
     chat_id: str | int,
@@ -14,6 +13,10 @@ def schedule_message(
     """
     Schedule a message to be sent at a specific datetime.
 
+    The message is stored in the durable outbox with `run_at` as its due
+    time, so it survives restarts and is sent by whichever process runs
+    outbox workers (started here if this process has none yet).
+
     Args:
         chat_id (str | int): The chat ID where the message will be sent.
         text (str): The message content.
@@ -27,16 +30,11 @@ def schedule_message(
     if delay < 0:
         delay = 0
 
-    def _job() -> None:
-        try:
-            if use_markdown:
-                send_markdown(chat_id, text)
-            else:
-                send_text(chat_id, text)
-        except Exception as e:
-            print(f"[SCHEDULE ERROR] {e}")
-
-    t = threading.Timer(delay, _job)
-    t.daemon = True
-    t.start()
-    return delay
\ No newline at end of file
+    outbox.enqueue_text(
+        chat_id,
+        text,
+        parse_mode="Markdown" if use_markdown else None,
+        run_at=run_at.timestamp(),
+    )
+    outbox.start_workers()
+    return delay
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import streamlit as st
+
+from ... import outbox  # type: ignore
+
+RECENT_JOBS = 10
+
+_STATUS_ICONS = {"queued": "⏳", "leased": "📤", "sent": "✅", "dead": "❌"}
+
+
+def remember_job(job_id: int, label: str) -> None:
+    """
+    Keep a queued job in this session's list of recent sends.
+    """
+    jobs: List[Dict[str, Any]] = st.session_state.setdefault("outbox_jobs", [])
+    jobs.insert(0, {"id": job_id, "label": label})
+    del jobs[RECENT_JOBS:]
+
+
+def render_recent_jobs() -> None:
+    """
+    Show the current status of this session's recent outbox jobs.
+    Statuses are read once per rerun; nothing waits for delivery.
+    """
+    jobs: List[Dict[str, Any]] = st.session_state.get("outbox_jobs", [])
+    if not jobs:
+        return
+
+    with st.expander("📨 Recent sends", expanded=True):
+        for entry in jobs:
+            job = outbox.get_job(entry["id"])
+            status = job["status"] if job else "unknown"
+            line = f"{_STATUS_ICONS.get(status, '❔')} job #{entry['id']} — {entry['label']} — **{status}**"
+            if job and status == "sent" and job.get("message_id"):
+                line += f" (message_id = {job['message_id']})"
+            if job and status in ("queued", "dead") and job.get("last_error"):
+                line += f"  \n`{job['last_error']}`"
+            st.markdown(line)
+        st.button("🔄 Refresh status", key="outbox_jobs_refresh")
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import streamlit as st
 
+from ... import lanes, media_cache, metrics, outbox
 # Import the actual get_bot_info function from src/telegram/telegram_fetch.py
 from ...telegram_fetch import get_bot_info
 
@@ -12,6 +13,8 @@ def render_tab_info() -> None:
     Features:
     - Performs a getMe API call to check bot status.
     - Displays basic bot information.
+    - Shows API health: per-method latency and errors of this panel process,
+      priority lanes, outbox and media cache.
 
     Note: This tab does not include options for retrieving last chat ID or getUpdates.
     """
@@ -26,4 +29,49 @@ def render_tab_info() -> None:
             st.error(err)
         else:
             st.success("Bot is working correctly")
-            st.json(info, expanded=True)
\ No newline at end of file
+            st.json(info, expanded=True)
+
+    render_api_health()
+
+
+def render_api_health() -> None:
+    """
+    API health section: Bot API calls made by this process since it started.
+    """
+    st.subheader("API Health")
+    port = metrics.metrics_port()
+    if port:
+        st.caption(f"Prometheus metrics: http://localhost:{port}/metrics")
+
+    calls = metrics.snapshot()
+    if not calls:
+        st.info("No Bot API calls made by the panel yet.")
+    else:
+        st.dataframe(
+            [
+                {
+                    "method": method,
+                    "calls": m["calls"],
+                    "p50 (ms)": round(m["p50"] * 1000),
+                    "p99 (ms)": round(m["p99"] * 1000),
+                    "errors": sum(m["errors"].values()),
+                    "429": m["errors"].get("429", 0),
+                    "retries": sum(m["retries"].values()),
+                    "sent (KB)": round(m["bytes_sent"] / 1024, 1),
+                    "received (KB)": round(m["bytes_received"] / 1024, 1),
+                }
+                for method, m in calls.items()
+            ],
+            use_container_width=True,
+        )
+
+    col_lanes, col_outbox, col_cache = st.columns(3)
+    with col_lanes:
+        st.caption("Priority lanes")
+        st.json(lanes.stats(), expanded=False)
+    with col_outbox:
+        st.caption("Outbox jobs")
+        st.json(outbox.stats(), expanded=False)
+    with col_cache:
+        st.caption("Media file_id cache")
+        st.json(media_cache.stats(), expanded=False)
@@ -1,18 +1,14 @@
 from __future__ import annotations
 
-import tempfile
-from pathlib import Path
 from typing import Optional
 
 import streamlit as st
 
-from ...telegram_utils import (  # type: ignore
-    send_document,
-    send_photo,
-    send_voice,
-)
+from ... import outbox  # type: ignore
+from ...telegram_utils import input_media  # type: ignore
 
 from . import ResolveTargetFn
+from .outbox_status import remember_job, render_recent_jobs
 
 def render_tab_media(
     resolve_target: ResolveTargetFn,
@@ -20,21 +16,38 @@ def render_tab_media(
     custom_chat_id: Optional[str],
 ) -> None:
     """
-    Render the tab for sending media (photo, voice, or document) through the Telegram bot.
+    Render the tab for sending media (photo, voice, document, or an album of
+    several files) through the Telegram bot.
 
     Args:
         resolve_target (ResolveTargetFn): Function to resolve the final chat ID.
         target (str): The selected target key.
         custom_chat_id (Optional[str]): Optional custom Chat ID if target is CUSTOM.
     """
-    st.subheader("🖼 Send Media (Photo / Voice / Document)")
+    st.subheader("🖼 Send Media (Photo / Voice / Document / Album)")
 
     media_type = st.radio(
         "Select media type:",
-        ["Photo", "Voice", "Document"],
+        ["Photo", "Voice", "Document", "Album"],
         horizontal=True,
     )
 
+    if media_type == "Album":
+        _render_album(resolve_target, target, custom_chat_id)
+    else:
+        _render_single(resolve_target, target, custom_chat_id, media_type)
+    render_recent_jobs()
+
+
+def _render_single(
+    resolve_target: ResolveTargetFn,
+    target: str,
+    custom_chat_id: Optional[str],
+    media_type: str,
+) -> None:
+    """
+    One photo, voice note or document.
+    """
     caption = st.text_input("Caption (optional)", value="")
 
     uploaded_file = st.file_uploader(
@@ -51,21 +64,59 @@ def render_tab_media(
             st.warning("⚠️ Please select a file before sending.")
         else:
             try:
-                suffix = Path(uploaded_file.name).suffix
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                    tmp.write(uploaded_file.read())
-                    tmp_path = tmp.name
-
-                if media_type == "Photo":
-                    result = send_photo(chat_id, tmp_path, caption=caption)
-                elif media_type == "Voice":
-                    result = send_voice(chat_id, tmp_path, caption=caption)
-                else:
-                    result = send_document(chat_id, tmp_path, caption=caption)
-
-                if result:
-                    st.success("✅ Media sent successfully")
-                else:
-                    st.error("❌ Failed to send media. Check the terminal logs.")
+                # The file is spooled next to the database so the queued job
+                # survives a restart; it is deleted once sent.
+                path = outbox.spool(uploaded_file, uploaded_file.name)
+                method, field = {
+                    "Photo": ("sendPhoto", "photo"),
+                    "Voice": ("sendVoice", "voice"),
+                    "Document": ("sendDocument", "document"),
+                }[media_type]
+                job_id = outbox.enqueue(method, {"chat_id": chat_id, "caption": caption}, files={field: path})
+                remember_job(job_id, f"{media_type.lower()} to {chat_id}")
+                st.info(f"📨 Media queued (job #{job_id}); it is delivered in the background.")
+            except Exception as e:
+                st.error(f"❌ An error occurred while sending media: {e}")
+
+
+def _render_album(
+    resolve_target: ResolveTargetFn,
+    target: str,
+    custom_chat_id: Optional[str],
+) -> None:
+    """
+    Several files sent as albums (split into groups of up to 10 automatically).
+    """
+    uploaded_files = st.file_uploader(
+        "Choose photos, videos or documents",
+        type=["jpg", "jpeg", "png", "mp4", "mov", "mp3", "ogg", "pdf", "zip", "txt"],
+        accept_multiple_files=True,
+    )
+    captions = st.text_area(
+        "Captions (optional, one line per file in the same order)",
+        value="",
+    ).splitlines()
+
+    if st.button("📤 Send Album", use_container_width=True):
+        chat_id = resolve_target(target, custom_chat_id)
+
+        if not chat_id:
+            st.error("⚠️ No valid chat_id available.")
+        elif not uploaded_files:
+            st.warning("⚠️ Please select at least one file before sending.")
+        else:
+            try:
+                # Spooled like single files, so the queued album survives a restart.
+                media = [
+                    input_media(
+                        outbox.spool(f, f.name),
+                        caption=captions[i].strip() if i < len(captions) else None,
+                        filename=f.name,
+                    )
+                    for i, f in enumerate(uploaded_files)
+                ]
+                job_id = outbox.enqueue_media_group(chat_id, media)
+                remember_job(job_id, f"album of {len(media)} file(s) to {chat_id}")
+                st.info(f"📨 Album queued (job #{job_id}); it is delivered in the background.")
             except Exception as e:
-                st.error(f"❌ An error occurred while sending media: {e}")
\ No newline at end of file
+                st.error(f"❌ An error occurred while sending the album: {e}")
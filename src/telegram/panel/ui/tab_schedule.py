@@ -52,5 +52,6 @@ def render_tab_schedule(
             st.success(
                 f"✅ Message scheduled to be sent at {run_at} "
                 f"(in approximately {mins} minutes and {secs} seconds).\n"
-                "Note: The Streamlit server must remain running until the scheduled time."
+                "Note: The message is stored in the outbox; if no panel or bot process is running "
+                "at that time, it is sent as soon as one starts."
             )
\ No newline at end of file
@@ -4,12 +4,10 @@ from typing import Optional
 
 import streamlit as st
 
-from ...telegram_utils import (  # type: ignore
-    send_markdown,
-    send_text,
-)
+from ... import outbox  # type: ignore
 
 from . import ResolveTargetFn
+from .outbox_status import remember_job, render_recent_jobs
 
 def render_tab_text(
     resolve_target: ResolveTargetFn,
@@ -52,15 +50,14 @@ def render_tab_text(
             st.warning("⚠️ Please enter text before sending.")
         else:
             try:
-                if use_markdown:
-                    result = send_markdown(chat_id, text)
-                else:
-                    result = send_text(chat_id, text)
-
-                if result:
-                    msg_id = result["result"]["message_id"]
-                    st.success(f"✅ Message sent successfully (message_id = {msg_id})")
-                else:
-                    st.error("❌ Failed to send message. Check terminal logs.")
+                job_id = outbox.enqueue_text(
+                    chat_id,
+                    text,
+                    parse_mode="Markdown" if use_markdown else None,
+                )
+                remember_job(job_id, f"text to {chat_id}")
+                st.info(f"📨 Message queued (job #{job_id}); it is delivered in the background.")
             except Exception as e:
-                st.error(f"❌ An error occurred while sending the message: {e}")
\ No newline at end of file
+                st.error(f"❌ An error occurred while sending the message: {e}")
+
+    render_recent_jobs()
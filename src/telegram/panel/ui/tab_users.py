@@ -1,17 +1,199 @@
 from __future__ import annotations
 
 import os
+import tempfile
+from datetime import date, datetime, time, timezone
+from pathlib import Path
+from typing import Any, List, Optional
 
 import streamlit as st
 
-from ...db import get_all_users, get_messages_for_chat
+from ... import chat_info
+from ...db import get_messages_page, get_users_page, search_messages
+from ...export import export_to_file, zstandard
+
+USERS_PAGE_SIZE = 50
+MESSAGES_PAGE_SIZE = 50
+SEARCH_PAGE_SIZE = 20
+DEFAULT_EXPORT_MAX_MB = 200
+
+
+def _cursor_stack(key: str) -> List[Optional[Any]]:
+    """
+    Return the list of page cursors stored in the session for `key`.
+    The first entry (None) is the first page; the last entry is the current page.
+    """
+    if key not in st.session_state:
+        st.session_state[key] = [None]
+    return st.session_state[key]
+
+
+def _pager(key: str, stack: List[Optional[Any]], next_cursor: Optional[Any], label: str) -> None:
+    """
+    Render Previous / Next buttons that move through a keyset cursor stack.
+    """
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+
+    with col_prev:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(stack) <= 1):
+            stack.pop()
+            st.rerun()
+
+    with col_page:
+        st.caption(f"{label} page {len(stack)}")
+
+    with col_next:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=next_cursor is None):
+            stack.append(next_cursor)
+            st.rerun()
+
+
+def _render_message_search(current_profile: str) -> None:
+    """
+    Full-text search over the current profile's logged messages (FTS5).
+    """
+    with st.expander("🔎 Search message history", expanded=False):
+        col_query, col_order = st.columns([3, 1])
+        with col_query:
+            query = st.text_input("Words to search for", value="", key="msg_search").strip()
+        with col_order:
+            order = st.radio(
+                "Order",
+                ["Newest", "Relevance"],
+                horizontal=True,
+                key="msg_search_order",
+            )
+
+        if not query:
+            return
+
+        order_key = "rank" if order == "Relevance" else "recent"
+        search_key = f"search_cursor::{current_profile}::{order_key}::{query}"
+        stack = _cursor_stack(search_key)
+        hits, next_cursor = search_messages(
+            current_profile,
+            query,
+            limit=SEARCH_PAGE_SIZE,
+            cursor=stack[-1],
+            order=order_key,
+        )
+
+        if not hits:
+            st.info("No messages match this search.")
+            return
+
+        for h in hits:
+            direction = "⬅️ In" if h["direction"] == "in" else "➡️ Out"
+            st.markdown(
+                f"**{direction}** — chat `{h['chat_id']}` — `{h['created_at']}`  \n"
+                f"{h['snippet'] or ''}"
+            )
+        _pager("search", stack, next_cursor, "Results")
+
+
+def _day_start_ts(day: Optional[date]) -> Optional[int]:
+    if day is None:
+        return None
+    return int(datetime.combine(day, time.min, tzinfo=timezone.utc).timestamp())
+
+
+def _export_limit() -> int:
+    """
+    Largest export the panel serves, in bytes (PANEL_EXPORT_MAX_MB).
+    The download button holds the whole file in memory; bigger exports
+    need the CLI (`python -m src.telegram.export`).
+    """
+    return int(float(os.getenv("PANEL_EXPORT_MAX_MB", DEFAULT_EXPORT_MAX_MB)) * 1024 * 1024)
+
+
+def _export_dir() -> Path:
+    """
+    Temporary directory of this session's exports. It is removed when the
+    session is dropped or the panel exits.
+    """
+    if "export_tmpdir" not in st.session_state:
+        st.session_state["export_tmpdir"] = tempfile.TemporaryDirectory(prefix="panel-export-")
+    return Path(st.session_state["export_tmpdir"].name)
+
+
+def _discard_export() -> None:
+    prepared = st.session_state.pop("export_file", None)
+    if prepared:
+        Path(prepared[0]).unlink(missing_ok=True)
+
+
+def _render_export(current_profile: str) -> None:
+    """
+    Export the profile's users or message history as NDJSON / CSV.
+
+    The export is streamed chunk by chunk into this session's temporary
+    directory (constant memory). The file is served once, up to
+    PANEL_EXPORT_MAX_MB, and deleted after the download.
+    """
+    with st.expander("📦 Export history", expanded=False):
+        col_kind, col_fmt, col_comp = st.columns(3)
+        with col_kind:
+            kind = st.selectbox("Data", ["messages", "users"], key="export_kind")
+        with col_fmt:
+            fmt = st.selectbox("Format", ["ndjson", "csv"], key="export_fmt")
+        with col_comp:
+            compressions = ["gzip", "none"] + (["zstd"] if zstandard is not None else [])
+            compression = st.selectbox("Compression", compressions, key="export_comp")
+
+        filters: dict = {}
+        if kind == "messages":
+            col_since, col_until, col_dir = st.columns(3)
+            with col_since:
+                since = st.date_input("From (UTC)", value=None, key="export_since")
+            with col_until:
+                until = st.date_input("Until (UTC, exclusive)", value=None, key="export_until")
+            with col_dir:
+                direction = st.selectbox("Direction", ["both", "in", "out"], key="export_dir")
+            filters = {
+                "since_ts": _day_start_ts(since),
+                "until_ts": _day_start_ts(until),
+                "direction": None if direction == "both" else direction,
+                "include_archive": st.checkbox("Include archived history", key="export_archive"),
+            }
+
+        if st.button("Prepare export", key="export_prepare"):
+            _discard_export()
+            suffix = {"gzip": ".gz", "zstd": ".zst"}.get(compression, "")
+            name = f"{current_profile}-{kind}.{fmt}{suffix}"
+            out_path = _export_dir() / name
+            with st.spinner("Exporting..."):
+                stats = export_to_file(
+                    kind, current_profile, out_path, fmt=fmt, compression=compression, **filters
+                )
+            if out_path.stat().st_size > _export_limit():
+                out_path.unlink()
+                st.error(
+                    f"The export is larger than PANEL_EXPORT_MAX_MB ({_export_limit() // (1024 * 1024)} MB). "
+                    "Narrow the filters, or run `python -m src.telegram.export` on the server."
+                )
+            else:
+                st.session_state["export_file"] = (str(out_path), name, stats["rows"])
+
+        prepared = st.session_state.get("export_file")
+        if prepared and Path(prepared[0]).exists():
+            path, name, rows = prepared
+            st.caption(f"{rows} rows ready.")
+            st.download_button(
+                "⬇️ Download",
+                data=Path(path).read_bytes(),
+                file_name=name,
+                key="export_download",
+                on_click=_discard_export,
+            )
+
 
 def render_tab_users() -> None:
     """
     Renders the Users tab:
     - Displays only users associated with the current bot profile
       as specified by BOT_PROFILE in the .env file.
-    - Filters out users from other bot profiles.
+    - Profile filtering, search and paging run in SQL (keyset pagination),
+      so the tab stays fast regardless of how many users a profile has.
     """
 
     st.header("Users Who Contacted the Bot")
@@ -25,63 +207,100 @@ def render_tab_users() -> None:
         )
         return
 
-    # Fetch all users from the database
-    users = get_all_users()
-    if not users:
-        st.info("No users have been recorded in the database yet.")
-        return
+    st.caption(f"Displaying users for current bot profile: `{current_profile}`")
 
-    # Filter users by current bot profile
-    filtered_users = [
-        u for u in users if (u.get("bot_profile") or "") == current_profile
-    ]
+    _render_message_search(current_profile)
+    _render_export(current_profile)
 
-    st.caption(f"Displaying users for current bot profile: `{current_profile}`")
+    search = st.text_input(
+        "🔍 Search users (username / first name prefix, or chat_id)",
+        value="",
+        key="users_search",
+    ).strip()
 
-    if not filtered_users:
-        st.info(
-            "No users are registered for this bot yet.\n"
-            "Try messaging the bot on Telegram, then refresh this page."
-        )
+    users_key = f"users_cursor::{current_profile}::{search}"
+    users_stack = _cursor_stack(users_key)
+    users, next_cursor = get_users_page(
+        current_profile,
+        search=search or None,
+        limit=USERS_PAGE_SIZE,
+        cursor=users_stack[-1],
+    )
+
+    if not users:
+        if search:
+            st.info("No users match this search.")
+        else:
+            st.info(
+                "No users are registered for this bot yet.\n"
+                "Try messaging the bot on Telegram, then refresh this page."
+            )
         return
 
+    # Live chat details come from the metadata cache; missing or stale ones
+    # are fetched in the background and appear on a later rerun.
+    live = st.checkbox("Show live chat details (name, members, photo)", value=True, key="users_live")
+    info = chat_info.get_many(
+        [u["chat_id"] for u in users],
+        kinds=("chat", "member_count", "photos"),
+    ) if live else {}
+
     # Display users in a table
     st.subheader("User List")
-    st.dataframe(
-        [
-            {
-                "chat_id": u["chat_id"],
-                "type": u["type"],
-                "username": u["username"],
-                "name": f"{u.get('first_name') or ''} {u.get('last_name') or ''}".strip(),
-                "title": u["title"],
-                "added_at": u["added_at"],
-                "last_seen_at": u["last_seen_at"],
-            }
-            for u in filtered_users
-        ],
-        use_container_width=True,
-    )
+    rows = []
+    for u in users:
+        row = {
+            "chat_id": u["chat_id"],
+            "type": u["type"],
+            "username": u["username"],
+            "name": f"{u.get('first_name') or ''} {u.get('last_name') or ''}".strip(),
+            "title": u["title"],
+            "added_at": u["added_at"],
+            "last_seen_at": u["last_seen_at"],
+        }
+        if live:
+            details = info.get(u["chat_id"], {})
+            members = details.get("member_count")
+            photos = details.get("photos")
+            row["live_name"] = chat_info.display_name(details.get("chat"))
+            row["members"] = members["count"] if members else None
+            row["photos"] = photos["total_count"] if photos else None
+        rows.append(row)
+    st.dataframe(rows, use_container_width=True)
+    if live and chat_info.stats()["pending"]:
+        st.caption("Fetching chat details in the background; rerun to see them.")
+    _pager("users", users_stack, next_cursor, "Users")
 
     # Show messages for a selected user
     st.markdown("---")
     st.subheader("Messages for a Specific User")
 
-    chat_ids = [u["chat_id"] for u in filtered_users]
+    chat_ids = [u["chat_id"] for u in users]
     selected_chat_id = st.selectbox("Select a chat_id:", chat_ids)
 
+    include_archive = st.checkbox(
+        "Include archived history",
+        value=False,
+        help="Also read messages moved to the monthly archive tables by the retention job.",
+    )
+
     if selected_chat_id:
-        msgs = get_messages_for_chat(int(selected_chat_id), limit=50)
+        msgs_key = f"msgs_cursor::{current_profile}::{selected_chat_id}::{include_archive}"
+        msgs_stack = _cursor_stack(msgs_key)
+        msgs, older_cursor = get_messages_page(
+            int(selected_chat_id),
+            bot_profile=current_profile,
+            limit=MESSAGES_PAGE_SIZE,
+            before_id=msgs_stack[-1],
+            include_archive=include_archive,
+        )
         if not msgs:
             st.info("No messages recorded for this user.")
         else:
-            msgs = [
-                m for m in msgs if (m.get("bot_profile") or "") == current_profile
-            ]
-
             for m in reversed(msgs):
                 direction = "⬅️ In" if m["direction"] == "in" else "➡️ Out"
                 st.markdown(
                     f"**{direction}** — `{m['created_at']}`  \n"
                     f"{m['text'] or ''}"
-                )
\ No newline at end of file
+                )
+            _pager("msgs", msgs_stack, older_cursor, "Messages")
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from . import db, rollups
+
+logger = logging.getLogger(__name__)
+
+# =========================
+#  Settings
+# =========================
+
+ARCHIVE_PREFIX = "messages_archive_"
+DEFAULT_BATCH_SIZE = 500          # rows moved per (short) write transaction
+DEFAULT_BATCH_PAUSE = 0.05        # seconds between batches, lets writers in
+DEFAULT_VACUUM_PAGES = 1000       # pages released per incremental_vacuum run
+DEFAULT_ANALYZE_EVERY = 24 * 3600
+
+
+# =========================
+#  Retention Policies
+# =========================
+
+def set_retention_policy(bot_profile: str, keep_days: int) -> None:
+    """
+    Keep `keep_days` days of live messages for a profile; older rows are
+    moved to the monthly archive tables by `run_retention`.
+
+    Args:
+        bot_profile (str): Profile name, e.g. "quran".
+        keep_days (int): Number of days to keep in the live `messages` table.
+    """
+    if keep_days <= 0:
+        raise ValueError("keep_days must be positive")
+
+    with db._transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO retention_policies (bot_profile, keep_days, updated_at)
+            VALUES (:bot_profile, :keep_days, :updated_at)
+            ON CONFLICT(bot_profile) DO UPDATE SET
+                keep_days=excluded.keep_days,
+                updated_at=excluded.updated_at
+            """,
+            {
+                "bot_profile": bot_profile,
+                "keep_days": keep_days,
+                "updated_at": db._now()[0],
+            },
+        )
+
+
+def delete_retention_policy(bot_profile: str) -> None:
+    """
+    Remove a profile's policy (its messages are then kept forever).
+    """
+    with db._transaction() as conn:
+        conn.execute(
+            "DELETE FROM retention_policies WHERE bot_profile = ?",
+            (bot_profile,),
+        )
+
+
+def get_retention_policies() -> Dict[str, int]:
+    """
+    Returns:
+        Dict[str, int]: keep_days per bot profile.
+    """
+    with db._get_conn() as conn:
+        rows = conn.execute("SELECT bot_profile, keep_days FROM retention_policies")
+        return {row["bot_profile"]: row["keep_days"] for row in rows}
+
+
+# =========================
+#  Archive Tables
+# =========================
+
+def _month_of(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m")
+
+
+def _ensure_archive_table(conn: sqlite3.Connection, month: str) -> str:
+    table = f"{ARCHIVE_PREFIX}{month}"
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            chat_id INTEGER NOT NULL,
+            direction TEXT NOT NULL,
+            text TEXT,
+            created_at TEXT,
+            created_ts INTEGER,
+            bot_profile TEXT
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_{table}_profile_chat
+        ON {table} (bot_profile, chat_id, id)
+        """
+    )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_chat ON {table} (chat_id, id)"
+    )
+    conn.execute(
+        """
+        INSERT INTO message_archives (table_name, month)
+        VALUES (?, ?)
+        ON CONFLICT(table_name) DO NOTHING
+        """,
+        (table, month),
+    )
+    return table
+
+
+def list_archives() -> List[Dict[str, Any]]:
+    """
+    Returns:
+        List[Dict[str, Any]]: One record per monthly archive table, newest first.
+    """
+    with db._get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT table_name, month, row_count, min_id, max_id
+            FROM message_archives
+            ORDER BY month DESC
+            """
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _archive_batch(bot_profile: str, cutoff_ts: int, batch_size: int) -> int:
+    """
+    Move up to `batch_size` expired rows of one profile into their monthly
+    archive tables. Runs as one short transaction.
+
+    Returns:
+        int: Number of rows moved.
+    """
+    with db._transaction() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, created_ts
+            FROM messages
+            WHERE bot_profile = :bot_profile AND created_ts < :cutoff
+            ORDER BY created_ts
+            LIMIT :limit
+            """,
+            {"bot_profile": bot_profile, "cutoff": cutoff_ts, "limit": batch_size},
+        ).fetchall()
+        if not rows:
+            return 0
+
+        by_month: Dict[str, List[int]] = {}
+        for row in rows:
+            by_month.setdefault(_month_of(row["created_ts"]), []).append(row["id"])
+
+        for month, ids in by_month.items():
+            table = _ensure_archive_table(conn, month)
+            marks = ",".join("?" * len(ids))
+            conn.execute(
+                f"""
+                INSERT OR IGNORE INTO {table}
+                    (id, chat_id, direction, text, created_at, created_ts, bot_profile)
+                SELECT id, chat_id, direction, text, created_at, created_ts, bot_profile
+                FROM messages
+                WHERE id IN ({marks})
+                """,
+                ids,
+            )
+            conn.execute(f"DELETE FROM messages WHERE id IN ({marks})", ids)
+            conn.execute(
+                """
+                UPDATE message_archives SET
+                    row_count = row_count + :n,
+                    min_id = MIN(COALESCE(min_id, :lo), :lo),
+                    max_id = MAX(COALESCE(max_id, :hi), :hi)
+                WHERE table_name = :table
+                """,
+                {"n": len(ids), "lo": min(ids), "hi": max(ids), "table": table},
+            )
+
+    return len(rows)
+
+
+def run_retention(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pause: float = DEFAULT_BATCH_PAUSE,
+    max_batches: Optional[int] = None,
+    now_ts: Optional[int] = None,
+    stop_event: Optional[threading.Event] = None,
+) -> Dict[str, int]:
+    """
+    Apply every retention policy by moving expired rows in small batches.
+
+    Each batch is its own short transaction followed by a short pause, so
+    the bot's writers are never blocked for long. Archived rows leave the
+    full-text index (its triggers fire on delete) but stay readable through
+    `db.get_messages_page(..., include_archive=True)`. Pending messages are
+    folded into the activity rollups first, so archiving never loses counts.
+
+    Returns:
+        Dict[str, int]: Rows moved per bot profile.
+    """
+    now_ts = now_ts if now_ts is not None else int(time.time())
+    moved: Dict[str, int] = {}
+    batches = 0
+    rollups.catch_up()
+
+    for profile, keep_days in get_retention_policies().items():
+        cutoff = now_ts - keep_days * 86400
+        moved[profile] = 0
+        while max_batches is None or batches < max_batches:
+            if stop_event is not None and stop_event.is_set():
+                return moved
+            n = _archive_batch(profile, cutoff, batch_size)
+            batches += 1
+            moved[profile] += n
+            if n < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+    return moved
+
+
+# =========================
+#  Compaction
+# =========================
+
+def incremental_vacuum(pages: int = DEFAULT_VACUUM_PAGES) -> bool:
+    """
+    Release up to `pages` free pages back to the file system.
+
+    Returns:
+        bool: False when the database is not in auto_vacuum=INCREMENTAL mode
+        (run `compact(full=True)` once to convert it).
+    """
+    with db._pool().connection() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return False
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    return True
+
+
+def analyze() -> None:
+    """
+    Refresh planner statistics where SQLite thinks they are stale.
+    """
+    with db._pool().connection() as conn:
+        conn.execute("PRAGMA optimize")
+
+
+def compact(full: bool = False) -> None:
+    """
+    Reclaim space and refresh statistics.
+
+    Args:
+        full (bool): Run a full VACUUM (rewrites the whole file and holds the
+            write lock meanwhile). It also switches existing databases to
+            auto_vacuum=INCREMENTAL so later runs can stay incremental.
+    """
+    if full:
+        with db._pool().connection() as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+    else:
+        incremental_vacuum()
+    analyze()
+    db._pool().checkpoint("TRUNCATE")
+
+
+# =========================
+#  Background Worker
+# =========================
+
+class RetentionWorker:
+    """
+    Daemon thread that periodically archives expired messages, releases free
+    pages with incremental VACUUM and refreshes statistics.
+    """
+
+    def __init__(
+        self,
+        interval: float = 3600,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        pause: float = DEFAULT_BATCH_PAUSE,
+        vacuum_pages: int = DEFAULT_VACUUM_PAGES,
+        analyze_every: float = DEFAULT_ANALYZE_EVERY,
+    ) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self.analyze_every = analyze_every
+        self.last_run: Optional[Dict[str, int]] = None
+        self._last_analyze: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self) -> Dict[str, int]:
+        moved = run_retention(self.batch_size, self.pause, stop_event=self._stop)
+        incremental_vacuum(self.vacuum_pages)
+        if self._last_analyze is None or time.monotonic() - self._last_analyze >= self.analyze_every:
+            analyze()
+            self._last_analyze = time.monotonic()
+        self.last_run = moved
+        return moved
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except sqlite3.Error as e:
+                logger.error("retention run failed: %s", e)
+            self._stop.wait(self.interval)
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+# =========================
+#  Settings
+# =========================
+
+BUCKETS = {"hour": 3600, "day": 86400}   # UTC buckets maintained by the catch-up job
+DEFAULT_BATCH_SIZE = 5000                 # messages folded in per write transaction
+DEFAULT_INTERVAL_SEC = 60                 # catch-up period of RollupWorker
+_STATE_NAME = "messages"
+
+
+# =========================
+#  Aggregation
+# =========================
+
+def _fold(conn: sqlite3.Connection, table: str, where: str, params: Dict[str, Any]) -> None:
+    """
+    Add the rows of `table` matching `where` to every rollup bucket size.
+    """
+    for size in BUCKETS.values():
+        p = {**params, "size": size}
+        conn.execute(
+            f"""
+            INSERT INTO message_rollups (bot_profile, bucket_size, bucket_start, direction, messages)
+            SELECT bot_profile, :size, (created_ts / :size) * :size, direction, COUNT(*)
+            FROM {table}
+            WHERE {where} AND created_ts IS NOT NULL
+            GROUP BY 1, 3, 4
+            ON CONFLICT(bot_profile, bucket_size, bucket_start, direction) DO UPDATE SET
+                messages = messages + excluded.messages
+            """,
+            p,
+        )
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO rollup_active_chats (bot_profile, bucket_size, bucket_start, chat_id)
+            SELECT DISTINCT bot_profile, :size, (created_ts / :size) * :size, chat_id
+            FROM {table}
+            WHERE {where} AND created_ts IS NOT NULL
+            """,
+            p,
+        )
+        # Recount only the buckets this batch touched.
+        conn.execute(
+            f"""
+            INSERT INTO active_user_rollups (bot_profile, bucket_size, bucket_start, active_users)
+            SELECT bot_profile, bucket_size, bucket_start, COUNT(*)
+            FROM rollup_active_chats
+            WHERE (bot_profile, bucket_size, bucket_start) IN (
+                SELECT DISTINCT bot_profile, :size, (created_ts / :size) * :size
+                FROM {table}
+                WHERE {where} AND created_ts IS NOT NULL
+            )
+            GROUP BY bot_profile, bucket_size, bucket_start
+            ON CONFLICT(bot_profile, bucket_size, bucket_start) DO UPDATE SET
+                active_users = excluded.active_users
+            """,
+            p,
+        )
+
+
+def _set_last_id(conn: sqlite3.Connection, last_id: int) -> None:
+    conn.execute(
+        """
+        INSERT INTO rollup_state (name, last_message_id, updated_at)
+        VALUES (:name, :last_id, :now)
+        ON CONFLICT(name) DO UPDATE SET
+            last_message_id = excluded.last_message_id,
+            updated_at = excluded.updated_at
+        """,
+        {"name": _STATE_NAME, "last_id": last_id, "now": db._now()[0]},
+    )
+
+
+def _last_id(conn: sqlite3.Connection) -> int:
+    row = conn.execute(
+        "SELECT last_message_id FROM rollup_state WHERE name = ?", (_STATE_NAME,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _catch_up_batch(batch_size: int) -> int:
+    """
+    Fold the next `batch_size` unprocessed messages into the rollups.
+
+    The state row is read after BEGIN IMMEDIATE, so two processes running
+    the job at once never count the same messages twice.
+
+    Returns:
+        int: Number of messages processed.
+    """
+    with db._transaction() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        lo = _last_id(conn)
+        row = conn.execute(
+            """
+            SELECT COUNT(*), MAX(id) FROM (
+                SELECT id FROM messages WHERE id > :lo ORDER BY id LIMIT :limit
+            )
+            """,
+            {"lo": lo, "limit": batch_size},
+        ).fetchone()
+        count, hi = row[0], row[1]
+        if not count:
+            return 0
+
+        _fold(conn, "messages", "id > :lo AND id <= :hi", {"lo": lo, "hi": hi})
+        _set_last_id(conn, hi)
+    return count
+
+
+def catch_up(batch_size: int = DEFAULT_BATCH_SIZE, max_batches: Optional[int] = None) -> int:
+    """
+    Fold every message logged since the last run into the rollup tables.
+
+    Progress is tracked by the last processed `messages.id`, so each run
+    only reads new rows. `RollupWorker` calls this periodically, and
+    `retention.run_retention` before it moves rows to the archive tables.
+
+    Returns:
+        int: Number of messages processed.
+    """
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        n = _catch_up_batch(batch_size)
+        total += n
+        batches += 1
+        if n < batch_size:
+            break
+    return total
+
+
+def rebuild(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Recompute the rollups from scratch (e.g. after a backfill or import).
+
+    Archived months are folded in first (one transaction), then the live
+    table is processed in batches by `catch_up`.
+
+    Returns:
+        int: Number of live messages processed.
+    """
+    with db._transaction() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM message_rollups")
+        conn.execute("DELETE FROM rollup_active_chats")
+        conn.execute("DELETE FROM active_user_rollups")
+        for table in db._archive_tables(conn):
+            _fold(conn, table, "1", {})
+        _set_last_id(conn, 0)
+    return catch_up(batch_size)
+
+
+# =========================
+#  Background Worker
+# =========================
+
+class RollupWorker:
+    """
+    Daemon thread that folds new messages into the rollups every `interval`
+    seconds, so neither message writes nor dashboard reads pay for it.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SEC, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-rollups", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                catch_up(self.batch_size)
+            except sqlite3.Error as e:
+                logger.error("rollup catch-up failed: %s", e)
+            self._stop.wait(self.interval)
+
+
+# =========================
+#  Query API
+# =========================
+
+def _bucket_size(bucket: str) -> int:
+    try:
+        return BUCKETS[bucket]
+    except KeyError:
+        raise ValueError(f"Unknown bucket: {bucket} (use one of {', '.join(BUCKETS)})") from None
+
+
+def get_activity(
+    bot_profile: str,
+    bucket: str = "day",
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    refresh: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Messages in/out and active users per bucket for one profile.
+
+    Reads only the rollup tables, so the cost is proportional to the number
+    of buckets in the range, not to the number of messages.
+
+    Args:
+        bot_profile (str): Profile name.
+        bucket (str): "hour" or "day" (UTC).
+        since_ts (Optional[int]): Epoch seconds, inclusive.
+        until_ts (Optional[int]): Epoch seconds, exclusive.
+        refresh (bool): Run `catch_up()` first instead of relying on
+            `RollupWorker`. This writes, so it is off by default and
+            unavailable on read-only snapshots.
+
+    Returns:
+        List[Dict[str, Any]]: One record per non-empty bucket, oldest first,
+        with bucket_start, bucket (ISO text), messages_in, messages_out and
+        active_users.
+    """
+    size = _bucket_size(bucket)
+    if refresh:
+        catch_up()
+
+    params = {
+        "bot_profile": bot_profile,
+        "size": size,
+        "since": since_ts if since_ts is not None else -(2 ** 62),
+        "until": until_ts if until_ts is not None else 2 ** 62,
+    }
+    where = """
+        bot_profile = :bot_profile AND bucket_size = :size
+        AND bucket_start >= (:since / :size) * :size AND bucket_start < :until
+    """
+
+    with db._get_conn() as conn:
+        counts = conn.execute(
+            f"""
+            SELECT bucket_start,
+                   SUM(CASE WHEN direction = 'in' THEN messages ELSE 0 END) AS messages_in,
+                   SUM(CASE WHEN direction = 'out' THEN messages ELSE 0 END) AS messages_out
+            FROM message_rollups
+            WHERE {where}
+            GROUP BY bucket_start
+            """,
+            params,
+        ).fetchall()
+        active = conn.execute(
+            f"SELECT bucket_start, active_users FROM active_user_rollups WHERE {where}",
+            params,
+        ).fetchall()
+
+    by_bucket: Dict[int, Dict[str, Any]] = {}
+    for row in counts:
+        by_bucket[row["bucket_start"]] = {
+            "bucket_start": row["bucket_start"],
+            "messages_in": row["messages_in"],
+            "messages_out": row["messages_out"],
+            "active_users": 0,
+        }
+    for row in active:
+        record = by_bucket.setdefault(
+            row["bucket_start"],
+            {"bucket_start": row["bucket_start"], "messages_in": 0, "messages_out": 0},
+        )
+        record["active_users"] = row["active_users"]
+
+    result = [by_bucket[k] for k in sorted(by_bucket)]
+    for record in result:
+        record["bucket"] = (
+            datetime.fromtimestamp(record["bucket_start"], timezone.utc)
+            .replace(tzinfo=None)
+            .isoformat()
+        )
+    return result
+
+
+def get_profile_totals(refresh: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    All-time incoming / outgoing message counts per bot profile
+    (`refresh` as in `get_activity`).
+
+    Returns:
+        Dict[str, Dict[str, int]]: {"quran": {"in": 120, "out": 118}, ...}
+    """
+    if refresh:
+        catch_up()
+
+    with db._get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT bot_profile, direction, SUM(messages) AS messages
+            FROM message_rollups
+            WHERE bucket_size = :size
+            GROUP BY bot_profile, direction
+            """,
+            {"size": BUCKETS["day"]},
+        ).fetchall()
+
+    totals: Dict[str, Dict[str, int]] = {}
+    for row in rows:
+        totals.setdefault(row["bot_profile"], {"in": 0, "out": 0})[row["direction"]] = row["messages"]
+    return totals
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# =========================
+#  Default Tuning
+# =========================
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_SYNCHRONOUS = "NORMAL"        # safe with WAL, one fsync per checkpoint
+DEFAULT_CACHE_SIZE_KIB = 16 * 1024    # page cache per connection
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_STATEMENT_CACHE = 256
+DEFAULT_CHECKPOINT_EVERY = 1000       # write transactions between passive checkpoints
+
+
+class SQLitePool:
+    """
+    A small pool of long-lived SQLite connections for one database file.
+
+    Every connection is opened once and configured with WAL journaling,
+    a busy timeout, relaxed `synchronous`, a larger page cache, memory-mapped
+    I/O and a bigger prepared-statement cache. Connections are handed out
+    per call and returned to the pool afterwards; a thread that already holds
+    a connection gets the same one back, so nested helpers never deadlock.
+
+    With `readonly=True` connections are opened through a `mode=ro` URI with
+    `query_only` set, so they can never take the write lock; `immutable=True`
+    additionally skips all locking and is only safe for files that are never
+    modified in place (e.g. a replica that is swapped atomically).
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        size: int = DEFAULT_POOL_SIZE,
+        busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+        synchronous: str = DEFAULT_SYNCHRONOUS,
+        cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB,
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        statement_cache: int = DEFAULT_STATEMENT_CACHE,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+        foreign_keys: bool = False,
+        readonly: bool = False,
+        immutable: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.size = max(1, size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.statement_cache = statement_cache
+        self.checkpoint_every = checkpoint_every
+        self.foreign_keys = foreign_keys
+        self.readonly = readonly or immutable
+        self.immutable = immutable
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._closed = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    # ---------- connection lifecycle ----------
+
+    def _open(self) -> sqlite3.Connection:
+        if self.readonly:
+            return self._open_readonly()
+
+        conn = sqlite3.connect(
+            str(self.path),
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.statement_cache,
+        )
+        conn.row_factory = sqlite3.Row
+        # Only takes effect on a brand-new file (before WAL writes the header);
+        # existing files keep their mode until a full VACUUM.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        self._tune(conn)
+        if self.foreign_keys:
+            conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _open_readonly(self) -> sqlite3.Connection:
+        uri = self.path.resolve().as_uri() + "?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.statement_cache,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA query_only = ON")
+        self._tune(conn)
+        return conn
+
+    def _tune(self, conn: sqlite3.Connection) -> None:
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError(f"Pool for {self.path} is closed.")
+            if len(self._all) < self.size:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.busy_timeout_ms / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out waiting for a pooled connection to {self.path}"
+            ) from None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection from the pool for the duration of the block.
+        """
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection and commit on success (rollback on error).
+        Nested calls on the same thread join the outer transaction.
+        """
+        with self.connection() as conn:
+            if getattr(self._local, "in_tx", False):
+                yield conn
+                return
+
+            self._local.in_tx = True
+            try:
+                with conn:
+                    yield conn
+            finally:
+                self._local.in_tx = False
+            self._after_write(conn)
+
+    def _after_write(self, conn: sqlite3.Connection) -> None:
+        if self.checkpoint_every <= 0:
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.checkpoint_every == 0
+        if due:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    # ---------- maintenance ----------
+
+    def checkpoint(self, mode: str = "PASSIVE") -> Optional[Dict[str, int]]:
+        """
+        Run a WAL checkpoint.
+
+        Args:
+            mode (str): PASSIVE, FULL, RESTART or TRUNCATE.
+
+        Returns:
+            Optional[Dict[str, int]]: busy flag, WAL frames and checkpointed frames.
+        """
+        with self.connection() as conn:
+            row = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        if row is None:
+            return None
+        return {"busy": row[0], "log": row[1], "checkpointed": row[2]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "size": self.size,
+                "open": len(self._all),
+                "idle": self._idle.qsize(),
+                "writes": self._writes,
+            }
+
+    def close(self) -> None:
+        """
+        Checkpoint the WAL and close every idle connection owned by the pool.
+        Connections still borrowed are closed when they are returned.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._all.clear()
+
+        first = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if first and not self.readonly:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.close()
+            except sqlite3.Error:
+                pass
+            first = False
+
+
+# =========================
+#  Pool Registry
+# =========================
+
+_pools: Dict[tuple[str, bool], SQLitePool] = {}
+_pools_lock = threading.Lock()
+
+
+def _key(path: Path | str, readonly: bool) -> tuple[str, bool]:
+    return str(Path(path).resolve()), readonly
+
+
+def get_pool(path: Path | str, **options: Any) -> SQLitePool:
+    """
+    Return the shared pool for `path`, creating it on first use.
+
+    Read-only pools (`readonly=True` / `immutable=True`) are kept apart from
+    the read/write pool of the same file. Other options are only applied
+    when the pool is created.
+    """
+    key = _key(path, bool(options.get("readonly") or options.get("immutable")))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = SQLitePool(path, **options)
+            _pools[key] = pool
+        return pool
+
+
+def close_pool(path: Path | str) -> None:
+    """
+    Close the read/write and read-only pools of `path`.
+    """
+    with _pools_lock:
+        pools = [_pools.pop(_key(path, ro), None) for ro in (False, True)]
+    for pool in pools:
+        if pool is not None:
+            pool.close()
+
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
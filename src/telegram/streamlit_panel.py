@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 from typing import Dict, Optional
 
 from .panel.environment import load_environment, load_telegram_ids
 from .panel.ui_layout import render_panel
-from .db import init_db
+from . import metrics, outbox
+from .db import enable_read_only_reads, init_db
 
 def run_panel(env_path: Path) -> None:
     """
@@ -14,9 +16,13 @@ def run_panel(env_path: Path) -> None:
     Steps:
     1. Load environment variables from the provided .env file.
     2. Initialize the database (create tables if they do not exist).
-    3. Load Telegram user IDs.
-    4. Define a resolver function for target user selection.
-    5. Render the panel interface.
+    3. Switch database reads to read-only connections (DB_PANEL_READONLY,
+       optionally against a refreshed replica file: DB_PANEL_REPLICA).
+    4. Start the outbox sender workers (OUTBOX_WORKERS, 0 to disable).
+    5. Serve Bot API metrics on TELEGRAM_METRICS_PORT, if set.
+    6. Load Telegram user IDs.
+    7. Define a resolver function for target user selection.
+    8. Render the panel interface.
 
     Args:
         env_path (Path): Path to the .env configuration file.
@@ -28,6 +34,19 @@ def run_panel(env_path: Path) -> None:
     # Initialize the database (create tables if needed)
     init_db()
 
+    # Panel reads must never block the bot's writers
+    if os.getenv("DB_PANEL_READONLY", "1").lower() in ("1", "true", "yes"):
+        enable_read_only_reads(
+            replica_path=os.getenv("DB_PANEL_REPLICA") or None,
+            refresh_sec=float(os.getenv("DB_PANEL_REPLICA_REFRESH_SEC", "30")),
+        )
+
+    # Panel sends are queued and delivered in the background
+    outbox.start_workers()
+
+    # Prometheus endpoint (no-op unless TELEGRAM_METRICS_PORT is set)
+    metrics.start_server()
+
     # Load TELEGRAM_*_ID values
     telegram_ids: Dict[str, str] = load_telegram_ids()
 
@@ -0,0 +1,737 @@
+"""
+Asyncio counterpart of `telegram_utils`, on a pooled `httpx.AsyncClient`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from . import flow_control, lanes, media_cache, metrics
+from .http_client import file_url, local_mode, method_url, pool_size, request_timeout
+from .multipart import CHUNK_SIZE, MediaSource, MultipartStream, ProgressFunc, source_name
+from .telegram_utils import (
+    _RETRY_STATUS,
+    _SINGLE_METHOD,
+    _get_channel_id,
+    _get_group_id,
+    _get_me_id,
+    _get_token,
+    _is_reference,
+    _local_paths,
+    _missing_file,
+    _no_token,
+    _split_albums,
+    _text_payloads,
+    _too_big_to_download,
+    _too_large,
+    input_media,
+)
+
+DEFAULT_CONCURRENCY = 50   # in-flight API calls per event loop
+
+
+# ========= Internal Utilities =========
+
+def concurrency() -> int:
+    try:
+        return max(1, int(os.getenv("TELEGRAM_ASYNC_CONCURRENCY", DEFAULT_CONCURRENCY)))
+    except ValueError:
+        return DEFAULT_CONCURRENCY
+
+
+# event loop -> {bot token: client}; a client cannot be shared between loops.
+# Keyed by the loop itself (an id can be reused by a later loop). A loop that
+# ends without aclose_clients() may be kept alive by its client's open
+# connections; its entry is dropped when the next loop creates a client.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _forget_closed_loops() -> None:
+    # Clients of a closed loop can no longer be used or closed: drop them.
+    for loop in [loop for loop in list(_clients) if loop.is_closed()]:
+        _clients.pop(loop, None)
+        _semaphores.pop(loop, None)
+
+
+def _client(token: str) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    clients = _clients.get(loop)
+    if clients is None:
+        _forget_closed_loops()
+        clients = _clients[loop] = {}
+    client = clients.get(token)
+    if client is None or client.is_closed:
+        size = max(1, pool_size(), concurrency())
+        connect, read = request_timeout()
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+            timeout=httpx.Timeout(read, connect=connect),
+        )
+        clients[token] = client
+    return client
+
+
+def _semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _semaphores.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(concurrency())
+        _semaphores[loop] = sem
+    return sem
+
+
+async def aclose_clients() -> None:
+    """
+    Close the clients created on the running event loop (call on shutdown).
+    """
+    loop = asyncio.get_running_loop()
+    for client in (_clients.pop(loop, None) or {}).values():
+        await client.aclose()
+    _semaphores.pop(loop, None)
+
+
+async def _request(
+    method: str,
+    payload: Optional[Dict[str, Any]] = None,
+    files: Optional[Dict[str, Any]] = None,
+    timeout: int = 30,
+    retry: bool = True,
+    on_progress: Optional[ProgressFunc] = None,
+) -> Dict[str, Any]:
+    """
+    Call a Bot API method and return the decoded response as is (failures in
+    the Bot API's error shape), with the retries of `telegram_utils._request`:
+    a 429 blocks the token for `retry_after` seconds and is then retried,
+    connect failures and 502-504 answers are retried with jittered backoff.
+    `files` are streamed from their source (or passed as file:// paths in
+    local mode), as in the blocking client.
+    """
+    token = _get_token()
+    if not token:
+        return _no_token()
+
+    controlled = flow_control.enabled()
+    retries = flow_control.max_retries() if controlled and retry else 0
+    payload, files = _local_paths(payload, files)
+    stream: Optional[MultipartStream] = None
+    headers: Dict[str, str] = {}
+    if files:
+        stream = MultipartStream(payload, files, on_progress=on_progress)
+        too_large = _too_large(stream.len)
+        if too_large:
+            return too_large
+        headers["Content-Type"] = stream.content_type
+        if stream.len is not None:
+            headers["Content-Length"] = str(stream.len)
+
+    attempt = 0
+    while True:
+        attempt += 1
+        # A new iteration of the stream rewinds its sources.
+        body: Dict[str, Any] = (
+            {"content": stream.__aiter__(), "headers": headers} if stream is not None else {"data": payload}
+        )
+        started = None
+        try:
+            async with _semaphore():
+                if controlled:
+                    # Shared with the blocking client and every other process,
+                    # in the lane of the calling task; waits on the loop.
+                    await lanes.acquire_async(token)
+                started = time.monotonic()
+                resp = await _client(token).post(
+                    method_url(token, method),
+                    **body,
+                    timeout=httpx.Timeout(timeout, connect=request_timeout()[0]),
+                )
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            if started is not None:
+                metrics.observe(method, time.monotonic() - started, metrics.NETWORK_ERROR)
+            if attempt <= retries:
+                metrics.record_retry(method, metrics.NETWORK_ERROR)
+                await asyncio.sleep(flow_control.backoff(attempt))
+                continue
+            return {"ok": False, "error_code": None, "description": f"Network error: {e}"}
+        except Exception as e:
+            if started is not None:
+                metrics.observe(method, time.monotonic() - started, metrics.NETWORK_ERROR)
+            return {"ok": False, "error_code": None, "description": f"Network error: {e}"}
+
+        try:
+            data = resp.json()
+        except Exception:
+            data = {
+                "ok": False,
+                "error_code": resp.status_code,
+                "description": f"Invalid response: {resp.text[:200]}",
+            }
+        sent = resp.request.headers.get("Content-Length")
+        metrics.observe(
+            method,
+            time.monotonic() - started,
+            resp.status_code,
+            None if data.get("ok") else data.get("error_code"),
+            int(sent) if sent and sent.isdigit() else 0,
+            len(resp.content),
+        )
+
+        if data.get("ok") or not controlled:
+            return data
+
+        error_code = data.get("error_code")
+        if error_code == 429:
+            retry_after = float((data.get("parameters") or {}).get("retry_after") or 1)
+            await asyncio.to_thread(flow_control.block, token, retry_after)
+            if attempt <= retries and retry_after <= flow_control.max_retry_after():
+                metrics.record_retry(method, "429")
+                continue
+        elif error_code in _RETRY_STATUS and attempt <= retries:
+            metrics.record_retry(method, "5xx")
+            await asyncio.sleep(flow_control.backoff(attempt))
+            continue
+        return data
+
+
+async def _post(
+    method: str,
+    payload: Optional[Dict[str, Any]] = None,
+    files: Optional[Dict[str, Any]] = None,
+    timeout: int = 30,
+) -> Optional[Dict[str, Any]]:
+    """
+    Call any Telegram Bot API method via POST (async version of
+    `telegram_utils._post`, same return value).
+    """
+    data = await _request(method, payload, files, timeout)
+    if not data.get("ok"):
+        print(f"Telegram error in {method}:", data)
+        return None
+    return data
+
+
+# =========================
+#  TEXT MESSAGES
+# =========================
+
+async def _send_parts(
+    payloads: List[Dict[str, Any]],
+    reply_to_message_id: Optional[int],
+    chain: bool,
+) -> List[Dict[str, Any]]:
+    """
+    Send the parts in order (async version of `telegram_utils._send_parts`).
+    """
+    responses: List[Dict[str, Any]] = []
+    reply_to = reply_to_message_id
+    for payload in payloads:
+        if reply_to:
+            payload["reply_to_message_id"] = reply_to
+        response = await _post("sendMessage", payload)
+        if response is None:
+            break
+        responses.append(response)
+        if chain:
+            reply_to = response["result"]["message_id"]
+    return responses
+
+
+async def send_text(
+    chat_id: int | str,
+    text: str,
+    parse_mode: Optional[str] = None,
+    reply_to_message_id: Optional[int] = None,
+    disable_web_page_preview: Optional[bool] = None,
+) -> Optional[Dict[str, Any]]:
+    payloads = _text_payloads(chat_id, text, parse_mode, disable_web_page_preview)
+    responses = await _send_parts(payloads, reply_to_message_id, chain=True)
+    if len(responses) < len(payloads):
+        return None
+    if len(responses) == 1:
+        return responses[0]
+    return {**responses[-1], "message_ids": [r["result"]["message_id"] for r in responses]}
+
+
+async def send_long_text(
+    chat_id: int | str,
+    text: str,
+    parse_mode: Optional[str] = None,
+    reply_to_message_id: Optional[int] = None,
+    disable_web_page_preview: Optional[bool] = None,
+    chain: bool = True,
+) -> Optional[List[int]]:
+    payloads = _text_payloads(chat_id, text, parse_mode, disable_web_page_preview)
+    responses = await _send_parts(payloads, reply_to_message_id, chain)
+    if not responses:
+        return None
+    return [r["result"]["message_id"] for r in responses]
+
+
+async def send_markdown(
+    chat_id: int | str,
+    text: str,
+    reply_to_message_id: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    return await send_text(chat_id, text, parse_mode="Markdown", reply_to_message_id=reply_to_message_id)
+
+
+async def send_html(
+    chat_id: int | str,
+    text: str,
+    reply_to_message_id: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    return await send_text(chat_id, text, parse_mode="HTML", reply_to_message_id=reply_to_message_id)
+
+
+# =========================
+#  SHORTCUTS (ME / CHANNEL / GROUP)
+# =========================
+
+async def send_to_me(text: str) -> Optional[Dict[str, Any]]:
+    me_id = _get_me_id()
+    if not me_id:
+        return None
+    return await send_text(me_id, text)
+
+
+async def send_to_channel(text: str) -> Optional[Dict[str, Any]]:
+    cid = _get_channel_id()
+    if not cid:
+        return None
+    return await send_text(cid, text)
+
+
+async def send_to_group(text: str) -> Optional[Dict[str, Any]]:
+    gid = _get_group_id()
+    if not gid:
+        return None
+    return await send_text(gid, text)
+
+
+async def broadcast(chat_ids: List[int | str], text: str) -> List[Optional[Dict[str, Any]]]:
+    """
+    Send `text` to every chat concurrently (bounded by TELEGRAM_ASYNC_CONCURRENCY).
+    Results are returned in the order of `chat_ids`.
+    """
+    return list(await asyncio.gather(*(send_text(cid, text) for cid in chat_ids)))
+
+
+# =========================
+#  IMAGES & FILES
+# =========================
+
+async def _upload_file(
+    method: str,
+    field: str,
+    source: MediaSource,
+    payload: Dict[str, Any],
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+    retry: bool = True,
+) -> Dict[str, Any]:
+    """
+    Async version of `telegram_utils._upload_media` (same `file_id` cache and
+    sources, raw API response); hashing, cache reads and disk reads run in
+    worker threads.
+    """
+    token = _get_token()
+    if not token:
+        return _no_token()
+    missing = _missing_file(source)
+    if missing:
+        return missing
+
+    digest: Optional[str] = None
+    if media_cache.applies_to(source):
+        file_id = None
+        try:
+            digest = await asyncio.to_thread(media_cache.content_sha256, source)
+            if digest is not None:
+                file_id = await asyncio.to_thread(media_cache.lookup, token, field, digest)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[MEDIA CACHE ERROR] {e}")
+            digest = None
+
+        if file_id:
+            data = await _request(method, {**payload, field: file_id}, retry=retry)
+            if data.get("ok"):
+                await asyncio.to_thread(media_cache.touch, token, field, digest)
+                return data
+            if not media_cache.is_stale_file_error(data):
+                return data
+            await asyncio.to_thread(media_cache.invalidate, token, field, digest)
+
+    upload = (filename or source_name(source), source)
+    data = await _request(method, payload, files={field: upload}, retry=retry, on_progress=on_progress)
+    if not data.get("ok"):
+        return data
+
+    if digest is not None:
+        uploaded = media_cache.extract_file(field, data)
+        if uploaded:
+            try:
+                await asyncio.to_thread(media_cache.store, token, field, digest, uploaded)
+            except sqlite3.Error as e:
+                print(f"[MEDIA CACHE ERROR] {e}")
+    return data
+
+
+async def _send_file(
+    method: str,
+    field: str,
+    source: MediaSource,
+    payload: Dict[str, Any],
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+) -> Optional[Dict[str, Any]]:
+    data = await _upload_file(method, field, source, payload, filename, on_progress)
+    if not data.get("ok"):
+        print(f"Telegram error in {method}:", data)
+        return None
+    return data
+
+
+async def send_photo(
+    chat_id: int | str,
+    photo_path: MediaSource,
+    caption: str = "",
+    parse_mode: Optional[str] = None,
+    reply_to_message_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+) -> Optional[Dict[str, Any]]:
+    payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    if reply_to_message_id:
+        payload["reply_to_message_id"] = reply_to_message_id
+    return await _send_file("sendPhoto", "photo", photo_path, payload, filename, on_progress)
+
+
+async def send_document(
+    chat_id: int | str,
+    document_path: MediaSource,
+    caption: str = "",
+    parse_mode: Optional[str] = None,
+    reply_to_message_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+) -> Optional[Dict[str, Any]]:
+    payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    if reply_to_message_id:
+        payload["reply_to_message_id"] = reply_to_message_id
+    return await _send_file("sendDocument", "document", document_path, payload, filename, on_progress)
+
+
+async def send_voice(
+    chat_id: int | str,
+    voice_path: MediaSource,
+    caption: str = "",
+    reply_to_message_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+) -> Optional[Dict[str, Any]]:
+    payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
+    if reply_to_message_id:
+        payload["reply_to_message_id"] = reply_to_message_id
+    return await _send_file("sendVoice", "voice", voice_path, payload, filename, on_progress)
+
+
+async def send_video(
+    chat_id: int | str,
+    video_path: MediaSource,
+    caption: str = "",
+    supports_streaming: bool = True,
+    reply_to_message_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+) -> Optional[Dict[str, Any]]:
+    payload: Dict[str, Any] = {
+        "chat_id": chat_id,
+        "caption": caption,
+        "supports_streaming": supports_streaming,
+    }
+    if reply_to_message_id:
+        payload["reply_to_message_id"] = reply_to_message_id
+    return await _send_file("sendVideo", "video", video_path, payload, filename, on_progress)
+
+
+# =========================
+#  MEDIA GROUPS (ALBUMS)
+# =========================
+
+async def _single_request(
+    chat_id: int | str,
+    item: Dict[str, Any],
+    options: Dict[str, Any],
+) -> Dict[str, Any]:
+    kind = item["type"]
+    payload: Dict[str, Any] = {"chat_id": chat_id, "caption": item.get("caption") or "", **options}
+    if item.get("parse_mode"):
+        payload["parse_mode"] = item["parse_mode"]
+    if _is_reference(item["media"]):
+        return await _request(_SINGLE_METHOD[kind], {**payload, kind: item["media"]})
+    return await _upload_file(_SINGLE_METHOD[kind], kind, item["media"], payload, item.get("filename"))
+
+
+async def _album_request(
+    token: str,
+    chat_id: int | str,
+    items: List[Dict[str, Any]],
+    options: Dict[str, Any],
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Async version of `telegram_utils._album_request` (raw API response).
+    """
+    media: List[Dict[str, Any]] = []
+    files: Dict[str, Any] = {}
+    digests: List[Optional[str]] = []
+    cached: List[int] = []
+
+    for i, item in enumerate(items):
+        entry: Dict[str, Any] = {"type": item["type"]}
+        if item.get("caption"):
+            entry["caption"] = item["caption"]
+        if item.get("parse_mode"):
+            entry["parse_mode"] = item["parse_mode"]
+
+        source, digest, file_id = item["media"], None, None
+        if _is_reference(source):
+            entry["media"] = source
+        else:
+            missing = _missing_file(source)
+            if missing:
+                return missing
+            if media_cache.applies_to(source):
+                try:
+                    digest = await asyncio.to_thread(media_cache.content_sha256, source)
+                    if digest is not None and use_cache:
+                        file_id = await asyncio.to_thread(media_cache.lookup, token, item["type"], digest)
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[MEDIA CACHE ERROR] {e}")
+                    digest = None
+            if file_id:
+                entry["media"] = file_id
+                cached.append(i)
+            else:
+                name = f"file{i}"
+                entry["media"] = f"attach://{name}"
+                files[name] = (item.get("filename") or source_name(source), source)
+        media.append(entry)
+        digests.append(digest)
+
+    payload = {"chat_id": chat_id, "media": json.dumps(media, ensure_ascii=False), **options}
+    data = await _request("sendMediaGroup", payload, files=files or None)
+
+    if not data.get("ok"):
+        if cached and media_cache.is_stale_file_error(data):
+            for i in cached:
+                await asyncio.to_thread(media_cache.invalidate, token, items[i]["type"], digests[i])
+            return await _album_request(token, chat_id, items, options, use_cache=False)
+        return data
+
+    for i, message in enumerate(data.get("result") or []):
+        if i >= len(items) or digests[i] is None:
+            continue
+        kind = items[i]["type"]
+        try:
+            if i in cached:
+                await asyncio.to_thread(media_cache.touch, token, kind, digests[i])
+            else:
+                uploaded = media_cache.extract_file(kind, {"result": message})
+                if uploaded:
+                    await asyncio.to_thread(media_cache.store, token, kind, digests[i], uploaded)
+        except sqlite3.Error as e:
+            print(f"[MEDIA CACHE ERROR] {e}")
+    return data
+
+
+async def send_media_group(
+    chat_id: int | str,
+    media: List[MediaSource | Dict[str, Any]],
+    reply_to_message_id: Optional[int] = None,
+    disable_notification: Optional[bool] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Async version of `telegram_utils.send_media_group` (same splitting into
+    albums, same return value).
+    """
+    token = _get_token()
+    if not token or not media:
+        return None
+
+    items = [input_media(**m) if isinstance(m, dict) else input_media(m) for m in media]
+
+    responses: List[Dict[str, Any]] = []
+    for n, album in enumerate(_split_albums(items)):
+        options: Dict[str, Any] = {}
+        if disable_notification is not None:
+            options["disable_notification"] = disable_notification
+        if reply_to_message_id and n == 0:
+            options["reply_to_message_id"] = reply_to_message_id
+
+        if len(album) == 1:
+            method = _SINGLE_METHOD[album[0]["type"]]
+            data = await _single_request(chat_id, album[0], options)
+        else:
+            method = "sendMediaGroup"
+            data = await _album_request(token, chat_id, album, options)
+        if not data.get("ok"):
+            print(f"Telegram error in {method}:", data)
+            return None
+        responses.append(data)
+    return responses
+
+
+# =========================
+#  FILE DOWNLOADS
+# =========================
+
+async def get_file(file_id: str) -> Optional[Dict[str, Any]]:
+    """
+    getFile: the File object (`file_path`, `file_size`, ...) or None.
+    """
+    data = await _post("getFile", {"file_id": file_id})
+    return data["result"] if data else None
+
+
+async def download_file(
+    file_id: str,
+    dest: Optional[str | Path] = None,
+    timeout: int = 60,
+    file_size: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Async version of `telegram_utils.download_file` (files over the cloud
+    download limit are refused before getFile, local-mode paths are read
+    from disk, otherwise the file is streamed from the file endpoint; disk
+    writes run in worker threads).
+    """
+    too_big = _too_big_to_download(file_size)
+    if too_big:
+        print(too_big)
+        return None
+    token = _get_token()
+    info = await get_file(file_id) if token else None
+    if not info or not info.get("file_path"):
+        return None
+    path = info["file_path"]
+
+    if local_mode() and os.path.isabs(path):
+        if not os.path.isfile(path):
+            print(f"File {path} of the Bot API server is not on this machine.")
+            return None
+        if dest is None:
+            return path
+        await asyncio.to_thread(shutil.copyfile, path, dest)
+        return str(dest)
+
+    if dest is None:
+        fd, dest = tempfile.mkstemp(suffix=Path(path).suffix)
+        os.close(fd)
+    started = time.monotonic()
+    received = 0
+    try:
+        async with _semaphore():
+            async with _client(token).stream(
+                "GET",
+                file_url(token, path),
+                timeout=httpx.Timeout(timeout, connect=request_timeout()[0]),
+            ) as resp:
+                if resp.status_code != 200:
+                    metrics.observe("downloadFile", time.monotonic() - started, resp.status_code, resp.status_code)
+                    print(f"Telegram error downloading {path}: HTTP {resp.status_code}")
+                    return None
+                f = await asyncio.to_thread(open, dest, "wb")
+                try:
+                    async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                        await asyncio.to_thread(f.write, chunk)
+                        received += len(chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+    except httpx.HTTPError as e:
+        metrics.observe("downloadFile", time.monotonic() - started, metrics.NETWORK_ERROR)
+        print(f"Network error downloading {path}: {e}")
+        return None
+    metrics.observe("downloadFile", time.monotonic() - started, 200, None, 0, received)
+    return str(dest)
+
+
+# =========================
+#  EDIT / DELETE / PIN
+# =========================
+
+async def edit_message_text(
+    chat_id: int | str,
+    message_id: int,
+    new_text: str,
+    parse_mode: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    payload: Dict[str, Any] = {
+        "chat_id": chat_id,
+        "message_id": message_id,
+        "text": new_text,
+    }
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    return await _post("editMessageText", payload)
+
+
+async def delete_message(chat_id: int | str, message_id: int) -> Optional[Dict[str, Any]]:
+    payload = {"chat_id": chat_id, "message_id": message_id}
+    return await _post("deleteMessage", payload)
+
+
+async def pin_message(
+    chat_id: int | str,
+    message_id: int,
+    disable_notification: bool = False,
+) -> Optional[Dict[str, Any]]:
+    payload = {
+        "chat_id": chat_id,
+        "message_id": message_id,
+        "disable_notification": disable_notification,
+    }
+    return await _post("pinChatMessage", payload)
+
+
+async def unpin_message(
+    chat_id: int | str,
+    message_id: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    payload: Dict[str, Any] = {"chat_id": chat_id}
+    if message_id is not None:
+        payload["message_id"] = message_id
+    return await _post("unpinChatMessage", payload)
+
+
+# =========================
+#  ERROR ALERTS
+# =========================
+
+async def send_error_alert(message: str) -> Optional[Dict[str, Any]]:
+    """
+    Send an error alert to TELEGRAM_ME_ID (your personal Telegram ID).
+    """
+    me_id = _get_me_id()
+    if not me_id:
+        return None
+    text = f"ERROR ALERT:\n{message}"
+    return await send_text(me_id, text)
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import os
+import time
 from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from dotenv import load_dotenv
 
+from . import metrics, updates
+from .http_client import get_session, method_url, request_timeout
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -23,30 +27,42 @@ def _build_api_url() -> Tuple[bool, Optional[str], Optional[str]]:
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     if not token:
         return False, "TELEGRAM_BOT_TOKEN is missing.", None
-    return True, None, f"https://api.telegram.org/bot{token}"
+    return True, None, method_url(token, "").rstrip("/")
 
 
-def _extract_chat_from_update(update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def _session() -> requests.Session:
+    """
+    The pooled keep-alive session of the current TELEGRAM_BOT_TOKEN.
     """
-    Extract the chat dictionary from a Telegram update object.
+    return get_session(os.getenv("TELEGRAM_BOT_TOKEN", ""))
 
-    Args:
-        update (Dict[str, Any]): A single update from getUpdates.
 
-    Returns:
-        Optional[Dict[str, Any]]: The chat object if found, else None.
+def _get(
+    api_url: str,
+    method: str,
+    timeout: float,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    GET a Bot API method and decode the answer, recording the call in
+    `metrics`. Network and decoding errors are raised.
     """
-    if "message" in update and "chat" in update["message"]:
-        return update["message"]["chat"]
-    if "edited_message" in update and "chat" in update["edited_message"]:
-        return update["edited_message"]["chat"]
-    if "channel_post" in update and "chat" in update["channel_post"]:
-        return update["channel_post"]["chat"]
-    if "edited_channel_post" in update and "chat" in update["edited_channel_post"]:
-        return update["edited_channel_post"]["chat"]
-    if "my_chat_member" in update and "chat" in update["my_chat_member"]:
-        return update["my_chat_member"]["chat"]
-    return None
+    started = time.monotonic()
+    status: int | str = metrics.NETWORK_ERROR
+    received = 0
+    data: Optional[Dict[str, Any]] = None
+    try:
+        resp = _session().get(f"{api_url}/{method}", params=params, timeout=request_timeout(timeout))
+        status, received = resp.status_code, len(resp.content)
+        data = resp.json()
+        return data
+    finally:
+        if data is not None:
+            error_code = None if data.get("ok") else data.get("error_code")
+        else:
+            error_code = status if isinstance(status, int) else None
+        metrics.observe(method, time.monotonic() - started, status, error_code, 0, received)
+
 
 # =====================
 #  getMe
@@ -64,8 +80,7 @@ def get_bot_info() -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
         return False, err, None
 
     try:
-        resp = requests.get(f"{api_url}/getMe", timeout=10)
-        data = resp.json()
+        data = _get(api_url, "getMe", 10)
     except Exception as e:
         return False, f"Network error in getMe: {e}", None
 
@@ -85,40 +100,23 @@ def get_last_chat() -> Tuple[
     Optional[Dict[str, Any]],
 ]:
     """
-    Retrieve the last update from getUpdates and extract its chat.
+    Fetch new updates, then return the chat of the most recent one.
+
+    Only updates after the stored offset are requested (see `updates`);
+    the answer comes from the `known_chats` table.
 
     Returns:
         Tuple: (success flag, error message, chat dict if found, last update dict)
     """
-    ok, err, api_url = _build_api_url()
-    if not ok or not api_url:
+    ok, err, _ = updates.drain()
+    if not ok:
         return False, err, None, None
 
-    try:
-        resp = requests.get(f"{api_url}/getUpdates", timeout=15)
-        data = resp.json()
-    except Exception as e:
-        return False, f"Network error in getUpdates: {e}", None, None
-
-    if not data.get("ok"):
-        return False, f"Telegram Error in getUpdates: {data}", None, None
-
-    updates = data.get("result", [])
-    if not updates:
+    found = updates.last_chat()
+    if found is None:
         return False, "No updates found. Send a message to the bot first.", None, None
 
-    chat: Optional[Dict[str, Any]] = None
-    last_update: Optional[Dict[str, Any]] = None
-
-    for upd in reversed(updates):
-        chat = _extract_chat_from_update(upd)
-        if chat:
-            last_update = upd
-            break
-
-    if not chat:
-        return False, "Could not extract chat from the last update.", None, last_update
-
+    chat, last_update = found
     return True, None, chat, last_update
 
 # =====================
@@ -129,49 +127,13 @@ def get_unique_chats() -> Tuple[bool, Optional[str], List[Dict[str, Any]]]:
     """
     Retrieve a list of all unique users/channels/groups that have contacted the bot at least once.
 
+    New updates are ingested first; the list is read from the `known_chats`
+    table, most recently active first.
+
     Returns:
         Tuple: (success flag, error message, list of unique chat dictionaries)
     """
-    ok, err, api_url = _build_api_url()
-    if not ok or not api_url:
+    ok, err, _ = updates.drain()
+    if not ok:
         return False, err, []
-
-    try:
-        resp = requests.get(f"{api_url}/getUpdates", timeout=15)
-        data = resp.json()
-    except Exception as e:
-        return False, f"Network error in getUpdates: {e}", []
-
-    if not data.get("ok"):
-        return False, f"Telegram Error in getUpdates: {data}", []
-
-    updates = data.get("result", [])
-    if not updates:
-        return True, None, []
-
-    seen_ids: set[int] = set()
-    chats: List[Dict[str, Any]] = []
-
-    for upd in updates:
-        chat = _extract_chat_from_update(upd)
-        if not chat:
-            continue
-
-        cid = chat.get("id")
-        if cid in seen_ids:
-            continue
-
-        seen_ids.add(cid)
-
-        chats.append(
-            {
-                "id": cid,
-                "type": chat.get("type"),
-                "title": chat.get("title"),
-                "username": chat.get("username"),
-                "first_name": chat.get("first_name"),
-                "last_name": chat.get("last_name"),
-            }
-        )
-
-    return True, None, chats
\ No newline at end of file
+    return True, None, updates.known_chats()
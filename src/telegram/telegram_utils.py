@@ -1,11 +1,24 @@
 from __future__ import annotations
 
+import json
+import mimetypes
 import os
-from typing import Any, Dict, List, Optional
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from dotenv import load_dotenv
 
+from . import flow_control, lanes, media_cache, metrics
+from .http_client import download_limit, file_url, get_session, local_mode, method_url, request_timeout, upload_limit
+from .multipart import CHUNK_SIZE, MediaSource, MultipartStream, ProgressFunc, local_file_uri, source_name
+from .text_split import split_text
+
 # Attempt to load any existing .env file (e.g., at the root level)
 # Applications with specific .env paths should call load_dotenv(dotenv_path=...) beforehand.
 load_dotenv()
@@ -21,39 +34,198 @@ def _get_token() -> Optional[str]:
     return token
 
 
-def _post(
+_RETRY_STATUS = (502, 503, 504)
+
+
+def _no_token() -> Dict[str, Any]:
+    """
+    The error answer when TELEGRAM_BOT_TOKEN is unset: a 401, like Telegram's
+    answer to a bad token, on every send path (not retried by the outbox).
+    """
+    return {"ok": False, "error_code": 401, "description": "TELEGRAM_BOT_TOKEN is missing."}
+
+
+def _local_paths(
+    payload: Optional[Dict[str, Any]],
+    files: Optional[Dict[str, Any]],
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    In local mode (`http_client.local_mode`), file fields read from a path
+    are handed to the self-hosted server as file:// paths instead of being
+    uploaded; sendMediaGroup's attach:// references are rewritten to match.
+
+    Returns:
+        Tuple: (payload, files left to upload or None).
+    """
+    if not files or not local_mode():
+        return payload, files
+    payload = dict(payload or {})
+    remaining: Dict[str, Any] = {}
+    for name, spec in files.items():
+        uri = local_file_uri(spec)
+        if uri is None:
+            remaining[name] = spec
+        elif isinstance(payload.get("media"), str) and f'"attach://{name}"' in payload["media"]:
+            payload["media"] = payload["media"].replace(f'"attach://{name}"', json.dumps(uri))
+        else:
+            payload[name] = uri
+    return payload, remaining or None
+
+
+def _too_large(size: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    The error answer for an upload over `http_client.upload_limit()`, or
+    None if it fits (or its size is unknown).
+    """
+    limit = upload_limit()
+    if size is None or size <= limit:
+        return None
+    hint = "" if local_mode() else " (a self-hosted Bot API server with TELEGRAM_LOCAL_MODE=1 accepts 2000 MB)"
+    return {
+        "ok": False,
+        "error_code": 413,
+        "description": f"Request Entity Too Large: {size / 2**20:.1f} MB upload exceeds the {limit / 2**20:.0f} MB limit{hint}",
+    }
+
+
+def _too_big_to_download(size: Optional[int]) -> Optional[str]:
+    """
+    Why a file of `size` bytes cannot be downloaded (over
+    `http_client.download_limit()`), or None if it can (or its size is unknown).
+    """
+    limit = download_limit()
+    if size is None or limit is None or size <= limit:
+        return None
+    return (
+        f"File of {size / 2**20:.1f} MB is too big for the cloud Bot API, which serves downloads "
+        f"up to {limit / 2**20:.0f} MB (a self-hosted Bot API server with TELEGRAM_LOCAL_MODE=1 has no limit)"
+    )
+
+
+def _request(
     method: str,
     payload: Optional[Dict[str, Any]] = None,
     files: Optional[Dict[str, Any]] = None,
     timeout: int = 30,
-) -> Optional[Dict[str, Any]]:
+    retry: bool = True,
+    on_progress: Optional[ProgressFunc] = None,
+) -> Dict[str, Any]:
     """
-    Call any Telegram Bot API method via POST.
-    The token is fetched dynamically from the environment each time.
+    Call a Bot API method and return the decoded response as is.
+
+    Calls queue in their priority lane (`lanes`: interactive unless the
+    caller runs inside `lanes.lane(...)`), then pass through the
+    cross-process flow controller (`flow_control`):
+    they wait for the token's shared rate bucket, a 429 blocks the token for
+    `retry_after` seconds in every process and is then retried, and connect
+    failures / 502-504 answers are retried with jittered backoff. Read
+    timeouts are not retried, since the message may already have been sent.
+    With `retry=False` (callers with their own retry scheduling, such as the
+    broadcast engine) the shared rate bucket and 429 blocking still apply,
+    but the first answer is returned.
+
+    Failures are returned in the Bot API's own error shape, so callers can
+    inspect `error_code` and `parameters.retry_after`:
+    {"ok": False, "error_code": 429 | None, "description": "...", "parameters": {...}}
+
+    `files` (paths, bytes or file objects, see `multipart.FileField`) are
+    streamed from their source in chunks rather than encoded in memory;
+    `on_progress(bytes_sent, total_bytes)` reports the upload. Against a
+    self-hosted server in local mode, paths are passed as file:// paths
+    instead. Uploads over the server's size limit fail with a 413 answer
+    before anything is sent.
     """
     token = _get_token()
     if not token:
-        return None
-
-    api_url = f"https://api.telegram.org/bot{token}"
-    url = f"{api_url}/{method}"
+        return _no_token()
+
+    controlled = flow_control.enabled()
+    retries = flow_control.max_retries() if controlled and retry else 0
+    payload, files = _local_paths(payload, files)
+    body: Any = payload
+    headers: Optional[Dict[str, str]] = None
+    if files:
+        # Re-iterating the stream on a retry rewinds its sources.
+        body = MultipartStream(payload, files, on_progress=on_progress)
+        headers = {"Content-Type": body.content_type}
+        too_large = _too_large(body.len)
+        if too_large:
+            return too_large
+
+    attempt = 0
+    while True:
+        attempt += 1
+        if controlled:
+            lanes.acquire(token)
+
+        started = time.monotonic()
+        try:
+            resp = get_session(token).post(
+                method_url(token, method),
+                data=body,
+                headers=headers,
+                timeout=request_timeout(timeout),
+            )
+        except requests.ConnectionError as e:
+            metrics.observe(method, time.monotonic() - started, metrics.NETWORK_ERROR)
+            if attempt <= retries:
+                metrics.record_retry(method, metrics.NETWORK_ERROR)
+                time.sleep(flow_control.backoff(attempt))
+                continue
+            return {"ok": False, "error_code": None, "description": f"Network error: {e}"}
+        except Exception as e:
+            metrics.observe(method, time.monotonic() - started, metrics.NETWORK_ERROR)
+            return {"ok": False, "error_code": None, "description": f"Network error: {e}"}
+
+        try:
+            data = resp.json()
+        except Exception:
+            data = {
+                "ok": False,
+                "error_code": resp.status_code,
+                "description": f"Invalid response: {resp.text[:200]}",
+            }
+        metrics.observe(
+            method,
+            time.monotonic() - started,
+            resp.status_code,
+            None if data.get("ok") else data.get("error_code"),
+            metrics.body_size(resp.request.body),
+            len(resp.content),
+        )
+
+        if data.get("ok") or not controlled:
+            return data
+
+        error_code = data.get("error_code")
+        if error_code == 429:
+            retry_after = float((data.get("parameters") or {}).get("retry_after") or 1)
+            flow_control.block(token, retry_after)
+            if attempt <= retries and retry_after <= flow_control.max_retry_after():
+                metrics.record_retry(method, "429")
+                continue
+        elif error_code in _RETRY_STATUS and attempt <= retries:
+            metrics.record_retry(method, "5xx")
+            time.sleep(flow_control.backoff(attempt))
+            continue
+        return data
 
-    try:
-        resp = requests.post(url, data=payload, files=files, timeout=timeout)
-    except Exception as e:
-        print(f"Telegram network error in {method}: {e}")
-        return None
-
-    try:
-        data = resp.json()
-    except Exception:
-        print(f"RAW RESPONSE from {method}:", resp.text)
-        return None
 
+def _post(
+    method: str,
+    payload: Optional[Dict[str, Any]] = None,
+    files: Optional[Dict[str, Any]] = None,
+    timeout: int = 30,
+) -> Optional[Dict[str, Any]]:
+    """
+    Call any Telegram Bot API method via POST.
+    The token is fetched dynamically from the environment each time; the
+    request goes through that token's pooled keep-alive session.
+    """
+    data = _request(method, payload, files, timeout)
     if not data.get("ok"):
         print(f"Telegram error in {method}:", data)
         return None
-
     return data
 
 
@@ -85,6 +257,55 @@ def _get_group_id() -> Optional[str]:
 #  TEXT MESSAGES
 # =========================
 
+def _text_payloads(
+    chat_id: int | str,
+    text: str,
+    parse_mode: Optional[str],
+    disable_web_page_preview: Optional[bool],
+) -> List[Dict[str, Any]]:
+    """
+    One sendMessage payload per part of `text` (see `text_split`).
+    """
+    payloads = []
+    for part in split_text(text, parse_mode):
+        payload: Dict[str, Any] = {
+            "chat_id": chat_id,
+            "text": part,
+        }
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        if disable_web_page_preview is not None:
+            payload["disable_web_page_preview"] = disable_web_page_preview
+        payloads.append(payload)
+    return payloads
+
+
+def _send_parts(
+    payloads: List[Dict[str, Any]],
+    reply_to_message_id: Optional[int],
+    chain: bool,
+) -> List[Dict[str, Any]]:
+    """
+    Send the parts in order, each replying to the previous one when
+    `chain` is set. Stops at the first failure.
+
+    Returns:
+        List[Dict[str, Any]]: The responses of the parts that were sent.
+    """
+    responses: List[Dict[str, Any]] = []
+    reply_to = reply_to_message_id
+    for payload in payloads:
+        if reply_to:
+            payload["reply_to_message_id"] = reply_to
+        response = _post("sendMessage", payload)
+        if response is None:
+            break
+        responses.append(response)
+        if chain:
+            reply_to = response["result"]["message_id"]
+    return responses
+
+
 def send_text(
     chat_id: int | str,
     text: str,
@@ -92,18 +313,50 @@ def send_text(
     reply_to_message_id: Optional[int] = None,
     disable_web_page_preview: Optional[bool] = None,
 ) -> Optional[Dict[str, Any]]:
-    payload: Dict[str, Any] = {
-        "chat_id": chat_id,
-        "text": text,
-    }
-    if parse_mode:
-        payload["parse_mode"] = parse_mode
-    if reply_to_message_id:
-        payload["reply_to_message_id"] = reply_to_message_id
-    if disable_web_page_preview is not None:
-        payload["disable_web_page_preview"] = disable_web_page_preview
+    """
+    Send a text message. Texts over Telegram's 4096 character limit go out
+    as several messages (see `send_long_text`); the response is then the
+    last one, with the ids of all parts under "message_ids".
+    """
+    payloads = _text_payloads(chat_id, text, parse_mode, disable_web_page_preview)
+    responses = _send_parts(payloads, reply_to_message_id, chain=True)
+    if len(responses) < len(payloads):
+        return None
+    if len(responses) == 1:
+        return responses[0]
+    return {**responses[-1], "message_ids": [r["result"]["message_id"] for r in responses]}
 
-    return _post("sendMessage", payload)
+
+def send_long_text(
+    chat_id: int | str,
+    text: str,
+    parse_mode: Optional[str] = None,
+    reply_to_message_id: Optional[int] = None,
+    disable_web_page_preview: Optional[bool] = None,
+    chain: bool = True,
+) -> Optional[List[int]]:
+    """
+    Send a text of any length, split at paragraph/line/word boundaries
+    without breaking Markdown or HTML formatting.
+
+    Args:
+        chat_id (int | str): Target chat.
+        text (str): Message text.
+        parse_mode (Optional[str]): None, "HTML", "Markdown" or "MarkdownV2".
+        reply_to_message_id (Optional[int]): Message the first part replies to.
+        disable_web_page_preview (Optional[bool]): Passed to every part.
+        chain (bool): Each part replies to the previous one, so the parts
+            stay together in the chat.
+
+    Returns:
+        Optional[List[int]]: Message ids of the parts in order (fewer than
+        the parts if one failed), or None if nothing was sent.
+    """
+    payloads = _text_payloads(chat_id, text, parse_mode, disable_web_page_preview)
+    responses = _send_parts(payloads, reply_to_message_id, chain)
+    if not responses:
+        return None
+    return [r["result"]["message_id"] for r in responses]
 
 
 def send_markdown(
@@ -148,81 +401,527 @@ def send_to_group(text: str) -> Optional[Dict[str, Any]]:
 
 
 def broadcast(chat_ids: List[int | str], text: str) -> List[Optional[Dict[str, Any]]]:
-    results: List[Optional[Dict[str, Any]]] = []
-    for cid in chat_ids:
-        results.append(send_text(cid, text))
-    return results
+    """
+    Send `text` to every chat concurrently within Telegram's rate limits
+    (see `broadcast.run_broadcast` for progress reporting and details).
+
+    Returns:
+        List[Optional[Dict[str, Any]]]: The API response per chat, in order
+        (None where sending failed).
+    """
+    from .broadcast import run_broadcast
+
+    return [r["response"] if r["ok"] else None for r in run_broadcast(chat_ids, text)]
 
 
 # =========================
 #  IMAGES & FILES
 # =========================
 
+def _upload_media(
+    method: str,
+    field: str,
+    source: MediaSource,
+    payload: Dict[str, Any],
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+    retry: bool = True,
+) -> Dict[str, Any]:
+    """
+    Send a file, reusing the `file_id` of an earlier upload of the same
+    content when `media_cache` has one, and return the raw API response
+    (see `_request`).
+
+    `source` is a local path, bytes/memoryview or a binary file object; it
+    is streamed in chunks, never loaded whole. A cached id that Telegram
+    rejects is dropped and the file is uploaded again; the id of every
+    successful upload is cached for the next send.
+    """
+    token = _get_token()
+    if not token:
+        return _no_token()
+    missing = _missing_file(source)
+    if missing:
+        return missing
+
+    digest: Optional[str] = None
+    if media_cache.applies_to(source):
+        file_id = None
+        try:
+            digest = media_cache.content_sha256(source)
+            if digest is not None:
+                file_id = media_cache.lookup(token, field, digest)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[MEDIA CACHE ERROR] {e}")
+            digest = None
+
+        if file_id:
+            data = _request(method, {**payload, field: file_id}, retry=retry)
+            if data.get("ok"):
+                media_cache.touch(token, field, digest)
+                return data
+            if not media_cache.is_stale_file_error(data):
+                return data
+            media_cache.invalidate(token, field, digest)
+
+    upload = (filename or source_name(source), source)
+    data = _request(method, payload, files={field: upload}, on_progress=on_progress, retry=retry)
+    if data.get("ok") and digest is not None:
+        uploaded = media_cache.extract_file(field, data)
+        if uploaded:
+            try:
+                media_cache.store(token, field, digest, uploaded)
+            except sqlite3.Error as e:
+                print(f"[MEDIA CACHE ERROR] {e}")
+    return data
+
+
+def _send_media(
+    method: str,
+    field: str,
+    source: MediaSource,
+    payload: Dict[str, Any],
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    `_upload_media`, returning None (and printing the error) on failure.
+    """
+    if not _get_token():
+        return None
+    data = _upload_media(method, field, source, payload, filename, on_progress)
+    if not data.get("ok"):
+        print(f"Telegram error in {method}:", data)
+        return None
+    return data
+
+
 def send_photo(
     chat_id: int | str,
-    photo_path: str,
+    photo_path: MediaSource,
     caption: str = "",
     parse_mode: Optional[str] = None,
     reply_to_message_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
 ) -> Optional[Dict[str, Any]]:
-    with open(photo_path, "rb") as f:
-        files = {"photo": f}
-        payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
-        if parse_mode:
-            payload["parse_mode"] = parse_mode
-        if reply_to_message_id:
-            payload["reply_to_message_id"] = reply_to_message_id
-        return _post("sendPhoto", payload, files=files)
+    payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    if reply_to_message_id:
+        payload["reply_to_message_id"] = reply_to_message_id
+    return _send_media("sendPhoto", "photo", photo_path, payload, filename, on_progress)
 
 
 def send_document(
     chat_id: int | str,
-    document_path: str,
+    document_path: MediaSource,
     caption: str = "",
     parse_mode: Optional[str] = None,
     reply_to_message_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
 ) -> Optional[Dict[str, Any]]:
-    with open(document_path, "rb") as f:
-        files = {"document": f}
-        payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
-        if parse_mode:
-            payload["parse_mode"] = parse_mode
-        if reply_to_message_id:
-            payload["reply_to_message_id"] = reply_to_message_id
-        return _post("sendDocument", payload, files=files)
+    """
+    Send a document from a path, bytes or a file object.
+
+    Args:
+        filename (Optional[str]): Name shown in Telegram (defaults to the
+            path's or file object's name).
+        on_progress (Optional[ProgressFunc]): `on_progress(bytes_sent,
+            total_bytes)` while uploading.
+    """
+    payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    if reply_to_message_id:
+        payload["reply_to_message_id"] = reply_to_message_id
+    return _send_media("sendDocument", "document", document_path, payload, filename, on_progress)
 
 
 def send_voice(
     chat_id: int | str,
-    voice_path: str,
+    voice_path: MediaSource,
     caption: str = "",
     reply_to_message_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
 ) -> Optional[Dict[str, Any]]:
-    with open(voice_path, "rb") as f:
-        files = {"voice": f}
-        payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
-        if reply_to_message_id:
-            payload["reply_to_message_id"] = reply_to_message_id
-        return _post("sendVoice", payload, files=files)
+    payload: Dict[str, Any] = {"chat_id": chat_id, "caption": caption}
+    if reply_to_message_id:
+        payload["reply_to_message_id"] = reply_to_message_id
+    return _send_media("sendVoice", "voice", voice_path, payload, filename, on_progress)
 
 
 def send_video(
     chat_id: int | str,
-    video_path: str,
+    video_path: MediaSource,
     caption: str = "",
     supports_streaming: bool = True,
     reply_to_message_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressFunc] = None,
 ) -> Optional[Dict[str, Any]]:
-    with open(video_path, "rb") as f:
-        files = {"video": f}
-        payload: Dict[str, Any] = {
-            "chat_id": chat_id,
-            "caption": caption,
-            "supports_streaming": supports_streaming,
-        }
-        if reply_to_message_id:
-            payload["reply_to_message_id"] = reply_to_message_id
-        return _post("sendVideo", payload, files=files)
+    """
+    Send a video from a path, bytes or a file object (streamed, so large
+    files are never held in memory).
+
+    Args:
+        filename (Optional[str]): Name shown in Telegram.
+        on_progress (Optional[ProgressFunc]): `on_progress(bytes_sent,
+            total_bytes)` while uploading.
+    """
+    payload: Dict[str, Any] = {
+        "chat_id": chat_id,
+        "caption": caption,
+        "supports_streaming": supports_streaming,
+    }
+    if reply_to_message_id:
+        payload["reply_to_message_id"] = reply_to_message_id
+    return _send_media("sendVideo", "video", video_path, payload, filename, on_progress)
+
+
+# =========================
+#  MEDIA GROUPS (ALBUMS)
+# =========================
+
+ALBUM_MAX_ITEMS = 10
+
+# Items that may share one album: photos and videos mix, documents and
+# audio only form albums of their own kind.
+_ALBUM_CLASS = {"photo": "visual", "video": "visual", "document": "document", "audio": "audio"}
+_SINGLE_METHOD = {"photo": "sendPhoto", "video": "sendVideo", "document": "sendDocument", "audio": "sendAudio"}
+
+
+def _guess_media_type(source: MediaSource, filename: Optional[str]) -> str:
+    name = filename or (source_name(source) if not isinstance(source, (bytes, bytearray, memoryview)) else "")
+    mime = mimetypes.guess_type(name)[0] or ""
+    if mime.startswith("image/") and not mime.endswith("gif"):
+        return "photo"
+    for kind in ("video", "audio"):
+        if mime.startswith(kind + "/"):
+            return kind
+    return "document"
+
+
+_REFERENCE_PREFIXES = ("http://", "https://", "attach://", "file://")
+_FILE_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def _is_reference(source: MediaSource) -> bool:
+    """
+    True for strings Telegram resolves itself: URLs, attach:// names and
+    file_ids. Anything path-like (a separator, a dot) is a local file.
+    """
+    if not isinstance(source, str):
+        return False
+    if source.startswith(_REFERENCE_PREFIXES):
+        return True
+    return _FILE_ID.fullmatch(source) is not None and not os.path.exists(source)
+
+
+def _missing_file(source: MediaSource) -> Optional[Dict[str, Any]]:
+    """
+    The error answer for a local path that does not exist (or was deleted
+    since it was queued), or None. Like any 400 it is not retried.
+    """
+    if isinstance(source, (str, os.PathLike)) and not os.path.isfile(source):
+        return {"ok": False, "error_code": 400, "description": f"File not found: {os.fspath(source)}"}
+    return None
+
+
+def input_media(
+    media: MediaSource,
+    type: Optional[str] = None,
+    caption: Optional[str] = None,
+    parse_mode: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Describe one album item for `send_media_group`.
+
+    Args:
+        media (MediaSource): Local path, bytes, file object, or a `file_id`
+            / http(s):// URL of a file Telegram already has or can fetch.
+        type (Optional[str]): "photo", "video", "document" or "audio";
+            guessed from the file name when omitted.
+        caption (Optional[str]): Caption of this item.
+        parse_mode (Optional[str]): Parse mode of the caption.
+        filename (Optional[str]): Name of an uploaded file.
+    """
+    kind = type or ("document" if _is_reference(media) else _guess_media_type(media, filename))
+    if kind not in _ALBUM_CLASS:
+        raise ValueError(f"Unsupported album media type: {kind}")
+    return {"type": kind, "media": media, "caption": caption, "parse_mode": parse_mode, "filename": filename}
+
+
+def _split_albums(items: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Split items (kept in order) into valid albums: runs of compatible types,
+    each cut into near-equal parts of at most ALBUM_MAX_ITEMS (11 photos
+    become 6 + 5, not 10 + a lone photo).
+    """
+    runs: List[List[Dict[str, Any]]] = []
+    for item in items:
+        if runs and _ALBUM_CLASS[runs[-1][-1]["type"]] == _ALBUM_CLASS[item["type"]]:
+            runs[-1].append(item)
+        else:
+            runs.append([item])
+
+    albums: List[List[Dict[str, Any]]] = []
+    for run in runs:
+        parts = -(-len(run) // ALBUM_MAX_ITEMS)
+        size, extra = divmod(len(run), parts)
+        start = 0
+        for i in range(parts):
+            end = start + size + (1 if i < extra else 0)
+            albums.append(run[start:end])
+            start = end
+    return albums
+
+
+def _single_request(
+    chat_id: int | str,
+    item: Dict[str, Any],
+    options: Dict[str, Any],
+    retry: bool = True,
+) -> Dict[str, Any]:
+    """
+    A lone album item sent with its single-file method (raw API response).
+    """
+    kind = item["type"]
+    payload: Dict[str, Any] = {"chat_id": chat_id, "caption": item.get("caption") or "", **options}
+    if item.get("parse_mode"):
+        payload["parse_mode"] = item["parse_mode"]
+    if _is_reference(item["media"]):
+        return _request(_SINGLE_METHOD[kind], {**payload, kind: item["media"]}, retry=retry)
+    return _upload_media(_SINGLE_METHOD[kind], kind, item["media"], payload, item.get("filename"), retry=retry)
+
+
+def _send_single(chat_id: int | str, item: Dict[str, Any], options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    data = _single_request(chat_id, item, options)
+    if not data.get("ok"):
+        print(f"Telegram error in {_SINGLE_METHOD[item['type']]}:", data)
+        return None
+    return data
+
+
+def _album_request(
+    token: str,
+    chat_id: int | str,
+    items: List[Dict[str, Any]],
+    options: Dict[str, Any],
+    use_cache: bool = True,
+    retry: bool = True,
+) -> Dict[str, Any]:
+    """
+    One sendMediaGroup call, returning the raw API response; new files are
+    uploaded as attachments, files already in `media_cache` are referenced
+    by their `file_id`.
+    """
+    media: List[Dict[str, Any]] = []
+    files: Dict[str, Any] = {}
+    digests: List[Optional[str]] = []
+    cached: List[int] = []
+
+    for i, item in enumerate(items):
+        entry: Dict[str, Any] = {"type": item["type"]}
+        if item.get("caption"):
+            entry["caption"] = item["caption"]
+        if item.get("parse_mode"):
+            entry["parse_mode"] = item["parse_mode"]
+
+        source, digest, file_id = item["media"], None, None
+        if _is_reference(source):
+            entry["media"] = source
+        else:
+            missing = _missing_file(source)
+            if missing:
+                return missing
+            if media_cache.applies_to(source):
+                try:
+                    digest = media_cache.content_sha256(source)
+                    if digest is not None and use_cache:
+                        file_id = media_cache.lookup(token, item["type"], digest)
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[MEDIA CACHE ERROR] {e}")
+                    digest = None
+            if file_id:
+                entry["media"] = file_id
+                cached.append(i)
+            else:
+                name = f"file{i}"
+                entry["media"] = f"attach://{name}"
+                files[name] = (item.get("filename") or source_name(source), source)
+        media.append(entry)
+        digests.append(digest)
+
+    payload = {"chat_id": chat_id, "media": json.dumps(media, ensure_ascii=False), **options}
+    data = _request("sendMediaGroup", payload, files=files or None, retry=retry)
+
+    if not data.get("ok"):
+        if cached and media_cache.is_stale_file_error(data):
+            for i in cached:
+                media_cache.invalidate(token, items[i]["type"], digests[i])
+            return _album_request(token, chat_id, items, options, use_cache=False, retry=retry)
+        return data
+
+    for i, message in enumerate(data.get("result") or []):
+        if i >= len(items) or digests[i] is None:
+            continue
+        kind = items[i]["type"]
+        try:
+            if i in cached:
+                media_cache.touch(token, kind, digests[i])
+            else:
+                uploaded = media_cache.extract_file(kind, {"result": message})
+                if uploaded:
+                    media_cache.store(token, kind, digests[i], uploaded)
+        except sqlite3.Error as e:
+            print(f"[MEDIA CACHE ERROR] {e}")
+    return data
+
+
+def _send_album(
+    token: str,
+    chat_id: int | str,
+    items: List[Dict[str, Any]],
+    options: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    data = _album_request(token, chat_id, items, options)
+    if not data.get("ok"):
+        print("Telegram error in sendMediaGroup:", data)
+        return None
+    return data
+
+
+def send_media_group(
+    chat_id: int | str,
+    media: List[MediaSource | Dict[str, Any]],
+    reply_to_message_id: Optional[int] = None,
+    disable_notification: Optional[bool] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Send many photos / videos / documents / audio files as albums.
+
+    The list is split automatically into valid albums (compatible types, at
+    most 10 items each); a lone leftover item is sent with the matching
+    single-file method. Files are streamed and uploads reuse `media_cache`.
+
+    Args:
+        chat_id (int | str): Target chat.
+        media (List[MediaSource | Dict[str, Any]]): Items in order: plain
+            sources (type guessed from the file name) or `input_media(...)`
+            dicts carrying a type and a per-item caption.
+        reply_to_message_id (Optional[int]): The first album replies to it.
+        disable_notification (Optional[bool]): Send silently.
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: One API response per call made, or
+        None as soon as a call fails (albums before it were already sent).
+    """
+    token = _get_token()
+    if not token or not media:
+        return None
+
+    items = [input_media(**m) if isinstance(m, dict) else input_media(m) for m in media]
+
+    responses: List[Dict[str, Any]] = []
+    for n, album in enumerate(_split_albums(items)):
+        options: Dict[str, Any] = {}
+        if disable_notification is not None:
+            options["disable_notification"] = disable_notification
+        if reply_to_message_id and n == 0:
+            options["reply_to_message_id"] = reply_to_message_id
+
+        if len(album) == 1:
+            data = _send_single(chat_id, album[0], options)
+        else:
+            data = _send_album(token, chat_id, album, options)
+        if data is None:
+            return None
+        responses.append(data)
+    return responses
+
+
+# =========================
+#  FILE DOWNLOADS
+# =========================
+
+def get_file(file_id: str) -> Optional[Dict[str, Any]]:
+    """
+    getFile: the File object (`file_path`, `file_size`, ...) or None.
+    """
+    data = _post("getFile", {"file_id": file_id})
+    return data["result"] if data else None
+
+
+def download_file(
+    file_id: str,
+    dest: Optional[str | Path] = None,
+    timeout: int = 60,
+    file_size: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Download a file sent to the bot.
+
+    A self-hosted server in local mode answers getFile with an absolute path
+    on this machine: the file is then read straight from disk (returned as
+    is without `dest`, copied to `dest` otherwise). Otherwise it is streamed
+    from the server's file endpoint; api.telegram.org serves files up to
+    20 MB, so larger ones are refused without calling getFile when their
+    size is known.
+
+    Args:
+        file_id (str): Id of the file.
+        dest (Optional[str | Path]): Where to write it; a temporary file
+            by default.
+        timeout (int): Read timeout of the download, in seconds.
+        file_size (Optional[int]): `file_size` of the message's file object.
+
+    Returns:
+        Optional[str]: Local path of the file, or None after printing the error.
+    """
+    too_big = _too_big_to_download(file_size)
+    if too_big:
+        print(too_big)
+        return None
+    token = _get_token()
+    info = get_file(file_id) if token else None
+    if not info or not info.get("file_path"):
+        return None
+    path = info["file_path"]
+
+    if local_mode() and os.path.isabs(path):
+        if not os.path.isfile(path):
+            print(f"File {path} of the Bot API server is not on this machine.")
+            return None
+        if dest is None:
+            return path
+        shutil.copyfile(path, dest)
+        return str(dest)
+
+    if dest is None:
+        fd, dest = tempfile.mkstemp(suffix=Path(path).suffix)
+        os.close(fd)
+    started = time.monotonic()
+    received = 0
+    try:
+        with get_session(token).get(file_url(token, path), stream=True, timeout=request_timeout(timeout)) as resp:
+            if resp.status_code != 200:
+                metrics.observe("downloadFile", time.monotonic() - started, resp.status_code, resp.status_code)
+                print(f"Telegram error downloading {path}: HTTP {resp.status_code}")
+                return None
+            with open(dest, "wb") as f:
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    received += len(chunk)
+    except requests.RequestException as e:
+        metrics.observe("downloadFile", time.monotonic() - started, metrics.NETWORK_ERROR)
+        print(f"Network error downloading {path}: {e}")
+        return None
+    metrics.observe("downloadFile", time.monotonic() - started, 200, None, 0, received)
+    return str(dest)
 
 
 # =========================
@@ -280,11 +979,17 @@ def unpin_message(
 def send_error_alert(message: str) -> Optional[Dict[str, Any]]:
     """
     Send an error alert to TELEGRAM_ME_ID (your personal Telegram ID).
+
+    When this process runs outbox workers the alert is queued durably and
+    {"ok": True, "result": {"job_id": ...}} is returned without waiting.
     """
     me_id = _get_me_id()
     if not me_id:
         return None
     text = f"ERROR ALERT:\n{message}"
+    from . import outbox  # imported here: outbox itself sends through this module
+    if outbox.workers_running():
+        return {"ok": True, "result": {"job_id": outbox.enqueue_text(me_id, text)}}
     return send_text(me_id, text)
 
 
@@ -0,0 +1,203 @@
+"""
+Splitting of texts longer than one Telegram message (4096 UTF-16 code units).
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+MAX_MESSAGE_LENGTH = 4096
+
+# (name, opening markup) of each formatting entity open at a position
+Stack = Tuple[Tuple[str, str], ...]
+
+_HTML_ATOM = re.compile(r"<[^<>]*>|&#?\w+;", re.S)
+_HTML_TAG = re.compile(r"<\s*(/?)\s*([a-zA-Z0-9-]+)")
+_MD_ATOM = {
+    "Markdown": re.compile(r"\[[^\[\]\n]*\]\([^()\s]*\)|```|[*_`]", re.S),
+    "MarkdownV2": re.compile(r"\\.|\[[^\[\]\n]*\]\([^()\s]*\)|```|\|\||__|[*_`~]", re.S),
+}
+_CODE = ("`", "```")
+_LANGUAGE = re.compile(r"[\w+#.-]*")
+
+
+def utf16_len(text: str) -> int:
+    """
+    Length of `text` as Telegram counts it (UTF-16 code units).
+    """
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _atoms(text: str, parse_mode: Optional[str]) -> List[str]:
+    """
+    Indivisible pieces of `text`: markup tokens and single characters.
+    """
+    pattern = None
+    if parse_mode and parse_mode.upper() == "HTML":
+        pattern = _HTML_ATOM
+    elif parse_mode in _MD_ATOM:
+        pattern = _MD_ATOM[parse_mode]
+    if pattern is None:
+        return list(text)
+
+    atoms: List[str] = []
+    pos = 0
+    for m in pattern.finditer(text):
+        atoms.extend(text[pos:m.start()])
+        atoms.append(m.group(0))
+        pos = m.end()
+    atoms.extend(text[pos:])
+    return atoms
+
+
+def _apply(stack: Stack, atom: str, parse_mode: Optional[str]) -> Stack:
+    """
+    Entity stack after `atom`.
+    """
+    if len(atom) == 1 and atom not in "*_`~":
+        return stack
+    if parse_mode and parse_mode.upper() == "HTML":
+        m = _HTML_TAG.match(atom)
+        if not m:
+            return stack
+        closing, name = m.group(1), m.group(2).lower()
+        if closing:
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == name:
+                    return stack[:i]
+            return stack
+        return stack + ((name, atom),)
+
+    if parse_mode not in _MD_ATOM or atom.startswith(("\\", "[")):
+        return stack
+    if stack and stack[-1][0] in _CODE:
+        # Inside code only the same marker means anything.
+        return stack[:-1] if atom == stack[-1][0] else stack
+    if stack and stack[-1][0] == atom:
+        return stack[:-1]
+    if any(name == atom for name, _ in stack):
+        return stack
+    return stack + ((atom, atom),)
+
+
+def _close(stack: Stack, parse_mode: Optional[str]) -> str:
+    if parse_mode and parse_mode.upper() == "HTML":
+        return "".join(f"</{name}>" for name, _ in reversed(stack))
+    return "".join(name for name, _ in reversed(stack))
+
+
+def _reopen(stack: Stack) -> str:
+    return "".join(markup for _, markup in stack)
+
+
+def _pre_markup(atoms: List[str], k: int) -> str:
+    """
+    Markup that reopens the ``` block opened by atoms[k]: the marker, its
+    language tag and a newline, so the next part's first line stays code.
+    """
+    line = []
+    for atom in atoms[k + 1:]:
+        if atom == "\n":
+            break
+        line.append(atom)
+    else:
+        return "```\n"
+    language = "".join(line)
+    return "```" + (language if _LANGUAGE.fullmatch(language) else "") + "\n"
+
+
+def _boundary_score(atoms: List[str], k: int) -> int:
+    """
+    How good a cut right after atoms[k] is: 3 paragraph, 2 line, 1 word.
+    """
+    atom = atoms[k]
+    if atom == "\n":
+        return 3 if k > 0 and atoms[k - 1] == "\n" else 2
+    if atom in (" ", "\t"):
+        return 1
+    return 0
+
+
+def split_text(
+    text: str,
+    parse_mode: Optional[str] = None,
+    limit: int = MAX_MESSAGE_LENGTH,
+) -> List[str]:
+    """
+    Split `text` into parts of at most `limit` UTF-16 code units.
+
+    Args:
+        text (str): Message text.
+        parse_mode (Optional[str]): None, "HTML", "Markdown" or "MarkdownV2".
+        limit (int): Maximum part length.
+
+    Returns:
+        List[str]: The parts, in order (one part if the text fits).
+    """
+    if utf16_len(text) <= limit:
+        return [text]
+
+    atoms = _atoms(text, parse_mode)
+    sizes = [utf16_len(a) for a in atoms]
+    close_len: Dict[Stack, int] = {}
+
+    def closing(stack: Stack) -> int:
+        if stack not in close_len:
+            close_len[stack] = utf16_len(_close(stack, parse_mode))
+        return close_len[stack]
+
+    parts: List[str] = []
+    stack: Stack = ()
+    i = 0
+    n = len(atoms)
+    while i < n:
+        if not stack:
+            # A part never starts with the whitespace it was cut at.
+            while i < n and atoms[i] in ("\n", " ", "\t"):
+                i += 1
+            if i >= n:
+                break
+
+        prefix = _reopen(stack)
+        used = utf16_len(prefix)
+        half = used + (limit - used) // 2
+        state = stack
+        # Latest cut of each boundary score: score -> (k, state after k, in second half)
+        cuts: Dict[int, Tuple[int, Stack, bool]] = {}
+        k = i
+        while k < n:
+            next_state = _apply(state, atoms[k], parse_mode)
+            if used + sizes[k] + closing(next_state) > limit:
+                break
+            used += sizes[k]
+            if len(next_state) > len(state) and next_state[-1] == ("```", "```"):
+                next_state = next_state[:-1] + (("```", _pre_markup(atoms, k)),)
+            state = next_state
+            cuts[_boundary_score(atoms, k)] = (k, state, used > half)
+            k += 1
+
+        if k >= n:
+            end, end_state = n - 1, state
+        elif not cuts:
+            if len(atoms[i]) == 1:
+                raise ValueError(f"limit {limit} is too small to split this text")
+            # A single atom over the limit (a huge link): cut it as plain text.
+            atoms[i:i + 1] = list(atoms[i])
+            sizes[i:i + 1] = [utf16_len(c) for c in atoms[i:i + 1 + len(atoms) - n]]
+            n = len(atoms)
+            continue
+        else:
+            # The best boundary that does not leave a tiny part, else the
+            # best boundary at all, else as much as fits.
+            ranked = [cuts[s] for s in (3, 2, 1) if s in cuts]
+            late = [c for c in ranked if c[2]]
+            end, end_state, _ = (late or ranked or [cuts[0]])[0]
+
+        body = "".join(atoms[i:end + 1])
+        if not any(name in _CODE or name == "pre" for name, _ in end_state):
+            body = body.rstrip(" \t\n")
+        parts.append(prefix + body + _close(end_state, parse_mode))
+        stack = end_state
+        i = end + 1
+
+    return [p for p in parts if p.strip()]
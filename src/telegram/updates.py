@@ -0,0 +1,480 @@
+"""
+Incremental getUpdates ingester: every update is fetched once.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from . import db, telegram_fetch
+from .media_cache import token_key
+
+# =========================
+#  Settings
+# =========================
+
+DEFAULT_POLL_TIMEOUT = 30       # seconds a background long poll waits for updates
+POLL_READ_MARGIN = 10.0         # extra read timeout on top of the long-poll timeout
+BATCH_LIMIT = 100               # updates per getUpdates call (Telegram's maximum)
+MAX_DRAIN_BATCHES = 50          # getUpdates calls per `drain()`
+ERROR_BACKOFF = 5.0             # seconds the background poller sleeps after an error
+
+# =========================
+#  Dispatch Table
+# =========================
+
+Chat = Dict[str, Any]
+ChatExtractor = Callable[[Dict[str, Any]], Optional[Chat]]
+
+
+def _chat_field(obj: Dict[str, Any]) -> Optional[Chat]:
+    return obj.get("chat")
+
+
+def _message_chat(obj: Dict[str, Any]) -> Optional[Chat]:
+    # callback_query: inline-mode buttons have no message, only inline_message_id
+    message = obj.get("message") or {}
+    return message.get("chat")
+
+
+def _business_connection_chat(obj: Dict[str, Any]) -> Optional[Chat]:
+    user = obj.get("user") or {}
+    if obj.get("user_chat_id") is None:
+        return None
+    return {
+        "id": obj["user_chat_id"],
+        "type": "private",
+        "username": user.get("username"),
+        "first_name": user.get("first_name"),
+        "last_name": user.get("last_name"),
+    }
+
+
+def _poll_answer_chat(obj: Dict[str, Any]) -> Optional[Chat]:
+    # Only anonymous votes of a channel carry a chat; user votes do not
+    return obj.get("voter_chat")
+
+
+def _no_chat(obj: Dict[str, Any]) -> Optional[Chat]:
+    # Updates about a user outside any chat (the user may never have
+    # started the bot, so their id is not a chat the bot can write to)
+    return None
+
+
+# Every update type of the Bot API -> how to find the chat it belongs to.
+# An update carries exactly one of these keys besides `update_id`.
+CHAT_EXTRACTORS: Dict[str, ChatExtractor] = {
+    "message": _chat_field,
+    "edited_message": _chat_field,
+    "channel_post": _chat_field,
+    "edited_channel_post": _chat_field,
+    "business_connection": _business_connection_chat,
+    "business_message": _chat_field,
+    "edited_business_message": _chat_field,
+    "deleted_business_messages": _chat_field,
+    "message_reaction": _chat_field,
+    "message_reaction_count": _chat_field,
+    "inline_query": _no_chat,
+    "chosen_inline_result": _no_chat,
+    "callback_query": _message_chat,
+    "shipping_query": _no_chat,
+    "pre_checkout_query": _no_chat,
+    "purchased_paid_media": _no_chat,
+    "poll": _no_chat,
+    "poll_answer": _poll_answer_chat,
+    "my_chat_member": _chat_field,
+    "chat_member": _chat_field,
+    "chat_join_request": _chat_field,
+    "chat_boost": _chat_field,
+    "removed_chat_boost": _chat_field,
+}
+
+
+def update_type(update: Dict[str, Any]) -> Optional[str]:
+    """
+    The update type (`message`, `callback_query`, ...), or None for a type
+    missing from CHAT_EXTRACTORS.
+    """
+    for key in update:
+        if key in CHAT_EXTRACTORS:
+            return key
+    return None
+
+
+def extract_chat(update: Dict[str, Any]) -> Optional[Chat]:
+    """
+    Extract the chat dictionary from a Telegram update of any type.
+
+    Args:
+        update (Dict[str, Any]): A single update from getUpdates.
+
+    Returns:
+        Optional[Dict[str, Any]]: The chat object if the update has one, else None.
+    """
+    kind = update_type(update)
+    if kind is None:
+        return None
+    chat = CHAT_EXTRACTORS[kind](update[kind] or {})
+    if not chat or chat.get("id") is None:
+        return None
+    return chat
+
+
+def allowed_updates() -> Optional[List[str]]:
+    """
+    Update types to request: TELEGRAM_ALLOWED_UPDATES (comma-separated), or
+    None to keep the bot's current setting. Telegram remembers the list for
+    every later getUpdates call, the bot's own included, so it is only sent
+    when configured. `chat_member` and the reaction updates must be listed
+    explicitly to be delivered.
+    """
+    raw = os.getenv("TELEGRAM_ALLOWED_UPDATES", "")
+    kinds = [k.strip() for k in raw.split(",") if k.strip()]
+    return kinds or None
+
+
+def bot_polls() -> bool:
+    """
+    True when the bot of TELEGRAM_BOT_TOKEN consumes its own updates
+    (TELEGRAM_BOT_POLLS=1): fetching them here would take them from the bot,
+    so `drain()` leaves them alone and the bot stores them via `recorder()`.
+    """
+    return os.getenv("TELEGRAM_BOT_POLLS", "").lower() in ("1", "true", "yes")
+
+
+# =========================
+#  Store
+# =========================
+
+_schema_ready: set[str] = set()
+
+_UPSERT_CHAT_SQL = """
+    INSERT INTO known_chats (
+        token_key, chat_id, type, title, username, first_name, last_name,
+        first_seen_ts, last_seen_ts, last_update_id, last_update
+    )
+    VALUES (
+        :token_key, :chat_id, :type, :title, :username, :first_name, :last_name,
+        :now, :now, :last_update_id, :last_update
+    )
+    ON CONFLICT(token_key, chat_id) DO UPDATE SET
+        type = excluded.type,
+        title = excluded.title,
+        username = excluded.username,
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        last_seen_ts = excluded.last_seen_ts,
+        last_update_id = excluded.last_update_id,
+        last_update = excluded.last_update
+    WHERE excluded.last_update_id > known_chats.last_update_id
+"""
+
+_UPSERT_OFFSET_SQL = """
+    INSERT INTO update_offsets (token_key, last_update_id, updated_ts)
+    VALUES (?, ?, ?)
+    ON CONFLICT(token_key) DO UPDATE SET
+        last_update_id = MAX(last_update_id, excluded.last_update_id),
+        updated_ts = excluded.updated_ts
+"""
+
+
+def _ensure_schema() -> bool:
+    """
+    Run the migrations once per database file; False if the DB is unusable.
+    """
+    path = str(db.DB_PATH)
+    if path in _schema_ready:
+        return True
+    try:
+        db.init_db()
+    except sqlite3.Error as e:
+        print(f"[UPDATES ERROR] {e}")
+        return False
+    _schema_ready.add(path)
+    return True
+
+
+def _token() -> str:
+    return os.getenv("TELEGRAM_BOT_TOKEN", "")
+
+
+def last_update_id(token: Optional[str] = None) -> int:
+    """
+    The last update_id stored for `token` (default TELEGRAM_BOT_TOKEN), 0 if none.
+    """
+    if not _ensure_schema():
+        return 0
+    with db._pool().connection() as conn:
+        row = conn.execute(
+            "SELECT last_update_id FROM update_offsets WHERE token_key = ?",
+            (token_key(token or _token()),),
+        ).fetchone()
+    return row["last_update_id"] if row else 0
+
+
+def store_updates(token: str, updates: List[Dict[str, Any]]) -> int:
+    """
+    Upsert the chats of a batch of updates and advance the stored offset,
+    in one transaction. Each chat is written once, with its latest update.
+
+    Args:
+        token (str): Bot token the updates were fetched with.
+        updates (List[Dict[str, Any]]): Updates in getUpdates order.
+
+    Returns:
+        int: Number of distinct chats in the batch.
+    """
+    if not updates:
+        return 0
+    key = token_key(token)
+    now = int(time.time())
+
+    latest: Dict[int, Dict[str, Any]] = {}
+    for update in updates:
+        chat = extract_chat(update)
+        if chat is None:
+            continue
+        latest[chat["id"]] = {
+            "token_key": key,
+            "chat_id": chat["id"],
+            "type": chat.get("type"),
+            "title": chat.get("title"),
+            "username": chat.get("username"),
+            "first_name": chat.get("first_name"),
+            "last_name": chat.get("last_name"),
+            "now": now,
+            "last_update_id": update["update_id"],
+            "last_update": json.dumps(update, ensure_ascii=False),
+        }
+
+    with db._transaction() as conn:
+        if latest:
+            conn.executemany(_UPSERT_CHAT_SQL, list(latest.values()))
+        conn.execute(_UPSERT_OFFSET_SQL, (key, max(u["update_id"] for u in updates), now))
+    return len(latest)
+
+
+def _chat_row(row: sqlite3.Row) -> Chat:
+    return {
+        "id": row["chat_id"],
+        "type": row["type"],
+        "title": row["title"],
+        "username": row["username"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+    }
+
+
+def known_chats(token: Optional[str] = None) -> List[Chat]:
+    """
+    Every chat seen in an update for `token`, most recently active first.
+    """
+    if not _ensure_schema():
+        return []
+    with db._pool().connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT chat_id, type, title, username, first_name, last_name
+            FROM known_chats
+            WHERE token_key = ?
+            ORDER BY last_update_id DESC
+            """,
+            (token_key(token or _token()),),
+        ).fetchall()
+    return [_chat_row(row) for row in rows]
+
+
+def last_chat(token: Optional[str] = None) -> Optional[Tuple[Chat, Dict[str, Any]]]:
+    """
+    The chat of the most recent update for `token` and that update, or None.
+    """
+    if not _ensure_schema():
+        return None
+    with db._pool().connection() as conn:
+        row = conn.execute(
+            """
+            SELECT chat_id, type, title, username, first_name, last_name, last_update
+            FROM known_chats
+            WHERE token_key = ?
+            ORDER BY last_update_id DESC
+            LIMIT 1
+            """,
+            (token_key(token or _token()),),
+        ).fetchone()
+    if row is None:
+        return None
+    return _chat_row(row), json.loads(row["last_update"])
+
+
+# =========================
+#  Ingest
+# =========================
+
+# One getUpdates call at a time per process: Telegram answers 409 to a
+# second concurrent poll, and the running one stores whatever arrives.
+_poll_lock = threading.Lock()
+
+
+def ingest_once(
+    timeout: float = 0,
+    allowed: Optional[List[str]] = None,
+    limit: int = BATCH_LIMIT,
+) -> Tuple[bool, Optional[str], int]:
+    """
+    Fetch the updates after the stored offset and store their chats.
+
+    Args:
+        timeout (float): Long-poll timeout in seconds (0 returns at once).
+        allowed (Optional[List[str]]): Update types to request; defaults to
+            `allowed_updates()` (not sent when unset).
+        limit (int): Maximum number of updates to fetch (1-100).
+
+    Returns:
+        Tuple: (success flag, error message, number of updates fetched).
+        When another thread is already polling, returns (True, None, 0).
+    """
+    ok, err, api_url = telegram_fetch._build_api_url()
+    if not ok or not api_url:
+        return False, err, 0
+    if not _ensure_schema():
+        return False, "Database is unavailable.", 0
+    if not _poll_lock.acquire(blocking=False):
+        return True, None, 0
+
+    try:
+        token = _token()
+        params: Dict[str, Any] = {
+            "offset": last_update_id(token) + 1,
+            "limit": limit,
+            "timeout": int(timeout),
+        }
+        if allowed is None:
+            allowed = allowed_updates()
+        if allowed is not None:
+            params["allowed_updates"] = json.dumps(allowed)
+        try:
+            data = telegram_fetch._get(api_url, "getUpdates", timeout + POLL_READ_MARGIN, params)
+        except Exception as e:
+            return False, f"Network error in getUpdates: {e}", 0
+
+        if not data.get("ok"):
+            return False, f"Telegram Error in getUpdates: {data}", 0
+
+        updates = data.get("result") or []
+        try:
+            store_updates(token, updates)
+        except sqlite3.Error as e:
+            return False, f"Database error while storing updates: {e}", 0
+        return True, None, len(updates)
+    finally:
+        _poll_lock.release()
+
+
+def drain(max_batches: int = MAX_DRAIN_BATCHES) -> Tuple[bool, Optional[str], int]:
+    """
+    Fetch every pending update without waiting (up to `max_batches` calls).
+    Nothing is fetched when the bot polls on its own (`bot_polls()`).
+
+    Returns:
+        Tuple: (success flag, error message, number of updates fetched)
+    """
+    if bot_polls():
+        return True, None, 0
+    total = 0
+    for _ in range(max_batches):
+        ok, err, count = ingest_once(timeout=0)
+        total += count
+        if not ok:
+            return False, err, total
+        if count < BATCH_LIMIT:
+            break
+    return True, None, total
+
+
+def recorder(token: str) -> Callable[[Any, Any], Awaitable[None]]:
+    """
+    A python-telegram-bot handler callback that stores every update the bot
+    receives, so the panel sees its chats without calling getUpdates.
+
+    Register it ahead of the bot's own handlers:
+    `app.add_handler(TypeHandler(Update, recorder(token)), group=-1)`.
+    """
+    async def record(update: Any, context: Any) -> None:
+        if not _ensure_schema():
+            return
+        try:
+            store_updates(token, [update.to_dict()])
+        except sqlite3.Error as e:
+            print(f"[UPDATES ERROR] {e}")
+
+    return record
+
+
+# =========================
+#  Background Poller
+# =========================
+
+class UpdatePoller:
+    """
+    A daemon thread that long-polls `ingest_once` until stopped.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_POLL_TIMEOUT) -> None:
+        self.timeout = timeout
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="update-poller", daemon=True)
+
+    def start(self) -> "UpdatePoller":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            ok, err, _ = ingest_once(timeout=self.timeout)
+            if not ok:
+                self.last_error = err
+                print(f"[UPDATES ERROR] {err}")
+                self._stop.wait(ERROR_BACKOFF)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Ask the thread to stop; it exits once the current long poll returns.
+        """
+        self._stop.set()
+        self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self._stop.is_set()
+
+
+_poller: Optional[UpdatePoller] = None
+_poller_lock = threading.Lock()
+
+
+def start_poller(timeout: float = DEFAULT_POLL_TIMEOUT) -> UpdatePoller:
+    """
+    Start this process's background poller (idempotent).
+
+    Telegram allows one getUpdates consumer per bot: do not poll a token
+    whose bot polls on its own (TELEGRAM_BOT_POLLS) or uses a webhook (the
+    API answers 409).
+    """
+    global _poller
+    with _poller_lock:
+        if _poller is None or not _poller.running:
+            _poller = UpdatePoller(timeout).start()
+        return _poller
+
+
+def stop_poller(timeout: Optional[float] = None) -> None:
+    global _poller
+    with _poller_lock:
+        poller, _poller = _poller, None
+    if poller is not None:
+        poller.stop(timeout)
@@ -1,20 +1,25 @@
 from __future__ import annotations
 
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 
 from telegram import User, Chat
 
+from .sqlite_pool import get_pool
+
 # Path to the database: /data/telegram_users.db
 DB_PATH = Path(__file__).resolve().parents[2] / "data" / "telegram_users.db"
 
 
-def _get_connection() -> sqlite3.Connection:
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+@contextmanager
+def _get_connection() -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection (foreign keys enabled) and commit on success.
+    """
+    with get_pool(DB_PATH, foreign_keys=True).transaction() as conn:
+        yield conn
 
 
 def init_db() -> None:
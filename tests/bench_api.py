@@ -0,0 +1,64 @@
+"""
+Offline load test of the Bot API client against the fake server.
+Run from the project root: python -m tests.bench_api --help
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.telegram import http_client, metrics, telegram_utils  # noqa: E402
+from src.telegram.fake_api import FakeBotAPI  # noqa: E402
+
+TOKEN = "123:BENCH"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=60.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="server-side calls/s before 429")
+    args = parser.parse_args()
+
+    api = FakeBotAPI(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        flood_rate=args.flood_rate,
+        rate_limit=args.rate_limit,
+        seed=1,
+    )
+    with tempfile.TemporaryDirectory() as tmp, api:
+        os.environ["TELEGRAM_BOT_TOKEN"] = TOKEN
+        os.environ["TELEGRAM_API_BASE_URL"] = api.url
+        os.environ.setdefault("TELEGRAM_RATE_DB", os.path.join(tmp, "ratelimit.db"))
+        metrics.reset()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            results = list(pool.map(lambda i: telegram_utils.send_text(1 + i % 100, f"message {i}"), range(args.calls)))
+        elapsed = time.perf_counter() - start
+        http_client.close_sessions()
+
+    snap = metrics.snapshot().get("sendMessage", {})
+    ok = sum(1 for r in results if r)
+    print(f"{ok}/{args.calls} sent in {elapsed:.2f}s  ({ok / elapsed:.1f} msg/s)")
+    print(f"attempts {snap.get('calls', 0)}  p50 {snap.get('p50', 0) * 1000:.0f} ms  p99 {snap.get('p99', 0) * 1000:.0f} ms")
+    print(f"retries {snap.get('retries', {})}  errors {snap.get('errors', {})}  injected {dict(api.faults)}")
+
+
+if __name__ == "__main__":
+    main()
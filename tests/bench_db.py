@@ -0,0 +1,104 @@
+"""
+Micro-benchmarks for the SQLite logging path (on a temporary database).
+Run from the project root: python -m tests.bench_db --help
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.telegram import db  # noqa: E402
+from src.telegram.sqlite_pool import close_all_pools  # noqa: E402
+
+
+def _legacy_add_message(chat_id: int, direction: str, text: str, bot_profile: str) -> None:
+    """
+    The original write path: one fresh connection (and one commit) per message.
+    """
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute(
+        """
+        INSERT INTO messages (chat_id, direction, text, created_at, bot_profile)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (chat_id, direction, text, db._now()[0], bot_profile),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _add_and_flush(n: int) -> Callable[[int, str, str, str], None]:
+    """
+    Wrap `db.add_message` so the last call waits for the queue to drain,
+    keeping the timing honest for the write-behind mode.
+    """
+    def write(chat_id: int, direction: str, text: str, bot_profile: str) -> None:
+        db.add_message(chat_id, direction, text, bot_profile=bot_profile)
+        if text == f"message {n - 1}":
+            db.flush_writes()
+
+    return write
+
+
+def _run(
+    name: str,
+    n: int,
+    write: Callable[[int, str, str, str], None],
+    legacy: bool = False,
+) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+
+        if legacy:
+            # The old code never enabled WAL: put the file back in rollback-journal mode.
+            close_all_pools()
+            conn = sqlite3.connect(db.DB_PATH)
+            conn.execute("PRAGMA journal_mode = DELETE")
+            conn.close()
+
+        start = time.perf_counter()
+        for i in range(n):
+            write(i % 100, "in" if i % 2 else "out", f"message {i}", "bench")
+        elapsed = time.perf_counter() - start
+
+        close_all_pools()
+
+    rate = n / elapsed
+    print(f"{name:<28} {n:>8} msgs  {elapsed:8.3f}s  {rate:>10.0f} msg/s")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    original = db.DB_PATH
+    try:
+        before = _run("connect-per-call (legacy)", args.messages, _legacy_add_message, legacy=True)
+        after = _run("pooled WAL connection", args.messages, db.add_message)
+
+        db.enable_write_behind()
+        try:
+            behind = _run("write-behind group commit", args.messages, _add_and_flush(args.messages))
+        finally:
+            db.disable_write_behind()
+    finally:
+        db.DB_PATH = original
+
+    print(f"speed-up (pooled):       x{after / before:.1f}")
+    print(f"speed-up (write-behind): x{behind / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Micro-benchmark: one connection per call vs. pooled keep-alive sessions.
+Run from the project root: python -m tests.bench_http --help
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.telegram import http_client, telegram_utils  # noqa: E402
+from tests.test_http_client import _StubHandler  # noqa: E402
+
+TOKEN = "123:BENCH"
+
+
+def _self_signed(tmp: Path) -> tuple[Path, Path]:
+    cert, key = tmp / "cert.pem", tmp / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(key), "-out", str(cert), "-days", "1",
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def _start_server(tls: bool, tmp: Path) -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.ports = set()
+    server.paths = []
+    scheme = "http"
+    if tls:
+        cert, key = _self_signed(tmp)
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(cert, key)
+        server.socket = ctx.wrap_socket(server.socket, server_side=True)
+        os.environ["REQUESTS_CA_BUNDLE"] = str(cert)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}"
+
+
+def _legacy_send(base_url: str, i: int) -> None:
+    """
+    The original `_post`: module-level requests.post, new connection every call.
+    """
+    url = f"{base_url}/bot{TOKEN}/sendMessage"
+    requests.post(url, data={"chat_id": 1, "text": f"message {i}"}, timeout=30).json()
+
+
+def _pooled_send(base_url: str, i: int) -> None:
+    telegram_utils.send_text(1, f"message {i}")
+
+
+def _run(name: str, n: int, send, base_url: str, server: ThreadingHTTPServer) -> float:
+    server.ports.clear()
+    start = time.perf_counter()
+    for i in range(n):
+        send(base_url, i)
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / n * 1000
+    print(f"{name:<28} {n:>6} calls  {elapsed:7.3f}s  {per_call:7.2f} ms/call  {len(server.ports):>5} connections")
+    return per_call
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--no-tls", action="store_true", help="Plain HTTP stand-in server")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server, base_url = _start_server(not args.no_tls, Path(tmp))
+        os.environ["TELEGRAM_BOT_TOKEN"] = TOKEN
+        http_client.API_BASE_URL = base_url
+        try:
+            before = _run("connection per call (legacy)", args.calls, _legacy_send, base_url, server)
+            after = _run("pooled keep-alive session", args.calls, _pooled_send, base_url, server)
+        finally:
+            http_client.close_sessions()
+            server.shutdown()
+            server.server_close()
+
+    print(f"latency saved per call: {before - after:.2f} ms (x{before / after:.1f})")
+
+
+if __name__ == "__main__":
+    main()
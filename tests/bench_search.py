@@ -0,0 +1,101 @@
+"""
+Benchmark for full-text search over a synthetic message log.
+Run from the project root: python -m tests.bench_search --help
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.telegram import db  # noqa: E402
+from src.telegram.sqlite_pool import close_all_pools  # noqa: E402
+
+PROFILES = ["quran", "gmail", "default_bot", "support"]
+COMMON = ["surah", "next", "verse", "please", "thanks", "hello"]
+VOCABULARY = [f"w{i}" for i in range(20_000)]
+
+
+def _fill(rows: int, batch: int = 50_000) -> None:
+    rnd = random.Random(42)
+    written = 0
+    start = time.perf_counter()
+    while written < rows:
+        n = min(batch, rows - written)
+        data = []
+        for i in range(n):
+            words = rnd.sample(COMMON, 2) + rnd.choices(VOCABULARY, k=8)
+            data.append(
+                (
+                    rnd.randrange(50_000),
+                    "in" if i % 2 else "out",
+                    " ".join(words),
+                    "2025-01-01T00:00:00",
+                    1735689600 + written + i,
+                    PROFILES[(written + i) % len(PROFILES)],
+                )
+            )
+        with db._transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO messages (chat_id, direction, text, created_at, created_ts, bot_profile)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                data,
+            )
+        written += n
+    with db._transaction() as conn:
+        conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('optimize')")
+    print(f"inserted {rows} rows in {time.perf_counter() - start:.1f}s")
+
+
+def _time(label: str, queries: List[str], order: str) -> None:
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        db.search_messages("quran", q, limit=20, order=order)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<18} {order:<7} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    original = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench_search.db"
+        try:
+            db.init_db()
+            _fill(args.rows)
+
+            rare = [rnd.choice(VOCABULARY) for _ in range(args.queries)]
+            pairs = [f"{rnd.choice(COMMON)} {rnd.choice(VOCABULARY)}" for _ in range(args.queries)]
+            common = [rnd.choice(COMMON) for _ in range(args.queries)]
+
+            for order in ("rank", "recent"):
+                _time("rare word", rare, order)
+                _time("common + rare", pairs, order)
+                _time("common word", common, order)
+        finally:
+            close_all_pools()
+            db.DB_PATH = original
+
+
+if __name__ == "__main__":
+    main()
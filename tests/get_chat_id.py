@@ -10,7 +10,8 @@ if not TOKEN:
     print("Token not found. Please add TELEGRAM_BOT_TOKEN to your .env file.")
     raise SystemExit
 
-url = f"https://api.telegram.org/bot{TOKEN}/getUpdates"
+API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL") or "https://api.telegram.org"
+url = f"{API_BASE_URL.rstrip('/')}/bot{TOKEN}/getUpdates"
 resp = requests.get(url, timeout=10).json()
 
 if not resp.get("ok"):
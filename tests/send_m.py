@@ -6,6 +6,8 @@ load_dotenv()
 
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+# Point at a local fake server with TELEGRAM_API_BASE_URL (see src/telegram/fake_api.py)
+API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL") or "https://api.telegram.org"
 
 def send_msg(text: str):
     """
@@ -18,7 +20,7 @@ def send_msg(text: str):
         None
     """
     requests.post(
-        f"https://api.telegram.org/bot{TOKEN}/sendMessage",
+        f"{API_BASE_URL.rstrip('/')}/bot{TOKEN}/sendMessage",
         json={"chat_id": CHAT_ID, "text": text}
     )
 
@@ -0,0 +1,119 @@
+import threading
+import time
+import unittest
+
+from src.telegram import broadcast, telegram_utils
+from tests.test_http_client import StubServerTestCase
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate_is_respected(self) -> None:
+        bucket = broadcast.TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        for _ in range(31):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.29)
+
+    def test_pause(self) -> None:
+        bucket = broadcast.TokenBucket(rate=1000)
+        bucket.pause(0.2)
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+
+class TestBroadcast(StubServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def _count(self, chat_id: str) -> int:
+        with self.lock:
+            self.calls[chat_id] = self.calls.get(chat_id, 0) + 1
+            return self.calls[chat_id]
+
+    def test_results_in_order_with_progress(self) -> None:
+        progress = []
+        results = broadcast.run_broadcast(
+            list(range(1, 41)),
+            "hello",
+            on_progress=lambda done, total, r: progress.append((done, total)),
+            rate=1000,
+        )
+        self.assertEqual([r["chat_id"] for r in results], list(range(1, 41)))
+        self.assertTrue(all(r["ok"] and r["attempts"] == 1 for r in results))
+        self.assertEqual(progress[-1], (40, 40))
+        self.assertEqual(len(progress), 40)
+
+    def test_retry_after_and_permanent_errors(self) -> None:
+        def responder(path, form):
+            chat_id = form["chat_id"]
+            n = self._count(chat_id)
+            if chat_id == "5" and n == 1:
+                return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                             "parameters": {"retry_after": 1}}
+            if chat_id == "7":
+                return 403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked"}
+            return 200, {"ok": True, "result": {"message_id": int(chat_id)}}
+
+        self.server.responder = responder
+        start = time.monotonic()
+        results = broadcast.run_broadcast(list(range(1, 11)), "hi", rate=1000)
+
+        self.assertGreaterEqual(time.monotonic() - start, 1.0)
+        self.assertEqual((results[4]["ok"], results[4]["attempts"]), (True, 2))
+        self.assertEqual((results[6]["ok"], results[6]["error_code"], results[6]["attempts"]), (False, 403, 1))
+        self.assertEqual(self.calls["7"], 1)
+        self.assertEqual(results[0]["response"]["result"]["message_id"], 1)
+
+    def test_per_chat_pacing(self) -> None:
+        start = time.monotonic()
+        results = broadcast.run_broadcast([1, 1, 1, -100, -100], "x", rate=1000,
+                                          private_interval=0.2, group_interval=0.3)
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertGreaterEqual(time.monotonic() - start, 0.39)
+
+    def test_long_text_is_split_and_paced_per_part(self) -> None:
+        sent = []
+
+        def responder(path, form):
+            with self.lock:
+                sent.append(form)
+                return 200, {"ok": True, "result": {"message_id": len(sent)}}
+
+        self.server.responder = responder
+        start = time.monotonic()
+        results = broadcast.run_broadcast([1, 2], "word " * 2000, rate=1000, private_interval=0.2)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.39)   # 3 parts per chat, paced
+        self.assertTrue(all(r["ok"] and r["attempts"] == 3 for r in results))
+        for result in results:
+            chat_forms = [f for f in sent if f["chat_id"] == str(result["chat_id"])]
+            self.assertEqual(len(chat_forms), 3)
+            self.assertTrue(all(len(f["text"]) <= 4096 for f in chat_forms))
+            ids = result["response"]["message_ids"]
+            self.assertEqual([f.get("reply_to_message_id") for f in chat_forms], [None, str(ids[0]), str(ids[1])])
+
+    def test_legacy_broadcast_keeps_its_return_shape(self) -> None:
+        self.server.responder = lambda path, form: (
+            (400, {"ok": False, "error_code": 400, "description": "chat not found"})
+            if form["chat_id"] == "2" else (200, {"ok": True, "result": {}})
+        )
+        self.assertEqual(
+            telegram_utils.broadcast([1, 2, 3], "x"),
+            [{"ok": True, "result": {}}, None, {"ok": True, "result": {}}],
+        )
+
+    def test_closing_the_iterator_stops_sending(self) -> None:
+        it = broadcast.iter_broadcast(list(range(1, 201)), "x", rate=20, workers=2)
+        next(it)
+        it.close()
+        sent = len(self.server.paths)
+        time.sleep(0.2)
+        self.assertEqual(len(self.server.paths), sent)
+        self.assertLess(sent, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+
+from src.telegram import chat_info
+from tests.test_fake_api import FakeApiTestCase
+
+
+class ChatInfoTestCase(FakeApiTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        chat_info.reset()
+
+    def tearDown(self) -> None:
+        chat_info.wait_idle(10)   # before the server goes away
+        chat_info.reset()
+        super().tearDown()
+
+
+class TestGet(ChatInfoTestCase):
+    def test_getchat_is_cached_in_memory_then_on_disk(self) -> None:
+        self.assertEqual(chat_info.get(5)["first_name"], "User5")
+        self.assertEqual(chat_info.get(5)["first_name"], "User5")
+        self.assertEqual(self.api.calls["getChat"], 1)
+
+        chat_info.reset()   # a new process: only the table is left
+        self.assertEqual(chat_info.get(5)["first_name"], "User5")
+        self.assertEqual(self.api.calls["getChat"], 1)
+        self.assertEqual(chat_info.stats()["db_hits"], 1)
+
+    def test_kinds_apply_to_their_chats(self) -> None:
+        self.assertEqual(chat_info.get(-100, "member_count")["count"], chat_info.get(-100, "member_count")["count"])
+        self.assertIsNone(chat_info.get(5, "member_count"))
+        self.assertEqual(chat_info.get(5, "photos")["file_id"], "photo-5-160")
+        self.assertIsNone(chat_info.get(-100, "photos"))
+        self.assertEqual(self.api.calls["getChatMemberCount"], 1)
+        self.assertEqual(self.api.calls["getUserProfilePhotos"], 1)
+
+    def test_stale_entries_are_fetched_again(self) -> None:
+        chat_info.get(5)
+        os.environ["TELEGRAM_CHAT_INFO_TTL_SEC"] = "0"
+        self.addCleanup(os.environ.pop, "TELEGRAM_CHAT_INFO_TTL_SEC", None)
+        chat_info.get(5)
+        self.assertEqual(self.api.calls["getChat"], 2)
+
+        # A transient failure keeps the stale answer
+        self.api.error_rate = 1.0
+        os.environ["TELEGRAM_FLOW_CONTROL"] = "0"
+        self.addCleanup(os.environ.pop, "TELEGRAM_FLOW_CONTROL", None)
+        self.assertEqual(chat_info.get(5)["id"], 5)
+
+    def test_refused_chats_are_cached_as_errors(self) -> None:
+        self.api.unknown_chats.add(7)
+        self.assertIsNone(chat_info.get(7))
+        self.assertIsNone(chat_info.get(7))
+        self.assertEqual(self.api.calls["getChat"], 1)
+
+        chat_info.invalidate(7)
+        self.api.unknown_chats.clear()
+        self.assertEqual(chat_info.get(7)["id"], 7)
+
+    def test_lru_is_bounded(self) -> None:
+        os.environ["TELEGRAM_CHAT_INFO_CACHE_SIZE"] = "3"
+        self.addCleanup(os.environ.pop, "TELEGRAM_CHAT_INFO_CACHE_SIZE", None)
+        chat_info.reset()
+        for chat_id in range(1, 6):
+            chat_info.get(chat_id)
+        stats = chat_info.stats()
+        self.assertEqual((stats["size"], stats["evictions"]), (3, 2))
+
+
+class TestGetMany(ChatInfoTestCase):
+    def test_page_is_enriched_by_the_background_refresh(self) -> None:
+        ids = list(range(1, 121)) + [-100, -200]
+        first = chat_info.get_many(ids, kinds=("chat", "member_count"))
+        self.assertTrue(all(v["chat"] is None for v in first.values()))
+
+        self.assertTrue(chat_info.wait_idle(20))
+        self.assertEqual(self.api.calls["getChat"], len(ids))
+        self.assertEqual(self.api.calls["getChatMemberCount"], 2)
+
+        info = chat_info.get_many(ids, kinds=("chat", "member_count"))
+        self.assertEqual(chat_info.display_name(info[3]["chat"]), "User3")
+        self.assertEqual(chat_info.display_name(info[-100]["chat"]), "Group -100")
+        self.assertIsNone(info[3]["member_count"])
+        self.assertIsNotNone(info[-200]["member_count"]["count"])
+        self.assertEqual(chat_info.stats()["pending"], 0)
+
+        # Served from the table after a restart, with no API calls
+        chat_info.reset()
+        calls = sum(self.api.calls.values())
+        info = chat_info.get_many(ids, kinds=("chat",))
+        self.assertEqual(len([v for v in info.values() if v["chat"]]), len(ids))
+        self.assertEqual(sum(self.api.calls.values()), calls)
+        self.assertEqual(chat_info.prefetch(ids), 0)
+
+    def test_duplicates_are_fetched_once(self) -> None:
+        chat_info.get_many([5, 5, 6])
+        chat_info.get_many([5, 6])
+        chat_info.wait_idle(10)
+        self.assertEqual(self.api.calls["getChat"], 2)
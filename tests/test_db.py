@@ -0,0 +1,304 @@
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.telegram import db
+from src.telegram.sqlite_pool import close_all_pools, get_pool
+
+
+class DBTestCase(unittest.TestCase):
+    """
+    Points `db.DB_PATH` at a throwaway file for every test.
+    """
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self._orig_path = db.DB_PATH
+        db.DB_PATH = Path(self._tmp.name) / "telegram_data.db"
+        db.init_db()
+
+    def tearDown(self) -> None:
+        close_all_pools()
+        db.DB_PATH = self._orig_path
+        self._tmp.cleanup()
+
+
+class TestConnectionPool(DBTestCase):
+    def test_wal_and_pragmas(self) -> None:
+        with db._get_conn() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+
+    def test_connections_are_reused(self) -> None:
+        for i in range(20):
+            db.add_message(1, "in", f"hello {i}", bot_profile="quran")
+        stats = get_pool(db.DB_PATH).stats()
+        self.assertEqual(stats["open"], 1)
+        self.assertEqual(len(db.get_messages_for_chat(1)), 20)
+
+    def test_nested_transaction_joins_outer(self) -> None:
+        with self.assertRaises(RuntimeError):
+            with db._transaction():
+                db.add_message(1, "in", "rolled back", bot_profile="quran")
+                raise RuntimeError("boom")
+        self.assertEqual(db.get_messages_for_chat(1), [])
+
+    def test_concurrent_writers(self) -> None:
+        def worker(n: int) -> None:
+            for i in range(50):
+                db.add_message(n, "in", f"{n}-{i}", bot_profile="quran")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with db._get_conn() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        self.assertEqual(total, 400)
+        self.assertLessEqual(get_pool(db.DB_PATH).stats()["open"], 4)
+
+
+class TestWriteBehind(DBTestCase):
+    def tearDown(self) -> None:
+        db.disable_write_behind()
+        super().tearDown()
+
+    def test_rows_are_flushed_in_batches(self) -> None:
+        db.configure_user_cache(max_size=0)  # every upsert reaches the queue
+        self.addCleanup(db.configure_user_cache)
+        db.enable_write_behind(max_batch=100, flush_interval_ms=20)
+        for i in range(250):
+            db.upsert_user(i % 10, chat_type="private", bot_profile="quran")
+            db.add_message(i % 10, "in", f"msg {i}", bot_profile="quran")
+        db.flush_writes()
+
+        stats = db.write_behind_stats()
+        self.assertEqual(stats["flushed_rows"], 500)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertLess(stats["flushes"], 500)
+        self.assertEqual(len(db.get_all_users()), 10)
+        self.assertEqual(len(db.get_messages_for_chat(3, limit=100)), 25)
+
+    def test_disable_flushes_pending_rows(self) -> None:
+        db.enable_write_behind(max_batch=1000, flush_interval_ms=10_000, max_queue=5)
+        for i in range(20):
+            db.add_message(1, "out", f"msg {i}", bot_profile="quran")
+        db.disable_write_behind()
+
+        self.assertIsNone(db.write_behind_stats())
+        self.assertEqual(len(db.get_messages_for_chat(1, limit=100)), 20)
+
+    def test_failed_flush_forgets_cached_users(self) -> None:
+        db.configure_user_cache(max_size=100, ttl_sec=3600, touch_interval_sec=60)
+        self.addCleanup(db.configure_user_cache)
+        db.enable_write_behind(max_batch=100, flush_interval_ms=10)
+        with mock.patch.object(db, "_transaction", side_effect=sqlite3.OperationalError("disk I/O error")):
+            with self.assertLogs(db.logger, "ERROR"):
+                db.upsert_user(1, "private", "alice", bot_profile="quran")
+                db.flush_writes()
+        self.assertEqual(db.write_behind_stats()["failed_rows"], 1)
+
+        # Not skipped as unchanged: the row is written again
+        db.upsert_user(1, "private", "alice", bot_profile="quran")
+        db.flush_writes()
+        self.assertEqual(db.user_cache_stats()["full_writes"], 2)
+        self.assertEqual(db.get_users_page("quran")[0][0]["username"], "alice")
+
+
+class TestUserCache(DBTestCase):
+    def tearDown(self) -> None:
+        db.configure_user_cache()
+        super().tearDown()
+
+    def test_unchanged_user_is_not_rewritten(self) -> None:
+        db.configure_user_cache(max_size=100, ttl_sec=3600, touch_interval_sec=60)
+        for _ in range(50):
+            db.upsert_user(1, "private", "alice", "Alice", bot_profile="quran")
+        db.upsert_user(1, "private", "alice_2", "Alice", bot_profile="quran")
+
+        stats = db.user_cache_stats()
+        self.assertEqual((stats["full_writes"], stats["skipped"], stats["touches"]), (2, 49, 0))
+        self.assertEqual(db.get_users_page("quran")[0][0]["username"], "alice_2")
+
+    def test_last_seen_is_coalesced_to_a_touch(self) -> None:
+        db.configure_user_cache(max_size=100, ttl_sec=3600, touch_interval_sec=0)
+        db.upsert_user(1, "private", "alice", bot_profile="quran")
+        with db._transaction() as conn:
+            conn.execute("UPDATE users SET last_seen_ts = 0, username = 'changed elsewhere'")
+        db.upsert_user(1, "private", "alice", bot_profile="quran")
+
+        self.assertEqual(db.user_cache_stats()["touches"], 1)
+        user = db.get_users_page("quran")[0][0]
+        self.assertGreater(user["last_seen_ts"], 0)
+        self.assertEqual(user["username"], "changed elsewhere")  # only last_seen was written
+
+    def test_eviction_and_ttl(self) -> None:
+        db.configure_user_cache(max_size=2, ttl_sec=3600, touch_interval_sec=60)
+        for chat_id in (1, 2, 3, 1):
+            db.upsert_user(chat_id, bot_profile="quran")
+        stats = db.user_cache_stats()
+        self.assertEqual((stats["misses"], stats["evictions"], stats["size"]), (4, 2, 2))
+
+        db.configure_user_cache(max_size=2, ttl_sec=-1, touch_interval_sec=60)
+        db.upsert_user(1, bot_profile="quran")
+        db.upsert_user(1, bot_profile="quran")
+        self.assertEqual(db.user_cache_stats()["expired"], 1)
+
+    def test_cache_can_be_disabled(self) -> None:
+        db.configure_user_cache(max_size=0)
+        self.assertIsNone(db.user_cache_stats())
+        db.upsert_user(1, bot_profile="quran")
+        self.assertEqual(len(db.get_all_users()), 1)
+
+
+class TestReadOnlyReads(DBTestCase):
+    def tearDown(self) -> None:
+        db.disable_read_only_reads()
+        super().tearDown()
+
+    def test_reads_use_query_only_snapshot(self) -> None:
+        db.add_message(1, "in", "before", bot_profile="quran")
+        db.enable_read_only_reads()
+
+        with db._get_conn() as conn:
+            self.assertEqual(conn.execute("PRAGMA query_only").fetchone()[0], 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM messages")
+
+            first = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            db.add_message(1, "out", "during", bot_profile="quran")  # writer pool
+            second = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        self.assertEqual((first, second), (1, 1))  # one snapshot per block
+
+        self.assertEqual(len(db.get_messages_for_chat(1)), 2)
+
+    def test_replica_is_refreshed_explicitly(self) -> None:
+        db.add_message(1, "in", "one", bot_profile="quran")
+        replica = Path(self._tmp.name) / "replica.db"
+        db.enable_read_only_reads(replica_path=replica, refresh_sec=3600)
+
+        db.add_message(1, "in", "two", bot_profile="quran")
+        self.assertEqual(len(db.get_messages_for_chat(1)), 1)
+
+        db.refresh_replica(replica)
+        self.assertEqual(len(db.get_messages_for_chat(1)), 2)
+        self.assertFalse(Path(str(replica) + "-wal").exists())
+
+
+class TestPaginatedQueries(DBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        with db._transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO users (bot_profile, chat_id, username, first_name, last_seen_ts)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    ("quran" if i % 2 else "gmail", i, f"user{i}", f"Name{i}", 1000 + i // 3)
+                    for i in range(300)
+                ],
+            )
+
+    def test_keyset_pages_cover_profile_exactly_once(self) -> None:
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = db.get_users_page("quran", limit=40, cursor=cursor)
+            seen.extend(u["chat_id"] for u in page)
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 150)
+        self.assertEqual(len(set(seen)), 150)
+        self.assertEqual(seen, [u["chat_id"] for u in db.iter_users("quran", page_size=7)])
+        self.assertTrue(all(cid % 2 for cid in seen))
+
+    def test_search_prefix_and_chat_id(self) -> None:
+        names = {u["username"] for u in db.iter_users("quran", search="USER29")}
+        self.assertEqual(names, {"user29", "user291", "user293", "user295", "user297", "user299"})
+
+        page, _ = db.get_users_page("quran", search="name1")
+        self.assertTrue(all(u["first_name"].startswith("Name1") for u in page))
+
+        page, cursor = db.get_users_page("quran", search="@user7")
+        self.assertIn(7, [u["chat_id"] for u in page])
+        self.assertIsNone(cursor)
+
+        page, _ = db.get_users_page("gmail", search="42")
+        self.assertEqual([u["chat_id"] for u in page], [42])
+
+    def test_messages_are_filtered_by_profile_in_sql(self) -> None:
+        for i in range(60):
+            db.add_message(5, "in", f"gmail {i}", bot_profile="gmail")
+            db.add_message(5, "out", f"quran {i}", bot_profile="quran")
+
+        msgs = db.get_messages_for_chat(5, limit=50, bot_profile="quran")
+        self.assertEqual(len(msgs), 50)
+        self.assertTrue(all(m["bot_profile"] == "quran" for m in msgs))
+
+        page, older = db.get_messages_page(5, bot_profile="quran", limit=50)
+        rest, older = db.get_messages_page(5, bot_profile="quran", limit=50, before_id=older)
+        self.assertEqual(len(rest), 10)
+        self.assertIsNone(older)
+        self.assertEqual(rest[-1]["text"], "quran 0")
+
+
+class TestMessageSearch(DBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        db.add_message(1, "in", "In the name of God, the Merciful", bot_profile="quran")
+        db.add_message(1, "out", "Surah Al-Fatiha selected", bot_profile="quran")
+        db.add_message(2, "in", "forward the invoice to finance", bot_profile="gmail")
+        db.add_message(2, "in", "Surah Yaseen please", bot_profile="gmail")
+        db.add_message(3, "in", "بسم الله الرحمن الرحيم, Café", bot_profile="quran")
+
+    def test_search_is_partitioned_by_profile(self) -> None:
+        hits, _ = db.search_messages("quran", "surah")
+        self.assertEqual([h["chat_id"] for h in hits], [1])
+        self.assertIn("**Surah**", hits[0]["snippet"])
+
+        hits, _ = db.search_messages("gmail", "surah")
+        self.assertEqual([h["chat_id"] for h in hits], [2])
+
+    def test_diacritics_and_syntax_are_neutralised(self) -> None:
+        hits, _ = db.search_messages("quran", "الرحمن")
+        self.assertEqual([h["chat_id"] for h in hits], [3])
+        hits, _ = db.search_messages("quran", "cafe")
+        self.assertEqual([h["chat_id"] for h in hits], [3])
+
+        for query in ('"', "AND OR", "NEAR(", "text:*"):
+            db.search_messages("quran", query)  # must not raise
+
+    def test_index_follows_updates_and_deletes(self) -> None:
+        with db._transaction() as conn:
+            conn.execute("UPDATE messages SET text = 'renamed' WHERE chat_id = 2")
+            conn.execute("DELETE FROM messages WHERE chat_id = 1")
+
+        self.assertEqual(db.search_messages("quran", "surah")[0], [])
+        self.assertEqual(len(db.search_messages("gmail", "renamed")[0]), 2)
+
+    def test_ranked_and_recent_pagination(self) -> None:
+        for i in range(25):
+            db.add_message(9, "in", f"repeat word {i}" + " word" * (i % 4), bot_profile="quran")
+
+        for order in ("rank", "recent"):
+            ids = []
+            cursor = None
+            while True:
+                hits, cursor = db.search_messages("quran", "word", limit=10, cursor=cursor, order=order)
+                ids.extend(h["id"] for h in hits)
+                if cursor is None:
+                    break
+            self.assertEqual(len(ids), 25)
+            self.assertEqual(len(set(ids)), 25)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.telegram import db, export, retention
+from tests.test_db import DBTestCase
+
+DAY = 86400
+NOW = 1_735_689_600  # 2025-01-01T00:00:00Z
+
+
+class TestExport(DBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.out_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.out_dir.cleanup)
+        with db._transaction() as conn:
+            for i in range(40):
+                conn.execute(
+                    """
+                    INSERT INTO messages (chat_id, direction, text, created_at, created_ts, bot_profile)
+                    VALUES (?, ?, ?, '', ?, ?)
+                    """,
+                    (i % 3, "in" if i % 2 == 0 else "out", f"msg {i}, \"quoted\"", NOW - (39 - i) * DAY, "quran"),
+                )
+            conn.execute(
+                "INSERT INTO messages (chat_id, direction, text, created_at, created_ts, bot_profile) "
+                "VALUES (9, 'in', 'other', '', ?, 'gmail')",
+                (NOW,),
+            )
+        for chat_id in range(5):
+            db.upsert_user(chat_id, "private", f"user{chat_id}", None, None, None, bot_profile="quran")
+
+    def _path(self, name: str) -> Path:
+        return Path(self.out_dir.name) / name
+
+    def test_ndjson_gzip_stream_matches_file(self) -> None:
+        data = b"".join(export.stream_export("messages", "quran", compression="gzip", chunk_size=7))
+        rows = [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines()]
+        self.assertEqual([r["text"] for r in rows], [f"msg {i}, \"quoted\"" for i in range(40)])
+
+        path = self._path("m.ndjson.gz")
+        stats = export.export_to_file("messages", "quran", path, compression="gzip", chunk_size=7)
+        self.assertEqual(stats["rows"], 40)
+        self.assertEqual(gzip.decompress(path.read_bytes()), gzip.decompress(data))
+        self.assertFalse(export._checkpoint_path(path).exists())
+
+    def test_filters(self) -> None:
+        rows = [
+            json.loads(line)
+            for line in b"".join(
+                export.stream_export(
+                    "messages", "quran",
+                    since_ts=NOW - 9 * DAY, until_ts=NOW, direction="in", chunk_size=3,
+                )
+            ).decode("utf-8").splitlines()
+        ]
+        self.assertEqual([r["text"].split(",")[0] for r in rows], ["msg 30", "msg 32", "msg 34", "msg 36", "msg 38"])
+
+    def test_csv_users(self) -> None:
+        data = b"".join(export.stream_export("users", "quran", fmt="csv", chunk_size=2)).decode("utf-8")
+        rows = list(csv.DictReader(io.StringIO(data)))
+        self.assertEqual([r["username"] for r in rows], [f"user{i}" for i in range(5)])
+        self.assertEqual(list(rows[0]), export.USER_COLUMNS)
+
+    def test_archive_rows_come_first(self) -> None:
+        retention.set_retention_policy("quran", keep_days=10)
+        retention.run_retention(pause=0, now_ts=NOW)
+        data = b"".join(export.stream_export("messages", "quran", include_archive=True, chunk_size=4))
+        ids = [json.loads(line)["id"] for line in data.decode("utf-8").splitlines()]
+        self.assertEqual(len(ids), 40)
+        self.assertEqual(ids, sorted(ids))
+
+    def test_resume_after_interruption(self) -> None:
+        path = self._path("m.csv.gz")
+        rows = export.iter_messages_for_export
+
+        def interrupted(*args, **kwargs):
+            for n, item in enumerate(rows(*args, **kwargs)):
+                if n == 25:
+                    raise KeyboardInterrupt
+                yield item
+
+        export.iter_messages_for_export = interrupted
+        try:
+            with self.assertRaises(KeyboardInterrupt):
+                export.export_to_file("messages", "quran", path, fmt="csv", compression="gzip", chunk_size=10)
+        finally:
+            export.iter_messages_for_export = rows
+
+        checkpoint = json.loads(export._checkpoint_path(path).read_text())
+        self.assertEqual(checkpoint["rows"], 20)
+
+        # Garbage after the checkpoint (a partly written chunk) is discarded.
+        with open(path, "ab") as f:
+            f.write(b"partial")
+
+        stats = export.export_to_file(
+            "messages", "quran", path, fmt="csv", compression="gzip", chunk_size=10, resume=True
+        )
+        self.assertTrue(stats["resumed"])
+        self.assertEqual(stats["rows"], 40)
+
+        data = gzip.decompress(path.read_bytes()).decode("utf-8")
+        parsed = list(csv.DictReader(io.StringIO(data)))
+        self.assertEqual([int(r["id"]) for r in parsed], list(range(1, 41)))
+
+    def test_rows_without_created_ts_are_kept(self) -> None:
+        with db._transaction() as conn:
+            conn.execute("UPDATE messages SET created_ts = NULL WHERE id IN (5, 6, 7, 20)")
+        data = b"".join(export.stream_export("messages", "quran", chunk_size=3))
+        ids = [json.loads(line)["id"] for line in data.decode("utf-8").splitlines()]
+        self.assertEqual(ids[:4], [5, 6, 7, 20])
+        self.assertEqual(sorted(ids), list(range(1, 41)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import requests
+
+from src.telegram import db, http_client, lanes, metrics, telegram_fetch, telegram_utils
+from src.telegram.fake_api import FakeBotAPI
+from src.telegram.sqlite_pool import close_all_pools
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class FakeApiTestCase(unittest.TestCase):
+    """
+    Runs a `FakeBotAPI` and points the clients at it through
+    TELEGRAM_API_BASE_URL (the database and rate state go to a temp dir).
+    """
+
+    ENV = ("TELEGRAM_BOT_TOKEN", "TELEGRAM_RATE_DB", "TELEGRAM_API_BASE_URL")
+    API_OPTIONS: dict = {}
+
+    def setUp(self) -> None:
+        self.api = FakeBotAPI(seed=1, **self.API_OPTIONS).start()
+        self._tmp = tempfile.TemporaryDirectory()
+        self._orig_env = {k: os.environ.get(k) for k in self.ENV}
+        self._orig_db_path = db.DB_PATH
+        db.DB_PATH = Path(self._tmp.name) / "telegram_data.db"
+        os.environ["TELEGRAM_RATE_DB"] = os.path.join(self._tmp.name, "ratelimit.db")
+        os.environ["TELEGRAM_BOT_TOKEN"] = "123:FAKE"
+        os.environ["TELEGRAM_API_BASE_URL"] = self.api.url
+        http_client.close_sessions()
+        metrics.reset()
+
+    def tearDown(self) -> None:
+        http_client.close_sessions()
+        lanes.reset()
+        metrics.reset()
+        self.api.stop()
+        for key, value in self._orig_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        close_all_pools()
+        db.DB_PATH = self._orig_db_path
+        self._tmp.cleanup()
+
+
+class TestFakeApi(FakeApiTestCase):
+    def test_message_lifecycle(self) -> None:
+        sent = telegram_utils.send_text(5, "hello")
+        message_id = sent["result"]["message_id"]
+        self.assertEqual(sent["result"]["chat"]["type"], "private")
+
+        self.assertIsNotNone(telegram_utils.edit_message_text(5, message_id, "edited"))
+        self.assertIsNotNone(telegram_utils.pin_message(5, message_id))
+        self.assertEqual(self.api.pinned(5), [message_id])
+        self.assertIsNotNone(telegram_utils.delete_message(5, message_id))
+        self.assertEqual(self.api.messages(5), [])
+        self.assertEqual(self.api.pinned(5), [])
+        self.assertIsNone(telegram_utils.delete_message(5, message_id))  # already gone
+
+    def test_errors_use_the_bot_api_shape(self) -> None:
+        self.assertEqual(telegram_utils._request("sendMessage", {"chat_id": 5, "text": " "})["description"],
+                         "Bad Request: message text is empty")
+        self.assertEqual(telegram_utils._request("noSuchMethod", {})["error_code"], 404)
+        os.environ["TELEGRAM_BOT_TOKEN"] = "not-a-token"
+        self.assertEqual(telegram_utils._request("getMe", {})["error_code"], 401)
+
+    def test_media_uploads_and_file_id_reuse(self) -> None:
+        first = telegram_utils.send_photo(5, b"\xff\xd8jpeg", filename="a.jpg")
+        second = telegram_utils.send_photo(6, b"\xff\xd8jpeg", filename="a.jpg")
+        self.assertEqual(first["result"]["photo"][-1]["file_id"], second["result"]["photo"][-1]["file_id"])
+        self.assertEqual(self.api.requests[-1][1]["photo"], first["result"]["photo"][-1]["file_id"])
+
+        [album] = telegram_utils.send_media_group(5, [
+            telegram_utils.input_media(b"one", type="document", filename="1.txt"),
+            telegram_utils.input_media(b"two", type="document", filename="2.txt", caption="both"),
+        ])
+        messages = album["result"]
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0]["media_group_id"], messages[1]["media_group_id"])
+
+        doc = messages[0]["document"]
+        file_info = telegram_utils._post("getFile", {"file_id": doc["file_id"]})["result"]
+        resp = requests.get(http_client.file_url("123:FAKE", file_info["file_path"]), timeout=5)
+        self.assertEqual(resp.content, b"one")
+
+    def test_recorded_requests_messages_and_files_are_bounded(self) -> None:
+        api = FakeBotAPI(record_requests=2, max_messages=3, max_files=2)
+        for n in range(5):
+            api.handle("/bot123:FAKE/sendMessage", {"chat_id": "5", "text": f"m{n}"}, {})
+        self.assertEqual([p["text"] for _, p in api.requests], ["m3", "m4"])
+        self.assertEqual([m["text"] for m in api.messages(5)], ["m2", "m3", "m4"])
+        self.assertEqual(api.stats()["calls"]["sendMessage"], 5)
+
+        ids = [
+            api.handle("/bot123:FAKE/sendDocument", {"chat_id": "5"}, {"document": (f"{n}.txt", b"%d" % n)})[1]["result"]["document"]["file_id"]
+            for n in range(3)
+        ]
+        self.assertEqual(len(set(ids)), 3)
+        status, body = api.handle("/bot123:FAKE/getFile", {"file_id": ids[0]}, {})
+        self.assertEqual(body["description"], "Bad Request: invalid file_id")
+        self.assertEqual(api.handle("/bot123:FAKE/getFile", {"file_id": ids[2]}, {})[0], 200)
+
+        quiet = FakeBotAPI(record_requests=0)
+        quiet.handle("/bot123:FAKE/getMe", {}, {})
+        self.assertEqual(list(quiet.requests), [])
+
+    def test_updates_feed_telegram_fetch(self) -> None:
+        self.api.push_update("hi", chat_id=42)
+        ok, err, chat, update = telegram_fetch.get_last_chat()
+        self.assertTrue(ok, err)
+        self.assertEqual(chat["id"], 42)
+        self.assertEqual(update["message"]["text"], "hi")
+
+    def test_long_poll_returns_when_an_update_arrives(self) -> None:
+        threading.Timer(0.2, self.api.push_update, args=("late",)).start()
+        start = time.monotonic()
+        data = telegram_utils._request("getUpdates", {"timeout": 5})
+        self.assertEqual([u["message"]["text"] for u in data["result"]], ["late"])
+        self.assertLess(time.monotonic() - start, 2)
+
+        offset = data["result"][-1]["update_id"] + 1
+        self.assertEqual(telegram_utils._request("getUpdates", {"offset": offset})["result"], [])
+
+    def test_latency_is_added(self) -> None:
+        self.api.latency = 0.1
+        start = time.monotonic()
+        telegram_utils.send_text(5, "slow")
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertGreaterEqual(metrics.snapshot()["sendMessage"]["p50"], 0.1)
+
+    def test_rate_limit_answers_429_and_client_recovers(self) -> None:
+        os.environ["TELEGRAM_RATE_LIMIT"] = "1000"
+        self.addCleanup(os.environ.pop, "TELEGRAM_RATE_LIMIT", None)
+        self.api.rate_limit = 20
+
+        results = [telegram_utils.send_text(5, f"m{i}") for i in range(25)]
+        self.assertTrue(all(results))
+        self.assertGreater(self.api.stats()["faults"]["rate_limit"], 0)
+        self.assertGreater(metrics.snapshot()["sendMessage"]["retries"]["429"], 0)
+
+    def test_injected_errors(self) -> None:
+        os.environ["TELEGRAM_FLOW_CONTROL"] = "0"
+        self.addCleanup(os.environ.pop, "TELEGRAM_FLOW_CONTROL", None)
+        self.api.error_rate = 1.0
+        data = telegram_utils._request("sendMessage", {"chat_id": 5, "text": "x"})
+        self.assertEqual(data["error_code"], 502)
+        self.api.error_rate, self.api.flood_rate = 0.0, 1.0
+        data = telegram_utils._request("sendMessage", {"chat_id": 5, "text": "x"})
+        self.assertEqual(data["parameters"]["retry_after"], 1)
+
+
+class TestFakeApiSubprocess(unittest.TestCase):
+    def test_runs_as_a_subprocess(self) -> None:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "src.telegram.fake_api", "--port", "0"],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            line = proc.stdout.readline()
+            url = line.strip().rsplit(" ", 1)[-1]
+            self.assertTrue(url.startswith("http://127.0.0.1:"), line)
+            data = requests.get(f"{url}/bot1:X/getMe", timeout=5).json()
+            self.assertEqual(data["result"]["id"], 1)
+        finally:
+            proc.terminate()
+            proc.wait(5)
+            proc.stdout.close()
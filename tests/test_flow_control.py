@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+import time
+import unittest
+
+from src.telegram import flow_control, telegram_utils
+from tests.test_http_client import StubServerTestCase
+
+TOKEN = "123:TEST"
+
+
+class TestFlowControl(StubServerTestCase):
+    def test_shared_bucket_limits_rate(self) -> None:
+        start = time.monotonic()
+        for _ in range(21):
+            flow_control.acquire(TOKEN, per_second=50, capacity=1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.38)
+
+    def test_block_written_by_another_process_is_honoured(self) -> None:
+        flow_control.acquire(TOKEN)  # creates the shared file and row
+        other = sqlite3.connect(os.environ["TELEGRAM_RATE_DB"])
+        with other:
+            other.execute("UPDATE rate_buckets SET blocked_until = ?", (time.time() + 0.5,))
+        other.close()
+
+        self.assertGreaterEqual(flow_control.acquire(TOKEN), 0.4)
+
+    def test_429_is_retried_after_retry_after(self) -> None:
+        calls = []
+        lock = threading.Lock()
+
+        def responder(path, form):
+            with lock:
+                calls.append(time.monotonic())
+                first = len(calls) == 1
+            if first:
+                return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                             "parameters": {"retry_after": 1}}
+            return 200, {"ok": True, "result": {"message_id": 9}}
+
+        self.server.responder = responder
+        self.assertEqual(telegram_utils.send_text(1, "hi")["result"]["message_id"], 9)
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.9)
+        self.assertGreater(flow_control.state(TOKEN)["blocked_until"], 0)
+
+    def test_transient_errors_are_retried_but_client_errors_are_not(self) -> None:
+        answers = [(503, {"ok": False, "error_code": 503, "description": "Service Unavailable"})]
+        self.server.responder = lambda path, form: answers.pop() if answers else (200, {"ok": True, "result": {}})
+        self.assertEqual(telegram_utils._request("sendMessage", {"chat_id": 1, "text": "x"}), {"ok": True, "result": {}})
+
+        self.server.responder = lambda path, form: (400, {"ok": False, "error_code": 400, "description": "Bad Request"})
+        before = len(self.server.paths)
+        self.assertIsNone(telegram_utils.send_text(1, "x"))
+        self.assertEqual(len(self.server.paths) - before, 1)
+
+    def test_long_retry_after_is_not_waited_for(self) -> None:
+        os.environ["TELEGRAM_MAX_RETRY_AFTER"] = "5"
+        self.addCleanup(os.environ.pop, "TELEGRAM_MAX_RETRY_AFTER", None)
+        self.server.responder = lambda path, form: (
+            429, {"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 30}}
+        )
+        result = telegram_utils._request("sendMessage", {"chat_id": 1, "text": "x"})
+        self.assertEqual(result["error_code"], 429)
+        self.assertEqual(len(self.server.paths), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from src.telegram import db, http_client, lanes, telegram_utils
+from src.telegram.sqlite_pool import close_all_pools
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers every Bot API call with ok=true (or whatever `server.responder`
+    returns for the path and the plain form fields) and records the client port, so
+    tests can count how many TCP connections were opened.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def _reply(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        self.server.ports.add(self.client_address[1])
+        self.server.paths.append(self.path)
+        self.server.last_request = (dict(self.headers), raw)
+
+        status, reply = 200, {"ok": True, "result": {"message_id": 1}}
+        responder = getattr(self.server, "responder", None)
+        if responder is not None:
+            form = {}
+            content_type = self.headers.get("Content-Type", "")
+            if content_type.startswith("application/x-www-form-urlencoded"):
+                form = {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+            elif content_type.startswith("multipart/form-data"):
+                # Plain fields only; uploaded files stay in `last_request`.
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {content_type}\r\n\r\n".encode() + raw
+                )
+                for part in message.iter_parts():
+                    if part.get_filename() is None:
+                        name = part.get_param("name", header="content-disposition")
+                        form[name] = part.get_payload(decode=True).decode()
+            status, reply = responder(self.path, form)
+
+        body = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class StubServerTestCase(unittest.TestCase):
+    """
+    Points the Bot API base URL at a local stub server for every test (and
+    the database, used by the media cache and outbox, at a throwaway file).
+    """
+
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.server.ports = set()
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self._tmp = tempfile.TemporaryDirectory()
+        self._orig_env = {k: os.environ.get(k) for k in ("TELEGRAM_BOT_TOKEN", "TELEGRAM_RATE_DB")}
+        os.environ["TELEGRAM_RATE_DB"] = os.path.join(self._tmp.name, "ratelimit.db")
+        self._orig_db_path = db.DB_PATH
+        db.DB_PATH = Path(self._tmp.name) / "telegram_data.db"
+
+        self._orig_base = http_client.API_BASE_URL
+        http_client.close_sessions()
+        http_client.API_BASE_URL = f"http://127.0.0.1:{self.server.server_address[1]}"
+        os.environ["TELEGRAM_BOT_TOKEN"] = "123:TEST"
+
+    def tearDown(self) -> None:
+        http_client.close_sessions()
+        lanes.reset()
+        http_client.API_BASE_URL = self._orig_base
+        for key, value in self._orig_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self.server.shutdown()
+        self.server.server_close()
+        close_all_pools()
+        db.DB_PATH = self._orig_db_path
+        self._tmp.cleanup()
+
+
+class TestHttpClient(StubServerTestCase):
+    def test_connections_are_reused(self) -> None:
+        for i in range(20):
+            self.assertTrue(telegram_utils.send_text(1, f"hello {i}")["ok"])
+        self.assertEqual(len(self.server.ports), 1)
+        self.assertEqual(self.server.paths[0], "/bot123:TEST/sendMessage")
+
+    def test_one_session_per_token_shared_across_threads(self) -> None:
+        sessions = []
+
+        def worker() -> None:
+            sessions.append(http_client.get_session("123:TEST"))
+            telegram_utils.send_text(1, "from a thread")
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len({id(s) for s in sessions}), 1)
+        self.assertIsNot(http_client.get_session("456:OTHER"), sessions[0])
+        self.assertLessEqual(len(self.server.ports), http_client.pool_size())
+
+    def test_timeouts(self) -> None:
+        self.assertEqual(http_client.request_timeout(12), (http_client.DEFAULT_CONNECT_TIMEOUT, 12))
+
+
+if __name__ == "__main__":
+    unittest.main()
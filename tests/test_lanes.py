@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+
+from src.telegram import broadcast, lanes, telegram_utils
+from src.telegram.lanes import LaneScheduler
+from tests.test_http_client import StubServerTestCase
+
+
+class TestLaneScheduler(unittest.TestCase):
+    def _wait_depth(self, scheduler, **depths):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            stats = scheduler.stats()
+            if all(stats[name]["depth"] == n for name, n in depths.items()):
+                return
+            time.sleep(0.01)
+        self.fail(f"queues never reached {depths}: {scheduler.stats()}")
+
+    def test_weighted_order_favours_interactive(self) -> None:
+        order = []
+        gate = threading.Event()
+
+        def take():
+            order.append(lanes.current_lane())
+            if len(order) == 1:
+                gate.wait(5)  # hold the first slot while the others queue up
+
+        scheduler = LaneScheduler(rate=1000, reserve_share=0.2, take=take)
+        first = threading.Thread(target=lambda: self._acquire_in(scheduler, lanes.BULK), daemon=True)
+        first.start()
+        while not order:
+            time.sleep(0.01)
+
+        threads = self._start_in(scheduler, lanes.BULK, 6) + self._start_in(scheduler, lanes.INTERACTIVE, 6)
+        self._wait_depth(scheduler, bulk=6, interactive=6)
+        gate.set()
+        for t in [first] + threads:
+            t.join(5)
+
+        # Stride scheduling: at most one bulk call slips in before all interactive ones.
+        self.assertEqual(order[1:8].count(lanes.INTERACTIVE), 6)
+        stats = scheduler.stats()
+        self.assertEqual(stats["bulk"]["granted"], 7)
+        self.assertEqual(stats["interactive"]["granted"], 6)
+        self.assertGreater(stats["bulk"]["wait_max"], stats["interactive"]["wait_p50"])
+
+    def test_async_waiters_share_the_order_and_can_be_cancelled(self) -> None:
+        order = []
+        gate = threading.Event()
+
+        def take():
+            order.append(("sync", lanes.current_lane()))
+            gate.wait(5)
+
+        scheduler = LaneScheduler(rate=1000, reserve_share=0.2, take=take,
+                                  try_take=lambda: order.append(("async", lanes.current_lane())) or 0.0)
+        holder = threading.Thread(target=lambda: self._acquire_in(scheduler, lanes.BULK), daemon=True)
+        holder.start()
+        while not order:
+            time.sleep(0.01)
+
+        async def main():
+            async def acquire_in(lane_name):
+                with lanes.lane(lane_name):
+                    await scheduler.acquire_async()
+
+            cancelled = asyncio.ensure_future(acquire_in(lanes.INTERACTIVE))
+            bulk = asyncio.ensure_future(acquire_in(lanes.BULK))
+            interactive = asyncio.ensure_future(acquire_in(lanes.INTERACTIVE))
+            await asyncio.sleep(0.05)
+            cancelled.cancel()
+            await asyncio.sleep(0.05)
+            gate.set()
+            await asyncio.wait_for(asyncio.gather(bulk, interactive), 5)
+
+        asyncio.run(main())
+        holder.join(5)
+        self.assertEqual(order[1:], [("async", lanes.INTERACTIVE), ("async", lanes.BULK)])
+        self.assertEqual(scheduler.stats()["interactive"]["depth"], 0)
+
+    def _acquire_in(self, scheduler, lane_name):
+        with lanes.lane(lane_name):
+            scheduler.acquire()
+
+    def _start_in(self, scheduler, lane_name, n):
+        threads = [
+            threading.Thread(target=self._acquire_in, args=(scheduler, lane_name), daemon=True)
+            for _ in range(n)
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def test_bulk_is_capped_below_the_rate(self) -> None:
+        # 50 calls/s with 40% reserved: bulk alone gets at most 30/s after its burst.
+        scheduler = LaneScheduler(rate=50, reserve_share=0.4)
+        start = time.monotonic()
+        for _ in range(45):
+            scheduler.acquire(lanes.BULK)
+        elapsed = time.monotonic() - start
+        self.assertGreater(elapsed, 0.4)  # 30 burst + 15 at 30/s
+
+        start = time.monotonic()
+        for _ in range(20):
+            scheduler.acquire(lanes.INTERACTIVE)
+        self.assertLess(time.monotonic() - start, 0.2)  # interactive is not capped
+
+    def test_unknown_lane_name_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            with lanes.lane("urgent"):
+                pass
+
+
+class TestLanesWithBroadcast(StubServerTestCase):
+    def test_interactive_reply_overtakes_running_broadcast(self) -> None:
+        os.environ["TELEGRAM_RATE_LIMIT"] = "40"
+        self.addCleanup(os.environ.pop, "TELEGRAM_RATE_LIMIT", None)
+
+        done = threading.Event()
+
+        def run():
+            broadcast.run_broadcast(list(range(1, 81)), "news", workers=8, rate=1000)
+            done.set()
+
+        threading.Thread(target=run, daemon=True).start()
+        time.sleep(0.5)  # the broadcast backlog is queued in the bulk lane
+
+        latencies = []
+        for _ in range(5):
+            start = time.monotonic()
+            self.assertIsNotNone(telegram_utils.send_text(999, "reply"))
+            latencies.append(time.monotonic() - start)
+            time.sleep(0.05)
+
+        self.assertFalse(done.is_set())
+        self.assertLess(max(latencies), 0.3)
+        self.assertGreater(lanes.stats()["bulk"]["granted"], 0)
+        done.wait(15)
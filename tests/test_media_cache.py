@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+from src.telegram import db, media_cache, telegram_async, telegram_utils
+from tests.test_http_client import StubServerTestCase
+
+
+class MediaCacheTestCase(StubServerTestCase):
+    """
+    Stub Bot API plus a throwaway photo file.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.photo = os.path.join(self._tmp.name, "photo.jpg")
+        with open(self.photo, "wb") as f:
+            f.write(b"\xff\xd8fake jpeg" * 100)
+
+        self.uploads = 0
+        self.sent_ids = []
+        self.stale_ids = set()
+        self.server.responder = self._respond
+
+    def _respond(self, path, form):
+        if "photo" in form:
+            self.sent_ids.append(form["photo"])
+            if form["photo"] in self.stale_ids:
+                return 400, {"ok": False, "error_code": 400, "description": "Bad Request: wrong file identifier/HTTP URL specified"}
+            file_id = form["photo"]
+        else:
+            self.uploads += 1
+            file_id = f"FILE{self.uploads}"
+        photo = [
+            {"file_id": f"{file_id}-thumb", "file_size": 10, "width": 90},
+            {"file_id": file_id, "file_unique_id": "U1", "file_size": 1100, "width": 800},
+        ]
+        return 200, {"ok": True, "result": {"message_id": 1, "photo": photo}}
+
+
+class TestMediaCache(MediaCacheTestCase):
+    def test_second_send_reuses_file_id(self) -> None:
+        self.assertIsNotNone(telegram_utils.send_photo(1, self.photo))
+        self.assertIsNotNone(telegram_utils.send_photo(2, self.photo))
+        self.assertIsNotNone(telegram_utils.send_photo(3, self.photo))
+
+        self.assertEqual(self.uploads, 1)
+        self.assertEqual(self.sent_ids, ["FILE1", "FILE1"])
+        stats = media_cache.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["uses"], 3)
+        self.assertEqual(stats["bytes_saved"], 2 * 1100)
+
+    def test_changed_content_is_uploaded(self) -> None:
+        telegram_utils.send_photo(1, self.photo)
+        with open(self.photo, "ab") as f:
+            f.write(b"more")
+        telegram_utils.send_photo(1, self.photo)
+        self.assertEqual(self.uploads, 2)
+        self.assertEqual(self.sent_ids, [])
+
+    def test_stale_file_id_is_replaced(self) -> None:
+        telegram_utils.send_photo(1, self.photo)
+        self.stale_ids.add("FILE1")
+
+        self.assertIsNotNone(telegram_utils.send_photo(1, self.photo))
+        self.assertEqual(self.uploads, 2)
+        digest = media_cache.file_sha256(self.photo)
+        self.assertEqual(media_cache.lookup("123:TEST", "photo", digest), "FILE2")
+
+    def test_lookup_ignores_the_read_replica(self) -> None:
+        db.init_db()
+        db.enable_read_only_reads(replica_path=os.path.join(self._tmp.name, "replica.db"), refresh_sec=3600)
+        self.addCleanup(db.disable_read_only_reads)
+
+        telegram_utils.send_photo(1, self.photo)   # stored after the replica was copied
+        telegram_utils.send_photo(2, self.photo)
+        self.assertEqual(self.uploads, 1)
+        self.assertEqual(self.sent_ids, ["FILE1"])
+
+    def test_ids_are_per_token(self) -> None:
+        telegram_utils.send_photo(1, self.photo)
+        os.environ["TELEGRAM_BOT_TOKEN"] = "456:OTHER"
+        telegram_utils.send_photo(1, self.photo)
+        self.assertEqual(self.uploads, 2)
+
+    def test_eviction_keeps_most_recent(self) -> None:
+        os.environ["TELEGRAM_MEDIA_CACHE_MAX"] = "2"
+        self.addCleanup(os.environ.pop, "TELEGRAM_MEDIA_CACHE_MAX", None)
+        for n in range(4):
+            media_cache.store("123:TEST", "photo", f"hash{n}", {"file_id": f"F{n}"})
+            with db._transaction() as conn:
+                conn.execute("UPDATE media_file_ids SET last_used_ts = ? WHERE sha256 = ?", (n, f"hash{n}"))
+        self.assertIsNone(media_cache.lookup("123:TEST", "photo", "hash0"))
+        self.assertEqual(media_cache.stats()["entries"], 2)
+
+    def test_disabled_always_uploads(self) -> None:
+        os.environ["TELEGRAM_MEDIA_CACHE"] = "0"
+        self.addCleanup(os.environ.pop, "TELEGRAM_MEDIA_CACHE", None)
+        telegram_utils.send_photo(1, self.photo)
+        telegram_utils.send_photo(1, self.photo)
+        self.assertEqual(self.uploads, 2)
+
+
+class TestAsyncMediaCache(MediaCacheTestCase):
+    def test_async_send_reuses_file_id(self) -> None:
+        async def run():
+            try:
+                first = await telegram_async.send_photo(1, self.photo)
+                second = await telegram_async.send_photo(2, self.photo)
+            finally:
+                await telegram_async.aclose_clients()
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertEqual(self.uploads, 1)
+        self.assertEqual(self.sent_ids, ["FILE1"])
@@ -0,0 +1,129 @@
+import json
+import os
+import unittest
+
+from src.telegram import telegram_utils
+from src.telegram.telegram_utils import _split_albums, input_media, send_media_group
+from tests.test_http_client import StubServerTestCase
+from tests.test_multipart import _parse
+
+
+class TestSplitAlbums(unittest.TestCase):
+    def _types(self, *types):
+        return [{"type": t, "media": f"id{i}"} for i, t in enumerate(types)]
+
+    def test_balanced_chunks_of_at_most_ten(self) -> None:
+        sizes = [len(a) for a in _split_albums(self._types(*["photo"] * 11))]
+        self.assertEqual(sizes, [6, 5])
+        sizes = [len(a) for a in _split_albums(self._types(*["photo"] * 25))]
+        self.assertEqual(sizes, [9, 8, 8])
+
+    def test_incompatible_types_start_a_new_album(self) -> None:
+        albums = _split_albums(self._types("photo", "video", "document", "document", "audio", "photo"))
+        self.assertEqual(
+            [[item["type"] for item in album] for album in albums],
+            [["photo", "video"], ["document", "document"], ["audio"], ["photo"]],
+        )
+
+    def test_type_is_guessed_from_name(self) -> None:
+        self.assertEqual(input_media(b"x", filename="a.JPG")["type"], "photo")
+        self.assertEqual(input_media(b"x", filename="a.mp4")["type"], "video")
+        self.assertEqual(input_media(b"x", filename="a.mp3")["type"], "audio")
+        self.assertEqual(input_media(b"x", filename="a.pdf")["type"], "document")
+        self.assertEqual(input_media("AgACAgQAAxkBAAI", type="photo")["type"], "photo")
+        with self.assertRaises(ValueError):
+            input_media(b"x", type="sticker")
+
+    def test_only_urls_and_file_ids_are_references(self) -> None:
+        for source in ("AgACAgQAAxkBAAI", "https://example.com/a.jpg", "attach://file0"):
+            self.assertTrue(telegram_utils._is_reference(source), source)
+        for source in ("photos/a.jpg", "a.jpg", "~/a.jpg", b"bytes"):
+            self.assertFalse(telegram_utils._is_reference(source), source)
+
+
+class TestSendMediaGroup(StubServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.calls = []
+        self.uploads = 0
+        self.server.responder = self._respond
+
+    def _respond(self, path, form):
+        method = path.rsplit("/", 1)[-1]
+        headers, raw = self.server.last_request
+        if method != "sendMediaGroup":
+            self.calls.append((method, form, {}))
+            return 200, {"ok": True, "result": {"message_id": 1}}
+
+        files = {}
+        if headers.get("Content-Type", "").startswith("multipart/"):
+            files = {k: v for k, v in _parse(headers["Content-Type"], raw).items() if v[0]}
+        media = json.loads(form["media"])
+        self.calls.append((method, form, files))
+
+        messages = []
+        for i, item in enumerate(media):
+            file_id = item["media"]
+            if file_id.startswith("attach://"):
+                self.uploads += 1
+                file_id = f"UP{self.uploads}"
+            messages.append({"message_id": 10 + i, item["type"]: {"file_id": file_id}})
+        for message in messages:
+            if "photo" in message:
+                message["photo"] = [message["photo"]]
+        return 200, {"ok": True, "result": messages}
+
+    def test_album_with_mixed_sources_and_captions(self) -> None:
+        photo = os.path.join(os.path.dirname(__file__), "test.jpg")
+        responses = send_media_group(
+            5,
+            [
+                input_media(photo, caption="first"),
+                input_media(b"\x00video", filename="clip.mp4", caption="second"),
+                input_media("EXISTING_ID", type="photo"),
+            ],
+            reply_to_message_id=3,
+        )
+        self.assertEqual(len(responses), 1)
+        method, form, files = self.calls[0]
+        self.assertEqual(method, "sendMediaGroup")
+        self.assertEqual(form["reply_to_message_id"], "3")
+
+        media = json.loads(form["media"])
+        self.assertEqual([m["type"] for m in media], ["photo", "video", "photo"])
+        self.assertEqual([m.get("caption") for m in media], ["first", "second", None])
+        self.assertEqual(media[2]["media"], "EXISTING_ID")
+        self.assertEqual(files["file1"], ("clip.mp4", b"\x00video"))
+        self.assertEqual(sorted(files), ["file0", "file1"])
+
+    def test_batches_and_lone_item(self) -> None:
+        items = [input_media(f"ID{i}", type="photo") for i in range(12)]
+        items.append(input_media("DOC", type="document"))
+        responses = send_media_group(5, items)
+
+        self.assertEqual(len(responses), 3)
+        self.assertEqual([c[0] for c in self.calls], ["sendMediaGroup", "sendMediaGroup", "sendDocument"])
+        self.assertEqual(len(json.loads(self.calls[0][1]["media"])), 6)
+        self.assertEqual(self.calls[2][1]["document"], "DOC")
+
+    def test_uploaded_files_are_cached_for_next_album(self) -> None:
+        media = [input_media(b"one", filename="1.jpg"), input_media(b"two", filename="2.jpg")]
+        send_media_group(5, media)
+        send_media_group(6, media)
+
+        self.assertEqual(self.uploads, 2)
+        second = json.loads(self.calls[1][1]["media"])
+        self.assertEqual([m["media"] for m in second], ["UP1", "UP2"])
+        self.assertEqual(self.calls[1][2], {})
+
+    def test_missing_file_is_an_error_not_a_file_id(self) -> None:
+        missing = os.path.join(os.path.dirname(__file__), "no_such_photo.jpg")
+        self.assertIsNone(send_media_group(5, [input_media(missing), input_media("ID", type="photo")]))
+        data = telegram_utils._upload_media("sendPhoto", "photo", missing, {"chat_id": 5})
+        self.assertEqual(data["error_code"], 400)
+        self.assertIn("File not found", data["description"])
+        self.assertEqual(self.calls, [])
+
+    def test_failure_returns_none(self) -> None:
+        self.server.responder = lambda path, form: (400, {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"})
+        self.assertIsNone(telegram_utils.send_media_group(5, [input_media("A", type="photo"), input_media("B", type="photo")]))
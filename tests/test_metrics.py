@@ -0,0 +1,71 @@
+import asyncio
+
+import requests
+
+from src.telegram import metrics, telegram_async, telegram_fetch, telegram_utils
+from tests.test_http_client import StubServerTestCase
+
+
+class TestMetrics(StubServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_calls_are_recorded_per_method(self) -> None:
+        for _ in range(3):
+            telegram_utils.send_text(1, "hi")
+        telegram_utils.send_document(1, b"%PDF data", filename="a.pdf")
+
+        snap = metrics.snapshot()
+        self.assertEqual(snap["sendMessage"]["calls"], 3)
+        self.assertEqual(snap["sendMessage"]["statuses"], {"200": 3})
+        self.assertGreater(snap["sendMessage"]["bytes_sent"], 0)
+        self.assertGreater(snap["sendMessage"]["bytes_received"], 0)
+        self.assertGreater(snap["sendDocument"]["bytes_sent"], len(b"%PDF data"))
+        self.assertLessEqual(snap["sendMessage"]["p50"], snap["sendMessage"]["p99"])
+
+    def test_errors_and_retries_are_counted(self) -> None:
+        answers = [(502, {"ok": False, "error_code": 502, "description": "Bad Gateway"})] * 2
+        self.server.responder = lambda path, form: answers.pop() if answers else (
+            400, {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"}
+        )
+        self.assertIsNone(telegram_utils.send_text(1, "hi"))
+
+        snap = metrics.snapshot()["sendMessage"]
+        self.assertEqual(snap["calls"], 3)
+        self.assertEqual(snap["retries"], {"5xx": 2})
+        self.assertEqual(snap["errors"], {"502": 2, "400": 1})
+        self.assertEqual(snap["statuses"], {"502": 2, "400": 1})
+
+    def test_fetch_and_async_calls_are_recorded(self) -> None:
+        self.server.responder = lambda path, form: (200, {"ok": True, "result": {"id": 1, "message_id": 1}})
+        ok, _, _ = telegram_fetch.get_bot_info()
+        self.assertTrue(ok)
+
+        async def run():
+            try:
+                await telegram_async.send_text(1, "hi")
+            finally:
+                await telegram_async.aclose_clients()
+
+        asyncio.run(run())
+        snap = metrics.snapshot()
+        self.assertEqual(snap["getMe"]["calls"], 1)
+        self.assertEqual(snap["sendMessage"]["calls"], 1)
+        self.assertGreater(snap["sendMessage"]["bytes_sent"], 0)
+
+    def test_prometheus_endpoint(self) -> None:
+        telegram_utils.send_text(1, "hi")
+        server = metrics.start_server(port=0, host="127.0.0.1")
+        self.addCleanup(metrics.stop_server)
+
+        resp = requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["Content-Type"].startswith("text/plain"))
+        text = resp.text
+        self.assertIn("# TYPE telegram_api_request_duration_seconds histogram", text)
+        self.assertIn('telegram_api_request_duration_seconds_bucket{method="sendMessage",le="+Inf"} 1', text)
+        self.assertIn('telegram_api_requests_total{method="sendMessage",status="200"} 1', text)
+        self.assertIn('telegram_lane_granted_total{lane="interactive"} 1', text)
+        self.assertIn("telegram_outbox_jobs", text)
@@ -0,0 +1,167 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.telegram import db, migrations
+from src.telegram.migrations import SCHEMA_VERSION
+from src.telegram.sqlite_pool import close_all_pools
+
+
+LEGACY_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER UNIQUE NOT NULL,
+    type TEXT,
+    username TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    title TEXT,
+    added_at TEXT,
+    last_seen_at TEXT,
+    bot_profile TEXT
+);
+CREATE TABLE messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    direction TEXT CHECK(direction IN ('in', 'out')) NOT NULL,
+    text TEXT,
+    created_at TEXT,
+    bot_profile TEXT
+);
+INSERT INTO users (chat_id, type, username, added_at, last_seen_at, bot_profile)
+VALUES (100, 'private', 'alice', '2024-01-01T10:00:00', '2024-01-02T10:00:00', 'quran'),
+       (200, 'private', 'bob', '2024-01-01T10:00:00', '2024-01-03T10:00:00', NULL);
+INSERT INTO messages (chat_id, direction, text, created_at, bot_profile)
+VALUES (100, 'in', 'hello', '2024-01-02T10:00:00', 'quran'),
+       (200, 'in', 'hi', '2024-01-03T10:00:00', NULL);
+"""
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self._orig_path = db.DB_PATH
+        db.DB_PATH = Path(self._tmp.name) / "telegram_data.db"
+
+    def tearDown(self) -> None:
+        close_all_pools()
+        db.DB_PATH = self._orig_path
+        self._tmp.cleanup()
+
+    def _plan(self, sql: str, params: dict) -> str:
+        with db._get_conn() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return " | ".join(row["detail"] for row in rows)
+
+    def test_fresh_database_reaches_latest_version(self) -> None:
+        db.init_db()
+        db.init_db()  # idempotent
+        with db._get_conn() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        self.assertEqual(version, SCHEMA_VERSION)
+
+    def test_legacy_file_is_migrated_in_place(self) -> None:
+        legacy = sqlite3.connect(db.DB_PATH)
+        legacy.executescript(LEGACY_SCHEMA)
+        legacy.close()
+
+        db.init_db()
+
+        users = {u["chat_id"]: u for u in db.get_all_users()}
+        self.assertEqual(users[100]["bot_profile"], "quran")
+        self.assertEqual(users[200]["bot_profile"], "")
+        with db._get_conn() as conn:
+            row = conn.execute(
+                "SELECT last_seen_ts FROM users WHERE chat_id = 100"
+            ).fetchone()
+            self.assertEqual(row[0], 1704189600)
+            ts = conn.execute(
+                "SELECT created_ts FROM messages WHERE chat_id = 200"
+            ).fetchone()[0]
+            self.assertEqual(ts, 1704276000)
+
+    def test_slow_steps_run_after_the_migration_commits(self) -> None:
+        legacy = sqlite3.connect(db.DB_PATH)
+        legacy.executescript(LEGACY_SCHEMA)
+        legacy.close()
+
+        # A start that stops before the deferred backfills run
+        skip = lambda conn, batch_size: None
+        with mock.patch.dict(migrations.TASKS, {"messages_epochs": skip, "messages_fts": skip}):
+            db.init_db()
+        with db._get_conn() as conn:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+            self.assertEqual(
+                [r[0] for r in conn.execute("SELECT name FROM migration_tasks ORDER BY name")],
+                ["messages_epochs", "messages_fts"],
+            )
+            self.assertIsNotNone(conn.execute("SELECT 1 FROM sqlite_stat1").fetchone())  # ANALYZE ran
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM messages WHERE created_ts IS NULL").fetchone()[0], 2
+            )
+        self.assertEqual(db.search_messages("quran", "hello")[0], [])
+
+        with db._pool().connection() as conn:
+            migrations.migrate(conn, task_batch_size=1)   # the next start finishes them
+        self.assertEqual([m["chat_id"] for m in db.search_messages("quran", "hello")[0]], [100])
+        with db._get_conn() as conn:
+            self.assertIsNone(conn.execute("SELECT 1 FROM migration_tasks").fetchone())
+            rows = conn.execute("SELECT created_ts, bot_profile FROM messages ORDER BY id").fetchall()
+            self.assertEqual([tuple(r) for r in rows], [(1704189600, "quran"), (1704276000, "")])
+
+        # The update / delete triggers exist once the backfill is done
+        with db._transaction() as conn:
+            conn.execute("UPDATE messages SET text = 'goodbye' WHERE text = 'hello'")
+        self.assertEqual(db.search_messages("quran", "hello")[0], [])
+        self.assertEqual(len(db.search_messages("quran", "goodbye")[0]), 1)
+
+    def test_same_chat_is_kept_per_profile(self) -> None:
+        db.init_db()
+        db.upsert_user(100, username="alice", bot_profile="quran")
+        db.upsert_user(100, username="alice", bot_profile="gmail")
+        db.upsert_user(100, username="alice2", bot_profile="quran")
+
+        profiles = sorted((u["bot_profile"], u["username"]) for u in db.get_all_users())
+        self.assertEqual(profiles, [("gmail", "alice"), ("quran", "alice2")])
+
+    def test_query_plans_use_indexes(self) -> None:
+        db.init_db()
+
+        plan = self._plan(
+            """
+            SELECT chat_id FROM users
+            WHERE bot_profile = :p
+            ORDER BY last_seen_ts DESC, id DESC
+            LIMIT 50
+            """,
+            {"p": "quran"},
+        )
+        self.assertIn("idx_users_profile_seen", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+        plan = self._plan(
+            """
+            SELECT direction, text FROM messages
+            WHERE bot_profile = :p AND chat_id = :c
+            ORDER BY id DESC
+            LIMIT 50
+            """,
+            {"p": "quran", "c": 100},
+        )
+        self.assertIn("idx_messages_profile_chat", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+        plan = self._plan(
+            """
+            SELECT COUNT(*) FROM messages
+            WHERE bot_profile = :p AND created_ts BETWEEN :a AND :b
+            """,
+            {"p": "quran", "a": 0, "b": 2_000_000_000},
+        )
+        self.assertIn("idx_messages_profile_created", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+from email.parser import BytesParser
+from email.policy import HTTP
+
+from src.telegram import telegram_async, telegram_utils
+from src.telegram.multipart import MultipartStream
+from tests.test_http_client import StubServerTestCase
+
+
+def _parse(content_type: str, body: bytes):
+    """
+    Decode a multipart body with the stdlib parser: {name: (filename, bytes)}.
+    """
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    parts = {}
+    for part in message.iter_parts():
+        parts[part.get_param("name", header="content-disposition")] = (
+            part.get_filename(),
+            part.get_payload(decode=True),
+        )
+    return parts
+
+
+class TestMultipartStream(unittest.TestCase):
+    def setUp(self) -> None:
+        self.path = os.path.join(os.path.dirname(__file__), "test.jpg")
+        with open(self.path, "rb") as f:
+            self.content = f.read()
+
+    def test_body_matches_declared_length_and_parses(self) -> None:
+        stream = MultipartStream(
+            {"chat_id": 5, "caption": "héllo", "supports_streaming": True, "skip": None},
+            {"photo": self.path, "thumb": ("t.bin", b"\x00\x01")},
+        )
+        body = stream.read_all()
+        self.assertEqual(len(body), stream.len)
+
+        parts = _parse(stream.content_type, body)
+        self.assertEqual(parts["chat_id"][1], b"5")
+        self.assertEqual(parts["caption"][1], "héllo".encode())
+        self.assertEqual(parts["supports_streaming"][1], b"true")
+        self.assertNotIn("skip", parts)
+        self.assertEqual(parts["photo"], ("test.jpg", self.content))
+        self.assertEqual(parts["thumb"], ("t.bin", b"\x00\x01"))
+
+    def test_sources_are_equivalent_and_rewound(self) -> None:
+        f = io.BytesIO(b"xx" + self.content)
+        f.seek(2)
+        for source in (self.path, self.content, memoryview(self.content), f):
+            stream = MultipartStream({}, {"photo": ("a.jpg", source)})
+            first = stream.read_all()
+            self.assertEqual(first, stream.read_all())  # a retry re-reads the source
+            self.assertEqual(_parse(stream.content_type, first)["photo"][1], self.content)
+
+    def test_unknown_length_for_unseekable_stream(self) -> None:
+        r, w = os.pipe()
+        os.write(w, b"abc")
+        os.close(w)
+        with os.fdopen(r, "rb") as pipe:
+            stream = MultipartStream({}, {"document": ("p.txt", pipe)})
+            self.assertIsNone(stream.len)
+            self.assertEqual(_parse(stream.content_type, stream.read_all())["document"][1], b"abc")
+
+    def test_progress_and_bounded_memory(self) -> None:
+        big = os.path.join(self._tmp(), "big.bin")
+        with open(big, "wb") as f:
+            f.write(os.urandom(1024 * 1024) * 16)
+
+        reports = []
+        stream = MultipartStream({"chat_id": 1}, {"video": big}, on_progress=lambda s, t: reports.append((s, t)))
+        tracemalloc.start()
+        try:
+            total = sum(len(chunk) for chunk in stream)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(total, stream.len)
+        self.assertEqual(reports[-1], (stream.len, stream.len))
+        self.assertLess(peak, 1024 * 1024)  # 16 MiB streamed, well under 1 MiB held
+
+    def _tmp(self) -> str:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return tmp.name
+
+
+class TestStreamingUploads(StubServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        os.environ["TELEGRAM_MEDIA_CACHE"] = "0"
+        self.addCleanup(os.environ.pop, "TELEGRAM_MEDIA_CACHE", None)
+
+    def _sent_parts(self):
+        headers, raw = self.server.last_request
+        self.assertEqual(int(headers["Content-Length"]), len(raw))
+        return _parse(headers["Content-Type"], raw)
+
+    def test_send_video_from_bytes_with_progress(self) -> None:
+        reports = []
+        result = telegram_utils.send_video(
+            7, b"\x00" * 300_000, caption="clip", filename="clip.mp4",
+            on_progress=lambda sent, total: reports.append((sent, total)),
+        )
+        self.assertIsNotNone(result)
+        parts = self._sent_parts()
+        self.assertEqual(parts["video"], ("clip.mp4", b"\x00" * 300_000))
+        self.assertEqual(parts["chat_id"][1], b"7")
+        self.assertEqual(reports[-1][0], reports[-1][1])
+
+    def test_send_document_from_file_object(self) -> None:
+        f = io.BytesIO(b"%PDF-1.4 fake")
+        self.assertIsNotNone(telegram_utils.send_document(7, f, filename="a.pdf"))
+        self.assertEqual(self._sent_parts()["document"], ("a.pdf", b"%PDF-1.4 fake"))
+
+    def test_async_send_document_streams(self) -> None:
+        async def run():
+            try:
+                return await telegram_async.send_document(7, b"async bytes", filename="b.txt")
+            finally:
+                await telegram_async.aclose_clients()
+
+        self.assertIsNotNone(asyncio.run(run()))
+        self.assertEqual(self._sent_parts()["document"], ("b.txt", b"async bytes"))
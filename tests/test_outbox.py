@@ -0,0 +1,214 @@
+import os
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.telegram import db, outbox, telegram_utils
+from src.telegram.fake_api import ApiError
+from src.telegram.panel.scheduler import schedule_message
+from tests.test_fake_api import FakeApiTestCase
+from tests.test_http_client import StubServerTestCase
+
+
+class OutboxTestCase(StubServerTestCase):
+    """
+    Stub Bot API that records every call it answers.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.sent = []
+        self.server.responder = self._respond
+
+    def tearDown(self) -> None:
+        outbox.stop_workers(drain=False, timeout=5.0)
+        super().tearDown()
+
+    def _respond(self, path, form):
+        self.sent.append((path.rsplit("/", 1)[-1], form))
+        return 200, {"ok": True, "result": {"message_id": len(self.sent)}}
+
+
+class TestOutbox(OutboxTestCase):
+    def test_enqueue_returns_immediately_and_worker_delivers(self) -> None:
+        job_id = outbox.enqueue_text(5, "hello")
+        self.assertEqual(outbox.get_job(job_id)["status"], "queued")
+        self.assertEqual(self.sent, [])
+
+        self.assertEqual(outbox.process_one("w1"), "sent")
+        job = outbox.get_job(job_id)
+        self.assertEqual(job["status"], "sent")
+        self.assertEqual(job["message_id"], 1)
+        self.assertEqual(self.sent, [("sendMessage", {"chat_id": "5", "text": "hello"})])
+        self.assertIsNone(outbox.process_one("w1"))
+
+    def test_long_text_is_sent_in_chained_parts(self) -> None:
+        text = "\n\n".join(f"paragraph {i} " + "x" * 990 for i in range(10))   # ~10,000 characters
+        job_id = outbox.enqueue_text(5, text)
+        self.assertEqual(outbox.process_one("w1"), "sent")
+
+        texts = [form["text"] for _, form in self.sent]
+        self.assertEqual(len(texts), 3)
+        self.assertTrue(all(len(t) <= 4096 for t in texts))
+        self.assertEqual("\n\n".join(texts), text)
+        self.assertEqual([form.get("reply_to_message_id") for _, form in self.sent], [None, "1", "2"])
+        self.assertEqual(outbox.get_job(job_id)["message_id"], 3)
+
+    def test_long_text_resumes_after_the_parts_already_sent(self) -> None:
+        def fail_second(path, form):
+            if len(self.sent) == 1:
+                self.sent.append(("failed", form))
+                return 502, {"ok": False, "error_code": 502, "description": "Bad Gateway"}
+            return self._respond(path, form)
+
+        self.server.responder = fail_second
+        outbox.enqueue("sendMessage", {"chat_id": 5, "text": "a" * 5000})
+        self.assertEqual(outbox.process_one("w1"), "retry")
+
+        with db._transaction() as conn:
+            conn.execute("UPDATE outbox SET available_at = 0")
+        self.assertEqual(outbox.process_one("w1"), "sent")
+        sent = [form for method, form in self.sent if method == "sendMessage"]
+        self.assertEqual([len(f["text"]) for f in sent], [4096, 904])
+        self.assertEqual(sent[1]["reply_to_message_id"], "1")
+
+    def test_leases_are_exclusive_and_expire(self) -> None:
+        job_id = outbox.enqueue_text(5, "x")
+        self.assertEqual(len(outbox.claim("w1", lease_sec=60)), 1)
+        self.assertEqual(outbox.claim("w2"), [])
+
+        # w1 died: once its lease expires, another worker takes over
+        with db._transaction() as conn:
+            conn.execute("UPDATE outbox SET lease_until = 0 WHERE id = ?", (job_id,))
+        jobs = outbox.claim("w2")
+        self.assertEqual([j["id"] for j in jobs], [job_id])
+        self.assertEqual(jobs[0]["attempts"], 2)
+
+    def test_transient_errors_retry_then_dead_letter(self) -> None:
+        self.server.responder = lambda path, form: (502, {"ok": False, "error_code": 502, "description": "Bad Gateway"})
+        job_id = outbox.enqueue("sendMessage", {"chat_id": 5, "text": "x"}, attempts=2)
+
+        self.assertEqual(outbox.process_one("w1"), "retry")
+        job = outbox.get_job(job_id)
+        self.assertEqual(job["status"], "queued")
+        self.assertGreater(job["available_at"], time.time())
+
+        with db._transaction() as conn:
+            conn.execute("UPDATE outbox SET available_at = 0 WHERE id = ?", (job_id,))
+        self.assertEqual(outbox.process_one("w1"), "dead")
+        job = outbox.get_job(job_id)
+        self.assertEqual(job["status"], "dead")
+        self.assertEqual(job["error_code"], 502)
+        self.assertEqual(outbox.stats()["dead"], 1)
+
+        self.server.responder = self._respond
+        self.assertTrue(outbox.requeue_dead(job_id))
+        self.assertEqual(outbox.process_one("w1"), "sent")
+
+    def test_permanent_errors_dead_letter_at_once(self) -> None:
+        self.server.responder = lambda path, form: (400, {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"})
+        job_id = outbox.enqueue_text(5, "x")
+        self.assertEqual(outbox.process_one("w1"), "dead")
+        self.assertEqual(outbox.get_job(job_id)["attempts"], 1)
+
+    def test_flood_wait_reschedules_after_retry_after(self) -> None:
+        os.environ["TELEGRAM_FLOW_CONTROL"] = "0"
+        self.addCleanup(os.environ.pop, "TELEGRAM_FLOW_CONTROL", None)
+        self.server.responder = lambda path, form: (
+            429, {"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 30}}
+        )
+        job_id = outbox.enqueue_text(5, "x")
+        self.assertEqual(outbox.process_one("w1"), "retry")
+        self.assertGreater(outbox.get_job(job_id)["available_at"], time.time() + 25)
+
+    def test_spooled_file_is_sent_and_removed(self) -> None:
+        path = outbox.spool(b"%PDF fake", "report.pdf")
+        job_id = outbox.enqueue("sendDocument", {"chat_id": 5, "caption": "c"}, files={"document": path})
+        self.assertEqual(outbox.process_one("w1"), "sent")
+
+        headers, raw = self.server.last_request
+        self.assertIn(b'filename="report.pdf"', raw)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(outbox.get_job(job_id)["status"], "sent")
+
+    def test_file_deleted_before_delivery_is_dead_lettered(self) -> None:
+        path = outbox.spool(b"%PDF fake", "report.pdf")
+        job_id = outbox.enqueue("sendDocument", {"chat_id": 5}, files={"document": path})
+        os.remove(path)
+
+        self.assertEqual(outbox.process_one("w1"), "dead")
+        self.assertIn("File not found", outbox.get_job(job_id)["last_error"])
+        self.assertEqual(self.sent, [])
+
+    def test_missing_token_dead_letters_every_job_kind(self) -> None:
+        photos = [outbox.spool(f"photo {i}".encode(), f"p{i}.jpg") for i in range(2)]
+        ids = [
+            outbox.enqueue_text(5, "hello"),
+            outbox.enqueue("sendDocument", {"chat_id": 5}, files={"document": outbox.spool(b"%PDF", "r.pdf")}),
+            outbox.enqueue_media_group(5, [telegram_utils.input_media(p) for p in photos]),
+        ]
+        with mock.patch.dict(os.environ, {"TELEGRAM_BOT_TOKEN": ""}):
+            self.assertEqual([outbox.process_one("w1") for _ in ids], ["dead"] * 3)
+        self.assertEqual([outbox.get_job(i)["error_code"] for i in ids], [401] * 3)
+        self.assertEqual(self.sent, [])
+
+    def test_worker_pool_drains_on_stop(self) -> None:
+        ids = [outbox.enqueue_text(5, f"m{i}") for i in range(20)]
+        workers = outbox.OutboxWorkers(workers=4, poll_interval=0.05).start()
+        workers.stop(drain=True, timeout=30)
+
+        self.assertEqual(len(self.sent), 20)
+        self.assertTrue(all(outbox.get_job(i)["status"] == "sent" for i in ids))
+
+    def test_scheduled_message_waits_until_due(self) -> None:
+        os.environ["OUTBOX_WORKERS"] = "0"
+        self.addCleanup(os.environ.pop, "OUTBOX_WORKERS", None)
+        schedule_message(5, "later", datetime.now() + timedelta(hours=1), use_markdown=True)
+        self.assertIsNone(outbox.process_one("w1"))
+        self.assertEqual(outbox.stats()["queued"], 1)
+
+    def test_error_alert_is_queued_when_workers_run(self) -> None:
+        os.environ["TELEGRAM_ME_ID"] = "42"
+        self.addCleanup(os.environ.pop, "TELEGRAM_ME_ID", None)
+        outbox.start_workers(2)
+
+        result = telegram_utils.send_error_alert("disk full")
+        job = outbox.wait(result["result"]["job_id"], timeout=5)
+        self.assertEqual(job["status"], "sent")
+        self.assertEqual(self.sent[-1][1]["text"], "ERROR ALERT:\ndisk full")
+
+
+class TestOutboxMedia(FakeApiTestCase):
+    def test_repeated_file_is_sent_by_file_id(self) -> None:
+        for chat_id in (5, 6):
+            path = outbox.spool(b"%PDF same bytes", "report.pdf")
+            outbox.enqueue("sendDocument", {"chat_id": chat_id, "caption": ""}, files={"document": path})
+            self.assertEqual(outbox.process_one("w1"), "sent")
+
+        first, second = [p for m, p in self.api.requests if m == "sendDocument"]
+        self.assertNotIn("document", first)           # uploaded
+        self.assertTrue(second["document"])           # cached file_id
+        self.assertEqual(self.api.messages(6)[0]["document"]["file_name"], "report.pdf")
+
+    def test_album_job_is_split_and_resumed(self) -> None:
+        paths = [outbox.spool(f"photo {i}".encode(), f"p{i}.jpg") for i in range(11)]
+        items = [telegram_utils.input_media(p, caption=f"c{i}") for i, p in enumerate(paths)]
+        job_id = outbox.enqueue_media_group(5, items)
+
+        # The second album fails once: only it is sent again
+        send_album = self.api._handlers["sendMediaGroup"]
+        def fail_second(token, params, files):
+            if self.api.calls["sendMediaGroup"] == 2:
+                raise ApiError(502, "Bad Gateway")
+            return send_album(token, params, files)
+        self.api._handlers["sendMediaGroup"] = fail_second
+
+        self.assertEqual(outbox.process_one("w1"), "retry")
+        with db._transaction() as conn:
+            conn.execute("UPDATE outbox SET available_at = 0")
+        self.assertEqual(outbox.process_one("w1"), "sent")
+
+        self.assertEqual(self.api.calls["sendMediaGroup"], 3)   # 6, failed 5, then 5
+        self.assertEqual([m["caption"] for m in self.api.messages(5)], [f"c{i}" for i in range(11)])
+        self.assertEqual(outbox.get_job(job_id)["message_id"], 7)
+        self.assertFalse(any(os.path.exists(p) for p in paths))
@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+import unittest
+from unittest import mock
+
+from src.telegram import db, retention
+from tests.test_db import DBTestCase
+
+DAY = 86400
+NOW = 1_735_689_600  # 2025-01-01T00:00:00Z
+
+
+class TestRetention(DBTestCase):
+    def _insert(self, chat_id: int, profile: str, ts: int, text: str) -> None:
+        with db._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO messages (chat_id, direction, text, created_at, created_ts, bot_profile)
+                VALUES (?, 'in', ?, '', ?, ?)
+                """,
+                (chat_id, text, ts, profile),
+            )
+
+    def setUp(self) -> None:
+        super().setUp()
+        for i in range(90):
+            self._insert(1, "quran", NOW - (89 - i) * DAY, f"quran {i}")
+            self._insert(1, "gmail", NOW - (89 - i) * DAY, f"gmail {i}")
+
+    def test_expired_rows_move_to_monthly_archives(self) -> None:
+        retention.set_retention_policy("quran", keep_days=30)
+        moved = retention.run_retention(batch_size=7, pause=0, now_ts=NOW)
+
+        self.assertEqual(moved, {"quran": 59})
+        self.assertEqual(
+            [a["month"] for a in retention.list_archives()],
+            ["202412", "202411", "202410"],
+        )
+        self.assertEqual(sum(a["row_count"] for a in retention.list_archives()), 59)
+
+        live = db.get_messages_for_chat(1, limit=1000, bot_profile="quran")
+        self.assertEqual(len(live), 31)
+        self.assertEqual(len(db.get_messages_for_chat(1, limit=1000, bot_profile="gmail")), 90)
+
+        # Running again is a no-op
+        self.assertEqual(retention.run_retention(now_ts=NOW), {"quran": 0})
+
+    def test_archived_history_is_read_transparently(self) -> None:
+        retention.set_retention_policy("quran", keep_days=10)
+        retention.run_retention(batch_size=25, pause=0, now_ts=NOW)
+
+        texts = [m["text"] for m in db.iter_messages(1, "quran", page_size=13, include_archive=True)]
+        self.assertEqual(texts, [f"quran {i}" for i in reversed(range(90))])
+
+        self.assertEqual(db.search_messages("quran", "quran", limit=100)[0].__len__(), 11)
+
+    def test_compaction(self) -> None:
+        retention.set_retention_policy("gmail", keep_days=1)
+        worker = retention.RetentionWorker(interval=3600, pause=0)
+        worker.run_once()
+        self.assertEqual(worker.last_run["gmail"], 90)  # all rows predate "now"
+        self.assertTrue(retention.incremental_vacuum())
+        retention.compact(full=True)
+
+    def test_worker_logs_failed_runs(self) -> None:
+        called = threading.Event()
+
+        def failing(*args, **kwargs):
+            called.set()
+            raise sqlite3.OperationalError("database is locked")
+
+        with mock.patch.object(retention, "run_retention", failing), \
+                self.assertLogs("src.telegram.retention", "ERROR") as logs:
+            worker = retention.RetentionWorker(interval=3600)
+            worker.start()
+            self.assertTrue(called.wait(5))
+            worker.stop(5)
+        self.assertIn("database is locked", logs.output[0])
+
+    def test_invalid_policy(self) -> None:
+        with self.assertRaises(ValueError):
+            retention.set_retention_policy("quran", keep_days=0)
+        retention.set_retention_policy("quran", keep_days=5)
+        retention.delete_retention_policy("quran")
+        self.assertEqual(retention.get_retention_policies(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
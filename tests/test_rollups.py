@@ -0,0 +1,87 @@
+import time
+import unittest
+
+from src.telegram import db, retention, rollups
+from tests.test_db import DBTestCase
+
+HOUR = 3600
+DAY = 86400
+NOW = 1_735_689_600  # 2025-01-01T00:00:00Z
+
+
+class TestRollups(DBTestCase):
+    def _insert(self, chat_id: int, profile: str, direction: str, ts: int) -> None:
+        with db._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO messages (chat_id, direction, text, created_at, created_ts, bot_profile)
+                VALUES (?, ?, 'x', '', ?, ?)
+                """,
+                (chat_id, direction, ts, profile),
+            )
+
+    def setUp(self) -> None:
+        super().setUp()
+        # Day 0: chats 1 and 2 (3 in, 2 out); day 1: chat 1 only (1 in)
+        self._insert(1, "quran", "in", NOW + 1 * HOUR)
+        self._insert(1, "quran", "out", NOW + 1 * HOUR + 5)
+        self._insert(2, "quran", "in", NOW + 2 * HOUR)
+        self._insert(2, "quran", "out", NOW + 2 * HOUR + 5)
+        self._insert(2, "quran", "in", NOW + 5 * HOUR)
+        self._insert(1, "quran", "in", NOW + DAY + HOUR)
+        self._insert(7, "gmail", "in", NOW)
+
+    def test_daily_and_hourly_activity(self) -> None:
+        self.assertEqual(rollups.get_activity("quran", "day"), [])  # reads never catch up by default
+        days = rollups.get_activity("quran", "day", refresh=True)
+        self.assertEqual(
+            [(d["bucket"], d["messages_in"], d["messages_out"], d["active_users"]) for d in days],
+            [("2025-01-01T00:00:00", 3, 2, 2), ("2025-01-02T00:00:00", 1, 0, 1)],
+        )
+
+        hours = rollups.get_activity("quran", "hour", since_ts=NOW, until_ts=NOW + DAY)
+        self.assertEqual([h["bucket_start"] for h in hours], [NOW + HOUR, NOW + 2 * HOUR, NOW + 5 * HOUR])
+        self.assertEqual([h["active_users"] for h in hours], [1, 1, 1])
+
+        self.assertEqual(rollups.get_profile_totals(), {"quran": {"in": 4, "out": 2}, "gmail": {"in": 1, "out": 0}})
+
+    def test_catch_up_is_incremental(self) -> None:
+        self.assertEqual(rollups.catch_up(batch_size=3), 7)
+        self.assertEqual(rollups.catch_up(), 0)
+
+        self._insert(3, "quran", "in", NOW + 3 * HOUR)
+        self.assertEqual(rollups.catch_up(), 1)
+        day0 = rollups.get_activity("quran", "day")[0]
+        self.assertEqual((day0["messages_in"], day0["active_users"]), (4, 3))
+
+    def test_worker_keeps_rollups_current(self) -> None:
+        rollups.catch_up()
+        db.add_message(9, "out", "logged", bot_profile="gmail")
+        self.assertEqual(rollups.get_profile_totals()["gmail"], {"in": 1, "out": 0})  # writes never fold
+
+        worker = rollups.RollupWorker(interval=0.02)
+        worker.start()
+        self.addCleanup(worker.stop, 5)
+        deadline = time.monotonic() + 5
+        while rollups.get_profile_totals()["gmail"]["out"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(rollups.get_profile_totals()["gmail"], {"in": 1, "out": 1})
+
+    def test_counts_survive_retention_and_rebuild(self) -> None:
+        before = rollups.get_activity("quran", "day", refresh=True)
+
+        retention.set_retention_policy("quran", keep_days=1)
+        retention.run_retention(pause=0, now_ts=NOW + 3 * DAY)
+        self.assertEqual(db.get_messages_for_chat(1, bot_profile="quran"), [])
+        self.assertEqual(rollups.get_activity("quran", "day"), before)
+
+        self.assertEqual(rollups.rebuild(), 1)  # only gmail's row is still live
+        self.assertEqual(rollups.get_activity("quran", "day"), before)
+
+    def test_unknown_bucket(self) -> None:
+        with self.assertRaises(ValueError):
+            rollups.get_activity("quran", "week")
+
+
+if __name__ == "__main__":
+    unittest.main()
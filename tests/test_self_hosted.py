@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+from unittest import mock
+
+from src.telegram import metrics, telegram_async, telegram_utils
+from tests.test_fake_api import FakeApiTestCase
+
+
+class SelfHostedTestCase(FakeApiTestCase):
+    """
+    Fake server in --local mode, with TELEGRAM_LOCAL_MODE=1 on the client.
+    """
+
+    API_OPTIONS = {"local": True}
+
+    def setUp(self) -> None:
+        super().setUp()
+        os.environ["TELEGRAM_LOCAL_MODE"] = "1"
+        self.addCleanup(os.environ.pop, "TELEGRAM_LOCAL_MODE", None)
+        self.video = os.path.join(self._tmp.name, "clip.mp4")
+        with open(self.video, "wb") as f:
+            f.write(b"\x00\x00\x00\x18ftypmp42" * 1000)
+
+
+class TestLocalMode(SelfHostedTestCase):
+    def test_paths_are_passed_as_file_uris(self) -> None:
+        result = telegram_utils.send_video(5, self.video, caption="clip")["result"]
+
+        params = self.api.requests[-1][1]
+        self.assertEqual(params["video"], "file://" + os.path.abspath(self.video))
+        self.assertEqual(result["video"]["file_size"], os.path.getsize(self.video))
+        # Nothing was uploaded: the request is a small urlencoded form
+        self.assertLess(metrics.snapshot()["sendVideo"]["bytes_sent"], 500)
+
+    def test_bytes_are_still_uploaded(self) -> None:
+        result = telegram_utils.send_document(5, b"in memory", filename="a.txt")["result"]
+        self.assertEqual(result["document"]["file_name"], "a.txt")
+        self.assertNotIn("document", self.api.requests[-1][1])
+
+    def test_album_references_local_paths(self) -> None:
+        other = os.path.join(self._tmp.name, "other.mp4")
+        with open(other, "wb") as f:
+            f.write(b"other video")
+        [album] = telegram_utils.send_media_group(5, [self.video, other])
+
+        media = json.loads(self.api.requests[-1][1]["media"])
+        self.assertEqual([m["media"] for m in media], ["file://" + self.video, "file://" + other])
+        self.assertEqual(len(album["result"]), 2)
+
+    def test_large_files_are_not_capped_at_50_mb(self) -> None:
+        os.environ["TELEGRAM_MAX_UPLOAD_MB"] = "0.001"
+        self.addCleanup(os.environ.pop, "TELEGRAM_MAX_UPLOAD_MB", None)
+        # The limit only applies to uploaded bodies, not to file:// paths.
+        self.assertIsNotNone(telegram_utils.send_video(5, self.video))
+
+    def test_download_reads_the_local_file(self) -> None:
+        result = telegram_utils.send_video(5, self.video)["result"]
+        path = telegram_utils.download_file(result["video"]["file_id"])
+        self.assertEqual(path, os.path.abspath(self.video))
+
+        uploaded = telegram_utils.send_document(5, b"uploaded bytes", filename="u.bin")["result"]
+        dest = os.path.join(self._tmp.name, "copy.bin")
+        self.assertEqual(telegram_utils.download_file(uploaded["document"]["file_id"], dest), dest)
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), b"uploaded bytes")
+        self.assertNotIn("downloadFile", metrics.snapshot())
+
+
+class TestCloudMode(FakeApiTestCase):
+    def test_paths_are_uploaded(self) -> None:
+        path = os.path.join(self._tmp.name, "doc.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF" * 100)
+        telegram_utils.send_document(5, path)
+        self.assertNotIn("document", self.api.requests[-1][1])
+        self.assertGreater(metrics.snapshot()["sendDocument"]["bytes_sent"], 400)
+
+    def test_upload_over_the_limit_is_refused_before_sending(self) -> None:
+        os.environ["TELEGRAM_MAX_UPLOAD_MB"] = "0.001"   # ~1 KB
+        self.addCleanup(os.environ.pop, "TELEGRAM_MAX_UPLOAD_MB", None)
+
+        data = telegram_utils._request("sendDocument", {"chat_id": 5}, files={"document": ("big.bin", b"x" * 5000)})
+        self.assertEqual(data["error_code"], 413)
+        self.assertIn("TELEGRAM_LOCAL_MODE", data["description"])
+        self.assertEqual(self.api.calls["sendDocument"], 0)
+
+    def test_server_rejects_file_uris(self) -> None:
+        data = telegram_utils._request("sendDocument", {"chat_id": 5, "document": "file:///etc/hostname"})
+        self.assertEqual(data["error_code"], 400)
+
+    def test_download_streams_over_http(self) -> None:
+        uploaded = telegram_utils.send_document(5, b"remote bytes", filename="r.bin")["result"]
+        path = telegram_utils.download_file(uploaded["document"]["file_id"])
+        self.addCleanup(os.remove, path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"remote bytes")
+        self.assertEqual(metrics.snapshot()["downloadFile"]["bytes_received"], len(b"remote bytes"))
+
+    def test_download_over_20_mb_is_refused(self) -> None:
+        self.api.download_limit = 10
+        uploaded = telegram_utils.send_document(5, b"more than ten bytes", filename="r.bin")["result"]
+        self.assertIsNone(telegram_utils.download_file(uploaded["document"]["file_id"]))
+
+    def test_download_of_a_known_big_file_skips_get_file(self) -> None:
+        file_id = telegram_utils.send_document(5, b"x" * 100, filename="r.bin")["result"]["document"]["file_id"]
+        out = io.StringIO()
+        with mock.patch.dict(os.environ, {"TELEGRAM_MAX_DOWNLOAD_MB": "0.00001"}), contextlib.redirect_stdout(out):
+            self.assertIsNone(telegram_utils.download_file(file_id, file_size=100))
+            self.assertIsNone(asyncio.run(telegram_async.download_file(file_id, file_size=100)))
+        self.assertIn("too big for the cloud Bot API", out.getvalue())
+        self.assertEqual(self.api.calls["getFile"], 0)
+
+        with mock.patch.dict(os.environ, {"TELEGRAM_LOCAL_MODE": "1", "TELEGRAM_MAX_DOWNLOAD_MB": "0.00001"}):
+            self.assertIsNone(telegram_utils._too_big_to_download(100))
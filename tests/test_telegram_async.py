@@ -0,0 +1,125 @@
+import asyncio
+import concurrent.futures
+import gc
+import os
+import tempfile
+import time
+import unittest
+import warnings
+
+from src.telegram import telegram_async
+from src.telegram.telegram_utils import input_media
+from tests.test_fake_api import FakeApiTestCase
+from tests.test_http_client import StubServerTestCase
+
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await telegram_async.aclose_clients()
+
+    return asyncio.run(main())
+
+
+class TestTelegramAsync(StubServerTestCase):
+    _run = staticmethod(_run)
+
+    def test_concurrent_calls_share_a_bounded_pool(self) -> None:
+        os.environ["TELEGRAM_ASYNC_CONCURRENCY"] = "8"
+        os.environ["TELEGRAM_RATE_LIMIT"] = "10000"
+        self.addCleanup(os.environ.pop, "TELEGRAM_ASYNC_CONCURRENCY", None)
+        self.addCleanup(os.environ.pop, "TELEGRAM_RATE_LIMIT", None)
+
+        results = self._run(telegram_async.broadcast(list(range(200)), "hello"))
+
+        self.assertEqual(len(results), 200)
+        self.assertTrue(all(r and r["ok"] for r in results))
+        self.assertLessEqual(len(self.server.ports), 10)  # max(pool size, concurrency)
+        self.assertEqual(self.server.paths.count("/bot123:TEST/sendMessage"), 200)
+
+    def test_same_return_shape_for_files_and_errors(self) -> None:
+        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+            f.write(b"\xff\xd8 not really a jpeg")
+        self.addCleanup(os.unlink, f.name)
+
+        result = self._run(telegram_async.send_photo(1, f.name, caption="c"))
+        self.assertEqual(result, {"ok": True, "result": {"message_id": 1}})
+        self.assertEqual(self.server.paths[-1], "/bot123:TEST/sendPhoto")
+
+        os.environ.pop("TELEGRAM_BOT_TOKEN")
+        self.assertIsNone(self._run(telegram_async.pin_message(1, 2)))
+
+    def test_transient_errors_and_429_are_retried(self) -> None:
+        answers = [
+            (429, {"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 1}}),
+            (503, {"ok": False, "error_code": 503, "description": "Service Unavailable"}),
+        ]
+        self.server.responder = lambda path, form: answers.pop() if answers else (200, {"ok": True, "result": {}})
+        self.assertEqual(self._run(telegram_async._request("sendMessage", {"chat_id": 1, "text": "x"})), {"ok": True, "result": {}})
+        self.assertEqual(len(self.server.paths), 3)
+
+        self.server.responder = lambda path, form: (503, {"ok": False, "error_code": 503, "description": "Service Unavailable"})
+        before = len(self.server.paths)
+        self.assertEqual(self._run(telegram_async._request("sendMessage", {"chat_id": 1}, retry=False))["error_code"], 503)
+        self.assertEqual(len(self.server.paths) - before, 1)
+
+    def test_clients_go_away_with_their_loop(self) -> None:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ResourceWarning)   # the sockets never closed
+            for _ in range(3):
+                asyncio.run(telegram_async.send_text(1, "no explicit close"))
+            gc.collect()
+        # Only the last loop can still be around (held by its open connections)
+        self.assertLessEqual(len(telegram_async._clients), 1)
+        self.assertLessEqual(len(telegram_async._semaphores), 1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ResourceWarning)
+            _run(telegram_async.send_text(1, "closed"))
+            gc.collect()
+        self.assertEqual(len(telegram_async._clients), 0)
+
+
+class TestTelegramAsyncFlowControl(FakeApiTestCase):
+    def test_rate_limited_burst_leaves_the_executor_free(self) -> None:
+        os.environ["TELEGRAM_RATE_LIMIT"] = "20"
+        self.addCleanup(os.environ.pop, "TELEGRAM_RATE_LIMIT", None)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=5))
+            sends = asyncio.gather(*(telegram_async.send_text(i, "burst") for i in range(60)))
+            await asyncio.sleep(0.5)   # the burst is now queued on the rate bucket
+            start = time.monotonic()
+            await loop.run_in_executor(None, lambda: None)
+            unrelated = time.monotonic() - start
+            return unrelated, await sends
+
+        unrelated, results = _run(main())
+        self.assertLess(unrelated, 0.3)
+        self.assertTrue(all(r and r["ok"] for r in results))
+
+
+class TestTelegramAsyncFiles(FakeApiTestCase):
+    def test_media_group_and_download(self) -> None:
+        items = [input_media(b"one", filename="1.jpg"), input_media(b"two", filename="2.jpg"),
+                 input_media(b"doc", filename="d.txt")]
+        responses = _run(telegram_async.send_media_group(5, items))
+        self.assertEqual(len(responses), 2)  # the lone document goes with sendDocument
+        self.assertEqual((self.api.calls["sendMediaGroup"], self.api.calls["sendDocument"]), (1, 1))
+
+        _run(telegram_async.send_media_group(6, items[:2]))
+        self.assertEqual(self.api.calls["sendMediaGroup"], 2)
+        second = self.api.requests[-1][1]
+        self.assertNotIn("attach://", second["media"])  # the second album reused the file_ids
+
+        file_id = responses[1]["result"]["document"]["file_id"]
+        path = _run(telegram_async.download_file(file_id))
+        self.addCleanup(os.remove, path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"doc")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import re
+import unittest
+
+from src.telegram import telegram_async, telegram_utils
+from src.telegram.text_split import MAX_MESSAGE_LENGTH, split_text, utf16_len
+from tests.test_http_client import StubServerTestCase
+
+
+class TestSplitText(unittest.TestCase):
+    def test_short_text_is_untouched(self) -> None:
+        self.assertEqual(split_text("hello *world*", "Markdown"), ["hello *world*"])
+
+    def test_prefers_paragraph_boundaries(self) -> None:
+        paragraphs = [f"Paragraph {n}. " + "word " * 150 for n in range(20)]
+        parts = split_text("\n\n".join(p.strip() for p in paragraphs))
+
+        self.assertGreater(len(parts), 1)
+        for part in parts:
+            self.assertLessEqual(utf16_len(part), MAX_MESSAGE_LENGTH)
+            self.assertTrue(part.startswith("Paragraph "))
+            self.assertTrue(part.endswith("word"))
+
+    def test_counts_utf16_code_units(self) -> None:
+        text = "😀" * 3000   # 6000 UTF-16 units, 3000 code points
+        parts = split_text(text)
+        self.assertEqual(len(parts), 2)
+        self.assertEqual(utf16_len(parts[0]), MAX_MESSAGE_LENGTH)
+        self.assertEqual("".join(parts), text)
+
+    def test_html_tags_are_closed_and_reopened(self) -> None:
+        text = "<b>bold &amp; <i>italic</i> " + "tom &amp; jerry " * 50 + "</b> end"
+        parts = split_text(text, "HTML", limit=200)
+
+        self.assertGreater(len(parts), 2)
+        for part in parts:
+            self.assertLessEqual(utf16_len(part), 200)
+            self.assertNotRegex(part, r"&\w*$|<[^>]*$")   # no cut entity or tag
+            self.assertEqual(len(re.findall(r"<b>", part)), len(re.findall(r"</b>", part)))
+        self.assertTrue(parts[1].startswith("<b>"))
+        self.assertEqual(re.sub(r"</?b>|\s", "", "".join(parts)), re.sub(r"</?b>|\s", "", text))
+
+    def test_markdown_entities_survive_the_cut(self) -> None:
+        text = "*" + "bold words " * 40 + "* then `" + "code " * 30 + "` [link](https://example.com/x)"
+        parts = split_text(text, "Markdown", limit=150)
+
+        for part in parts:
+            self.assertLessEqual(utf16_len(part), 150)
+            self.assertEqual(part.count("*") % 2, 0)
+            self.assertEqual(part.count("`") % 2, 0)
+        self.assertTrue(parts[-1].endswith("[link](https://example.com/x)"))
+
+    def test_code_block_reopens_with_its_language(self) -> None:
+        lines = [f"print({n})" for n in range(60)]
+        parts = split_text("```python\n" + "\n".join(lines) + "\n```", "MarkdownV2", limit=300)
+
+        self.assertGreater(len(parts), 2)
+        for part in parts:
+            self.assertLessEqual(utf16_len(part), 300)
+            self.assertEqual(part.splitlines()[0], "```python")
+            self.assertTrue(part.endswith("```"))
+        code = [line for part in parts for line in part.splitlines() if not line.startswith("```")]
+        self.assertEqual(code, lines)
+
+    def test_word_longer_than_limit_is_cut_hard(self) -> None:
+        parts = split_text("a" * 250, limit=100)
+        self.assertEqual([len(p) for p in parts], [100, 100, 50])
+
+
+class TestSendLongText(StubServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.sent = []
+        self.server.responder = self._respond
+
+    def _respond(self, path, form):
+        self.sent.append(form)
+        return 200, {"ok": True, "result": {"message_id": 100 + len(self.sent)}}
+
+    def _long_text(self) -> str:
+        return "\n\n".join("line " * 500 for _ in range(4))   # ~10k characters
+
+    def test_parts_are_chained_replies(self) -> None:
+        ids = telegram_utils.send_long_text(7, self._long_text(), reply_to_message_id=5)
+
+        self.assertEqual(ids, [101, 102, 103, 104])
+        self.assertEqual([f.get("reply_to_message_id") for f in self.sent], ["5", "101", "102", "103"])
+
+    def test_send_text_splits_and_reports_all_ids(self) -> None:
+        response = telegram_utils.send_markdown(7, "*" + self._long_text() + "*")
+
+        self.assertEqual(response["result"]["message_id"], 104)
+        self.assertEqual(response["message_ids"], [101, 102, 103, 104])
+        for form in self.sent:
+            self.assertEqual(form["parse_mode"], "Markdown")
+            self.assertTrue(form["text"].startswith("*") and form["text"].endswith("*"))
+
+    def test_failed_part_stops_the_chain(self) -> None:
+        def respond(path, form):
+            if len(self.sent) == 2:
+                return 400, {"ok": False, "error_code": 400, "description": "Bad Request"}
+            return self._respond(path, form)
+
+        self.server.responder = respond
+        self.assertEqual(telegram_utils.send_long_text(7, self._long_text(), chain=False), [101, 102])
+        self.assertIsNone(telegram_utils.send_text(7, self._long_text()))
+
+    def test_async_send_long_text(self) -> None:
+        async def run():
+            try:
+                return await telegram_async.send_long_text(7, self._long_text())
+            finally:
+                await telegram_async.aclose_clients()
+
+        self.assertEqual(asyncio.run(run()), [101, 102, 103, 104])
+        self.assertEqual(self.sent[3]["reply_to_message_id"], "103")
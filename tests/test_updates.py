@@ -0,0 +1,122 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from src.telegram import metrics, telegram_fetch, updates
+from src.telegram.panel import telegram_fetch as panel_fetch
+from tests.test_fake_api import FakeApiTestCase
+
+
+class TestDispatch(unittest.TestCase):
+    def test_every_update_type_is_handled(self) -> None:
+        group = {"id": -100, "type": "supergroup", "title": "Group"}
+        cases = {
+            "callback_query": ({"id": "1", "from": {"id": 7}, "message": {"message_id": 1, "chat": group}}, -100),
+            "chat_member": ({"chat": group, "from": {"id": 7}}, -100),
+            "chat_join_request": ({"chat": group, "from": {"id": 7}}, -100),
+            "message_reaction": ({"chat": group, "message_id": 1}, -100),
+            "business_connection": ({"id": "b", "user": {"id": 8}, "user_chat_id": 8}, 8),
+            "inline_query": ({"id": "q", "from": {"id": 7}, "query": "x"}, None),
+            "poll_answer": ({"poll_id": "p", "user": {"id": 7}}, None),
+        }
+        for kind, (payload, chat_id) in cases.items():
+            with self.subTest(kind):
+                chat = updates.extract_chat({"update_id": 1, kind: payload})
+                self.assertEqual(chat and chat["id"], chat_id)
+
+        self.assertIsNone(updates.extract_chat({"update_id": 1, "some_future_type": {"chat": group}}))
+        self.assertIsNone(updates.allowed_updates())
+        with mock.patch.dict(os.environ, {"TELEGRAM_ALLOWED_UPDATES": "message, chat_member"}):
+            self.assertEqual(updates.allowed_updates(), ["message", "chat_member"])
+
+
+class TestIngest(FakeApiTestCase):
+    def test_only_new_updates_are_fetched(self) -> None:
+        self.api.push_update("one", chat_id=1)
+        self.api.push_update("two", chat_id=2)
+        self.assertEqual(updates.drain(), (True, None, 2))
+        self.assertEqual(updates.last_update_id(), 2)
+
+        # Nothing new: the next call is confirmed-offset only and returns nothing
+        self.assertEqual(updates.drain(), (True, None, 0))
+        self.assertEqual(self.api.requests[-1][1]["offset"], "3")
+
+        self.api.push_update("three", chat_id=1)
+        ok, _, chats = telegram_fetch.get_unique_chats()
+        self.assertTrue(ok)
+        self.assertEqual([c["id"] for c in chats], [1, 2])  # most recent first
+        self.assertEqual(updates.last_update_id(), 3)
+
+    def test_chats_from_other_update_types(self) -> None:
+        group = {"id": -100, "type": "supergroup", "title": "Group"}
+        self.api.push_event("chat_member", {"chat": group, "from": {"id": 7}})
+        self.api.push_event("callback_query", {"id": "1", "from": {"id": 9}, "message": {"message_id": 1, "chat": {"id": 9, "type": "private"}}})
+        self.api.push_event("inline_query", {"id": "q", "from": {"id": 11}, "query": ""})
+
+        ok, _, chats = panel_fetch.get_unique_chats()
+        self.assertTrue(ok)
+        self.assertEqual([c["id"] for c in chats], [9, -100])
+        self.assertEqual(updates.last_update_id(), 3)  # chat-less updates are confirmed too
+
+        ok, _, chat, update = telegram_fetch.get_last_chat()
+        self.assertEqual(chat["id"], 9)
+        self.assertIn("callback_query", update)
+
+    def test_allowed_updates_are_sent(self) -> None:
+        self.api.push_event("chat_member", {"chat": {"id": -5, "type": "group"}})
+        self.assertEqual(updates.ingest_once(allowed=["message"]), (True, None, 0))
+        self.assertEqual(updates.known_chats(), [])
+
+    def test_allowed_updates_are_only_sent_when_configured(self) -> None:
+        updates.ingest_once()
+        self.assertNotIn("allowed_updates", self.api.requests[-1][1])
+
+    def test_updates_of_a_polling_bot_are_left_alone(self) -> None:
+        self.api.push_update("for the bot", chat_id=1)
+        with mock.patch.dict(os.environ, {"TELEGRAM_BOT_POLLS": "1"}):
+            self.assertEqual(updates.drain(), (True, None, 0))
+
+            # The bot stores what it handles; the panel reads it from there
+            update = {"update_id": 7, "message": {"message_id": 1, "chat": {"id": 5, "type": "private"}}}
+            record = updates.recorder(os.environ["TELEGRAM_BOT_TOKEN"])
+            asyncio.run(record(mock.Mock(to_dict=lambda: update), None))
+            ok, _, chats = telegram_fetch.get_unique_chats()
+        self.assertTrue(ok)
+        self.assertEqual([c["id"] for c in chats], [5])
+        self.assertNotIn("getUpdates", [path for path, _ in self.api.requests])
+        self.assertEqual(len(self.api._updates), 1)
+
+    def test_long_poll_waits_for_an_update(self) -> None:
+        threading.Timer(0.2, self.api.push_update, args=("late",), kwargs={"chat_id": 4}).start()
+        start = time.monotonic()
+        self.assertEqual(updates.ingest_once(timeout=5), (True, None, 1))
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(self.api.requests[-1][1]["timeout"], "5")
+
+    def test_poller_runs_in_the_background(self) -> None:
+        poller = updates.start_poller(timeout=1)
+        try:
+            self.api.push_update("bg", chat_id=6)
+            deadline = time.monotonic() + 5
+            while not updates.known_chats() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual([c["id"] for c in updates.known_chats()], [6])
+            self.assertTrue(poller.running)
+        finally:
+            updates.stop_poller(5)   # before tearDown stops the server
+
+    def test_chats_are_stored_per_token(self) -> None:
+        self.api.push_update("hi", chat_id=3)
+        updates.drain()
+        self.assertEqual(updates.known_chats("456:OTHER"), [])
+        self.assertEqual(metrics.snapshot()["getUpdates"]["calls"], 1)
+
+    def test_error_is_reported(self) -> None:
+        self.api.error_rate = 1.0
+        ok, err, count = updates.ingest_once()
+        self.assertFalse(ok)
+        self.assertIn("getUpdates", err)
+        self.assertEqual(updates.last_update_id(), 0)